@@ -4,12 +4,28 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, login_user
 from flask_bcrypt import Bcrypt
 from config import config
+from app.utils.hashing import PasswordHasher
+from app.utils.rate_limit import LoginLimiter
+from app.utils.page_cache import PageCache
+from app.motion.gestures import GestureClassifier
+from app.motion.normalization import TransformCache
+from app.vision.server import VisionServer
+from app.rtc.sfu import SelectiveForwarder
+from app.rtc.bandwidth import BandwidthController
 
 # Initialize extensions
 db = SQLAlchemy()
 socketio = SocketIO()
 login_manager = LoginManager()
 bcrypt = Bcrypt()
+hasher = PasswordHasher()
+login_limiter = LoginLimiter()
+page_cache = PageCache()
+gestures = GestureClassifier()
+calibrations = TransformCache()
+vision = VisionServer()
+sfu = SelectiveForwarder()
+bandwidth = BandwidthController()
 
 def create_app(config_name='development'):
     """
@@ -23,15 +39,36 @@ def create_app(config_name='development'):
     else:
         app.config.from_object(config_name)
 
+    # Take the client address from trusted proxies' X-Forwarded-* headers,
+    # so per-IP limits don't see every client as the load balancer
+    hops = app.config.get('PROXY_FIX_HOPS', 0)
+    if hops:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops, x_host=hops)
+
+    # Import the socket handlers before SocketIO is initialized so they are kept
+    # on the SocketIO object and registered on every app's server, not only the first
+    from app.routes import game as game_routes  # noqa: F401
+
     # Initialize extensions with app
     db.init_app(app)
     socketio.init_app(app, cors_allowed_origins="*")
     login_manager.init_app(app)
     login_manager.login_view = 'auth.login'
     bcrypt.init_app(app)
+    hasher.init_app(app)
+    login_limiter.init_app(app)
+    page_cache.init_app(app)
+    gestures.init_app(app)
+    vision.init_app(app)
+    sfu.init_app(app)
+    bandwidth.init_app(app)
 
     # Import models to ensure they are registered with SQLAlchemy
-    from app.models import user, avatar, game_session
+    from app.models import user, avatar, game_session, game_result, reset_token, calibration_profile
+
+    # Keep users' landmark transforms in memory until their profile changes
+    calibrations.init_app(app)
 
     # Register blueprints
     from app.routes.main import main as main_blueprint
@@ -43,52 +80,131 @@ def create_app(config_name='development'):
     from app.routes.game import game as game_blueprint
     app.register_blueprint(game_blueprint, url_prefix='/game')
 
-    # Create database tables if they don't exist
+    # Serve fingerprinted static assets if they have been built
+    from app.utils.assets import init_assets
+    init_assets(app)
+
+    # Load compiled templates from the on-disk bytecode cache
+    from app.utils.templates import init_template_cache
+    init_template_cache(app)
+
+    # Register CLI commands
+    from app.commands import register_commands
+    register_commands(app)
+
+    # Create database tables according to the configured schema mode
     with app.app_context():
-        db.create_all()
+        init_schema(app)
 
-        # Create and log in admin user if auto-login is enabled
-        if app.config.get('AUTO_LOGIN_ENABLED', False):
-            create_and_login_admin(app)
+    # Log in the admin user automatically if auto-login is enabled
+    if app.config.get('AUTO_LOGIN_ENABLED', False):
+        create_and_login_admin(app)
 
     return app
 
-def create_and_login_admin(app):
+def init_schema(app):
+    """
+    Prepare the database schema according to SCHEMA_MODE.
+
+    'create' always runs create_all, 'check' only runs it when a table is
+    missing (a single inspection query), and 'skip' leaves the schema to
+    migrations. Both 'create' and 'check' also add columns that existing
+    tables lack, since create_all never alters a table.
     """
-    Create an admin user if it doesn't exist and automatically log them in
+    mode = app.config.get('SCHEMA_MODE', 'check')
+    if mode == 'skip':
+        return
+    if mode not in ('check', 'create'):
+        raise ValueError(f"Unknown SCHEMA_MODE: {mode}")
+    inspector = db.inspect(db.engine)
+    existing = set(inspector.get_table_names())
+    missing = set(db.metadata.tables) - existing
+    if mode == 'create' or missing:
+        if missing:
+            app.logger.info(f"Creating missing tables: {', '.join(sorted(missing))}")
+        db.create_all()
+    add_missing_columns(app, inspector, existing)
+
+def add_missing_columns(app, inspector, tables):
+    """
+    Add model columns that existing tables lack, with their indexes.
+
+    Columns are added with ALTER TABLE ... ADD COLUMN, so a NOT NULL column
+    needs a server default to fill existing rows.
+    """
+    from sqlalchemy.schema import CreateColumn, CreateIndex
+
+    for name in sorted(tables & set(db.metadata.tables)):
+        table = db.metadata.tables[name]
+        present = {column['name'] for column in inspector.get_columns(name)}
+        columns = [column for column in table.columns if column.name not in present]
+        if not columns:
+            continue
+        for column in columns:
+            if not column.nullable and column.server_default is None:
+                raise RuntimeError(f"Cannot add NOT NULL column {name}.{column.name} without a server default; "
+                                   "migrate the database")
+        app.logger.info(f"Adding missing columns to {name}: {', '.join(column.name for column in columns)}")
+        with db.engine.begin() as connection:
+            for column in columns:
+                ddl = CreateColumn(column).compile(dialect=db.engine.dialect)
+                connection.exec_driver_sql(f'ALTER TABLE {table.name} ADD COLUMN {ddl}')
+            added = {column.name for column in columns}
+            for index in table.indexes:
+                if added & {column.name for column in index.columns}:
+                    connection.execute(CreateIndex(index))
+
+def ensure_admin_user(app):
+    """
+    Return the auto-login admin user, creating it if it doesn't exist
     """
     from app.models.user import User
-    from flask import request, g
 
-    with app.app_context():
-        # Check if admin user exists
-        admin_username = app.config.get('AUTO_LOGIN_USERNAME', 'admin')
+    admin_username = app.config.get('AUTO_LOGIN_USERNAME', 'admin')
+    admin = User.query.filter_by(username=admin_username).first()
+
+    # Create admin user if it doesn't exist
+    if not admin:
         admin_email = app.config.get('AUTO_LOGIN_EMAIL', 'admin@example.com')
         admin_password = app.config.get('AUTO_LOGIN_PASSWORD', 'admin')
+        hashed_password = hasher.hash_password(admin_password)
+        admin = User(username=admin_username, email=admin_email, password_hash=hashed_password)
+        db.session.add(admin)
+        db.session.commit()
+        app.logger.info(f"Created admin user: {admin_username}")
+    return admin
 
-        admin = User.query.filter_by(username=admin_username).first()
-
-        # Create admin user if it doesn't exist
-        if not admin:
-            hashed_password = bcrypt.generate_password_hash(admin_password).decode('utf-8')
-            admin = User(username=admin_username, email=admin_email, password_hash=hashed_password)
-            db.session.add(admin)
-            db.session.commit()
-            print(f"Created admin user: {admin_username}")
-
-        # Set up automatic login for the admin user
-        @app.before_request
-        def auto_login_admin():
-            # Skip if user is already logged in or if it's a static file request
-            if g.get('_auto_login_processed') or '/static/' in request.path:
-                return
-
-            # Mark as processed to avoid infinite recursion
-            g._auto_login_processed = True
-
-            # Auto-login the admin user
-            if 'user_id' not in session:
-                admin = User.query.filter_by(username=admin_username).first()
-                if admin:
-                    login_user(admin)
-                    app.logger.info(f"Auto-logged in as {admin_username}")
+def create_and_login_admin(app):
+    """
+    Automatically log in the admin user, creating it on first use.
+
+    The admin account is created by the first request that needs it rather
+    than at startup, so booting a worker never pays for a bcrypt hash. After
+    that the admin identity is served from an in-process cache, so requests
+    without a session don't each pay for a user query.
+    """
+    from flask import request, g
+    from app.models.user import User
+    from app.utils.auto_login import AdminIdentityCache
+
+    admin_username = app.config.get('AUTO_LOGIN_USERNAME', 'admin')
+    cache = AdminIdentityCache(app, ensure_admin_user, ttl=app.config.get('AUTO_LOGIN_CACHE_TTL', 0))
+    cache.watch(User)
+    app.extensions['auto_login'] = cache
+
+    # Set up automatic login for the admin user
+    @app.before_request
+    def auto_login_admin():
+        # Skip if user is already logged in or if it's a static file request
+        if g.get('_auto_login_processed') or '/static/' in request.path:
+            return
+
+        # Mark as processed to avoid infinite recursion
+        g._auto_login_processed = True
+
+        # Auto-login the admin user (Flask-Login keeps the id under '_user_id')
+        if '_user_id' not in session:
+            admin = cache.get()
+            if admin:
+                login_user(admin)
+                app.logger.debug(f"Auto-logged in as {admin_username}")
@@ -0,0 +1,73 @@
+"""
+Flask CLI commands for maintenance and deployment tasks.
+"""
+import click
+
+
+def register_commands(app):
+    """Register the application's CLI commands"""
+
+    @app.cli.command('recompute-ratings')
+    @click.option('--system', type=click.Choice(['glicko2', 'elo']), default=None,
+                  help='Rating system to replay with (defaults to RATING_SYSTEM).')
+    @click.option('--k-factor', type=float, default=None, help='Elo K-factor override.')
+    @click.option('--tau', type=float, default=None, help='Glicko-2 volatility constraint override.')
+    def recompute_ratings_command(system, k_factor, tau):
+        """Replay the full match history and rewrite every user's rating."""
+        from app.utils.rating import RatingParams, recompute_ratings
+
+        params = RatingParams.from_config(app.config)
+        if system:
+            params.system = system
+        if k_factor is not None:
+            params.k_factor = k_factor
+        if tau is not None:
+            params.tau = tau
+
+        count = recompute_ratings(params)
+        click.echo(f"Replayed {count} completed sessions using {params.system}")
+
+    @app.cli.command('purge-reset-tokens')
+    @click.option('--batch-size', type=int, default=None,
+                  help='Tokens deleted per transaction (defaults to RESET_TOKEN_SWEEP_BATCH_SIZE).')
+    def purge_reset_tokens_command(batch_size):
+        """Delete expired password reset tokens in batches."""
+        from app.models.reset_token import PasswordResetToken
+
+        batch_size = batch_size or app.config.get('RESET_TOKEN_SWEEP_BATCH_SIZE', 1000)
+        count = PasswordResetToken.purge_expired(batch_size)
+        click.echo(f"Purged {count} expired reset tokens")
+
+    @app.cli.command('build-assets')
+    def build_assets_command():
+        """Fingerprint and precompress static assets into the dist folder."""
+        import os
+        from app.utils.assets import build_assets
+
+        dist_folder = app.config.get('ASSETS_DIST_FOLDER') or os.path.join(app.static_folder, 'dist')
+        manifest = build_assets(app.static_folder, dist_folder, exclude=[app.config['UPLOAD_FOLDER']],
+                                keep_builds=app.config.get('ASSETS_KEEP_BUILDS', 3))
+        compressed = sum(1 for entry in manifest.values() if entry['encodings'])
+        total = sum(entry['size'] for entry in manifest.values())
+        click.echo(f"Built {len(manifest)} assets ({total} bytes, {compressed} precompressed) into {dist_folder}")
+
+    @app.cli.command('precompile-templates')
+    @click.option('--render/--no-render', default=True,
+                  help='Also time one render of each template.')
+    def precompile_templates_command(render):
+        """Compile every template into the Jinja bytecode cache."""
+        from app.utils.templates import bytecode_cache_dir, precompile_templates
+
+        if app.jinja_env.bytecode_cache is None:
+            click.echo("JINJA_BYTECODE_CACHE is disabled; templates were compiled but not cached")
+
+        def ms(seconds):
+            return '-' if seconds is None else f"{seconds * 1000:.2f}"
+
+        report = precompile_templates(app, render=render)
+        click.echo(f"{'template':<32} {'compile ms':>10} {'load ms':>8} {'render ms':>10}")
+        for row in report:
+            click.echo(f"{row['name']:<32} {ms(row['compile']):>10} {ms(row['load']):>8} {ms(row['render']):>10}")
+
+        total = sum(row['compile'] for row in report)
+        click.echo(f"Compiled {len(report)} templates in {total * 1000:.1f} ms into {bytecode_cache_dir(app)}")
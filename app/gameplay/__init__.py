@@ -0,0 +1 @@
+# This file makes the gameplay directory a Python package
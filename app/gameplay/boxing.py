@@ -0,0 +1,191 @@
+"""
+Boxing damage from wrist kinematics.
+
+Each tick, every active match contributes the recent wrist history of
+both players' hands. Velocity and acceleration come from finite
+differences over the capture timestamps, so speeds are in pixels per
+second whatever the frame rate. A punch lands at a peak of wrist speed
+that is moving away from the body (towards the camera or upwards).
+Its type follows from the stroke's direction:
+
+- uppercut: mostly upward
+- cross: a large component across the body, towards the other hand
+- jab: straight at the camera
+
+Damage scales with the punch type, peak speed and acceleration. It is
+further adjusted by the avatars' strength, speed and defense, and reduced
+while the defender is blocking. All matches are processed in one
+vectorized pass over arrays of shape (matches, 2 players, 2 hands, ...).
+
+This is a library for now: the app has no server-side round loop yet, so
+nothing in it calls ``score_tick``. A caller keeps each match's wrist
+history and feeds the damage to ``GameRound.apply_damage``.
+"""
+from app.motion.landmarks import WRIST
+from app.utils.lazy_import import lazy_module
+
+np = lazy_module('numpy')
+
+# Punch type vocabulary; 0 is no punch
+PUNCH_TYPES = (None, 'jab', 'cross', 'uppercut')
+JAB, CROSS, UPPERCUT = 1, 2, 3
+
+# Avatar stat that leaves damage unchanged (the Avatar column default)
+BASE_STAT = 10
+STATS = ('strength', 'speed', 'defense')
+
+
+class BoxingRules:
+    """Tunable constants of the damage model"""
+
+    def __init__(self, min_punch_speed=750.0, reference_speed=1200.0, reference_acceleration=30000.0,
+                 base_damage=(0.0, 4.0, 7.0, 9.0), snap_bonus=0.25, block_factor=0.25,
+                 uppercut_share=0.6, cross_share=0.35, stroke_frames=4):
+        """
+        Args:
+            min_punch_speed (float): Peak wrist speed in px/s for a punch to
+                land (25 px per frame at 30 fps, as the punch gesture).
+            reference_speed (float): Peak speed in px/s dealing base damage.
+            reference_acceleration (float): Acceleration in px/s^2 that
+                earns the full snap bonus.
+            base_damage (tuple): Damage per PUNCH_TYPES entry.
+            snap_bonus (float): Extra share of damage for a sharp start.
+            block_factor (float): Share of damage that gets through a block.
+            uppercut_share (float): Upward share of the stroke for an uppercut.
+            cross_share (float): Across-the-body share of the stroke for a cross.
+            stroke_frames (int): Frames before the peak that set its direction.
+        """
+        self.min_punch_speed = min_punch_speed
+        self.reference_speed = reference_speed
+        self.reference_acceleration = reference_acceleration
+        self.base_damage = base_damage
+        self.snap_bonus = snap_bonus
+        self.block_factor = block_factor
+        self.uppercut_share = uppercut_share
+        self.cross_share = cross_share
+        self.stroke_frames = stroke_frames
+
+
+def avatar_stats(avatars):
+    """
+    Collect avatar modifiers for a tick.
+
+    Args:
+        avatars (list): (player 1 avatar, player 2 avatar) per match; None
+            stands for the default stats.
+
+    Returns:
+        numpy.ndarray: float32 array of shape (matches, 2, 3) holding
+        strength, speed and defense.
+    """
+    return np.array([
+        [[getattr(avatar, stat, None) or BASE_STAT for stat in STATS] for avatar in pair]
+        for pair in avatars
+    ], dtype=np.float32).reshape(len(avatars), 2, len(STATS))
+
+
+def wrist_kinematics(wrists, timestamps):
+    """
+    Differentiate wrist positions over time.
+
+    Args:
+        wrists (ndarray): Positions of shape (..., frames, 3).
+        timestamps (ndarray): Capture times in milliseconds of shape
+            (..., frames), broadcastable against the positions.
+
+    Returns:
+        tuple: Velocity (..., frames - 1, 3) in px/s and acceleration
+        (..., frames - 2, 3) in px/s^2.
+    """
+    dt = np.diff(timestamps, axis=-1)[..., None] / 1000.0
+    dt = np.where(dt > 0, dt, np.nan)
+    velocity = np.diff(wrists, axis=-2) / dt
+    centers = (dt[..., 1:, :] + dt[..., :-1, :]) / 2
+    acceleration = np.diff(velocity, axis=-2) / centers
+    return velocity, acceleration
+
+
+def score_tick(hands, timestamps, stats=None, blocking=None, rules=None, new_frames=1):
+    """
+    Work out the damage dealt in one tick across all matches.
+
+    Punches are scored at their speed peak, one frame after it, so every
+    punch counts exactly once while the history window slides forward by
+    ``new_frames`` each tick.
+
+    Args:
+        hands (ndarray): Recent landmarks of shape (matches, 2, 2, frames, 21, 3)
+            or wrists only of shape (matches, 2, 2, frames, 3). Frames must
+            cover at least the stroke plus the ``new_frames`` latest ones.
+        timestamps (ndarray): Capture times in milliseconds, of shape
+            (matches, 2, frames).
+        stats (ndarray): Output of avatar_stats; default stats when None.
+        blocking (ndarray): Whether each player is blocking, of shape
+            (matches, 2).
+        rules (BoxingRules): Damage model constants.
+        new_frames (int): Frames added to the history since the last tick.
+
+    Returns:
+        dict: 'damage' is the health lost by each player, shape (matches, 2);
+        'punches' is the PUNCH_TYPES index of each hand's last punch this
+        tick and 'speed' its peak speed, both shaped (matches, 2, 2).
+
+    Raises:
+        ValueError: If the history is too short.
+    """
+    r = rules or BoxingRules()
+    hands = np.asarray(hands, dtype=np.float32)
+    wrists = hands[..., WRIST, :] if hands.ndim == 6 else hands
+    matches, frames = wrists.shape[0], wrists.shape[3]
+    if frames < r.stroke_frames + new_frames + 2:
+        raise ValueError(f'Need at least {r.stroke_frames + new_frames + 2} frames of history')
+
+    times = np.asarray(timestamps, dtype=np.float64)[:, :, None, :]
+    velocity, acceleration = wrist_kinematics(wrists, times)
+    speed = np.sqrt(np.einsum('...i,...i->...', velocity, velocity))
+
+    # Speed peaks among the newest velocities that have a successor
+    last = speed.shape[-1] - 1
+    peaks = np.arange(last - new_frames, last)
+    current = speed[..., peaks]
+    outward = (-velocity[..., peaks, 2] > 0) | (-velocity[..., peaks, 1] > 0)
+    landed = ((current >= speed[..., peaks - 1]) & (current > speed[..., peaks + 1])
+              & (current > r.min_punch_speed) & outward)
+
+    # Stroke direction: from stroke_frames before the peak to the peak
+    end = wrists[..., peaks + 1, :]
+    stroke = end - wrists[..., peaks + 1 - r.stroke_frames, :]
+    length = np.sqrt(np.einsum('...i,...i->...', stroke, stroke))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        upward = -stroke[..., 1] / length
+        # Across the body: towards the player's other hand
+        center_x = wrists[..., -1, 0].mean(axis=2)[:, :, None, None]
+        inward = np.sign(center_x - wrists[..., peaks + 1 - r.stroke_frames, 0])
+        across = stroke[..., 0] * inward / length
+    kinds = np.select([upward > r.uppercut_share, across > r.cross_share], [UPPERCUT, CROSS], JAB)
+    kinds = np.where(landed, kinds, 0).astype(np.uint8)
+
+    # Damage per punch from type, speed and snap
+    if stats is None:
+        stats = np.full((matches, 2, len(STATS)), BASE_STAT, dtype=np.float32)
+    strength, agility, defense = (stats[..., i] for i in range(len(STATS)))
+    snap = np.nan_to_num(np.linalg.norm(acceleration[..., peaks - 1, :], axis=-1))
+    damage = (np.asarray(r.base_damage, dtype=np.float32)[kinds]
+              * np.clip(np.nan_to_num(current) * (agility / BASE_STAT)[:, :, None, None] / r.reference_speed, 0.5, 2.0)
+              * (1 + r.snap_bonus * np.clip(snap / r.reference_acceleration, 0, 1))
+              * (strength / BASE_STAT)[:, :, None, None])
+    dealt = damage.sum(axis=(2, 3))
+
+    # Each player takes what the opponent dealt, softened by defense and blocks
+    taken = dealt[:, ::-1] * BASE_STAT / np.maximum(defense, 1)
+    if blocking is not None:
+        taken = np.where(blocking, taken * r.block_factor, taken)
+
+    # Report each hand's latest punch this tick
+    latest = np.where(landed, np.arange(new_frames), -1).max(axis=-1)
+    pick = np.maximum(latest, 0)[..., None]
+    return {
+        'damage': taken.astype(np.float32),
+        'punches': np.where(latest >= 0, np.take_along_axis(kinds, pick, -1)[..., 0], 0).astype(np.uint8),
+        'speed': np.where(latest >= 0, np.take_along_axis(current, pick, -1)[..., 0], 0).astype(np.float32),
+    }
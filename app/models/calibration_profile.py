@@ -0,0 +1,99 @@
+from datetime import datetime, timezone
+import json
+from app import db
+from app.motion.normalization import HANDEDNESS, LandmarkTransform
+
+
+class CalibrationProfile(db.Model):
+    """A user's motion calibration, kept so they don't recalibrate on every visit"""
+    __tablename__ = 'calibration_profiles'
+
+    MEASUREMENTS = ('shoulder_width', 'arm_span', 'center_x', 'center_y')
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), unique=True, nullable=False, index=True)
+    handedness = db.Column(db.String(5), default='right', nullable=False)
+
+    # Body measurements in camera pixels
+    shoulder_width = db.Column(db.Float, nullable=True)
+    arm_span = db.Column(db.Float, nullable=True)
+    center_x = db.Column(db.Float, nullable=True)
+    center_y = db.Column(db.Float, nullable=True)
+
+    # JSON from the calibration page: motion range, thresholds, environment
+    data = db.Column(db.Text, nullable=True)
+
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc),
+                           onupdate=lambda: datetime.now(timezone.utc))
+
+    # Relationships
+    user = db.relationship('User', backref=db.backref(
+        'calibration', uselist=False, lazy=True, cascade='all, delete-orphan'))
+
+    def __repr__(self):
+        return f'<CalibrationProfile user={self.user_id}>'
+
+    @classmethod
+    def for_user(cls, user):
+        """Get a user's profile, adding an empty one if they have none"""
+        profile = cls.query.filter_by(user_id=user.id).first()
+        if profile is None:
+            profile = cls(user_id=user.id)
+            db.session.add(profile)
+        return profile
+
+    def update(self, handedness='right', measurements=None, data=None):
+        """
+        Replace the stored calibration.
+
+        The caller is responsible for committing the session.
+
+        Args:
+            handedness (str): 'right' or 'left'.
+            measurements (dict): New values for MEASUREMENTS (missing ones
+                become None); the stored ones are kept when None.
+            data (dict): Client calibration data to store as JSON.
+
+        Raises:
+            ValueError: If the handedness or a measurement is invalid.
+        """
+        if handedness not in HANDEDNESS:
+            raise ValueError(f"Handedness must be one of: {', '.join(HANDEDNESS)}")
+        if measurements is not None:
+            for name in ('shoulder_width', 'arm_span'):
+                value = measurements.get(name)
+                if value is not None and not value > 0:
+                    raise ValueError(f'{name} must be positive')
+            for name in self.MEASUREMENTS:
+                setattr(self, name, measurements.get(name))
+
+        self.handedness = handedness
+        self.data = json.dumps(data) if data else None
+
+    def transform(self):
+        """Build the transform that normalizes this user's landmarks"""
+        return LandmarkTransform.from_measurements(
+            shoulder_width=self.shoulder_width,
+            arm_span=self.arm_span,
+            center_x=self.center_x,
+            center_y=self.center_y,
+            handedness=self.handedness,
+        )
+
+    def to_dict(self):
+        """Get the profile as sent to the calibration page"""
+        data = {}
+        if self.data:
+            try:
+                data = json.loads(self.data)
+            except json.JSONDecodeError:
+                pass
+        return {
+            'handedness': self.handedness,
+            'shoulder_width': self.shoulder_width,
+            'arm_span': self.arm_span,
+            'center': None if self.center_x is None else {'x': self.center_x, 'y': self.center_y},
+            'data': data,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+        }
@@ -0,0 +1,57 @@
+from datetime import datetime, timezone
+import hashlib
+from flask import current_app, render_template
+from app import db
+
+
+class GameResult(db.Model):
+    """Pre-rendered results summary for a completed game session"""
+    __tablename__ = 'game_results'
+
+    TEMPLATE = 'game/results_summary.html'
+
+    session_id = db.Column(db.Integer, db.ForeignKey('game_sessions.id'), primary_key=True)
+    version = db.Column(db.String(64), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    etag = db.Column(db.String(32), nullable=False)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+    # Relationships
+    session = db.relationship('GameSession', backref=db.backref(
+        'result', uselist=False, lazy=True, cascade='all, delete-orphan'))
+
+    def __repr__(self):
+        return f'<GameResult {self.session_id}>'
+
+    @staticmethod
+    def current_version():
+        """Get the deploy version stored results must match to be served"""
+        return str(current_app.config.get('DEPLOY_VERSION', 'dev'))
+
+    @property
+    def is_current(self):
+        """Check if the stored summary was rendered by this deploy"""
+        return self.version == self.current_version()
+
+    @classmethod
+    def publish(cls, session):
+        """
+        Render and store the results summary for a completed session.
+
+        The caller is responsible for committing the session.
+
+        Args:
+            session (GameSession): The completed game session.
+
+        Returns:
+            GameResult: The stored result.
+        """
+        body = render_template(cls.TEMPLATE, session=session)
+        result = session.result
+        if result is None:
+            result = cls(session=session)
+            db.session.add(result)
+        result.version = cls.current_version()
+        result.body = body
+        result.etag = hashlib.sha256(body.encode('utf-8')).hexdigest()[:32]
+        return result
@@ -1,3 +1,4 @@
+import math
 from datetime import datetime, timezone
 from app import db
 
@@ -16,6 +17,9 @@ class GameSession(db.Model):
     STATUS_CANCELLED = 'cancelled'
 
     status = db.Column(db.String(20), default=STATUS_WAITING)
+
+    # Game mode (a key of app.vision.scheduler.GAME_MODES); None for the default
+    game_mode = db.Column(db.String(32), nullable=True)
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
     started_at = db.Column(db.DateTime, nullable=True)
     ended_at = db.Column(db.DateTime, nullable=True)
@@ -36,6 +40,7 @@ class GameSession(db.Model):
             'player1_id': self.player1_id,
             'player2_id': self.player2_id,
             'status': self.status,
+            'game_mode': self.game_mode,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'started_at': self.started_at.isoformat() if self.started_at else None,
             'ended_at': self.ended_at.isoformat() if self.ended_at else None,
@@ -131,10 +136,31 @@ class GameSession(db.Model):
                 self.player1.draws += 1
                 self.player2.draws += 1
 
+            self._update_ratings(winner_id)
+
+            # The results page can no longer change, so render it once now
+            from app.models.game_result import GameResult
+            GameResult.publish(self)
             db.session.commit()
             return True
         return False
 
+    def _update_ratings(self, winner_id):
+        """Update both players' skill ratings from the match result"""
+        from flask import current_app
+        from app.utils.rating import RatingParams, rate_match
+
+        if self.player1 is self.player2:
+            return
+
+        if winner_id == self.player1_id:
+            score = 1.0
+        elif winner_id == self.player2_id:
+            score = 0.0
+        else:
+            score = 0.5
+        rate_match(self.player1, self.player2, score, RatingParams.from_config(current_app.config))
+
     def cancel_session(self):
         """Cancel the game session"""
         self.status = self.STATUS_CANCELLED
@@ -162,8 +188,9 @@ class GameRound(db.Model):
 
     # Round results
     winner_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
-    player1_health = db.Column(db.Integer, default=100)
-    player2_health = db.Column(db.Integer, default=100)
+    # Exact health, so damage smaller than a point per tick still adds up
+    player1_health = db.Column(db.Float, default=100)
+    player2_health = db.Column(db.Float, default=100)
 
     # Relationships
     winner = db.relationship('User', backref='won_rounds', lazy=True)
@@ -207,3 +234,24 @@ class GameRound(db.Model):
             db.session.commit()
             return True
         return False
+
+    def apply_damage(self, player1_damage, player2_damage):
+        """
+        Subtract health lost this tick, e.g. from app.gameplay.boxing.
+
+        Fractions are kept; use shown_health to display health. The change
+        is not committed, so a tick's rounds can be saved together.
+
+        Returns:
+            bool: True if a player has run out of health.
+        """
+        if self.status != self.STATUS_ACTIVE:
+            return False
+        self.player1_health = max(0.0, self.player1_health - float(player1_damage))
+        self.player2_health = max(0.0, self.player2_health - float(player2_damage))
+        return self.player1_health == 0 or self.player2_health == 0
+
+    @property
+    def shown_health(self):
+        """Both players' health as whole points, rounded up so a player with health left never shows 0"""
+        return tuple(math.ceil(health) for health in (self.player1_health, self.player2_health))
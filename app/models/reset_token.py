@@ -0,0 +1,91 @@
+from datetime import datetime, timezone, timedelta
+import hashlib
+import secrets
+from app import db
+
+
+class PasswordResetToken(db.Model):
+    """Password reset token, stored only as a SHA-256 digest of the emailed value"""
+    __tablename__ = 'password_reset_tokens'
+    __table_args__ = (
+        db.Index('ix_password_reset_tokens_user_expires', 'user_id', 'expires_at'),
+    )
+
+    LIFETIME = timedelta(hours=1)
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    token_digest = db.Column(db.String(64), unique=True, nullable=False, index=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+    # Relationships
+    user = db.relationship('User', backref=db.backref('reset_tokens', lazy=True, cascade='all, delete-orphan'))
+
+    def __repr__(self):
+        return f'<PasswordResetToken user={self.user_id}>'
+
+    @staticmethod
+    def digest(token):
+        """Get the hex digest under which a token is stored"""
+        return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+    @classmethod
+    def issue(cls, user):
+        """
+        Replace any outstanding tokens for a user with a new one.
+
+        Returns:
+            str: The plaintext token to send to the user.
+        """
+        token = secrets.token_urlsafe(32)
+        cls.query.filter_by(user_id=user.id).delete()
+        db.session.add(cls(
+            user_id=user.id,
+            token_digest=cls.digest(token),
+            expires_at=datetime.now(timezone.utc) + cls.LIFETIME
+        ))
+        db.session.commit()
+        return token
+
+    @classmethod
+    def find_valid(cls, token):
+        """
+        Look up an unexpired token by its digest.
+
+        Returns:
+            PasswordResetToken: The matching token, or None.
+        """
+        if not token:
+            return None
+        return cls.query.filter(
+            cls.token_digest == cls.digest(token),
+            cls.expires_at > datetime.now(timezone.utc)
+        ).first()
+
+    @classmethod
+    def purge_expired(cls, batch_size=1000, now=None):
+        """
+        Delete expired tokens in batches, oldest first.
+
+        Each batch is committed separately so the sweep never holds a long
+        write lock on the table.
+
+        Returns:
+            int: The number of tokens deleted.
+        """
+        now = now or datetime.now(timezone.utc)
+        total = 0
+        while True:
+            ids = db.session.execute(
+                db.select(cls.id).where(cls.expires_at <= now)
+                .order_by(cls.expires_at).limit(batch_size)
+            ).scalars().all()
+            if not ids:
+                break
+            db.session.execute(db.delete(cls).where(cls.id.in_(ids)))
+            db.session.commit()
+            total += len(ids)
+            if len(ids) < batch_size:
+                break
+        return total
@@ -1,7 +1,7 @@
-from datetime import datetime, timezone, timedelta
-import secrets
+from datetime import datetime, timezone
 from flask_login import UserMixin
 from app import db, login_manager
+from app.utils.rating import DEFAULT_RATING, DEFAULT_DEVIATION, DEFAULT_VOLATILITY
 
 @login_manager.user_loader
 def load_user(user_id):
@@ -19,16 +19,21 @@ class User(db.Model, UserMixin):
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
     last_seen = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
 
-    # Password reset fields
-    reset_token = db.Column(db.String(100), nullable=True)
-    reset_token_expiration = db.Column(db.DateTime, nullable=True)
-
     # Profile information
     avatar_id = db.Column(db.Integer, db.ForeignKey('avatars.id', name='fk_user_avatar_id'), nullable=True)
     wins = db.Column(db.Integer, default=0)
     losses = db.Column(db.Integer, default=0)
     draws = db.Column(db.Integer, default=0)
 
+    # Skill rating (Glicko-2 scale, also used as the Elo rating)
+    # Server defaults let init_schema add the columns to existing databases
+    rating = db.Column(db.Float, default=DEFAULT_RATING, server_default=str(DEFAULT_RATING),
+                       nullable=False, index=True)
+    rating_deviation = db.Column(db.Float, default=DEFAULT_DEVIATION, server_default=str(DEFAULT_DEVIATION),
+                                 nullable=False)
+    rating_volatility = db.Column(db.Float, default=DEFAULT_VOLATILITY, server_default=str(DEFAULT_VOLATILITY),
+                                  nullable=False)
+
     # Relationships
     player1_sessions = db.relationship('GameSession', foreign_keys='GameSession.player1_id', backref='player1', lazy=True)
     player2_sessions = db.relationship('GameSession', foreign_keys='GameSession.player2_id', backref='player2', lazy=True)
@@ -55,29 +60,28 @@ class User(db.Model, UserMixin):
 
     def generate_reset_token(self):
         """Generate a password reset token that expires in 1 hour"""
-        self.reset_token = secrets.token_urlsafe(32)
-        self.reset_token_expiration = datetime.now(timezone.utc) + timedelta(hours=1)
-        db.session.commit()
-        return self.reset_token
+        from app.models.reset_token import PasswordResetToken
+        return PasswordResetToken.issue(self)
 
     def verify_reset_token(self, token):
-        """Verify that the reset token is valid and not expired"""
-        if token != self.reset_token:
-            return False
-        # Convert reset_token_expiration to timezone-aware datetime for comparison
-        if self.reset_token_expiration is None:
-            return False
-        expiration = self.reset_token_expiration.replace(tzinfo=timezone.utc)
-        if expiration < datetime.now(timezone.utc):
-            return False
-        return True
+        """Verify that the reset token is valid, not expired and belongs to this user"""
+        from app.models.reset_token import PasswordResetToken
+        record = PasswordResetToken.find_valid(token)
+        return record is not None and record.user_id == self.id
 
     def clear_reset_token(self):
         """Clear the reset token after it has been used"""
-        self.reset_token = None
-        self.reset_token_expiration = None
+        from app.models.reset_token import PasswordResetToken
+        PasswordResetToken.query.filter_by(user_id=self.id).delete()
         db.session.commit()
 
+    @staticmethod
+    def get_user_by_reset_token(token):
+        """Get the user a valid, unexpired reset token was issued to"""
+        from app.models.reset_token import PasswordResetToken
+        record = PasswordResetToken.find_valid(token)
+        return record.user if record else None
+
     @staticmethod
     def get_user_by_email(email):
         """Get a user by their email address"""
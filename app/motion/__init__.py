@@ -0,0 +1 @@
+# This file makes the motion directory a Python package
@@ -0,0 +1,184 @@
+"""
+Compact binary landmark frames.
+
+A frame is a fixed 20-byte little-endian header followed by the landmarks
+of one or more sets (e.g. left and right hand) as 16-bit values:
+
+    offset  size  field
+    0       1     version (1)
+    1       1     kind: 1 hand (21 points), 2 body (33), 3 face mesh (468)
+    2       1     encoding: 1 float16, 2 int16 quantized
+    3       1     sets: number of landmark sets in the frame
+    4       4     seq: uint32 sequence number
+    8       8     timestamp: float64 capture time in milliseconds
+    16      4     scale: float32 step of one int16 unit (unused for float16)
+    20      ...   landmarks: sets x points x (x, y, z)
+
+A message is any number of frames of the same kind, encoding and set
+count back to back, so a batch decodes with a single ``numpy.frombuffer``
+into a structured array whose fields are views of the received buffer.
+Missing landmarks are NaN in float16 and -32768 in int16.
+"""
+from functools import lru_cache
+from app.motion.landmarks import HAND_LANDMARKS, BODY_LANDMARKS, FACE_LANDMARKS
+from app.utils.lazy_import import lazy_module
+
+np = lazy_module('numpy')
+
+VERSION = 1
+HEADER_SIZE = 20
+
+KIND_HAND = 1
+KIND_BODY = 2
+KIND_FACE = 3
+KIND_POINTS = {KIND_HAND: HAND_LANDMARKS, KIND_BODY: BODY_LANDMARKS, KIND_FACE: FACE_LANDMARKS}
+
+# Order of the sets in a hand frame
+HAND_NAMES = ('left', 'right')
+
+ENCODING_FLOAT16 = 1
+ENCODING_INT16 = 2
+ENCODING_TYPES = {ENCODING_FLOAT16: '<f2', ENCODING_INT16: '<i2'}
+
+# int16 value marking a missing landmark
+MISSING_INT16 = -32768
+INT16_RANGE = 32767
+
+
+class FrameFormatError(ValueError):
+    """Raised when a binary landmark message is malformed"""
+
+
+@lru_cache(maxsize=64)
+def frame_dtype(kind, encoding, sets):
+    """
+    Get the structured dtype of one frame.
+
+    Returns:
+        numpy.dtype: Header fields plus a 'landmarks' field of shape
+        (sets, points, 3).
+    """
+    return np.dtype([
+        ('version', 'u1'),
+        ('kind', 'u1'),
+        ('encoding', 'u1'),
+        ('sets', 'u1'),
+        ('seq', '<u4'),
+        ('timestamp', '<f8'),
+        ('scale', '<f4'),
+        ('landmarks', ENCODING_TYPES[encoding], (sets, KIND_POINTS[kind], 3)),
+    ])
+
+
+def encode_frames(landmarks, kind, seq=0, timestamps=None, encoding=ENCODING_FLOAT16):
+    """
+    Encode landmark frames.
+
+    Args:
+        landmarks (array-like): Shape (frames, sets, points, 3), or
+            (frames, points, 3) for a single set. NaN marks missing points.
+        kind (int): KIND_HAND, KIND_BODY or KIND_FACE.
+        seq (int or array-like): Sequence number of the first frame, or one
+            per frame.
+        timestamps (array-like): Capture time per frame in milliseconds.
+        encoding (int): ENCODING_FLOAT16 or ENCODING_INT16. int16 picks a
+            per-frame scale that spans the frame's largest coordinate.
+
+    Returns:
+        bytes: The encoded message.
+    """
+    values = np.asarray(landmarks, dtype=np.float32)
+    if values.ndim == 3:
+        values = values[:, None]
+    frames, sets = values.shape[:2]
+    if kind not in KIND_POINTS or values.shape[2:] != (KIND_POINTS[kind], 3):
+        raise FrameFormatError(f'Landmarks do not match kind {kind}')
+    if encoding not in ENCODING_TYPES:
+        raise FrameFormatError(f'Unknown encoding {encoding}')
+
+    records = np.zeros(frames, dtype=frame_dtype(kind, encoding, sets))
+    records['version'] = VERSION
+    records['kind'] = kind
+    records['encoding'] = encoding
+    records['sets'] = sets
+    seq = np.asarray(seq, dtype=np.uint32)
+    records['seq'] = seq + np.arange(frames, dtype=np.uint32) if seq.ndim == 0 else seq
+    records['timestamp'] = 0 if timestamps is None else timestamps
+
+    if encoding == ENCODING_FLOAT16:
+        records['landmarks'] = values
+    else:
+        missing = np.isnan(values)
+        peak = np.nanmax(np.abs(values).reshape(frames, -1), axis=1, initial=0)
+        scale = np.where(peak > 0, peak / INT16_RANGE, 1.0).astype(np.float32)
+        quantized = np.rint(values / scale[:, None, None, None])
+        quantized[missing] = MISSING_INT16
+        records['scale'] = scale
+        records['landmarks'] = quantized
+    return records.tobytes()
+
+
+def decode_frames(buffer, kind=None):
+    """
+    Decode a message without copying it.
+
+    Args:
+        buffer (bytes-like): The received message.
+        kind (int): Expected kind, if any.
+
+    Returns:
+        numpy.ndarray: Structured array of frames (see frame_dtype) viewing
+        the buffer; it is read-only when the buffer is.
+
+    Raises:
+        FrameFormatError: If the buffer is not bytes-like, or the header or
+            size is invalid.
+    """
+    try:
+        view = memoryview(buffer).cast('B')
+    except TypeError:
+        raise FrameFormatError(f'Message must be contiguous bytes, not {type(buffer).__name__}')
+    if view.nbytes < HEADER_SIZE:
+        raise FrameFormatError('Message is shorter than a frame header')
+
+    version, frame_kind, encoding, sets = view[:4].tobytes()
+    if version != VERSION:
+        raise FrameFormatError(f'Unsupported frame version {version}')
+    if frame_kind not in KIND_POINTS or (kind is not None and frame_kind != kind):
+        raise FrameFormatError(f'Unexpected frame kind {frame_kind}')
+    if encoding not in ENCODING_TYPES or sets == 0:
+        raise FrameFormatError('Invalid frame encoding or set count')
+
+    dtype = frame_dtype(frame_kind, encoding, sets)
+    if view.nbytes % dtype.itemsize:
+        raise FrameFormatError(f'Message size is not a multiple of the {dtype.itemsize}-byte frame')
+
+    records = np.frombuffer(view, dtype=dtype)
+    # Every frame in a message must share the first frame's layout
+    layout = np.stack([records['version'], records['kind'], records['encoding'], records['sets']], axis=1)
+    if (layout != layout[0]).any():
+        raise FrameFormatError('Frames in a message must share one layout')
+    return records
+
+
+def dequantize(records, out=None):
+    """
+    Convert decoded frames to float32 landmarks.
+
+    Args:
+        records (numpy.ndarray): Output of decode_frames.
+        out (numpy.ndarray): Optional float32 buffer of shape
+            (frames, sets, points, 3) to write into.
+
+    Returns:
+        numpy.ndarray: float32 landmarks with NaN for missing points.
+    """
+    values = records['landmarks']
+    if out is None:
+        out = np.empty(values.shape, dtype=np.float32)
+    if records.dtype['landmarks'].base == np.dtype('<f2'):
+        np.copyto(out, values)
+    else:
+        np.multiply(values, records['scale'][:, None, None, None], out=out)
+        out[values == MISSING_INT16] = np.nan
+    return out
@@ -0,0 +1,135 @@
+"""
+Labeled landmark sequences for measuring gesture recognition.
+
+A sequence is a run of consecutive frames from one player: both hands as
+(frames, 2, 21, 3) in HAND_NAMES order, optionally the body as
+(frames, 33, 3), capture timestamps in milliseconds, and the gesture the
+player was making in every frame of every track. Labels are indices into
+HAND_GESTURES / BODY_POSES; 0 marks frames nobody labeled, which scoring
+ignores. Missing landmarks are NaN.
+
+A corpus is a directory of sequences, one compressed ``.npz`` file each.
+Files store label names next to the codes, so a corpus stays readable
+after the label vocabularies change.
+"""
+import os
+from app.motion.codec import HAND_NAMES
+from app.motion.gestures import HAND_GESTURES, BODY_POSES
+from app.motion.landmarks import HAND_LANDMARKS, BODY_LANDMARKS
+from app.utils.lazy_import import lazy_module
+
+np = lazy_module('numpy')
+
+CORPUS_EXTENSION = '.npz'
+
+
+def _vocabulary_names(vocabulary):
+    return np.array(['' if label is None else label for label in vocabulary])
+
+
+def _remap(codes, names, vocabulary):
+    """Map stored codes through their saved names to indices into vocabulary"""
+    lookup = np.array([vocabulary.index(name or None) if (name or None) in vocabulary else 0 for name in names],
+                      dtype=np.uint8)
+    return lookup[codes]
+
+
+class GestureSequence:
+    """Labeled landmark frames of one player"""
+
+    def __init__(self, hands, hand_labels, body=None, body_labels=None, timestamps=None, name=''):
+        """
+        Args:
+            hands (array-like): Shape (frames, 2, 21, 3).
+            hand_labels (array-like): HAND_GESTURES indices of shape (frames, 2).
+            body (array-like): Shape (frames, 33, 3), or None.
+            body_labels (array-like): BODY_POSES indices of shape (frames,).
+            timestamps (array-like): Capture times in milliseconds; frames are
+                assumed 30 fps apart when omitted.
+            name (str): Description, e.g. the gesture or the recording.
+
+        Raises:
+            ValueError: If the arrays do not line up.
+        """
+        self.hands = np.asarray(hands, dtype=np.float32)
+        self.hand_labels = np.asarray(hand_labels, dtype=np.uint8)
+        frames = len(self.hands)
+        if self.hands.shape[1:] != (len(HAND_NAMES), HAND_LANDMARKS, 3) or self.hand_labels.shape != (frames, 2):
+            raise ValueError('Hands must have shape (frames, 2, 21, 3) with labels of shape (frames, 2)')
+
+        self.body = None if body is None else np.asarray(body, dtype=np.float32)
+        self.body_labels = np.zeros(frames, dtype=np.uint8) if body_labels is None else \
+            np.asarray(body_labels, dtype=np.uint8)
+        if self.body is not None and self.body.shape != (frames, BODY_LANDMARKS, 3):
+            raise ValueError('Body must have shape (frames, 33, 3)')
+        if self.body_labels.shape != (frames,):
+            raise ValueError('Body labels must have shape (frames,)')
+
+        self.timestamps = np.arange(frames) * (1000 / 30) if timestamps is None else \
+            np.asarray(timestamps, dtype=np.float64)
+        if self.timestamps.shape != (frames,):
+            raise ValueError('Timestamps must have shape (frames,)')
+        self.name = name
+
+    def __len__(self):
+        return len(self.hands)
+
+    def save(self, path):
+        """Write the sequence to an .npz file"""
+        arrays = {
+            'hands': self.hands,
+            'hand_labels': self.hand_labels,
+            'hand_vocabulary': _vocabulary_names(HAND_GESTURES),
+            'body_labels': self.body_labels,
+            'body_vocabulary': _vocabulary_names(BODY_POSES),
+            'timestamps': self.timestamps,
+            'name': np.array(self.name),
+        }
+        if self.body is not None:
+            arrays['body'] = self.body
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read a sequence written by save.
+
+        Raises:
+            ValueError: If the file is not a valid sequence.
+        """
+        with np.load(path, allow_pickle=False) as data:
+            try:
+                return cls(
+                    hands=data['hands'],
+                    hand_labels=_remap(data['hand_labels'], data['hand_vocabulary'], HAND_GESTURES),
+                    body=data['body'] if 'body' in data else None,
+                    body_labels=_remap(data['body_labels'], data['body_vocabulary'], BODY_POSES),
+                    timestamps=data['timestamps'],
+                    name=str(data['name']),
+                )
+            except KeyError as e:
+                raise ValueError(f'{path} is not a gesture sequence: missing {e}')
+
+
+def save_corpus(sequences, directory):
+    """
+    Write sequences to a corpus directory.
+
+    Returns:
+        list: The paths written.
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for i, sequence in enumerate(sequences):
+        path = os.path.join(directory, f'{i:05d}-{sequence.name or "sequence"}{CORPUS_EXTENSION}')
+        sequence.save(path)
+        paths.append(path)
+    return paths
+
+
+def load_corpus(path):
+    """Load every sequence in a corpus directory, or a single sequence file"""
+    if not os.path.isdir(path):
+        return [GestureSequence.load(path)]
+    names = sorted(name for name in os.listdir(path) if name.endswith(CORPUS_EXTENSION))
+    return [GestureSequence.load(os.path.join(path, name)) for name in names]
@@ -0,0 +1,135 @@
+"""
+Score gesture classifiers against labeled sequences.
+
+Scoring works on events, not frames. An event is a run of consecutive
+frames with the same label in one track (a hand or the body). A labeled
+event is detected when a predicted run of its label overlaps it, allowing
+``tolerance`` frames after it ends. Latency is the number of frames from
+the start of the event to the first frame predicted with its label. A
+predicted run that matches no labeled event is a false positive, unless
+it lies entirely within unlabeled frames.
+"""
+import time
+from app.motion.gestures import (
+    HAND_GESTURES, BODY_POSES, classify_body, classify_hand_sequence
+)
+from app.utils.lazy_import import lazy_module
+
+np = lazy_module('numpy')
+
+
+def gesture_events(codes):
+    """
+    Split per-frame label codes into runs.
+
+    Returns:
+        list: (code, start, end) tuples with ``end`` exclusive, skipping
+        runs of 0.
+    """
+    codes = np.asarray(codes)
+    if len(codes) == 0:
+        return []
+    edges = np.flatnonzero(codes[1:] != codes[:-1]) + 1
+    starts = np.concatenate([[0], edges])
+    ends = np.concatenate([edges, [len(codes)]])
+    return [(int(codes[s]), int(s), int(e)) for s, e in zip(starts, ends) if codes[s]]
+
+
+class GestureScore:
+    """Event counts and detection latencies for one label"""
+
+    def __init__(self):
+        self.events = 0
+        self.detected = 0
+        self.predicted = 0
+        self.false_positives = 0
+        self.latencies = []
+
+    @property
+    def precision(self):
+        """Share of scored predictions that matched an event (None without any)"""
+        if not self.predicted:
+            return None
+        return (self.predicted - self.false_positives) / self.predicted
+
+    @property
+    def recall(self):
+        """Share of labeled events that were detected (None without any)"""
+        return self.detected / self.events if self.events else None
+
+    def latency(self, percentile=50):
+        """Detection latency in frames at a percentile (None without detections)"""
+        return float(np.percentile(self.latencies, percentile)) if self.latencies else None
+
+
+def score_track(truth, predicted, scores, tolerance=2):
+    """
+    Add one track's events to per-label scores.
+
+    Args:
+        truth (array-like): Labeled codes per frame.
+        predicted (array-like): Classifier codes per frame.
+        scores (dict): Code to GestureScore, updated in place.
+        tolerance (int): Frames after an event during which a detection
+            still counts.
+    """
+    truth = np.asarray(truth)
+    predicted = np.asarray(predicted)
+    labeled = gesture_events(truth)
+    runs = gesture_events(predicted)
+
+    for code, start, end in labeled:
+        score = scores.setdefault(code, GestureScore())
+        score.events += 1
+        window = predicted[start:end + tolerance]
+        hits = np.flatnonzero(window == code)
+        if len(hits):
+            score.detected += 1
+            score.latencies.append(int(hits[0]))
+
+    for code, start, end in runs:
+        score = scores.setdefault(code, GestureScore())
+        matched = any(c == code and s < end and start < e + tolerance for c, s, e in labeled)
+        if not matched and not truth[start:end].any():
+            # Only unlabeled frames: nothing to judge the prediction against
+            continue
+        score.predicted += 1
+        if not matched:
+            score.false_positives += 1
+
+
+def evaluate_sequences(sequences, thresholds=None, tolerance=2):
+    """
+    Classify sequences and score the results.
+
+    Every sequence is classified on its own, as one stream batch would be.
+
+    Args:
+        sequences (list): GestureSequence objects.
+        thresholds (GestureThresholds): Detection thresholds to evaluate.
+        tolerance (int): See score_track.
+
+    Returns:
+        dict: 'hands' and 'body' map labels to GestureScore; 'frames' and
+        'body_frames' count the frames classified and 'seconds' is the time
+        spent classifying.
+    """
+    report = {'hands': {}, 'body': {}, 'frames': 0, 'body_frames': 0, 'seconds': 0.0}
+    hand_scores, body_scores = {}, {}
+
+    for sequence in sequences:
+        start = time.perf_counter()
+        hand_codes = classify_hand_sequence(sequence.hands, thresholds=thresholds)
+        body_codes = classify_body(sequence.body, thresholds) if sequence.body is not None else None
+        report['seconds'] += time.perf_counter() - start
+        report['frames'] += len(sequence)
+
+        for hand in range(hand_codes.shape[1]):
+            score_track(sequence.hand_labels[:, hand], hand_codes[:, hand], hand_scores, tolerance)
+        if body_codes is not None:
+            report['body_frames'] += len(sequence)
+            score_track(sequence.body_labels, body_codes, body_scores, tolerance)
+
+    report['hands'] = {HAND_GESTURES[code]: score for code, score in sorted(hand_scores.items())}
+    report['body'] = {BODY_POSES[code]: score for code, score in sorted(body_scores.items())}
+    return report
@@ -0,0 +1,182 @@
+"""
+One-Euro smoothing for many landmark streams at once.
+
+The server-side counterpart of ``smoothPoseData`` in motion-tracking.js.
+Instead of a fixed exponential factor it uses the One-Euro filter (Casiez
+et al., CHI 2012): the cutoff frequency rises with the landmark's speed, so
+slow movement is smoothed heavily while fast movement such as a punch keeps
+little lag.
+
+All players share one set of arrays of shape (players, landmarks, 3), so a
+tick of every stream is a handful of vectorized operations. State and
+scratch space are allocated once per filter bank; filtering a frame does
+not allocate arrays of the frame's size.
+"""
+import math
+from app.utils.lazy_import import lazy_module
+
+np = lazy_module('numpy')
+
+
+class OneEuroFilter:
+    """Bank of One-Euro filters, one slot per landmark stream"""
+
+    def __init__(self, capacity, landmarks, min_cutoff=1.0, beta=0.007, d_cutoff=1.0, frequency=30.0):
+        """
+        Args:
+            capacity (int): Number of stream slots.
+            landmarks (int): Landmarks per frame, e.g. 21 for a hand.
+            min_cutoff (float): Cutoff frequency in Hz at rest. Lower is smoother.
+            beta (float): Cutoff increase per unit of speed (per second).
+                Higher follows fast movement more closely.
+            d_cutoff (float): Cutoff frequency in Hz for the speed estimate.
+            frequency (float): Frame rate assumed when a stream has no usable
+                previous timestamp.
+        """
+        self.capacity = capacity
+        self.landmarks = landmarks
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.frequency = frequency
+
+        shape = (capacity, landmarks, 3)
+        # Filter state
+        self._x = np.full(shape, np.nan, dtype=np.float32)
+        self._dx = np.zeros(shape, dtype=np.float32)
+        self._t = np.full(capacity, np.nan, dtype=np.float64)
+        # Scratch space reused by every step
+        self._delta = np.empty(shape, dtype=np.float32)
+        self._work = np.empty(shape, dtype=np.float32)
+        self._cutoff = np.empty((capacity, landmarks, 1), dtype=np.float32)
+        self._dt = np.empty((capacity, 1, 1), dtype=np.float32)
+        self._seen = np.empty(shape, dtype=bool)
+        self._fresh = np.empty(shape, dtype=bool)
+        self._present = np.empty(capacity, dtype=bool)
+
+        self._slots = {}
+        self._free = list(range(capacity - 1, -1, -1))
+
+    def acquire(self, key):
+        """
+        Get the slot of a stream, assigning a free one on first use.
+
+        Raises:
+            RuntimeError: If every slot is taken.
+        """
+        slot = self._slots.get(key)
+        if slot is None:
+            if not self._free:
+                raise RuntimeError(f'All {self.capacity} filter slots are in use')
+            slot = self._slots[key] = self._free.pop()
+        return slot
+
+    def release(self, key):
+        """Free a stream's slot and clear its state"""
+        slot = self._slots.pop(key, None)
+        if slot is not None:
+            self.reset(slice(slot, slot + 1))
+            self._free.append(slot)
+
+    def reset(self, slots=slice(None)):
+        """Clear the state of some (by default all) slots"""
+        self._x[slots] = np.nan
+        self._dx[slots] = 0
+        self._t[slots] = np.nan
+
+    def filter(self, values, timestamps, out=None):
+        """
+        Filter one frame of every slot.
+
+        Slots without a frame this tick should be NaN; missing landmarks
+        come out as NaN and leave their slot's state untouched.
+
+        Args:
+            values (numpy.ndarray): Shape (capacity, landmarks, 3).
+            timestamps (array-like): Capture time in seconds, per slot or
+                shared by all.
+            out (numpy.ndarray): Optional float32 output of the same shape;
+                may be ``values`` itself.
+
+        Returns:
+            numpy.ndarray: The smoothed landmarks.
+        """
+        if out is None:
+            out = np.empty(self._x.shape, dtype=np.float32)
+        self._step(slice(None), values, timestamps, out)
+        return out
+
+    def filter_stream(self, key, frames, timestamps, out=None):
+        """
+        Filter consecutive frames of one stream.
+
+        Args:
+            key: Stream key; a slot is acquired on first use.
+            frames (numpy.ndarray): Shape (frames, landmarks, 3).
+            timestamps (array-like): Capture time of each frame in seconds.
+            out (numpy.ndarray): Optional float32 output of the same shape.
+
+        Returns:
+            numpy.ndarray: The smoothed frames.
+        """
+        slot = self.acquire(key)
+        rows = slice(slot, slot + 1)
+        if out is None:
+            out = np.empty(np.shape(frames), dtype=np.float32)
+        for i, timestamp in enumerate(np.asarray(timestamps, dtype=np.float64)):
+            self._step(rows, frames[i:i + 1], timestamp, out[i:i + 1])
+        return out
+
+    def _step(self, rows, x, t, out):
+        """Advance the slots in ``rows`` by one frame, writing to ``out``"""
+        x_prev, dx_prev, t_prev = self._x[rows], self._dx[rows], self._t[rows]
+        delta, work, cutoff = self._delta[rows], self._work[rows], self._cutoff[rows]
+        dt, seen, fresh, present = self._dt[rows], self._seen[rows], self._fresh[rows], self._present[rows]
+
+        # Landmarks seen for the first time start at rest where they are
+        np.isfinite(x, out=seen)
+        np.isnan(x_prev, out=fresh)
+        np.logical_and(fresh, seen, out=fresh)
+        np.copyto(x_prev, x, where=fresh, casting='same_kind')
+        np.copyto(dx_prev, 0, where=fresh)
+
+        # Elapsed time per slot, falling back to the nominal frame rate
+        np.subtract(t, t_prev, out=dt[:, 0, 0], casting='unsafe')
+        np.copyto(dt, 1.0 / self.frequency, where=~(dt > 0))
+
+        # Speed estimate, itself low-pass filtered at d_cutoff
+        np.subtract(x, x_prev, out=delta)
+        np.divide(delta, dt, out=work)
+        np.subtract(work, dx_prev, out=work)
+        np.multiply(work, self._alpha(self.d_cutoff, dt, cutoff), out=work)
+        np.add(dx_prev, work, out=work)
+
+        # Cutoff rises with the speed of each landmark; x is not read past
+        # this point, so out may alias it
+        np.multiply(work, work, out=out)
+        np.sum(out, axis=-1, keepdims=True, out=cutoff)
+        np.sqrt(cutoff, out=cutoff)
+        np.multiply(cutoff, self.beta, out=cutoff)
+        np.add(cutoff, self.min_cutoff, out=cutoff)
+        self._alpha(cutoff, dt, cutoff)
+
+        # Smoothed position; missing landmarks come out NaN
+        np.multiply(delta, cutoff, out=delta)
+        np.add(x_prev, delta, out=out)
+
+        # Only observed landmarks update the state
+        np.copyto(x_prev, out, where=seen)
+        np.copyto(dx_prev, work, where=seen)
+        np.any(seen, axis=(1, 2), out=present)
+        np.copyto(t_prev, t, where=present, casting='unsafe')
+        return out
+
+    @staticmethod
+    def _alpha(cutoff, dt, out):
+        """Smoothing factor 1 / (1 + tau / dt) for tau = 1 / (2 pi cutoff)"""
+        np.multiply(cutoff, dt, out=out)
+        np.multiply(out, 2 * math.pi, out=out)
+        np.add(out, 1, out=out)
+        np.reciprocal(out, out=out)
+        np.subtract(1, out, out=out)
+        return out
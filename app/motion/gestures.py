@@ -0,0 +1,307 @@
+"""
+Server-side gesture classification for streamed landmarks.
+
+A NumPy port of ``detectHandGesture`` and ``detectBodyPose`` from
+gesture-recognition.js, with the same thresholds and priority order. The
+classifiers accept arrays with any leading dimensions (frames, players,
+hands), so a whole batch of streams is classified in one vectorized pass.
+
+Coordinates are in the units the browser reports (pixels for x and y),
+which is what the JS thresholds assume. Missing landmarks are NaN.
+
+``GestureClassifier.recent`` backs the 'verified' flag of game actions.
+It only knows the gestures of streams whose landmarks reach the server,
+which with the shipped pages means server-side tracking
+(VISION_SERVER_ENABLED); gestures detected in the browser are never
+streamed.
+"""
+from app.motion.landmarks import (
+    HAND_LANDMARKS, BODY_LANDMARKS, WRIST, THUMB_TIP, INDEX_TIP, FINGER_TIPS, FINGER_BASES,
+    NOSE, LEFT_SHOULDER, RIGHT_SHOULDER, LEFT_HIP, RIGHT_HIP, LEFT_KNEE, RIGHT_KNEE
+)
+from app.motion.codec import HAND_NAMES
+from app.utils.lazy_import import lazy_module
+
+np = lazy_module('numpy')
+
+# Label vocabularies; classifiers return indices into these (0 is no gesture)
+HAND_GESTURES = (None, 'punch', 'block', 'swipe_left', 'swipe_right', 'pinch', 'point', 'peace', 'fist', 'open_hand')
+BODY_POSES = (None, 'crouch', 'lean_left', 'lean_right', 'stand')
+
+# Extended-finger bitmasks, thumb in bit 0
+OPEN_HAND_MASK = 0b11111
+POINT_MASK = 0b00010
+PEACE_MASK = 0b00110
+
+
+class GestureThresholds:
+    """Thresholds matching gestureConfig in gesture-recognition.js"""
+
+    def __init__(self, pinch_distance=0.05, punch_velocity=25.0, block_velocity=10.0,
+                 swipe_velocity=15.0, min_finger_length=30.0, crouch_offset=50.0, lean_offset=30.0):
+        self.pinch_distance = pinch_distance
+        self.punch_velocity = punch_velocity
+        self.block_velocity = block_velocity
+        self.swipe_velocity = swipe_velocity
+        self.min_finger_length = min_finger_length
+        self.crouch_offset = crouch_offset
+        self.lean_offset = lean_offset
+
+    @classmethod
+    def from_config(cls, config):
+        """Build thresholds from a Flask config mapping"""
+        return cls(
+            pinch_distance=config.get('GESTURE_PINCH_DISTANCE', 0.05),
+            punch_velocity=config.get('GESTURE_PUNCH_VELOCITY', 25.0),
+            block_velocity=config.get('GESTURE_BLOCK_VELOCITY', 10.0),
+            swipe_velocity=config.get('GESTURE_SWIPE_VELOCITY', 15.0),
+        )
+
+
+def _dot(a, b):
+    return np.einsum('...i,...i->...', a, b)
+
+
+def as_landmarks(data, count):
+    """
+    Convert a frames x landmarks x 3 payload to a float32 array.
+
+    JSON nulls become NaN, i.e. missing landmarks.
+
+    Raises:
+        ValueError: If the payload does not have shape (frames, count, 3).
+    """
+    try:
+        frames = np.asarray(data, dtype=np.float32)
+    except (TypeError, ValueError):
+        raise ValueError('Landmarks must be numeric')
+    if frames.ndim != 3 or frames.shape[1:] != (count, 3) or len(frames) == 0:
+        raise ValueError(f'Expected landmarks of shape (frames, {count}, 3)')
+    return frames
+
+
+def finger_masks(hands, min_finger_length=30.0):
+    """
+    Work out which fingers are extended, as in updateFingerStates.
+
+    A finger is extended when its tip lies beyond its base as seen from the
+    wrist and the base-to-tip length (in x/y) exceeds min_finger_length.
+
+    Args:
+        hands (ndarray): Hand landmarks of shape (..., 21, 3).
+
+    Returns:
+        ndarray: uint8 bitmasks of shape (...), bit i set when finger i
+        (thumb first) is extended.
+    """
+    xy = hands[..., :2]
+    wrist = xy[..., WRIST:WRIST + 1, :]
+    tips = xy[..., FINGER_TIPS, :]
+    bases = xy[..., FINGER_BASES, :]
+
+    finger = tips - bases
+    extended = (_dot(bases - wrist, tips - wrist) > 0) & (_dot(finger, finger) > min_finger_length ** 2)
+    return np.packbits(extended, axis=-1, bitorder='little')[..., 0]
+
+
+def wrist_velocity(frames, previous=None):
+    """
+    Get per-frame wrist velocity along the first (time) axis.
+
+    Args:
+        frames (ndarray): Hand landmarks of shape (frames, ..., 21, 3).
+        previous (ndarray): The frame before frames[0], or None to give the
+            first frame zero velocity.
+
+    Returns:
+        ndarray: Velocities of shape (frames, ..., 3); unknown velocities are 0.
+    """
+    wrist = frames[..., WRIST, :]
+    velocity = np.empty_like(wrist)
+    np.subtract(wrist[1:], wrist[:-1], out=velocity[1:])
+    if previous is None:
+        velocity[0] = 0
+    else:
+        np.subtract(wrist[0], previous[..., WRIST, :], out=velocity[0])
+    return np.nan_to_num(velocity, copy=False)
+
+
+def classify_hands(hands, velocity, thresholds=None):
+    """
+    Classify hand gestures, as in detectHandGesture.
+
+    Args:
+        hands (ndarray): Hand landmarks of shape (..., 21, 3).
+        velocity (ndarray): Wrist velocity per hand of shape (..., 3).
+        thresholds (GestureThresholds): Detection thresholds.
+
+    Returns:
+        ndarray: uint8 indices into HAND_GESTURES of shape (...).
+    """
+    t = thresholds or GestureThresholds()
+    mask = finger_masks(hands, t.min_finger_length)
+    fist = mask == 0
+    open_hand = mask == OPEN_HAND_MASK
+
+    pinch_gap = hands[..., THUMB_TIP, :] - hands[..., INDEX_TIP, :]
+    pinch = _dot(pinch_gap, pinch_gap) < t.pinch_distance ** 2
+
+    vx, vy, vz = velocity[..., 0], velocity[..., 1], velocity[..., 2]
+    speed_sq = _dot(velocity, velocity)
+    swipe = open_hand & (speed_sq > t.swipe_velocity ** 2) & (np.abs(vx) > np.abs(vy))
+
+    # In detectHandGesture's order of precedence
+    conditions = [
+        fist & (speed_sq > t.punch_velocity ** 2) & (vz < 0),
+        open_hand & (speed_sq > t.block_velocity ** 2) & (vy < 0),
+        swipe & (vx <= 0),
+        swipe & (vx > 0),
+        pinch,
+        mask == POINT_MASK,
+        mask == PEACE_MASK,
+        fist,
+        open_hand,
+    ]
+    codes = np.select(conditions, range(1, len(conditions) + 1), default=0).astype(np.uint8)
+
+    # Without a wrist the JS hand state has no position and detects nothing
+    codes[~np.isfinite(hands[..., WRIST, 0])] = 0
+    return codes
+
+
+def classify_hand_sequence(frames, previous=None, thresholds=None):
+    """
+    Classify consecutive frames of hand landmarks.
+
+    Args:
+        frames (ndarray): Hand landmarks of shape (frames, ..., 21, 3).
+        previous (ndarray): The frame before frames[0], if known.
+        thresholds (GestureThresholds): Detection thresholds.
+
+    Returns:
+        ndarray: uint8 indices into HAND_GESTURES of shape (frames, ...).
+    """
+    return classify_hands(frames, wrist_velocity(frames, previous), thresholds)
+
+
+def classify_body(poses, thresholds=None):
+    """
+    Classify body poses, as in detectBodyPose.
+
+    Args:
+        poses (ndarray): Body landmarks of shape (..., 33, 3).
+        thresholds (GestureThresholds): Detection thresholds.
+
+    Returns:
+        ndarray: uint8 indices into BODY_POSES of shape (...).
+    """
+    t = thresholds or GestureThresholds()
+    x, y = poses[..., 0], poses[..., 1]
+
+    standing = (y[..., LEFT_SHOULDER] < y[..., LEFT_HIP]) & (y[..., RIGHT_SHOULDER] < y[..., RIGHT_HIP])
+    crouching = ((y[..., LEFT_KNEE] > y[..., LEFT_HIP] + t.crouch_offset)
+                 & (y[..., RIGHT_KNEE] > y[..., RIGHT_HIP] + t.crouch_offset))
+    lean = ((x[..., LEFT_SHOULDER] + x[..., RIGHT_SHOULDER]) - (x[..., LEFT_HIP] + x[..., RIGHT_HIP])) / 2
+
+    conditions = [
+        crouching,
+        standing & (lean < -t.lean_offset),
+        standing & (lean > t.lean_offset),
+        standing,
+    ]
+    codes = np.select(conditions, range(1, len(conditions) + 1), default=0).astype(np.uint8)
+
+    core = poses[..., (NOSE, LEFT_SHOULDER, RIGHT_SHOULDER, LEFT_HIP, RIGHT_HIP), :2]
+    codes[~np.isfinite(core).all(axis=(-2, -1))] = 0
+    return codes
+
+
+def gesture_names(codes, vocabulary=HAND_GESTURES):
+    """Convert classifier output to (nested) lists of labels"""
+    return np.array(np.asarray(vocabulary, dtype=object)[codes], dtype=object).tolist()
+
+
+class GestureClassifier:
+    """Flask extension classifying landmark batches from many streams"""
+
+    def __init__(self, app=None):
+        self.thresholds = GestureThresholds()
+        self.max_frames = 120
+        self._last = {}
+        self._recent = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Configure the classifier from the app config"""
+        self.thresholds = GestureThresholds.from_config(app.config)
+        self.max_frames = app.config.get('GESTURE_MAX_BATCH_FRAMES', 120)
+        self._last.clear()
+        self._recent.clear()
+        app.extensions['gestures'] = self
+
+    def classify(self, stream_id, hands=None, body=None, transform=None):
+        """
+        Classify one batch of consecutive frames from a stream.
+
+        The last hand frame of each stream is kept so velocities carry over
+        between batches.
+
+        Args:
+            stream_id: Key of the stream, e.g. the socket id.
+            hands (dict): Hand name ('left', 'right') to landmarks of shape
+                (frames, 21, 3).
+            body: Body landmarks of shape (frames, 33, 3), or None.
+            transform (LandmarkTransform): The player's calibration, applied
+                before classifying; results use the player's own hand names
+                and sides.
+
+        Returns:
+            dict: 'hands' maps each hand to its label per frame, 'body' is the
+            pose label per frame (or None).
+
+        Raises:
+            ValueError: If a payload is malformed or too long, or names a
+                hand other than 'left' and 'right'.
+        """
+        if hands is not None and not isinstance(hands, dict):
+            raise ValueError('Hands must map hand names to landmarks')
+        unknown = [name for name in hands or {} if name not in HAND_NAMES]
+        if unknown:
+            raise ValueError(f'Unknown hand names: {unknown}')
+        hands = {name: as_landmarks(frames, HAND_LANDMARKS) for name, frames in (hands or {}).items()}
+        body = as_landmarks(body, BODY_LANDMARKS) if body is not None else None
+        batches = list(hands.values()) + ([body] if body is not None else [])
+        if any(len(frames) > self.max_frames for frames in batches):
+            raise ValueError(f'At most {self.max_frames} frames per batch')
+        if transform is not None:
+            hands = transform.apply_hands(hands)
+            body = transform.apply(body) if body is not None else None
+
+        result = {'hands': {}, 'body': None}
+        for name, frames in hands.items():
+            key = (stream_id, name)
+            codes = classify_hand_sequence(frames, self._last.get(key), self.thresholds)
+            self._last[key] = frames[-1].copy()
+            result['hands'][name] = gesture_names(codes)
+        if body is not None:
+            result['body'] = gesture_names(classify_body(body, self.thresholds), BODY_POSES)
+        if transform is not None:
+            result = transform.restore(result)
+
+        detected = set(result['body'] or ())
+        for labels in result['hands'].values():
+            detected.update(labels)
+        detected.discard(None)
+        self._recent[stream_id] = detected
+        return result
+
+    def recent(self, stream_id):
+        """Get the gestures detected in a stream's latest batch"""
+        return self._recent.get(stream_id, set())
+
+    def forget(self, stream_id):
+        """Drop the state kept for a stream"""
+        self._recent.pop(stream_id, None)
+        for key in [key for key in self._last if key[0] == stream_id]:
+            del self._last[key]
@@ -0,0 +1,40 @@
+"""
+Landmark layouts shared by the motion modules.
+
+Indices follow the MediaPipe hand (21 points), pose (33 points) and face
+mesh (468 points) models that motion-tracking.js streams from the browser.
+"""
+
+HAND_LANDMARKS = 21
+BODY_LANDMARKS = 33
+FACE_LANDMARKS = 468
+
+# Hand
+WRIST = 0
+THUMB_MCP = 2
+THUMB_TIP = 4
+INDEX_MCP = 5
+INDEX_TIP = 8
+MIDDLE_MCP = 9
+MIDDLE_TIP = 12
+RING_MCP = 13
+RING_TIP = 16
+PINKY_MCP = 17
+PINKY_TIP = 20
+
+# Fingers in the order thumb, index, middle, ring, pinky
+FINGER_TIPS = (THUMB_TIP, INDEX_TIP, MIDDLE_TIP, RING_TIP, PINKY_TIP)
+FINGER_BASES = (THUMB_MCP, INDEX_MCP, MIDDLE_MCP, RING_MCP, PINKY_MCP)
+
+# Body
+NOSE = 0
+LEFT_SHOULDER = 11
+RIGHT_SHOULDER = 12
+LEFT_ELBOW = 13
+RIGHT_ELBOW = 14
+LEFT_WRIST = 15
+RIGHT_WRIST = 16
+LEFT_HIP = 23
+RIGHT_HIP = 24
+LEFT_KNEE = 25
+RIGHT_KNEE = 26
@@ -0,0 +1,228 @@
+"""
+Per-user landmark normalization from calibration profiles.
+
+Players stand at different distances from their cameras, have different
+reach and lead with different hands, so the same punch arrives as very
+different pixel tracks. A calibration profile reduces this to a diagonal
+affine map into a reference frame: the shoulder midpoint moves to the
+middle of a 640x480 image, the body is scaled to a reference shoulder
+width (corrected for arm span) and left-handed players are mirrored so
+every stream looks like a right-handed player's.
+
+The reference frame keeps the pixel scale the gesture thresholds were
+tuned for, so the classifiers run unchanged on normalized landmarks. The
+maps are built once per profile and kept in memory by ``TransformCache``;
+normalizing a batch is one multiply-add.
+"""
+import threading
+from collections import OrderedDict
+from app.motion.landmarks import (
+    LEFT_SHOULDER, RIGHT_SHOULDER, LEFT_ELBOW, RIGHT_ELBOW, LEFT_WRIST, RIGHT_WRIST
+)
+from app.utils.lazy_import import lazy_module
+
+np = lazy_module('numpy')
+
+REFERENCE_CENTER = (320.0, 240.0)
+REFERENCE_SHOULDER_WIDTH = 160.0
+# Arm span over shoulder width of a typical adult, and the most reach is corrected by
+REFERENCE_REACH = 4.2
+MAX_REACH_CORRECTION = 1.25
+
+HANDEDNESS = ('right', 'left')
+
+# Names that trade places when a stream is mirrored
+MIRRORED_HANDS = {'left': 'right', 'right': 'left'}
+MIRRORED_LABELS = {
+    'swipe_left': 'swipe_right', 'swipe_right': 'swipe_left',
+    'lean_left': 'lean_right', 'lean_right': 'lean_left',
+}
+
+
+def _median(values):
+    values = values[np.isfinite(values)]
+    return float(np.median(values)) if values.size else None
+
+
+def measure_body(poses):
+    """
+    Measure a player from body landmarks of a neutral pose.
+
+    Args:
+        poses (ndarray): Body landmarks of shape (frames, 33, 3).
+
+    Returns:
+        dict: 'shoulder_width', 'arm_span' (None if the arms were not
+        visible), 'center_x' and 'center_y' in pixels, as medians over
+        the frames.
+
+    Raises:
+        ValueError: If the shoulders are not visible in any frame.
+    """
+    xy = poses[..., :2]
+    left, right = xy[:, LEFT_SHOULDER], xy[:, RIGHT_SHOULDER]
+    width = np.linalg.norm(left - right, axis=-1)
+    arms = sum(
+        np.linalg.norm(xy[:, a] - xy[:, b], axis=-1)
+        for a, b in ((LEFT_SHOULDER, LEFT_ELBOW), (LEFT_ELBOW, LEFT_WRIST),
+                     (RIGHT_SHOULDER, RIGHT_ELBOW), (RIGHT_ELBOW, RIGHT_WRIST))
+    )
+    center = (left + right) / 2
+
+    shoulder_width = _median(width)
+    if not shoulder_width:
+        raise ValueError('Shoulders are not visible in the calibration frames')
+    return {
+        'shoulder_width': shoulder_width,
+        'arm_span': _median(width + arms),
+        'center_x': _median(center[:, 0]),
+        'center_y': _median(center[:, 1]),
+    }
+
+
+class LandmarkTransform:
+    """Diagonal affine map ``x * scale + offset`` into the reference frame"""
+
+    def __init__(self, scale, offset, mirror=False):
+        self.scale = np.asarray(scale, dtype=np.float32)
+        self.offset = np.asarray(offset, dtype=np.float32)
+        self.mirror = mirror
+
+    @classmethod
+    def from_measurements(cls, shoulder_width=None, arm_span=None, center_x=None, center_y=None,
+                          handedness='right'):
+        """
+        Build the map for a player's measurements.
+
+        Without a shoulder width only handedness is normalized; without a
+        center the reference center is assumed.
+        """
+        scale = 1.0
+        if shoulder_width:
+            scale = REFERENCE_SHOULDER_WIDTH / shoulder_width
+            if arm_span:
+                correction = REFERENCE_REACH / (arm_span / shoulder_width)
+                scale *= min(max(correction, 1 / MAX_REACH_CORRECTION), MAX_REACH_CORRECTION)
+
+        mirror = handedness == 'left'
+        scale = np.array([-scale if mirror else scale, scale, scale])
+        center = np.array([
+            REFERENCE_CENTER[0] if center_x is None else center_x,
+            REFERENCE_CENTER[1] if center_y is None else center_y,
+            0.0,
+        ])
+        offset = np.array([REFERENCE_CENTER[0], REFERENCE_CENTER[1], 0.0]) - scale * center
+        return cls(scale, offset, mirror)
+
+    def apply(self, frames):
+        """
+        Map landmarks of shape (..., 3) into the reference frame.
+
+        Returns:
+            ndarray: New float32 landmarks; missing (NaN) ones stay missing.
+        """
+        out = np.multiply(frames, self.scale, dtype=np.float32)
+        out += self.offset
+        return out
+
+    def apply_hands(self, hands):
+        """Map a dict of hand landmarks, swapping hand names when mirroring"""
+        names = MIRRORED_HANDS if self.mirror else {}
+        return {names.get(name, name): self.apply(frames) for name, frames in hands.items()}
+
+    def restore(self, result):
+        """Swap hand names and sided labels of a classifier result back after mirroring"""
+        if not self.mirror:
+            return result
+
+        def swap(labels):
+            return [MIRRORED_LABELS.get(label, label) for label in labels]
+
+        result['hands'] = {MIRRORED_HANDS.get(name, name): swap(labels) for name, labels in result['hands'].items()}
+        if result['body'] is not None:
+            result['body'] = swap(result['body'])
+        return result
+
+
+class TransformCache:
+    """Flask extension keeping each user's landmark transform in memory"""
+
+    def __init__(self, app=None):
+        self.enabled = True
+        self.max_entries = 1024
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._generation = 0
+        self._watching = False
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Configure the cache from the app config"""
+        self.enabled = app.config.get('CALIBRATION_NORMALIZE', True)
+        self.max_entries = app.config.get('CALIBRATION_CACHE_MAX_ENTRIES', 1024)
+        self.clear()
+        self._watch()
+        app.extensions['calibrations'] = self
+
+    def clear(self):
+        """Drop every cached transform"""
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+            self.hits = 0
+            self.misses = 0
+
+    def invalidate(self, user_id):
+        """Forget a user's transform so the next batch loads their profile again"""
+        with self._lock:
+            self._entries.pop(user_id, None)
+            self._generation += 1
+
+    def get(self, user_id):
+        """
+        Get a user's transform, loading their profile on first use.
+
+        Users without a profile are cached too, so their streams don't
+        query the database on every batch.
+
+        Returns:
+            LandmarkTransform: The transform, or None if the user has no
+            profile or normalization is disabled.
+        """
+        from app.models.calibration_profile import CalibrationProfile
+
+        if not self.enabled or user_id is None:
+            return None
+        with self._lock:
+            if user_id in self._entries:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return self._entries[user_id]
+            generation = self._generation
+
+        profile = CalibrationProfile.query.filter_by(user_id=user_id).first()
+        transform = profile.transform() if profile is not None else None
+        with self._lock:
+            self.misses += 1
+            # Don't store a profile that changed while it was being loaded
+            if generation == self._generation:
+                self._entries[user_id] = transform
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return transform
+
+    def _watch(self):
+        from app import db
+        from app.models.calibration_profile import CalibrationProfile
+
+        if self._watching:
+            return
+        for event in ('after_insert', 'after_update', 'after_delete'):
+            db.event.listen(CalibrationProfile, event, self._on_change)
+        self._watching = True
+
+    def _on_change(self, mapper, connection, target):
+        self.invalidate(target.user_id)
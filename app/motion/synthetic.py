@@ -0,0 +1,174 @@
+"""
+Synthetic labeled gesture sequences.
+
+Generates GestureSequence objects for punch, block, swipe and pinch in
+the pixel coordinates the browser streams. Each sequence has one hand
+resting in a pose, making the gesture with a smooth speed profile and
+then resting again. The other hand idles and the body stands. Per-landmark
+Gaussian jitter and dropped frames stand in for tracker noise.
+
+Labels record what the player is doing, not what the thresholds would
+detect: every frame of a motion is labeled with its gesture, so slow
+frames at the start show up as detection latency. Frames where the hand
+is changing shape are left unlabeled.
+"""
+from app.motion.corpus import GestureSequence
+from app.motion.gestures import HAND_GESTURES, BODY_POSES
+from app.motion import landmarks as lm
+from app.utils.lazy_import import lazy_module
+
+np = lazy_module('numpy')
+
+SYNTHETIC_GESTURES = ('punch', 'block', 'swipe_left', 'swipe_right', 'pinch')
+
+FIST = (False,) * 5
+OPEN_HAND = (True,) * 5
+
+# Peak wrist speed in pixels per frame, per gesture
+PEAK_SPEED = {
+    'punch': (30.0, 50.0),
+    'block': (14.0, 25.0),
+    'swipe_left': (20.0, 40.0),
+    'swipe_right': (20.0, 40.0),
+}
+# Unit direction of each motion (x right, y down, z away from the camera)
+DIRECTION = {
+    'punch': (0.0, 0.0, -1.0),
+    'block': (0.0, -1.0, 0.0),
+    'swipe_left': (-1.0, 0.0, 0.0),
+    'swipe_right': (1.0, 0.0, 0.0),
+}
+
+
+def hand_pose(extended, wrist=(0.0, 0.0, 0.0)):
+    """
+    Build all 21 landmarks of an upright hand.
+
+    Args:
+        extended (tuple): Whether each finger, thumb first, is extended.
+        wrist (tuple): Wrist position.
+
+    Returns:
+        numpy.ndarray: float32 landmarks of shape (21, 3).
+    """
+    hand = np.empty((lm.HAND_LANDMARKS, 3), dtype=np.float32)
+    hand[lm.WRIST] = wrist
+    for i, (base, tip) in enumerate(zip(lm.FINGER_BASES, lm.FINGER_TIPS)):
+        hand[base] = hand[lm.WRIST] + [(i - 2) * 20, -60, 0]
+        hand[tip] = hand[base] + ([0, -70, 0] if extended[i] else [0, 10, 0])
+        # Joints between the base and the tip
+        for step, joint in enumerate(range(base + 1, tip), start=1):
+            hand[joint] = hand[base] + (hand[tip] - hand[base]) * step / (tip - base)
+    # Thumb CMC, between the wrist and the thumb base
+    hand[1] = (hand[lm.WRIST] + hand[lm.THUMB_MCP]) / 2
+    return hand
+
+
+def body_pose(left_wrist, right_wrist):
+    """Build all 33 landmarks of a standing body around the given wrists"""
+    body = np.empty((lm.BODY_LANDMARKS, 3), dtype=np.float32)
+    center = (left_wrist[0] + right_wrist[0]) / 2
+    body[lm.NOSE] = [center, 100, 0]
+    body[1:11] = body[lm.NOSE] + [0, 5, 0]       # eyes, ears and mouth
+    body[lm.LEFT_SHOULDER] = [center + 50, 180, 0]
+    body[lm.RIGHT_SHOULDER] = [center - 50, 180, 0]
+    body[lm.LEFT_WRIST] = left_wrist
+    body[lm.RIGHT_WRIST] = right_wrist
+    body[13] = (body[lm.LEFT_SHOULDER] + body[lm.LEFT_WRIST]) / 2    # elbows
+    body[14] = (body[lm.RIGHT_SHOULDER] + body[lm.RIGHT_WRIST]) / 2
+    body[17:23:2] = body[lm.LEFT_WRIST]                               # finger points
+    body[18:23:2] = body[lm.RIGHT_WRIST]
+    body[lm.LEFT_HIP] = [center + 30, 380, 0]
+    body[lm.RIGHT_HIP] = [center - 30, 380, 0]
+    body[lm.LEFT_KNEE] = [center + 30, 420, 0]
+    body[lm.RIGHT_KNEE] = [center - 30, 420, 0]
+    body[27:33:2] = [center + 30, 470, 0]                             # ankles and feet
+    body[28:33:2] = [center - 30, 470, 0]
+    return body
+
+
+def _speed_profile(peak, frames):
+    """Per-frame speeds of a smooth stroke that peaks at ``peak``"""
+    return peak * np.sin(np.pi * (np.arange(frames) + 0.5) / frames)
+
+
+def synthetic_sequence(gesture, rng=None, noise=1.5, dropout=0.0, frames=45):
+    """
+    Generate one labeled sequence of a gesture.
+
+    Args:
+        gesture (str): One of SYNTHETIC_GESTURES.
+        rng (numpy.random.Generator): Source of randomness.
+        noise (float): Standard deviation of landmark jitter in pixels.
+        dropout (float): Probability that the tracker loses a hand in a frame.
+        frames (int): Sequence length.
+
+    Returns:
+        GestureSequence: The sequence, named after the gesture.
+
+    Raises:
+        ValueError: If the gesture is unknown.
+    """
+    if gesture not in SYNTHETIC_GESTURES:
+        raise ValueError(f'Unknown synthetic gesture {gesture!r}')
+    rng = rng if rng is not None else np.random.default_rng()
+    code = HAND_GESTURES.index(gesture)
+
+    active = rng.integers(2)
+    start = int(rng.integers(8, 16))
+    wrists = np.empty((frames, 2, 3), dtype=np.float32)
+    wrists[:, 0] = [rng.uniform(340, 460), rng.uniform(340, 420), 0]
+    wrists[:, 1] = [rng.uniform(180, 300), rng.uniform(340, 420), 0]
+    labels = np.empty((frames, 2), dtype=np.uint8)
+
+    shapes = [None, None]
+    shapes[1 - active] = FIST if rng.random() < 0.5 else OPEN_HAND
+    shapes[active] = FIST if gesture == 'punch' else OPEN_HAND
+    for h, shape in enumerate(shapes):
+        labels[:, h] = HAND_GESTURES.index('fist' if shape == FIST else 'open_hand')
+
+    thumb_offsets = np.zeros((frames, 3), dtype=np.float32)
+    if gesture == 'pinch':
+        # Close the thumb onto the index tip, hold, and open again
+        closing, held = 4, int(rng.integers(5, 12))
+        gap = hand_pose(OPEN_HAND)[lm.INDEX_TIP] - hand_pose(OPEN_HAND)[lm.THUMB_TIP]
+        closure = np.concatenate([
+            np.linspace(0, 1, closing + 1)[1:], np.ones(held), np.linspace(1, 0, closing + 1)[1:]
+        ])
+        end = min(frames, start + len(closure))
+        thumb_offsets[start:end] = closure[:end - start, None] * gap
+        labels[start:end, active] = 0
+        labels[start + closing:min(frames, start + closing + held), active] = code
+    else:
+        stroke = int(rng.integers(5, 9))
+        speeds = _speed_profile(rng.uniform(*PEAK_SPEED[gesture]), stroke)
+        path = np.cumsum(speeds)[:, None] * DIRECTION[gesture]
+        end = min(frames, start + stroke)
+        wrists[start:end, active] += path[:end - start]
+        wrists[end:, active] += path[end - start - 1]
+        labels[start:end, active] = code
+
+    hands = np.empty((frames, 2, lm.HAND_LANDMARKS, 3), dtype=np.float32)
+    for h, shape in enumerate(shapes):
+        hands[:, h] = hand_pose(shape) + wrists[:, h, None]
+    hands[:, active, lm.THUMB_TIP] += thumb_offsets
+
+    body = np.stack([body_pose(wrists[f, 0], wrists[f, 1]) for f in range(frames)])
+    body_labels = np.full(frames, BODY_POSES.index('stand'), dtype=np.uint8)
+
+    hands += rng.normal(0, noise, hands.shape).astype(np.float32) if noise else 0
+    body += rng.normal(0, noise, body.shape).astype(np.float32) if noise else 0
+    if dropout:
+        hands[rng.random((frames, 2)) < dropout] = np.nan
+
+    timestamps = np.cumsum(rng.normal(1000 / 30, 2, frames).clip(10))
+    return GestureSequence(hands, labels, body, body_labels, timestamps, name=gesture)
+
+
+def synthetic_corpus(per_gesture=20, seed=0, noise=1.5, dropout=0.0, frames=45):
+    """Generate ``per_gesture`` sequences of every synthetic gesture"""
+    rng = np.random.default_rng(seed)
+    return [
+        synthetic_sequence(gesture, rng, noise=noise, dropout=dropout, frames=frames)
+        for gesture in SYNTHETIC_GESTURES for _ in range(per_gesture)
+    ]
@@ -1,7 +1,8 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request
+from flask import Blueprint, current_app, render_template, redirect, url_for, flash, request
 from flask_login import login_user, logout_user, login_required, current_user
 from app.models.user import User
-from app import db, bcrypt
+from app import db, hasher, login_limiter
+from app.utils.hashing import HashingPoolSaturated
 from app.forms.auth_forms import LoginForm, RegistrationForm, RequestResetForm, ResetPasswordForm
 
 auth = Blueprint('auth', __name__)
@@ -14,8 +15,23 @@ def login():
 
     form = LoginForm()
     if form.validate_on_submit():
+        # Reject over-budget clients before any database or bcrypt work
+        retry_after = login_limiter.hit(request.remote_addr, form.username.data)
+        if retry_after:
+            current_app.logger.warning(f"Rejected login attempt for {form.username.data!r} from "
+                                       f"{request.remote_addr}; limiter counters: {login_limiter.metrics()}")
+            flash('Too many login attempts. Please try again later.', 'danger')
+            return render_template('auth/login.html', form=form), 429, {'Retry-After': str(retry_after)}
+
         user = User.query.filter_by(username=form.username.data).first()
-        if user and bcrypt.check_password_hash(user.password_hash, form.password.data):
+        if user and hasher.check_password(user.password_hash, form.password.data):
+            # Transparently upgrade hashes created with an old work factor
+            if hasher.needs_rehash(user.password_hash):
+                try:
+                    user.password_hash = hasher.hash_password(form.password.data)
+                    db.session.commit()
+                except HashingPoolSaturated:
+                    pass  # Try again on a later login
             login_user(user, remember=form.remember.data)
             next_page = request.args.get('next')
             return redirect(next_page if next_page else url_for('main.index'))
@@ -32,7 +48,7 @@ def register():
 
     form = RegistrationForm()
     if form.validate_on_submit():
-        hashed_password = bcrypt.generate_password_hash(form.password.data).decode('utf-8')
+        hashed_password = hasher.hash_password(form.password.data)
         user = User(
             username=form.username.data,
             email=form.email.data,
@@ -78,16 +94,16 @@ def reset_token(token):
     if current_user.is_authenticated:
         return redirect(url_for('main.index'))
 
-    # Find the user with this token
-    user = User.query.filter_by(reset_token=token).first()
+    # Find the user with this token by its indexed digest
+    user = User.get_user_by_reset_token(token)
 
-    if user is None or not user.verify_reset_token(token):
+    if user is None:
         flash('That is an invalid or expired token', 'warning')
         return redirect(url_for('auth.reset_request'))
 
     form = ResetPasswordForm()
     if form.validate_on_submit():
-        hashed_password = bcrypt.generate_password_hash(form.password.data).decode('utf-8')
+        hashed_password = hasher.hash_password(form.password.data)
         user.password_hash = hashed_password
         user.clear_reset_token()
         db.session.commit()
@@ -1,12 +1,25 @@
+import hashlib
 import json
-from flask import Blueprint, render_template, request, jsonify
+from flask import Blueprint, current_app, render_template, request, make_response
+from flask import session as flask_session
 from flask_login import login_required, current_user
-from flask_socketio import emit, join_room, leave_room
-from app import socketio, db
+from flask_socketio import emit, join_room, leave_room, rooms
+from markupsafe import Markup
+from app import socketio, db, gestures, calibrations, vision, sfu, bandwidth
 from app.models.game_session import GameSession
+from app.models.game_result import GameResult
 from app.models.avatar import Avatar
+from app.models.calibration_profile import CalibrationProfile
+from app.utils.api_batch import OperationRegistry
+from app.motion.codec import KIND_BODY, KIND_HAND, HAND_NAMES, FrameFormatError, decode_frames, dequantize
+from app.motion.gestures import as_landmarks
+from app.motion.landmarks import BODY_LANDMARKS
+from app.motion.normalization import measure_body
+from app.rtc.sfu import SFU_PEER, parse_peer, subscription_peer
+from app.vision.scheduler import GAME_MODES
 
 game = Blueprint('game', __name__)
+api = OperationRegistry()
 
 @game.route('/lobby')
 @login_required
@@ -46,6 +59,10 @@ def handle_connect():
 @socketio.on('disconnect')
 def handle_disconnect():
     """Handle client disconnection"""
+    gestures.forget(request.sid)
+    vision.stop(request.sid)
+    _leave_sfu()
+    bandwidth.forget(request.sid)
     if current_user.is_authenticated:
         emit('user_disconnected', {'user_id': current_user.id, 'username': current_user.username}, broadcast=True)
 
@@ -67,33 +84,177 @@ def handle_join_game(data):
     session_id = data.get('session_id')
     if session_id:
         join_room(session_id)
+        if _plays_in(session_id):
+            join_room(_players_room(session_id))
         emit('game_message', {'msg': f'{current_user.username} has joined the game'}, room=session_id)
 
+        # Past the mesh limit every player uploads once to the server instead. Only players may
+        # publish, so spectators, who cannot subscribe without publishing, do not count
+        players = sum(1 for _ in socketio.server.manager.get_participants('/', _players_room(session_id)))
+        if sfu.wants_sfu(session_id, players):
+            emit('video_mode', {'mode': 'sfu', 'peer': SFU_PEER}, room=session_id)
+
 @socketio.on('leave_game')
 def handle_leave_game(data):
     """Handle user leaving a game session"""
     session_id = data.get('session_id')
     if session_id:
         leave_room(session_id)
+        leave_room(_players_room(session_id))
+        _leave_sfu()
+        bandwidth.forget(request.sid)
         emit('game_message', {'msg': f'{current_user.username} has left the game'}, room=session_id)
 
 @socketio.on('game_action')
 def handle_game_action(data):
-    """Handle game actions (punches, blocks, etc.)"""
+    """
+    Handle game actions (punches, blocks, etc.)
+
+    An action is 'verified' when the server classified the same gesture in
+    the latest landmarks of this socket. Only server-side tracking
+    (VISION_SERVER_ENABLED) or a client streaming 'motion_frames' fills
+    those in; the pages' in-browser tracking streams no landmarks, so
+    without server tracking every action is unverified.
+    """
     session_id = data.get('session_id')
     action_type = data.get('action_type')
     action_data = data.get('action_data', {})
 
     if session_id and action_type:
-        # Broadcast the action to all players in the session
+        # Broadcast the action to all players in the session, flagging whether
+        # the server saw the gesture in the player's latest landmark batch
         emit('game_action', {
             'user_id': current_user.id,
             'username': current_user.username,
             'action_type': action_type,
-            'action_data': action_data
+            'action_data': action_data,
+            'verified': action_type in gestures.recent(request.sid)
         }, room=session_id)
 
-# WebRTC signaling
+def _share_gestures(session_id, classify):
+    """Run a gesture classification and send the result to the session"""
+    try:
+        result = classify()
+    except ValueError as e:
+        emit('motion_error', {'error': str(e)})
+        return
+
+    result['user_id'] = current_user.id
+    if session_id:
+        emit('motion_gestures', result, room=session_id)
+    else:
+        emit('motion_gestures', result)
+
+@socketio.on('motion_frames')
+def handle_motion_frames(data):
+    """Classify a batch of streamed landmark frames and share the gestures"""
+    if current_user.is_authenticated:
+        _share_gestures(data.get('session_id'), lambda: gestures.classify(
+            request.sid, hands=data.get('hands'), body=data.get('body'),
+            transform=calibrations.get(current_user.id)))
+
+def _classify_binary(data):
+    """Decode binary hand and body frames and classify them"""
+    hands = body = None
+    result_seq = None
+    if data.get('hands') is not None:
+        records = decode_frames(data['hands'], kind=KIND_HAND)
+        frames = dequantize(records)
+        if frames.shape[1] > len(HAND_NAMES):
+            raise FrameFormatError('Hand frames hold at most two hands')
+        hands = {name: frames[:, i] for i, name in enumerate(HAND_NAMES[:frames.shape[1]])}
+        result_seq = records['seq']
+    if data.get('body') is not None:
+        records = decode_frames(data['body'], kind=KIND_BODY)
+        body = dequantize(records)[:, 0]
+        result_seq = records['seq'] if result_seq is None else result_seq
+
+    result = gestures.classify(request.sid, hands=hands, body=body, transform=calibrations.get(current_user.id))
+    if result_seq is not None:
+        result['seq'] = [int(result_seq[0]), int(result_seq[-1])]
+    return result
+
+@socketio.on('motion_frames_binary')
+def handle_motion_frames_binary(data):
+    """Classify binary landmark frames (see app.motion.codec) and share the gestures"""
+    if current_user.is_authenticated:
+        _share_gestures(data.get('session_id'), lambda: _classify_binary(data))
+
+def _server_landmarks_handler(app, user_id, session_id, send_body=False):
+    """
+    Build the callback feeding server-extracted landmarks into the gesture pipeline.
+
+    With send_body, body landmarks are also sent back to the client as
+    'vision_body', for the calibration page to measure a neutral pose.
+    """
+    def on_landmarks(stream_id, landmarks, timestamp):
+        hands = {name: frame[None] for name, frame in landmarks['hands'].items()}
+        body = landmarks['body'][None] if landmarks['body'] is not None else None
+        if send_body and body is not None:
+            # Missing landmarks are NaN, which JSON cannot carry
+            points = [[None if value != value else float(value) for value in point] for point in landmarks['body']]
+            socketio.emit('vision_body', {'body': points, 'timestamp': timestamp}, to=stream_id)
+        with app.app_context():
+            try:
+                result = gestures.classify(stream_id, hands=hands, body=body, transform=calibrations.get(user_id))
+            except ValueError:
+                return
+            result['user_id'] = user_id
+            result['timestamp'] = timestamp
+            socketio.emit('motion_gestures', result, to=session_id or stream_id)
+    return on_landmarks
+
+@socketio.on('vision_offer')
+def handle_vision_offer(data):
+    """Track the client's camera on the server from a WebRTC offer"""
+    if not current_user.is_authenticated:
+        return
+    if not vision.enabled:
+        emit('vision_error', {'error': 'Server-side tracking is disabled'})
+        return
+
+    on_landmarks = _server_landmarks_handler(current_app._get_current_object(), current_user.id,
+                                             data.get('session_id'), send_body=bool(data.get('calibrate')))
+    # The tracking ladder follows the session's game mode unless the client names one
+    game_mode = data.get('game_mode')
+    if game_mode is None and data.get('session_id') is not None:
+        game_session = GameSession.query.get(data.get('session_id'))
+        game_mode = game_session.game_mode if game_session is not None else None
+    try:
+        answer = vision.offer(request.sid, data.get('sdp'), data.get('type'), on_landmarks,
+                              game_mode=game_mode)
+    except ValueError as e:
+        emit('vision_error', {'error': str(e)})
+        return
+    emit('vision_answer', answer)
+
+@socketio.on('vision_stop')
+def handle_vision_stop():
+    """Stop tracking the client's camera on the server"""
+    vision.stop(request.sid)
+
+@socketio.on('vision_status')
+def handle_vision_status():
+    """Report the quality level and frame counters of the client's server-side tracking"""
+    emit('vision_status', vision.status(request.sid))
+
+# WebRTC signaling; peers named by app.rtc.sfu.parse_peer are the server's SFU
+def _plays_in(session_id):
+    """Whether the client joined a game session's room and the user is one of its players"""
+    if session_id is None or session_id not in rooms():
+        return False
+    game_session = GameSession.query.get(session_id)
+    return game_session is not None and current_user.id in (game_session.player1_id, game_session.player2_id)
+
+def _players_room(session_id):
+    """Get the room of the clients in a session that may publish to the SFU"""
+    return f'{session_id}:players'
+
+def _leave_sfu():
+    """Stop forwarding the client's stream and tell its subscribers"""
+    for subscriber in sfu.leave(request.sid):
+        emit('user-disconnected', subscription_peer(request.sid), room=subscriber)
+
 @socketio.on('call-user')
 def handle_call_user(data):
     """Handle call user request"""
@@ -102,11 +263,32 @@ def handle_call_user(data):
         offer = data.get('offer')
 
         if to and offer:
+            if parse_peer(to)[0]:
+                _publish_to_sfu(data.get('session_id'), offer, data.get('layer'))
+                return
             emit('call-made', {
                 'offer': offer,
                 'socket': request.sid
             }, room=to)
 
+def _publish_to_sfu(session_id, offer, layer):
+    """Answer an offer to publish to the SFU and offer the new subscriptions"""
+    if not _plays_in(session_id):
+        emit('sfu_error', {'error': 'Not a player in this session'})
+        return
+    try:
+        answer, subscriptions = sfu.publish(session_id, request.sid, offer.get('sdp'), offer.get('type'), layer)
+    except ValueError as e:
+        emit('sfu_error', {'error': str(e)})
+        return
+
+    emit('answer-made', {'answer': answer, 'socket': SFU_PEER})
+    for subscription in subscriptions:
+        emit('call-made', {
+            'offer': subscription['offer'],
+            'socket': subscription['socket']
+        }, room=subscription['to'])
+
 @socketio.on('make-answer')
 def handle_make_answer(data):
     """Handle make answer request"""
@@ -115,6 +297,13 @@ def handle_make_answer(data):
         answer = data.get('answer')
 
         if to and answer:
+            server, publisher = parse_peer(to)
+            if server:
+                try:
+                    sfu.answer(request.sid, publisher, answer.get('sdp'), answer.get('type'))
+                except ValueError as e:
+                    emit('sfu_error', {'error': str(e)})
+                return
             emit('answer-made', {
                 'answer': answer,
                 'socket': request.sid
@@ -128,11 +317,55 @@ def handle_ice_candidate(data):
         candidate = data.get('candidate')
 
         if to and candidate:
+            server, publisher = parse_peer(to)
+            if server:
+                try:
+                    sfu.add_candidate(request.sid, publisher, candidate)
+                except ValueError as e:
+                    emit('sfu_error', {'error': str(e)})
+                return
             emit('ice-candidate', {
                 'candidate': candidate,
                 'socket': request.sid
             }, room=to)
 
+@socketio.on('sfu_layer')
+def handle_sfu_layer(data):
+    """Change the layer the client receives forwarded streams at"""
+    try:
+        sfu.set_layer(request.sid, data.get('layer'))
+    except ValueError as e:
+        emit('sfu_error', {'error': str(e)})
+
+@socketio.on('sfu_stats')
+def handle_sfu_stats():
+    """Report what the client publishes and receives through the SFU"""
+    try:
+        emit('sfu_stats', sfu.stats(request.sid))
+    except ValueError as e:
+        emit('sfu_error', {'error': str(e)})
+
+@socketio.on('network_stats')
+def handle_network_stats(data):
+    """Adapt the bandwidth profile of each of the client's connections to its reported stats"""
+    if not current_user.is_authenticated:
+        return
+    if not _plays_in(data.get('session_id')):
+        emit('bandwidth_error', {'error': 'Not a player in this session'})
+        return
+    try:
+        changes = bandwidth.report(data.get('session_id'), request.sid, data.get('peers'), server_load=vision.load())
+    except ValueError as e:
+        emit('bandwidth_error', {'error': str(e)})
+        return
+
+    for peer, profile in changes.items():
+        # The server encodes what it forwards, so it applies those profiles itself
+        publisher = parse_peer(peer)[1]
+        if publisher is not None:
+            sfu.set_layer(request.sid, profile, publisher)
+        emit('bandwidth_profile', {'peer': peer, 'profile': profile})
+
 @socketio.on('game_chat')
 def handle_game_chat(data):
     """Handle game chat message"""
@@ -146,93 +379,86 @@ def handle_game_chat(data):
             }, room=session_id)
 
 
-# API endpoints
-@game.route('/api/create_session', methods=['POST'])
-@login_required
-def api_create_session():
-    """API endpoint to create a new game session"""
-    data = request.get_json()
+# API operations, shared by the endpoints below and /api/batch
+@api.operation('create_session')
+def create_session(data):
+    """Create a new game session"""
+    game_mode = data.get('game_mode')
+    if game_mode is not None and game_mode not in GAME_MODES:
+        return {'success': False, 'error': f"Game mode must be one of: {', '.join(GAME_MODES)}"}, 400
 
-    # Create a new game session
     session = GameSession(
         player1_id=current_user.id,
-        status='waiting'
+        status='waiting',
+        game_mode=game_mode
     )
 
     db.session.add(session)
-    db.session.commit()
+    db.session.flush()
 
-    return jsonify({'success': True, 'session_id': session.id})
+    return {'success': True, 'session_id': session.id}, 200
 
 
-@game.route('/api/join_session', methods=['POST'])
-@login_required
-def api_join_session():
-    """API endpoint to join a game session"""
-    data = request.get_json()
+@api.operation('join_session')
+def join_session(data):
+    """Join a game session"""
     session_id = data.get('session_id')
 
     if not session_id:
-        return jsonify({'success': False, 'error': 'Session ID is required'}), 400
+        return {'success': False, 'error': 'Session ID is required'}, 400
 
     # Find the session
     session = GameSession.query.get(session_id)
 
     if not session:
-        return jsonify({'success': False, 'error': 'Session not found'}), 404
+        return {'success': False, 'error': 'Session not found'}, 404
 
     if session.status != 'waiting':
-        return jsonify({'success': False, 'error': 'Session is not available'}), 400
+        return {'success': False, 'error': 'Session is not available'}, 400
 
     # Join the session
     session.player2_id = current_user.id
     session.status = 'playing'
-    db.session.commit()
 
-    return jsonify({'success': True})
+    return {'success': True}, 200
 
 
-@game.route('/api/update_avatar', methods=['POST'])
-@login_required
-def api_update_avatar():
-    """API endpoint to update user's avatar"""
-    data = request.get_json()
+@api.operation('update_avatar')
+def update_avatar(data):
+    """Update user's avatar"""
     avatar_id = data.get('avatar_id')
 
     if not avatar_id:
-        return jsonify({'success': False, 'error': 'Avatar ID is required'}), 400
+        return {'success': False, 'error': 'Avatar ID is required'}, 400
 
     # Find the avatar
     avatar = Avatar.query.get(avatar_id)
 
     if not avatar:
-        return jsonify({'success': False, 'error': 'Avatar not found'}), 404
+        return {'success': False, 'error': 'Avatar not found'}, 404
 
     # Update the user's avatar
     current_user.avatar_id = avatar.id
-    db.session.commit()
 
-    return jsonify({'success': True})
+    return {'success': True}, 200
 
 
-@game.route('/api/save_avatar_customization', methods=['POST'])
-@login_required
-def api_save_avatar_customization():
-    """API endpoint to save avatar customization"""
-    data = request.get_json()
+@api.operation('save_avatar_customization')
+def save_avatar_customization(data):
+    """Save avatar customization"""
     avatar_id = data.get('avatarId')
     color = data.get('color')
     accessories = data.get('accessories', [])
     animation = data.get('animation')
 
     if not avatar_id:
-        return jsonify({'success': False, 'error': 'Avatar ID is required'}), 400
+        return {'success': False, 'error': 'Avatar ID is required'}, 400
 
     # Find the avatar
     avatar = Avatar.query.get(avatar_id)
 
     if not avatar:
-        return jsonify({'success': False, 'error': 'Avatar not found'}), 404
+        return {'success': False, 'error': 'Avatar not found'}, 404
 
     # Update the avatar with customization data
     # In a real application, you would store this in a separate table
@@ -244,23 +470,21 @@ def api_save_avatar_customization():
     }
 
     avatar.description = json.dumps(customization_data)
-    db.session.commit()
 
-    return jsonify({'success': True, 'avatarId': avatar.id})
+    return {'success': True, 'avatarId': avatar.id}, 200
 
 
-@game.route('/api/get_avatar_customization', methods=['GET'])
-@login_required
-def api_get_avatar_customization():
-    """API endpoint to get avatar customization"""
+@api.operation('get_avatar_customization')
+def get_avatar_customization(data):
+    """Get avatar customization"""
     if not current_user.avatar_id:
-        return jsonify({'success': False, 'error': 'No avatar selected'}), 404
+        return {'success': False, 'error': 'No avatar selected'}, 404
 
     # Find the avatar
     avatar = Avatar.query.get(current_user.avatar_id)
 
     if not avatar:
-        return jsonify({'success': False, 'error': 'Avatar not found'}), 404
+        return {'success': False, 'error': 'Avatar not found'}, 404
 
     # Get the customization data
     customization_data = {}
@@ -273,55 +497,168 @@ def api_get_avatar_customization():
     # Add the avatar ID
     customization_data['avatarId'] = avatar.id
 
-    return jsonify({'success': True, 'avatarData': customization_data})
+    return {'success': True, 'avatarData': customization_data}, 200
+
+
+@api.operation('get_calibration')
+def get_calibration(data):
+    """Get the user's saved calibration profile"""
+    profile = CalibrationProfile.query.filter_by(user_id=current_user.id).first()
+
+    if not profile:
+        return {'success': False, 'error': 'No calibration saved'}, 404
+
+    return {'success': True, 'calibration': profile.to_dict()}, 200
+
+
+def _number(value, name):
+    """Read an optional numeric field of a calibration"""
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f'{name} must be a number')
+    return float(value)
+
+
+@api.operation('save_calibration')
+def save_calibration(data):
+    """
+    Save the user's calibration profile.
+
+    Measurements are taken from 'body', landmarks of a neutral pose, or
+    from 'shoulder_width', 'arm_span' and 'center'. Without either, the
+    stored measurements are kept.
+    """
+    center = data.get('center') or {}
+
+    try:
+        measurements = None
+        if data.get('body') is not None:
+            measurements = measure_body(as_landmarks(data['body'], BODY_LANDMARKS))
+        elif data.get('shoulder_width') is not None:
+            measurements = {
+                'shoulder_width': _number(data.get('shoulder_width'), 'shoulder_width'),
+                'arm_span': _number(data.get('arm_span'), 'arm_span'),
+                'center_x': _number(center.get('x'), 'center.x'),
+                'center_y': _number(center.get('y'), 'center.y'),
+            }
+        profile = CalibrationProfile.for_user(current_user)
+        profile.update(
+            handedness=data.get('handedness', 'right'),
+            measurements=measurements,
+            data={key: data[key] for key in ('motion_range', 'thresholds', 'environment') if key in data}
+        )
+    except (AttributeError, ValueError) as e:
+        return {'success': False, 'error': str(e)}, 400
+
+    db.session.flush()
+    return {'success': True, 'calibration': profile.to_dict()}, 200
+
+
+def _signal(data, field):
+    """Validate a WebRTC signalling message"""
+    if not data.get('to') or not data.get(field):
+        return {'success': False, 'error': 'Missing required parameters'}, 400
+
+    # In a real application, this would emit a socket.io event
+    # For testing purposes, we'll just return success
+    return {'success': True}, 200
+
+
+@api.operation('call-user')
+def call_user(data):
+    """WebRTC call user"""
+    return _signal(data, 'offer')
+
+
+@api.operation('make-answer')
+def make_answer(data):
+    """WebRTC make answer"""
+    return _signal(data, 'answer')
+
+
+@api.operation('ice-candidate')
+def ice_candidate(data):
+    """WebRTC ICE candidate"""
+    return _signal(data, 'candidate')
+
+
+# API endpoints
+@game.route('/api/create_session', methods=['POST'])
+@login_required
+def api_create_session():
+    """API endpoint to create a new game session"""
+    return api.respond(create_session, request.get_json())
+
+
+@game.route('/api/join_session', methods=['POST'])
+@login_required
+def api_join_session():
+    """API endpoint to join a game session"""
+    return api.respond(join_session, request.get_json())
+
+
+@game.route('/api/update_avatar', methods=['POST'])
+@login_required
+def api_update_avatar():
+    """API endpoint to update user's avatar"""
+    return api.respond(update_avatar, request.get_json())
+
+
+@game.route('/api/save_avatar_customization', methods=['POST'])
+@login_required
+def api_save_avatar_customization():
+    """API endpoint to save avatar customization"""
+    return api.respond(save_avatar_customization, request.get_json())
+
+
+@game.route('/api/get_avatar_customization', methods=['GET'])
+@login_required
+def api_get_avatar_customization():
+    """API endpoint to get avatar customization"""
+    return api.respond(get_avatar_customization, None)
+
+
+@game.route('/api/get_calibration', methods=['GET'])
+@login_required
+def api_get_calibration():
+    """API endpoint to get the user's calibration profile"""
+    return api.respond(get_calibration, None)
+
+
+@game.route('/api/save_calibration', methods=['POST'])
+@login_required
+def api_save_calibration():
+    """API endpoint to save the user's calibration profile"""
+    return api.respond(save_calibration, request.get_json())
 
 
 @game.route('/api/call-user', methods=['POST'])
 @login_required
 def api_call_user():
     """API endpoint for WebRTC call user"""
-    data = request.get_json()
-    to = data.get('to')
-    offer = data.get('offer')
-
-    if not to or not offer:
-        return jsonify({'success': False, 'error': 'Missing required parameters'}), 400
-
-    # In a real application, this would emit a socket.io event
-    # For testing purposes, we'll just return success
-    return jsonify({'success': True})
+    return api.respond(call_user, request.get_json())
 
 
 @game.route('/api/make-answer', methods=['POST'])
 @login_required
 def api_make_answer():
     """API endpoint for WebRTC make answer"""
-    data = request.get_json()
-    to = data.get('to')
-    answer = data.get('answer')
-
-    if not to or not answer:
-        return jsonify({'success': False, 'error': 'Missing required parameters'}), 400
-
-    # In a real application, this would emit a socket.io event
-    # For testing purposes, we'll just return success
-    return jsonify({'success': True})
+    return api.respond(make_answer, request.get_json())
 
 
 @game.route('/api/ice-candidate', methods=['POST'])
 @login_required
 def api_ice_candidate():
     """API endpoint for WebRTC ICE candidate"""
-    data = request.get_json()
-    to = data.get('to')
-    candidate = data.get('candidate')
+    return api.respond(ice_candidate, request.get_json())
 
-    if not to or not candidate:
-        return jsonify({'success': False, 'error': 'Missing required parameters'}), 400
 
-    # In a real application, this would emit a socket.io event
-    # For testing purposes, we'll just return success
-    return jsonify({'success': True})
+@game.route('/api/batch', methods=['POST'])
+@login_required
+def api_batch():
+    """API endpoint to run several API operations in one request and transaction"""
+    return api.run_batch(request.get_json())
 
 
 @game.route('/play/<int:session_id>')
@@ -332,9 +669,42 @@ def play_game(session_id):
     return render_template('game/play.html', session=session)
 
 
+def _render_results(session_id, summary):
+    return render_template('game/results.html', session_id=session_id, summary=Markup(summary))
+
+
 @game.route('/results/<int:session_id>')
 @login_required
 def game_results(session_id):
-    """Render the game results page for a specific session"""
-    session = GameSession.query.get_or_404(session_id)
-    return render_template('game/results.html', session=session)
\ No newline at end of file
+    """
+    Render the game results page for a specific session.
+
+    Completed sessions are served from their stored summary with an ETag and
+    a long private max-age, so revisits are answered with 304 without
+    touching the session. Other sessions are rendered live.
+    """
+    result = GameResult.query.get(session_id)
+    if result is None or not result.is_current:
+        session = GameSession.query.get_or_404(session_id)
+        if session.status != GameSession.STATUS_COMPLETED:
+            return _render_results(session_id, render_template(GameResult.TEMPLATE, session=session))
+        result = GameResult.publish(session)
+        db.session.commit()
+
+    # Pages showing flash messages must not be revalidated or reused
+    if flask_session.get('_flashes'):
+        return _render_results(session_id, result.body)
+
+    # The navigation bar is per user and the layout per deploy
+    etag = hashlib.sha256(
+        f'{result.etag}:{result.version}:{current_user.get_id()}'.encode('utf-8')
+    ).hexdigest()[:32]
+    if request.if_none_match.contains(etag):
+        response = make_response('', 304)
+    else:
+        response = make_response(_render_results(session_id, result.body))
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.max_age = current_app.config.get('RESULTS_CACHE_MAX_AGE', 86400)
+    response.vary.add('Cookie')
+    return response
\ No newline at end of file
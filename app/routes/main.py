@@ -1,14 +1,17 @@
 from flask import Blueprint, render_template
 from flask_login import login_required, current_user
+from app.utils.page_cache import cacheable
 
 main = Blueprint('main', __name__)
 
 @main.route('/')
+@cacheable
 def index():
     """Render the home page"""
     return render_template('index.html')
 
 @main.route('/about')
+@cacheable
 def about():
     """Render the about page"""
     return render_template('about.html')
@@ -0,0 +1 @@
+# This file makes the rtc directory a Python package
@@ -0,0 +1,218 @@
+"""
+Server-driven bandwidth profiles for match video.
+
+Clients used to pick a bandwidth profile by hand and apply it to every
+connection. Instead, each client now reports a summary of ``getStats()``
+for each of its connections every few seconds: round-trip time, packet
+loss, the bitrate the browser estimates is available, and whether its
+encoder is held back by the CPU. ``BandwidthController`` keeps the
+smoothed figures per link, that is per (client, peer) pair within a game
+session, and picks the best profile the link can carry.
+
+Like the tracking ``QualityScheduler``, a link moves at most one profile
+per interval. It steps down as soon as loss, round-trip time or the
+available bitrate say the profile is too much. It steps back up only
+after several intervals with low loss, a short round trip and room for
+the better profile's bitrate. The gap between the two thresholds keeps
+links from flapping.
+
+CPU counts as well. A client whose encoder reports a CPU limit is
+treated like a congested link. When server-side tracking is running,
+links the server forwards through the SFU share its CPU with the
+tracking workers, so they also step down while the workers are short of
+headroom.
+"""
+import threading
+import time
+from app.rtc.sfu import parse_peer
+
+# Profiles from best to worst, with the video and audio kbps each sends;
+# the bitrates match bandwidthConstraints in video-chat.js
+PROFILES = ('high', 'medium', 'low')
+PROFILE_KBPS = {'high': 1000 + 96, 'medium': 500 + 64, 'low': 250 + 32}
+DEFAULT_PROFILE = 'medium'
+
+# Weight of the newest report in a link's smoothed figures
+STATS_SMOOTHING = 0.3
+# A link recovers a profile once loss and round trip are below this share of their limits
+RECOVER_SHARE = 0.5
+# Spare available bitrate a better profile needs before a link moves up to it
+BITRATE_MARGIN = 0.25
+# Intervals a link waits after a change before it moves up again
+RECOVER_INTERVALS = 3
+
+
+def _number(value, name):
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'Invalid {name}: {value!r}')
+
+
+def _smooth(old, new):
+    if new is None:
+        return old
+    return new if old is None else old + STATS_SMOOTHING * (new - old)
+
+
+class Link:
+    """Smoothed network figures and profile of one connection"""
+
+    def __init__(self, now):
+        self.level = PROFILES.index(DEFAULT_PROFILE)
+        self.rtt = None
+        self.loss = None
+        self.available = None
+        self.cpu_limited = False
+        self.reports = 0
+        self.changes = 0
+        self.created = now
+        self.changed = None
+
+    @property
+    def profile(self):
+        return PROFILES[self.level]
+
+
+class BandwidthController:
+    """Flask extension choosing each connection's bandwidth profile from client-reported stats"""
+
+    def __init__(self, app=None):
+        self.enabled = True
+        self.target_rtt_ms = 250.0
+        self.max_loss = 0.05
+        self.interval = 2.0
+        self.headroom = 0.2
+        self._sessions = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Configure the thresholds from the app config"""
+        self.enabled = app.config.get('BANDWIDTH_ADAPTIVE', True)
+        self.target_rtt_ms = app.config.get('BANDWIDTH_TARGET_RTT_MS', 250.0)
+        self.max_loss = app.config.get('BANDWIDTH_MAX_LOSS', 0.05)
+        self.interval = app.config.get('BANDWIDTH_INTERVAL', 2.0)
+        self.headroom = app.config.get('VISION_CPU_HEADROOM', 0.2)
+        with self._lock:
+            self._sessions.clear()
+        app.extensions['bandwidth'] = self
+
+    def report(self, session_id, sid, peers, server_load=None, now=None):
+        """
+        Record a client's stats summary and adjust the profile of each of
+        its connections.
+
+        Args:
+            session_id: The game session the client plays or watches.
+            sid: The reporting client.
+            peers (dict): Peer id to a summary with any of 'rtt_ms',
+                'loss' (a share of packets, 0 to 1), 'available_kbps' and
+                'cpu_limited'.
+            server_load (float): Share of the tracking workers' CPU in
+                use, or None if server-side tracking is not running.
+
+        Returns:
+            dict: Peer id to the new profile, for connections whose
+            profile changed.
+
+        Raises:
+            ValueError: If the summary is malformed.
+        """
+        if not isinstance(peers, dict) or not all(isinstance(stats, dict) for stats in peers.values()):
+            raise ValueError('Network stats must map peers to summaries')
+        summaries = {peer: (_number(stats.get('rtt_ms'), 'rtt_ms'), _number(stats.get('loss'), 'loss'),
+                            _number(stats.get('available_kbps'), 'available_kbps'), bool(stats.get('cpu_limited')))
+                     for peer, stats in peers.items()}
+        now = time.monotonic() if now is None else now
+
+        changes = {}
+        with self._lock:
+            links = self._sessions.setdefault(session_id, {})
+            for peer, (rtt, loss, available, cpu_limited) in summaries.items():
+                link = links.get((sid, peer))
+                if link is None:
+                    link = links[sid, peer] = Link(now)
+                link.rtt = _smooth(link.rtt, rtt)
+                link.loss = _smooth(link.loss, loss)
+                link.available = _smooth(link.available, available)
+                link.cpu_limited = cpu_limited
+                link.reports += 1
+                # Forwarded links are encoded by the server, next to the tracking workers
+                load = server_load if parse_peer(peer)[0] else None
+                if self._adjust(link, load, now):
+                    changes[peer] = link.profile
+        return changes
+
+    def _adjust(self, link, load, now):
+        # A new link may step down on its first report, but not up
+        if not self.enabled or (link.changed is not None and now - link.changed < self.interval):
+            return False
+
+        level = link.level
+        settled = now - (link.created if link.changed is None else link.changed) >= self.interval * RECOVER_INTERVALS
+        if self._congested(link, load):
+            level = min(level + 1, len(PROFILES) - 1)
+        elif level > 0 and settled and self._clear(link, load):
+            level -= 1
+        if level == link.level:
+            return False
+        link.level = level
+        link.changes += 1
+        link.changed = now
+        return True
+
+    def _congested(self, link, load):
+        return ((link.loss is not None and link.loss > self.max_loss)
+                or (link.rtt is not None and link.rtt > self.target_rtt_ms)
+                or (link.available is not None and link.available < PROFILE_KBPS[link.profile])
+                or link.cpu_limited
+                or (load is not None and load > 1 - self.headroom))
+
+    def _clear(self, link, load):
+        better = PROFILES[link.level - 1]
+        return ((link.loss is None or link.loss < self.max_loss * RECOVER_SHARE)
+                and (link.rtt is None or link.rtt < self.target_rtt_ms * RECOVER_SHARE)
+                and (link.available is None or link.available >= PROFILE_KBPS[better] * (1 + BITRATE_MARGIN))
+                and (load is None or load < 1 - 2 * self.headroom))
+
+    def profile(self, session_id, sid, peer):
+        """Get a connection's profile; connections without reports start at the default"""
+        with self._lock:
+            link = self._sessions.get(session_id, {}).get((sid, peer))
+            return link.profile if link is not None else DEFAULT_PROFILE
+
+    def state(self, session_id):
+        """
+        Get every connection of a session.
+
+        Returns:
+            dict: 'client -> peer' to the link's profile, smoothed
+            figures, report count and profile changes.
+        """
+        with self._lock:
+            return {
+                f'{sid} -> {peer}': {
+                    'profile': link.profile,
+                    'rtt_ms': link.rtt,
+                    'loss': link.loss,
+                    'available_kbps': link.available,
+                    'cpu_limited': link.cpu_limited,
+                    'reports': link.reports,
+                    'changes': link.changes,
+                }
+                for (sid, peer), link in self._sessions.get(session_id, {}).items()
+            }
+
+    def forget(self, sid):
+        """Forget every connection a client reported or was the peer of"""
+        with self._lock:
+            for session_id, links in list(self._sessions.items()):
+                for key in [key for key in links if sid == key[0] or sid == key[1]
+                            or parse_peer(key[1])[1] == sid]:
+                    del links[key]
+                if not links:
+                    del self._sessions[session_id]
@@ -0,0 +1,508 @@
+"""
+Selective forwarding of match video between clients.
+
+``video-chat.js`` connects every pair of clients directly, so each
+client uploads its camera once per other participant. Once more player
+clients join than the mesh allows, ``SelectiveForwarder`` takes over:
+every client publishes a single stream to the server, and the server
+forwards it to the other participants of the room on one subscription
+connection per (subscriber, publisher) pair. Spectators cannot publish,
+so they do not count towards the switch.
+
+Signaling reuses the mesh events. A client publishes with a 'call-user'
+offer to the peer id ``SFU_PEER`` and gets an 'answer-made' back; the
+server offers each subscription with 'call-made' from the peer id
+``subscription_peer(publisher)`` and the client answers it with
+'make-answer', exactly as it would for another client. Publishing also
+subscribes a client to everyone in the room, so the socket handlers only
+accept publishers that joined the session's room and play in it.
+
+aiortc decodes incoming video and encodes every outgoing track
+separately, so each subscriber gets its own encoder. A subscriber's
+layer sets the resolution and frame rate forwarded to it, and through
+them the bitrate its encoder sends. Frames are scaled once per publisher
+and size, however many subscribers share a layer. Audio is forwarded
+unchanged.
+
+Like ``VisionServer``, aiortc runs on an asyncio loop in a background
+thread that is started by the first publisher. A call that takes longer
+than the signaling timeout, or that the loop fails, raises
+``ForwardingError``.
+"""
+import asyncio
+import logging
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from app.vision.video import scaled_size
+
+# Resolution (frame height) and frame rate forwarded to a subscriber; the
+# names match the bandwidth profiles in video-chat.js
+LAYERS = {
+    'low': {'height': 180, 'fps': 15},
+    'medium': {'height': 360, 'fps': 24},
+    'high': {'height': 720, 'fps': 30},
+}
+DEFAULT_LAYER = 'medium'
+
+logger = logging.getLogger(__name__)
+
+# Peer id clients publish to, and prefix of the peer ids of subscriptions
+SFU_PEER = 'sfu'
+
+
+def subscription_peer(publisher):
+    """Get the peer id a client sees a publisher's forwarded stream under"""
+    return f'{SFU_PEER}:{publisher}'
+
+
+def parse_peer(peer):
+    """
+    Split a signaling peer id addressed to the server.
+
+    Returns:
+        tuple: (True, publisher) for a subscription, (True, None) for the
+        client's own published stream, or (False, None) if the peer is
+        another client.
+    """
+    if peer == SFU_PEER:
+        return True, None
+    if isinstance(peer, str) and peer.startswith(SFU_PEER + ':'):
+        return True, peer[len(SFU_PEER) + 1:]
+    return False, None
+
+
+def layer_size(width, height, layer):
+    """Get the (width, height) a frame is forwarded at in a layer; frames are never scaled up"""
+    target = LAYERS[layer]['height']
+    if height <= target:
+        return width, height
+    return scaled_size(width, height, target / height)
+
+
+def _create_layer_track(publication, source, layer):
+    from aiortc import MediaStreamTrack
+    from aiortc.mediastreams import MediaStreamError
+
+    class LayerTrack(MediaStreamTrack):
+        """A publisher's video thinned and scaled to one subscriber's layer"""
+
+        kind = 'video'
+
+        def __init__(self):
+            super().__init__()
+            self.layer = layer
+            self.forwarded = 0
+            self.dropped = 0
+            self._due = None
+
+        async def recv(self):
+            while True:
+                try:
+                    frame = await source.recv()
+                except MediaStreamError:
+                    self.stop()
+                    raise
+                if self._admit(frame.time):
+                    self.forwarded += 1
+                    return publication.scaled(frame, layer_size(frame.width, frame.height, self.layer))
+                self.dropped += 1
+
+        def stop(self):
+            super().stop()
+            source.stop()
+
+        def _admit(self, time):
+            if time is None:
+                return True
+            interval = 1 / LAYERS[self.layer]['fps']
+            # Allow a little jitter so a source at the layer's rate is not halved
+            if self._due is not None and time < self._due - interval / 10:
+                return False
+            if self._due is not None and time - self._due < interval:
+                self._due += interval
+            else:
+                self._due = time + interval
+            return True
+
+    return LayerTrack()
+
+
+class Publication:
+    """The tracks one client publishes, relayed to its subscribers"""
+
+    def __init__(self, sid, room, peer, relay):
+        self.sid = sid
+        self.room = room
+        self.peer = peer
+        self.relay = relay
+        self.tracks = []
+        self._scaled = {}
+
+    def scaled(self, frame, size):
+        """
+        Scale a frame, reusing the result for other subscribers at the same size.
+
+        Frames are also converted to the encoders' yuv420p here, once:
+        encoders run in executor threads and PyAV frames are not safe to
+        convert from several threads at a time.
+        """
+        if size == (frame.width, frame.height) and frame.format.name == 'yuv420p':
+            return frame
+        cached = self._scaled.get(size)
+        if cached is None or cached[0] is not frame:
+            cached = self._scaled[size] = (frame, frame.reformat(width=size[0], height=size[1], format='yuv420p'))
+        return cached[1]
+
+    def subscribe(self, layer):
+        """Get the tracks to send one subscriber"""
+        tracks = []
+        for track in self.tracks:
+            proxy = self.relay.subscribe(track, buffered=False)
+            tracks.append(_create_layer_track(self, proxy, layer) if track.kind == 'video' else proxy)
+        return tracks
+
+
+class ForwardingError(ValueError):
+    """Raised when the server's WebRTC loop fails or does not answer in time"""
+
+
+class Subscription:
+    """A connection forwarding one publisher's tracks to one subscriber"""
+
+    def __init__(self, subscriber, publisher, peer, tracks):
+        self.subscriber = subscriber
+        self.publisher = publisher
+        self.peer = peer
+        self.tracks = tracks
+
+    @property
+    def video(self):
+        return next((track for track in self.tracks if track.kind == 'video'), None)
+
+
+class SelectiveForwarder:
+    """Flask extension forwarding each client's published stream to the rest of its room"""
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.mesh_limit = 2
+        self.max_participants = 16
+        self.default_layer = DEFAULT_LAYER
+        self.timeout = 10.0
+        self._loop = None
+        self._thread = None
+        self._relay = None
+        self._publications = {}
+        self._subscriptions = {}
+        self._layers = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Configure the forwarder from the app config"""
+        self.shutdown()
+        self.enabled = app.config.get('SFU_ENABLED', False)
+        self.mesh_limit = app.config.get('SFU_MESH_MAX_PARTICIPANTS', 2)
+        self.max_participants = app.config.get('SFU_MAX_PARTICIPANTS', 16)
+        self.default_layer = app.config.get('SFU_DEFAULT_LAYER', DEFAULT_LAYER)
+        if self.default_layer not in LAYERS:
+            raise ValueError(f'Unknown SFU layer: {self.default_layer}')
+        self.timeout = app.config.get('SFU_SIGNALING_TIMEOUT', 10.0)
+        app.extensions['sfu'] = self
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name='sfu-loop', daemon=True)
+                self._thread.start()
+        return self._loop
+
+    def _run(self, coroutine, cancel=True):
+        # A timed-out call is cancelled, unless it cleans up and should run to the end
+        try:
+            future = asyncio.run_coroutine_threadsafe(coroutine, self._ensure_loop())
+            return future.result(self.timeout)
+        except FutureTimeoutError:
+            if cancel:
+                future.cancel()
+            raise ForwardingError('The server timed out forwarding video')
+        except (ValueError, TypeError):
+            raise
+        except Exception as e:
+            raise ForwardingError(f'Forwarding video failed: {e}')
+
+    def wants_sfu(self, room, participants):
+        """Whether a room with this many participants should forward through the server"""
+        return self.enabled and (participants > self.mesh_limit or self.active(room))
+
+    def active(self, room):
+        """Whether anyone in a room publishes to the server"""
+        return any(publication.room == room for publication in list(self._publications.values()))
+
+    def participants(self, room):
+        """Get the clients publishing in a room"""
+        return sorted(sid for sid, publication in list(self._publications.items()) if publication.room == room)
+
+    def publish(self, room, sid, sdp, type, layer=None):
+        """
+        Answer a client's offer to publish its stream to a room.
+
+        Subscriptions between the client and everyone already publishing
+        in the room are created at once, in both directions.
+
+        Args:
+            room: The room (game session) to publish in.
+            sid: The publishing client.
+            sdp (str): The client's offer.
+            type (str): Must be 'offer'.
+            layer (str): The layer the client receives others at; the
+                default layer if None.
+
+        Returns:
+            tuple: The answer as a dict of 'sdp' and 'type', and the
+            subscription offers to signal, as dicts of 'to' (the
+            subscriber), 'socket' (the peer id of the publisher) and
+            'offer'.
+
+        Raises:
+            ValueError: If the offer, room or layer is invalid or the
+                room is full.
+            ForwardingError: If the server did not answer in time.
+        """
+        if not self.enabled:
+            raise ValueError('Forwarding through the server is disabled')
+        if not sdp or type != 'offer':
+            raise ValueError('A WebRTC offer is required')
+        if room is None:
+            raise ValueError('A session is required to publish')
+        layer = layer or self._layers.get(sid, self.default_layer)
+        if layer not in LAYERS:
+            raise ValueError(f'Unknown layer: {layer}')
+        if sid not in self._publications and len(self.participants(room)) >= self.max_participants:
+            raise ValueError('This session is full')
+        self._layers[sid] = layer
+        try:
+            return self._run(self._publish(room, sid, sdp, type))
+        except ForwardingError:
+            # Do not leave a half-negotiated publication behind
+            try:
+                asyncio.run_coroutine_threadsafe(self._leave(sid), self._loop)
+            except RuntimeError:
+                self._publications.pop(sid, None)
+            raise
+        except (ValueError, TypeError) as e:
+            raise ValueError(f'Invalid offer: {e}')
+
+    async def _publish(self, room, sid, sdp, type):
+        from aiortc import RTCPeerConnection, RTCSessionDescription
+        from aiortc.contrib.media import MediaRelay
+
+        await self._leave(sid)
+        if self._relay is None:
+            self._relay = MediaRelay()
+        peer = RTCPeerConnection()
+        publication = Publication(sid, room, peer, self._relay)
+        self._publications[sid] = publication
+
+        @peer.on('track')
+        def on_track(track):
+            publication.tracks.append(track)
+
+        @peer.on('connectionstatechange')
+        async def on_state():
+            if peer.connectionState == 'failed' and self._publications.get(sid) is publication:
+                await self._leave(sid)
+
+        await peer.setRemoteDescription(RTCSessionDescription(sdp=sdp, type=type))
+        await peer.setLocalDescription(await peer.createAnswer())
+        answer = {'sdp': peer.localDescription.sdp, 'type': peer.localDescription.type}
+
+        offers = []
+        for other in self.participants(room):
+            if other != sid:
+                offers.append(await self._subscribe(sid, self._publications[other]))
+                offers.append(await self._subscribe(other, publication))
+        return answer, [offer for offer in offers if offer is not None]
+
+    async def _subscribe(self, subscriber, publication):
+        from aiortc import RTCPeerConnection
+
+        if not publication.tracks:
+            return None
+        peer = RTCPeerConnection()
+        subscription = Subscription(subscriber, publication.sid, peer,
+                                    publication.subscribe(self._layers.get(subscriber, self.default_layer)))
+        for track in subscription.tracks:
+            peer.addTrack(track)
+        self._subscriptions[subscriber, publication.sid] = subscription
+        await peer.setLocalDescription(await peer.createOffer())
+        return {'to': subscriber, 'socket': subscription_peer(publication.sid),
+                'offer': {'sdp': peer.localDescription.sdp, 'type': peer.localDescription.type}}
+
+    def answer(self, sid, publisher, sdp, type):
+        """
+        Complete a subscription with the subscriber's answer.
+
+        Raises:
+            ValueError: If the answer is invalid or the subscription
+                does not exist.
+        """
+        if not sdp or type != 'answer':
+            raise ValueError('A WebRTC answer is required')
+        subscription = self._subscriptions.get((sid, publisher))
+        if subscription is None:
+            raise ValueError('No such subscription')
+        try:
+            self._run(self._answer(subscription, sdp, type))
+        except ForwardingError:
+            raise
+        except (ValueError, TypeError) as e:
+            raise ValueError(f'Invalid answer: {e}')
+
+    async def _answer(self, subscription, sdp, type):
+        from aiortc import RTCSessionDescription
+
+        await subscription.peer.setRemoteDescription(RTCSessionDescription(sdp=sdp, type=type))
+
+    def add_candidate(self, sid, publisher, candidate):
+        """
+        Add a client's trickled ICE candidate to its publication, or to
+        a subscription if ``publisher`` is given.
+
+        Args:
+            candidate (dict): The browser's RTCIceCandidate as JSON, with
+                'candidate', 'sdpMid' and 'sdpMLineIndex'.
+
+        Raises:
+            ValueError: If the candidate is invalid or the connection
+                does not exist.
+        """
+        if publisher is None:
+            connection = self._publications.get(sid)
+        else:
+            connection = self._subscriptions.get((sid, publisher))
+        if connection is None:
+            raise ValueError('No such connection')
+        line = (candidate or {}).get('candidate')
+        if not line:
+            # The end of candidates; aiortc needs no notice
+            return
+        from aiortc.sdp import candidate_from_sdp
+
+        try:
+            ice = candidate_from_sdp(line.split(':', 1)[1] if line.startswith('candidate:') else line)
+        except (ValueError, IndexError) as e:
+            raise ValueError(f'Invalid candidate: {e}')
+        ice.sdpMid = candidate.get('sdpMid')
+        ice.sdpMLineIndex = candidate.get('sdpMLineIndex')
+        self._run(connection.peer.addIceCandidate(ice))
+
+    def set_layer(self, sid, layer, publisher=None):
+        """
+        Change the layer a client receives every publisher at, or only
+        ``publisher`` if given.
+
+        Takes effect on the next forwarded frame; aiortc's encoders
+        restart with a key frame when the resolution changes.
+
+        Raises:
+            ValueError: If the layer is unknown.
+        """
+        if layer not in LAYERS:
+            raise ValueError(f'Unknown layer: {layer}')
+        if publisher is None:
+            self._layers[sid] = layer
+        for (subscriber, source), subscription in list(self._subscriptions.items()):
+            if subscriber == sid and publisher in (None, source) and subscription.video is not None:
+                subscription.video.layer = layer
+
+    def leave(self, sid):
+        """
+        Stop publishing a client's stream and close its subscriptions.
+
+        Closing continues on the loop if it takes longer than the
+        signaling timeout, so a client always leaves.
+
+        Returns:
+            list: The clients that were receiving the stream.
+        """
+        self._layers.pop(sid, None)
+        if self._loop is None:
+            return []
+        subscribers = [subscriber for subscriber, publisher in list(self._subscriptions) if publisher == sid]
+        try:
+            self._run(self._leave(sid), cancel=False)
+        except ForwardingError as e:
+            logger.warning('Closing the forwarded streams of %s: %s', sid, e)
+        return subscribers
+
+    async def _leave(self, sid):
+        publication = self._publications.pop(sid, None)
+        subscribers = []
+        for key in [key for key in self._subscriptions if sid in key]:
+            subscription = self._subscriptions.pop(key)
+            if subscription.publisher == sid:
+                subscribers.append(subscription.subscriber)
+            for track in subscription.tracks:
+                track.stop()
+            await subscription.peer.close()
+        if publication is not None:
+            await publication.peer.close()
+        return subscribers
+
+    def stats(self, sid):
+        """
+        Get what a client publishes and receives through the server.
+
+        Returns:
+            dict: 'room', 'layer', 'packets_received' of the published
+            stream and, per publisher, the 'layer', 'forwarded' and
+            'dropped' frame counts and 'bytes_sent' of the subscription;
+            None if the client does not publish.
+        """
+        publication = self._publications.get(sid)
+        if publication is None:
+            return None
+        return self._run(self._stats(sid, publication))
+
+    async def _stats(self, sid, publication):
+        received = sum(stat.packetsReceived for stat in (await publication.peer.getStats()).values()
+                       if stat.type == 'inbound-rtp')
+        subscriptions = {}
+        for (subscriber, publisher), subscription in list(self._subscriptions.items()):
+            if subscriber != sid:
+                continue
+            video = subscription.video
+            sent = sum(stat.bytesSent for stat in (await subscription.peer.getStats()).values()
+                       if stat.type == 'outbound-rtp')
+            subscriptions[publisher] = {
+                'layer': video.layer if video is not None else None,
+                'forwarded': video.forwarded if video is not None else 0,
+                'dropped': video.dropped if video is not None else 0,
+                'bytes_sent': sent,
+            }
+        return {'room': publication.room, 'layer': self._layers.get(sid, self.default_layer),
+                'packets_received': received, 'subscriptions': subscriptions}
+
+    async def _cancel_tasks(self):
+        # Connections that never completed leave ICE checks running
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def shutdown(self):
+        """Close every connection and stop the loop"""
+        if self._loop is not None:
+            for sid in list(self._publications):
+                self._run(self._leave(sid))
+            self._run(self._cancel_tasks())
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+            self._loop = self._thread = None
+        self._relay = None
+        self._publications.clear()
+        self._subscriptions.clear()
+        self._layers.clear()
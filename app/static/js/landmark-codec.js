@@ -0,0 +1,137 @@
+/**
+ * Landmark Codec for Motion Powered Games
+ * Encodes landmark frames in the compact binary format decoded by app/motion/codec.py
+ *
+ * Frame layout (little-endian): version u8, kind u8, encoding u8, sets u8,
+ * seq u32, timestamp f64 (ms), scale f32, then sets x points x (x, y, z) as
+ * float16 or int16 values. Frames of one message share kind, encoding and sets.
+ */
+
+const LandmarkCodec = {
+    VERSION: 1,
+    HEADER_SIZE: 20,
+
+    KIND_HAND: 1,
+    KIND_BODY: 2,
+    KIND_FACE: 3,
+    POINTS: { 1: 21, 2: 33, 3: 468 },
+
+    ENCODING_FLOAT16: 1,
+    ENCODING_INT16: 2,
+    MISSING_INT16: -32768
+};
+
+// Scratch views for float32 -> float16 conversion
+const float32Scratch = new Float32Array(1);
+const uint32Scratch = new Uint32Array(float32Scratch.buffer);
+
+/**
+ * Shift bits right, rounding the dropped bits to nearest with ties to even
+ * @param {number} value - Non-negative integer below 2^25
+ * @param {number} shift - Bits to drop, 1 to 24
+ * @returns {number} - The rounded value
+ */
+function roundShift(value, shift) {
+    const half = 1 << (shift - 1);
+    const rest = value & ((1 << shift) - 1);
+    const result = value >>> shift;
+    return rest > half || (rest === half && (result & 1)) ? result + 1 : result;
+}
+
+/**
+ * Convert a number to IEEE 754 half precision bits, rounding like NumPy's
+ * float32 to float16 cast (to nearest, ties to even)
+ * @param {number} value - The value to convert (NaN for missing)
+ * @returns {number} - The float16 bit pattern
+ */
+function toFloat16Bits(value) {
+    float32Scratch[0] = value;
+    const bits = uint32Scratch[0];
+    const sign = (bits >>> 16) & 0x8000;
+    const exponent = (bits >>> 23) & 0xff;
+    const mantissa = bits & 0x7fffff;
+
+    if (exponent === 0xff) {
+        // Infinity or NaN
+        return sign | 0x7c00 | (mantissa ? 0x200 : 0);
+    }
+
+    const halfExponent = exponent - 127 + 15;
+    if (halfExponent >= 0x1f) {
+        return sign | 0x7c00;
+    }
+    if (halfExponent <= 0) {
+        // Subnormal half; below half the smallest one rounds to zero
+        if (halfExponent < -10) return sign;
+        return sign | roundShift(mantissa | 0x800000, 14 - halfExponent);
+    }
+
+    // A mantissa that rounds up past its top carries into the exponent, up to infinity
+    return sign | ((halfExponent << 10) + roundShift(mantissa, 13));
+}
+
+/**
+ * Encode landmark frames
+ * @param {Array} frames - Per frame, an array of landmark sets (e.g. [leftHand, rightHand]);
+ *                         each set is an array of {x, y, z} keypoints or null when missing
+ * @param {Object} options - kind, encoding, seq (first sequence number) and timestamps (ms per frame)
+ * @returns {ArrayBuffer} - The encoded message
+ */
+function encodeLandmarkFrames(frames, options = {}) {
+    const kind = options.kind || LandmarkCodec.KIND_HAND;
+    const encoding = options.encoding || LandmarkCodec.ENCODING_FLOAT16;
+    const points = LandmarkCodec.POINTS[kind];
+    const sets = frames.length > 0 ? frames[0].length : 0;
+    const frameSize = LandmarkCodec.HEADER_SIZE + sets * points * 3 * 2;
+
+    const buffer = new ArrayBuffer(frameSize * frames.length);
+    const view = new DataView(buffer);
+
+    frames.forEach((frame, f) => {
+        const offset = f * frameSize;
+        const values = [];
+        for (let s = 0; s < sets; s++) {
+            const keypoints = frame[s];
+            for (let p = 0; p < points; p++) {
+                const kp = keypoints ? keypoints[p] : null;
+                values.push(kp ? kp.x : NaN, kp ? kp.y : NaN, kp ? (kp.z || 0) : NaN);
+            }
+        }
+
+        // int16 uses one step per frame so the largest coordinate spans the range
+        let scale = 0;
+        if (encoding === LandmarkCodec.ENCODING_INT16) {
+            const peak = values.reduce((max, v) => (Number.isNaN(v) ? max : Math.max(max, Math.abs(v))), 0);
+            scale = peak > 0 ? peak / 32767 : 1;
+        }
+
+        view.setUint8(offset, LandmarkCodec.VERSION);
+        view.setUint8(offset + 1, kind);
+        view.setUint8(offset + 2, encoding);
+        view.setUint8(offset + 3, sets);
+        view.setUint32(offset + 4, ((options.seq || 0) + f) >>> 0, true);
+        view.setFloat64(offset + 8, options.timestamps ? options.timestamps[f] : performance.now(), true);
+        view.setFloat32(offset + 16, scale, true);
+
+        values.forEach((value, i) => {
+            const position = offset + LandmarkCodec.HEADER_SIZE + i * 2;
+            if (encoding === LandmarkCodec.ENCODING_INT16) {
+                const quantized = Number.isNaN(value) ? LandmarkCodec.MISSING_INT16 : Math.round(value / scale);
+                view.setInt16(position, quantized, true);
+            } else {
+                view.setUint16(position, toFloat16Bits(value), true);
+            }
+        });
+    });
+
+    return buffer;
+}
+
+// Export functions if using modules
+if (typeof module !== 'undefined' && module.exports) {
+    module.exports = {
+        LandmarkCodec,
+        encodeLandmarkFrames,
+        toFloat16Bits
+    };
+}
@@ -0,0 +1,76 @@
+/**
+ * Server Tracking for Motion Powered Games
+ * Sends the camera to the server over WebRTC so landmarks are extracted there
+ * (app/vision/server.py). Gestures come back as 'motion_gestures' events, the
+ * same as for landmarks streamed from the browser.
+ */
+
+let serverTrackingConnection = null;
+
+/**
+ * Start tracking a camera stream on the server
+ * @param {Object} socket - The Socket.IO connection
+ * @param {MediaStream} stream - The camera stream; only its video is sent
+ * @param {Object} options - sessionId of the game room to share gestures with,
+ *     gameMode ('boxing', 'shadow_dance', ...) to pick how tracking degrades under load,
+ *     calibrate to get body landmarks back as 'vision_body' events
+ * @returns {Promise} - Resolves once the server has answered
+ */
+async function startServerTracking(socket, stream, options = {}) {
+    stopServerTracking(socket);
+
+    const connection = new RTCPeerConnection();
+    serverTrackingConnection = connection;
+    stream.getVideoTracks().forEach(track => connection.addTrack(track, stream));
+
+    const answered = new Promise((resolve, reject) => {
+        socket.once('vision_answer', answer => {
+            connection.setRemoteDescription(answer).then(resolve, reject);
+        });
+        socket.once('vision_error', data => reject(new Error(data.error)));
+    });
+
+    await connection.setLocalDescription(await connection.createOffer());
+
+    // Send the offer once ICE gathering is complete; the server does not trickle
+    if (connection.iceGatheringState !== 'complete') {
+        await new Promise(resolve => {
+            connection.addEventListener('icegatheringstatechange', () => {
+                if (connection.iceGatheringState === 'complete') resolve();
+            });
+        });
+    }
+
+    socket.emit('vision_offer', {
+        sdp: connection.localDescription.sdp,
+        type: connection.localDescription.type,
+        session_id: options.sessionId || null,
+        game_mode: options.gameMode || null,
+        calibrate: options.calibrate || false
+    });
+    return answered;
+}
+
+/**
+ * Stop tracking on the server
+ * @param {Object} socket - The Socket.IO connection
+ */
+function stopServerTracking(socket) {
+    if (serverTrackingConnection) {
+        serverTrackingConnection.close();
+        serverTrackingConnection = null;
+        socket.emit('vision_stop');
+    }
+}
+
+/**
+ * Ask for the server-side tracking quality level and frame counters
+ * @param {Object} socket - The Socket.IO connection
+ * @returns {Promise} - Resolves to {quality, frames}
+ */
+function getServerTrackingStatus(socket) {
+    return new Promise(resolve => {
+        socket.once('vision_status', resolve);
+        socket.emit('vision_status');
+    });
+}
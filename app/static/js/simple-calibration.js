@@ -3,6 +3,9 @@
  * A simplified version that focuses on camera access and basic motion detection
  */
 
+// Steps whose moving pixels give the range of motion, by step index
+const MOTION_RANGE_STEPS = { 1: 'hands', 3: 'body' };
+
 class SimpleCalibration {
     constructor(options = {}) {
         // Configuration options with defaults
@@ -34,8 +37,12 @@ class SimpleCalibration {
         // Motion detection variables
         this.previousImageData = null;
         this.motionThreshold = 30; // Threshold for motion detection
+        this.motionPercentageThreshold = 0.5; // Percentage of sampled pixels that must change
         this.motionPixelCount = 0;
         
+        // What the calibration measured, passed to onCalibrationComplete
+        this.calibrationData = null;
+        
         // Initialize
         this.initialize();
     }
@@ -118,6 +125,21 @@ class SimpleCalibration {
         
         this.isCalibrating = true;
         this.currentStep = 0;
+        this.calibrationData = {
+            timestamp: Date.now(),
+            environment: {
+                cameraResolution: this.videoElement ? {
+                    width: this.videoElement.videoWidth,
+                    height: this.videoElement.videoHeight
+                } : null
+            },
+            // Bounding boxes in video pixels of what moved during the hand and test steps
+            motionRange: { hands: null, body: null },
+            thresholds: {
+                pixelDifference: this.motionThreshold,
+                motionPercentage: this.motionPercentageThreshold
+            }
+        };
         
         // Start the first step
         this.startStep();
@@ -182,7 +204,7 @@ class SimpleCalibration {
         
         // Call calibration complete callback
         if (typeof this.config.onCalibrationComplete === 'function') {
-            this.config.onCalibrationComplete();
+            this.config.onCalibrationComplete(this.getCalibrationData());
         }
         
         // Dispatch calibration complete event
@@ -232,7 +254,9 @@ class SimpleCalibration {
         // If we have previous image data, compare to detect motion
         if (this.previousImageData) {
             const previousData = this.previousImageData.data;
+            const width = this.canvasElement.width;
             let motionPixels = 0;
+            let minX = Infinity, minY = Infinity, maxX = -Infinity, maxY = -Infinity;
             
             // Compare pixels (sample every 10th pixel for performance)
             for (let i = 0; i < data.length; i += 40) {
@@ -244,6 +268,12 @@ class SimpleCalibration {
                 // If difference is above threshold, count as motion
                 if (diff > this.motionThreshold) {
                     motionPixels++;
+                    const x = (i / 4) % width;
+                    const y = Math.floor(i / 4 / width);
+                    minX = Math.min(minX, x);
+                    maxX = Math.max(maxX, x);
+                    minY = Math.min(minY, y);
+                    maxY = Math.max(maxY, y);
                     
                     // Highlight motion pixels for visualization
                     if (this.currentStep === 1) { // Only in hand detection step
@@ -263,8 +293,9 @@ class SimpleCalibration {
             const motionPercentage = (motionPixels / (data.length / 40)) * 100;
             
             // If motion percentage is above threshold, consider motion detected
-            if (motionPercentage > 0.5) {
+            if (motionPercentage > this.motionPercentageThreshold) {
                 this.motionDetected = true;
+                this.updateMotionRange(MOTION_RANGE_STEPS[this.currentStep], minX, minY, maxX, maxY);
                 
                 // Dispatch motion detected event
                 this.dispatchEvent('motionDetected', {
@@ -283,6 +314,30 @@ class SimpleCalibration {
         this.animationFrame = requestAnimationFrame(() => this.detectMotion());
     }
     
+    /**
+     * Widen the range of motion recorded for a step
+     */
+    updateMotionRange(key, minX, minY, maxX, maxY) {
+        if (!key || !this.calibrationData) return;
+        
+        const range = this.calibrationData.motionRange[key];
+        if (!range) {
+            this.calibrationData.motionRange[key] = { min: { x: minX, y: minY }, max: { x: maxX, y: maxY } };
+            return;
+        }
+        range.min.x = Math.min(range.min.x, minX);
+        range.min.y = Math.min(range.min.y, minY);
+        range.max.x = Math.max(range.max.x, maxX);
+        range.max.y = Math.max(range.max.y, maxY);
+    }
+    
+    /**
+     * Get what the calibration measured
+     */
+    getCalibrationData() {
+        return this.calibrationData ? JSON.parse(JSON.stringify(this.calibrationData)) : null;
+    }
+    
     /**
      * Get the current calibration progress
      */
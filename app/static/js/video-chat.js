@@ -40,6 +40,9 @@ const bandwidthConstraints = {
     }
 };
 
+// Peer id of the server's SFU; streams it forwards arrive as 'sfu:<publisher>'
+const SFU_PEER = 'sfu';
+
 // Global variables
 let localStream = null;
 let peerConnections = {};
@@ -47,6 +50,12 @@ let currentBandwidthProfile = 'medium';
 let socket = null;
 let localVideo = null;
 let remoteVideos = {};
+let sessionId = null;
+let sfuMode = false;
+let peerProfiles = {};
+let previousStats = {};
+let statsTimer = null;
+let onBandwidthProfile = null;
 
 /**
  * Initialize the video chat functionality
@@ -59,7 +68,12 @@ function initVideoChat(options = {}) {
         remoteVideoContainer: 'remoteVideos',
         socketInstance: null,
         autoStart: false,
-        bandwidthProfile: 'medium'
+        bandwidthProfile: 'medium',
+        sessionId: null,
+        sfu: false,
+        adaptiveBandwidth: true,
+        statsInterval: 2000,
+        onBandwidthProfile: null
     };
     
     const config = { ...defaultOptions, ...options };
@@ -69,6 +83,9 @@ function initVideoChat(options = {}) {
     
     // Set bandwidth profile
     currentBandwidthProfile = config.bandwidthProfile;
+    sessionId = config.sessionId;
+    sfuMode = config.sfu;
+    onBandwidthProfile = config.onBandwidthProfile;
     
     // Set up local video element
     localVideo = document.getElementById(config.localVideoId);
@@ -79,6 +96,11 @@ function initVideoChat(options = {}) {
     // Set up socket event handlers
     setupSocketHandlers();
     
+    // Let the server pick each connection's profile from its stats
+    if (config.adaptiveBandwidth) {
+        startStatsReporting(config.statsInterval);
+    }
+    
     // Start video if autoStart is true
     if (config.autoStart) {
         startLocalVideo();
@@ -92,10 +114,22 @@ function initVideoChat(options = {}) {
         disconnectFromUser,
         setBandwidthProfile,
         toggleMute,
-        toggleVideo
+        toggleVideo,
+        enableSfu,
+        startStatsReporting,
+        stopStatsReporting
     };
 }
 
+/**
+ * Check whether a peer id names a stream the SFU forwards
+ * @param {string} socketId - The peer id
+ * @returns {boolean} True for 'sfu:<publisher>' ids
+ */
+function isSubscription(socketId) {
+    return String(socketId).startsWith(`${SFU_PEER}:`);
+}
+
 /**
  * Set up socket event handlers for WebRTC signaling
  */
@@ -151,19 +185,42 @@ function setupSocketHandlers() {
         }
     });
     
-    // Handle user disconnection
-    socket.on('user-disconnected', (socketId) => {
-        if (peerConnections[socketId]) {
-            peerConnections[socketId].close();
-            delete peerConnections[socketId];
+    // Switch to the SFU once the room outgrows a mesh
+    socket.on('video_mode', (data) => {
+        if (data.mode === 'sfu') {
+            enableSfu();
+        }
+    });
+    
+    socket.on('sfu_error', (data) => {
+        console.error('SFU error:', data.error);
+    });
+    
+    // Apply the profile the server picked for one connection
+    socket.on('bandwidth_profile', (data) => {
+        const { peer, profile } = data;
+        if (!bandwidthConstraints[profile]) {
+            return;
         }
+        peerProfiles[peer] = profile;
         
-        // Remove remote video element
-        if (remoteVideos[socketId]) {
-            remoteVideos[socketId].remove();
-            delete remoteVideos[socketId];
+        // The server applies profiles of streams it forwards itself
+        if (peerConnections[peer] && !isSubscription(peer)) {
+            applyBandwidthLimits(peerConnections[peer], profile);
+        }
+        if (onBandwidthProfile) {
+            onBandwidthProfile(peer, profile);
         }
     });
+    
+    socket.on('bandwidth_error', (data) => {
+        console.error('Bandwidth error:', data.error);
+    });
+    
+    // Handle user disconnection
+    socket.on('user-disconnected', (socketId) => {
+        disconnectFromUser(socketId);
+    });
 }
 
 /**
@@ -174,8 +231,8 @@ function setupSocketHandlers() {
 function createPeerConnection(socketId) {
     const peerConnection = new RTCPeerConnection(rtcConfig);
     
-    // Add local stream tracks to peer connection
-    if (localStream) {
+    // Add local stream tracks to peer connection; SFU subscriptions only receive
+    if (localStream && !isSubscription(socketId)) {
         localStream.getTracks().forEach(track => {
             peerConnection.addTrack(track, localStream);
         });
@@ -210,14 +267,19 @@ function createPeerConnection(socketId) {
             remoteVideos[socketId] = remoteVideo;
         }
         
-        // Set remote stream
-        if (remoteVideo.srcObject !== event.streams[0]) {
+        // Set remote stream; the SFU sends audio and video as separate streams
+        if (isSubscription(socketId)) {
+            if (!remoteVideo.srcObject) {
+                remoteVideo.srcObject = new MediaStream();
+            }
+            remoteVideo.srcObject.addTrack(event.track);
+        } else if (remoteVideo.srcObject !== event.streams[0]) {
             remoteVideo.srcObject = event.streams[0];
         }
     };
     
     // Apply bandwidth limits
-    applyBandwidthLimits(peerConnection);
+    applyBandwidthLimits(peerConnection, peerProfiles[socketId] || currentBandwidthProfile);
     
     return peerConnection;
 }
@@ -225,9 +287,10 @@ function createPeerConnection(socketId) {
 /**
  * Apply bandwidth limits to a peer connection
  * @param {RTCPeerConnection} peerConnection - The peer connection to apply limits to
+ * @param {string} profile - The bandwidth profile, the current one by default
  */
-function applyBandwidthLimits(peerConnection) {
-    const bandwidth = bandwidthConstraints[currentBandwidthProfile];
+function applyBandwidthLimits(peerConnection, profile = currentBandwidthProfile) {
+    const bandwidth = bandwidthConstraints[profile];
     
     // Set bandwidth limits on all senders
     peerConnection.getSenders().forEach(sender => {
@@ -263,6 +326,11 @@ async function startLocalVideo() {
             localVideo.srcObject = localStream;
         }
         
+        // Publish the new stream if the SFU is already forwarding
+        if (sfuMode) {
+            await connectToUser(SFU_PEER);
+        }
+        
         return localStream;
     } catch (error) {
         console.error('Error starting local video:', error);
@@ -293,6 +361,11 @@ function stopLocalVideo() {
  * @param {string} socketId - The socket ID of the user to connect to
  */
 async function connectToUser(socketId) {
+    // With the SFU, the one connection to the server carries the stream to everyone
+    if (sfuMode && socketId !== SFU_PEER) {
+        return;
+    }
+    
     // Create peer connection if it doesn't exist
     if (!peerConnections[socketId]) {
         peerConnections[socketId] = createPeerConnection(socketId);
@@ -304,10 +377,12 @@ async function connectToUser(socketId) {
         await peerConnections[socketId].setLocalDescription(offer);
         
         // Send offer to remote peer
-        socket.emit('call-user', {
-            offer,
-            to: socketId
-        });
+        const call = { offer, to: socketId };
+        if (socketId === SFU_PEER) {
+            call.session_id = sessionId;
+            call.layer = currentBandwidthProfile;
+        }
+        socket.emit('call-user', call);
     } catch (error) {
         console.error('Error connecting to user:', error);
     }
@@ -322,6 +397,8 @@ function disconnectFromUser(socketId) {
         peerConnections[socketId].close();
         delete peerConnections[socketId];
     }
+    delete peerProfiles[socketId];
+    delete previousStats[socketId];
     
     // Remove remote video element
     if (remoteVideos[socketId]) {
@@ -338,17 +415,145 @@ function setBandwidthProfile(profile) {
     if (bandwidthConstraints[profile]) {
         currentBandwidthProfile = profile;
         
+        // A profile picked by hand overrides the server's choices
+        stopStatsReporting();
+        peerProfiles = {};
+        
         // Apply new bandwidth limits to all peer connections
         Object.values(peerConnections).forEach(pc => {
             applyBandwidthLimits(pc);
         });
         
+        // The SFU forwards the other streams at the matching layer
+        if (sfuMode) {
+            socket.emit('sfu_layer', { layer: profile });
+        }
+        
         return true;
     }
     
     return false;
 }
 
+/**
+ * Summarize a connection's stats for the server
+ *
+ * The profile the server picks is applied by whoever sends on the link: by
+ * this client to its own senders, or by the server for SFU subscriptions. So
+ * a link we send on is summarized from the send side only (what the peer
+ * reports losing, the outgoing bitrate estimate), and a subscription from
+ * what we receive.
+ * @param {RTCStatsReport} report - The connection's getStats() report
+ * @param {Object} previous - Packet counters of the last summary, if any
+ * @param {boolean} receiving - Whether the server sends on this link (an SFU subscription)
+ * @returns {Object} 'rtt_ms', 'loss', 'available_kbps' and 'cpu_limited', and the packet counters
+ */
+function summarizeStats(report, previous = {}, receiving = false) {
+    const summary = { rtt_ms: null, loss: null, available_kbps: null, cpu_limited: false };
+    let received = 0;
+    let lost = 0;
+    
+    report.forEach(stat => {
+        if (stat.type === 'candidate-pair' && stat.nominated && stat.state === 'succeeded') {
+            if (stat.currentRoundTripTime !== undefined) {
+                summary.rtt_ms = stat.currentRoundTripTime * 1000;
+            }
+            const available = receiving ? stat.availableIncomingBitrate : stat.availableOutgoingBitrate;
+            if (available) {
+                summary.available_kbps = available / 1000;
+            }
+        } else if (stat.type === 'remote-inbound-rtp' && stat.kind === 'video' && !receiving) {
+            // What the peer reports losing of what we send
+            if (stat.fractionLost !== undefined) {
+                summary.loss = stat.fractionLost;
+            }
+            if (summary.rtt_ms === null && stat.roundTripTime !== undefined) {
+                summary.rtt_ms = stat.roundTripTime * 1000;
+            }
+        } else if (stat.type === 'inbound-rtp' && stat.kind === 'video' && receiving) {
+            received += stat.packetsReceived || 0;
+            lost += stat.packetsLost || 0;
+        } else if (stat.type === 'outbound-rtp' && stat.kind === 'video') {
+            summary.cpu_limited = summary.cpu_limited || stat.qualityLimitationReason === 'cpu';
+        }
+    });
+    
+    // Loss of what we receive, since the last summary
+    if (receiving) {
+        const newReceived = received - (previous.received || 0);
+        const newLost = lost - (previous.lost || 0);
+        if (newReceived + newLost > 0) {
+            summary.loss = Math.max(newLost, 0) / (newReceived + newLost);
+        }
+    }
+    
+    return { summary, counters: { received, lost } };
+}
+
+/**
+ * Send the server a stats summary of every connection
+ */
+async function reportNetworkStats() {
+    const peers = {};
+    await Promise.all(Object.entries(peerConnections).map(async ([socketId, pc]) => {
+        if (pc.connectionState !== 'connected') {
+            return;
+        }
+        try {
+            const { summary, counters } = summarizeStats(await pc.getStats(), previousStats[socketId],
+                isSubscription(socketId));
+            previousStats[socketId] = counters;
+            peers[socketId] = summary;
+        } catch (error) {
+            console.error('Error reading connection stats:', error);
+        }
+    }));
+    
+    if (Object.keys(peers).length > 0) {
+        socket.emit('network_stats', { session_id: sessionId, peers });
+    }
+}
+
+/**
+ * Report connection stats to the server periodically
+ * @param {number} interval - Milliseconds between reports
+ */
+function startStatsReporting(interval = 2000) {
+    stopStatsReporting();
+    statsTimer = setInterval(reportNetworkStats, interval);
+}
+
+/**
+ * Stop reporting connection stats
+ */
+function stopStatsReporting() {
+    if (statsTimer !== null) {
+        clearInterval(statsTimer);
+        statsTimer = null;
+    }
+}
+
+/**
+ * Replace the mesh with one connection to the server's SFU
+ */
+async function enableSfu() {
+    if (sfuMode && peerConnections[SFU_PEER]) {
+        return;
+    }
+    sfuMode = true;
+    
+    // Close direct connections; their streams come back through the SFU
+    Object.keys(peerConnections).forEach(socketId => {
+        if (socketId !== SFU_PEER && !isSubscription(socketId)) {
+            disconnectFromUser(socketId);
+        }
+    });
+    
+    if (localStream) {
+        await connectToUser(SFU_PEER);
+    }
+}
+
 /**
  * Toggle audio mute state
  * @returns {boolean} The new mute state (true = muted)
@@ -395,6 +600,10 @@ if (typeof module !== 'undefined' && module.exports) {
         disconnectFromUser,
         setBandwidthProfile,
         toggleMute,
-        toggleVideo
+        toggleVideo,
+        enableSfu,
+        startStatsReporting,
+        stopStatsReporting,
+        summarizeStats
     };
 }
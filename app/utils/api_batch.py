@@ -0,0 +1,79 @@
+"""
+JSON API operations that can run on their own or batched.
+
+Each operation is a plain function taking the request payload and returning
+``(body, status)``. Operations only stage changes in the SQLAlchemy session;
+the caller commits once, so an endpoint and a whole batch are each a single
+transaction. A batch runs its operations in order and stops at the first
+failure, rolling back everything it staged.
+"""
+from flask import current_app, jsonify
+from app import db
+
+
+class OperationRegistry:
+    """Named JSON API operations shared by their endpoints and the batch endpoint"""
+
+    def __init__(self):
+        self.operations = {}
+
+    def operation(self, name):
+        """Register a function as the operation called ``name``"""
+        def decorator(func):
+            self.operations[name] = func
+            return func
+        return decorator
+
+    def respond(self, func, data):
+        """Run one operation in its own transaction and build its response"""
+        if data is not None and not isinstance(data, dict):
+            return jsonify({'success': False, 'error': 'Request body must be a JSON object'}), 400
+        body, status = func(data or {})
+        if status < 400:
+            db.session.commit()
+        else:
+            db.session.rollback()
+        return jsonify(body), status
+
+    def run_batch(self, payload):
+        """
+        Run an ordered list of operations in one transaction.
+
+        Args:
+            payload (dict): ``{'operations': [{'op': name, 'data': {...}}, ...]}``.
+
+        Returns:
+            tuple: The JSON response and status code. Every executed operation
+            gets an ``{'op', 'status', 'body'}`` entry in ``results``; on
+            failure the batch status is the failing operation's status and no
+            changes are committed.
+        """
+        if payload is not None and not isinstance(payload, dict):
+            return jsonify({'success': False, 'error': 'Request body must be a JSON object'}), 400
+        operations = (payload or {}).get('operations')
+        if not isinstance(operations, list) or not operations:
+            return jsonify({'success': False, 'error': 'Operations are required'}), 400
+
+        limit = current_app.config.get('API_BATCH_MAX_OPERATIONS', 20)
+        if len(operations) > limit:
+            return jsonify({'success': False, 'error': f'At most {limit} operations are allowed'}), 400
+
+        # Validate the whole batch before running any of it
+        for entry in operations:
+            if not isinstance(entry, dict) or entry.get('op') not in self.operations:
+                op = entry.get('op') if isinstance(entry, dict) else None
+                return jsonify({'success': False, 'error': f'Unknown operation: {op}'}), 400
+            if entry.get('data') is not None and not isinstance(entry['data'], dict):
+                return jsonify({'success': False, 'error': f"Data of {entry['op']} must be a JSON object"}), 400
+
+        results = []
+        for index, entry in enumerate(operations):
+            data = entry.get('data') or {}
+            body, status = self.operations[entry['op']](data)
+            results.append({'op': entry['op'], 'status': status, 'body': body})
+            if status >= 400:
+                db.session.rollback()
+                return jsonify({'success': False, 'failed': index, 'results': results}), status
+
+        db.session.commit()
+        return jsonify({'success': True, 'results': results}), 200
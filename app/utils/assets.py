@@ -0,0 +1,190 @@
+"""
+Static asset pipeline: content fingerprinting and precompression.
+
+``build_assets`` copies every file under the static folder to a dist folder
+as ``name.<hash>.ext``, writes ``.gz`` (and ``.br`` when brotli is
+installed) variants of text assets and records the mapping in
+``manifest.json``. ``init_assets`` loads that manifest so
+``url_for('static', filename=...)`` emits the hashed names, and serves
+hashed files with their precompressed variant and an immutable
+Cache-Control header.
+
+A rebuild keeps the hashed files of the last few builds, so pages and
+cached HTML still referencing them keep loading during and after a
+deploy; older files are pruned. User uploads are never fingerprinted.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+from flask import request, send_from_directory
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+MANIFEST_NAME = 'manifest.json'
+# Hashed paths written by each recent build, oldest first
+BUILDS_NAME = 'builds.json'
+COMPRESSIBLE_EXTENSIONS = {'.js', '.css', '.svg', '.json', '.txt', '.html', '.map', '.xml'}
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+
+def fingerprint(data, length=12):
+    """Get the content hash used in fingerprinted file names"""
+    return hashlib.sha256(data).hexdigest()[:length]
+
+
+def _compress(data):
+    variants = {'gzip': (gzip.compress(data, compresslevel=9, mtime=0), '.gz')}
+    if brotli is not None:
+        variants['br'] = (brotli.compress(data, quality=11), '.br')
+    return variants
+
+
+def _load_builds(dist_folder):
+    try:
+        with open(os.path.join(dist_folder, BUILDS_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+
+def _prune(dist_folder, kept):
+    removed = 0
+    for root, dirs, files in os.walk(dist_folder, topdown=False):
+        for name in files:
+            path = os.path.join(root, name)
+            rel = os.path.relpath(path, dist_folder).replace(os.sep, '/')
+            if rel in (MANIFEST_NAME, BUILDS_NAME):
+                continue
+            base = rel[:-len('.gz')] if rel.endswith('.gz') else rel[:-len('.br')] if rel.endswith('.br') else rel
+            if base not in kept:
+                os.remove(path)
+                removed += 1
+        if root != dist_folder and not os.listdir(root):
+            os.rmdir(root)
+    return removed
+
+
+def build_assets(static_folder, dist_folder, exclude=(), keep_builds=3):
+    """
+    Fingerprint and precompress every file in the static folder.
+
+    Args:
+        static_folder (str): The source static folder.
+        dist_folder (str): Output folder. Files of the last ``keep_builds``
+            builds, this one included, are kept; older ones are removed.
+        exclude (list): Folders under the static folder to skip, such as
+            user uploads.
+        keep_builds (int): Builds whose hashed files are kept.
+
+    Returns:
+        dict: The manifest, mapping each source path (relative to the static
+        folder) to its hashed path and available encodings.
+    """
+    static_folder = os.path.abspath(static_folder)
+    dist_folder = os.path.abspath(dist_folder)
+    # Never fingerprint a previous build
+    skipped = {dist_folder} | {os.path.abspath(folder) for folder in exclude}
+
+    manifest = {}
+    for root, dirs, files in os.walk(static_folder):
+        dirs[:] = [d for d in dirs if os.path.join(os.path.abspath(root), d) not in skipped]
+        for name in sorted(files):
+            source = os.path.join(root, name)
+            rel = os.path.relpath(source, static_folder).replace(os.sep, '/')
+            with open(source, 'rb') as f:
+                data = f.read()
+
+            stem, ext = os.path.splitext(rel)
+            hashed = f'{stem}.{fingerprint(data)}{ext}'
+            target = os.path.join(dist_folder, hashed)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, 'wb') as f:
+                f.write(data)
+
+            encodings = []
+            if ext.lower() in COMPRESSIBLE_EXTENSIONS:
+                for encoding, (compressed, suffix) in _compress(data).items():
+                    # Only keep variants that actually save bytes
+                    if len(compressed) < len(data):
+                        with open(target + suffix, 'wb') as f:
+                            f.write(compressed)
+                        encodings.append(encoding)
+
+            manifest[rel] = {'path': hashed, 'size': len(data), 'encodings': encodings}
+
+    os.makedirs(dist_folder, exist_ok=True)
+    builds = _load_builds(dist_folder) + [sorted(entry['path'] for entry in manifest.values())]
+    builds = builds[-max(keep_builds, 1):]
+    _prune(dist_folder, {path for build in builds for path in build})
+    with open(os.path.join(dist_folder, BUILDS_NAME), 'w') as f:
+        json.dump(builds, f)
+    with open(os.path.join(dist_folder, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def load_manifest(dist_folder):
+    """
+    Load the manifest written by build_assets.
+
+    Returns:
+        dict: The manifest, or an empty dict if no build exists.
+    """
+    try:
+        with open(os.path.join(dist_folder, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def init_assets(app):
+    """
+    Serve fingerprinted assets if a build manifest exists.
+
+    Rewrites url_for('static', ...) to hashed names and replaces the static
+    view so hashed files are sent precompressed with immutable caching.
+    Unhashed paths keep working through the default static view.
+    """
+    dist_folder = app.config.get('ASSETS_DIST_FOLDER') or os.path.join(app.static_folder, 'dist')
+    prefix = app.config.get('ASSETS_URL_PREFIX', 'dist')
+    manifest = load_manifest(dist_folder) if app.config.get('ASSETS_FINGERPRINTING', True) else {}
+    app.extensions['assets'] = manifest
+    if not manifest:
+        return
+
+    urls = {rel: f"{prefix}/{entry['path']}" for rel, entry in manifest.items()}
+    hashed = {f"{prefix}/{entry['path']}": entry for entry in manifest.values()}
+    default_static = app.view_functions['static']
+
+    @app.url_defaults
+    def fingerprinted_static_url(endpoint, values):
+        if endpoint == 'static':
+            filename = values.get('filename')
+            if filename in urls:
+                values['filename'] = urls[filename]
+
+    def static(filename):
+        entry = hashed.get(filename)
+        if entry is None:
+            return default_static(filename=filename)
+
+        offered = [e for e in ('br', 'gzip') if e in entry['encodings']] + ['identity']
+        encoding = request.accept_encodings.best_match(offered, default='identity')
+        suffix = {'br': '.br', 'gzip': '.gz'}.get(encoding, '')
+        mimetype = mimetypes.guess_type(entry['path'])[0] or 'application/octet-stream'
+
+        response = send_from_directory(dist_folder, entry['path'] + suffix, mimetype=mimetype)
+        if suffix:
+            response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        response.cache_control.public = True
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+        return response
+
+    app.view_functions['static'] = static
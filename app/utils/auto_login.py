@@ -0,0 +1,79 @@
+"""
+Cached identity for the auto-login admin user.
+
+The auto-login hook runs on every request that arrives without a session,
+which for kiosk and API clients is every request. ``AdminIdentityCache``
+resolves the admin once, keeps a detached snapshot and merges it into each
+request's database session without a query. The snapshot is dropped when
+the admin row is updated or deleted in this process, by ``invalidate()``,
+or after AUTO_LOGIN_CACHE_TTL seconds if a TTL is configured.
+"""
+import threading
+import time
+
+
+class AdminIdentityCache:
+    """Resolve the auto-login admin once and reuse it across requests"""
+
+    def __init__(self, app, resolve, ttl=0):
+        """
+        Args:
+            app (Flask): The application.
+            resolve (callable): Returns the admin user, creating it if needed.
+            ttl (float): Seconds before re-resolving; 0 keeps it until invalidated.
+        """
+        self.app = app
+        self.resolve = resolve
+        self.ttl = ttl
+        self.hits = 0
+        self.resolves = 0
+        self._snapshot = None
+        self._resolved_at = 0.0
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        """Forget the cached admin so the next request resolves it again"""
+        with self._lock:
+            self._snapshot = None
+
+    def _expired(self):
+        return self.ttl > 0 and time.monotonic() - self._resolved_at > self.ttl
+
+    def get(self):
+        """
+        Get the admin user attached to the current database session.
+
+        Returns:
+            User: The admin user, or None if it could not be resolved.
+        """
+        from app import db
+
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or self._expired():
+                admin = self.resolve(self.app)
+                if admin is None:
+                    return None
+                db.session.refresh(admin)
+                db.session.expunge(admin)
+                self._snapshot = snapshot = admin
+                self._resolved_at = time.monotonic()
+                self.resolves += 1
+            else:
+                self.hits += 1
+
+        # Attach a copy of the snapshot to this request's session without a SELECT
+        return db.session.merge(snapshot, load=False)
+
+    def watch(self, model):
+        """Invalidate the cache whenever the cached admin row changes"""
+        from app import db
+
+        def on_change(mapper, connection, target):
+            snapshot = self._snapshot
+            if snapshot is not None and target.id == snapshot.id:
+                self.invalidate()
+
+        db.event.listen(model, 'after_update', on_change)
+        db.event.listen(model, 'after_delete', on_change)
+        return on_change
@@ -0,0 +1,143 @@
+"""
+Password hashing offloaded to a bounded worker pool.
+
+bcrypt is deliberately CPU-bound. Running it inline inside an eventlet or
+gevent worker blocks the event loop, so every socket on that worker stalls
+during a login burst. ``PasswordHasher`` runs hashing in a thread or process
+pool, caps the number of outstanding jobs and fails fast with
+``HashingPoolSaturated`` (rendered as a 503) instead of queueing without
+bound. A job whose caller gave up waiting keeps its slot until it has
+actually finished, so slow jobs cannot pile up behind the cap.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+
+POOL_INLINE = 'inline'
+POOL_THREAD = 'thread'
+POOL_PROCESS = 'process'
+POOL_AUTO = 'auto'
+
+# Socket.IO async modes whose threads are green threads after monkey patching
+GREEN_ASYNC_MODES = ('eventlet', 'gevent', 'gevent_uwsgi')
+
+
+class HashingPoolSaturated(Exception):
+    """Raised when too many password hashing jobs are already pending"""
+
+
+def bcrypt_cost(pw_hash):
+    """
+    Extract the work factor from a bcrypt hash such as ``$2b$12$...``.
+
+    Returns:
+        int: The log2 cost, or None if the hash is not in bcrypt format.
+    """
+    if isinstance(pw_hash, bytes):
+        pw_hash = pw_hash.decode('utf-8')
+    parts = (pw_hash or '').split('$')
+    if len(parts) < 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
+class PasswordHasher:
+    """Flask extension that runs bcrypt work on a bounded pool"""
+
+    def __init__(self, app=None):
+        self._bcrypt = None
+        self._executor = None
+        self._slots = None
+        self.mode = POOL_INLINE
+        self.workers = 1
+        self.max_pending = 0
+        self.timeout = None
+        self.log_rounds = 12
+        self.rejected = 0
+        self.timed_out = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Configure the pool from the app and register the 503 handler"""
+        from app import bcrypt, socketio
+
+        self.shutdown()
+        self._bcrypt = bcrypt
+        self.log_rounds = app.config.get('BCRYPT_LOG_ROUNDS', 12)
+        self.workers = app.config.get('PASSWORD_HASH_WORKERS', 2)
+        self.max_pending = app.config.get('PASSWORD_HASH_MAX_PENDING', 32)
+        self.timeout = app.config.get('PASSWORD_HASH_TIMEOUT', 30)
+
+        mode = app.config.get('PASSWORD_HASH_POOL', POOL_AUTO)
+        if mode == POOL_AUTO:
+            mode = POOL_PROCESS if socketio.async_mode in GREEN_ASYNC_MODES else POOL_THREAD
+        if mode not in (POOL_INLINE, POOL_THREAD, POOL_PROCESS):
+            raise ValueError(f"Unknown PASSWORD_HASH_POOL: {mode}")
+        self.mode = mode
+        self._slots = threading.BoundedSemaphore(self.workers + self.max_pending)
+
+        app.register_error_handler(HashingPoolSaturated, self._saturated_response)
+        app.extensions['password_hasher'] = self
+
+    @staticmethod
+    def _saturated_response(error):
+        return 'The server is busy, please try again shortly.', 503, {'Retry-After': '1'}
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self.mode == POOL_PROCESS:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                    thread_name_prefix='password-hash')
+        return self._executor
+
+    def _run(self, fn, *args):
+        if self.mode == POOL_INLINE:
+            return fn(*args)
+
+        slots = self._slots
+        if not slots.acquire(blocking=False):
+            self.rejected += 1
+            raise HashingPoolSaturated()
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            slots.release()
+            raise
+        # The slot is held until the job finishes, even after its caller times out
+        future.add_done_callback(lambda done: slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            self.timed_out += 1
+            raise HashingPoolSaturated()
+
+    def hash_password(self, password):
+        """
+        Hash a password with the configured work factor.
+
+        Returns:
+            str: The bcrypt hash.
+        """
+        return self._run(self._bcrypt.generate_password_hash, password).decode('utf-8')
+
+    def check_password(self, pw_hash, password):
+        """
+        Check a password against a stored hash.
+
+        Returns:
+            bool: True if the password matches.
+        """
+        return self._run(self._bcrypt.check_password_hash, pw_hash, password)
+
+    def needs_rehash(self, pw_hash):
+        """Whether a hash was created with a different work factor than configured"""
+        cost = bcrypt_cost(pw_hash)
+        return cost is not None and cost != self.log_rounds
+
+    def shutdown(self):
+        """Stop the pool's workers"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,66 @@
+"""
+Deferred imports for heavy optional dependencies.
+
+The computer vision and ML stacks take seconds to import, so modules that
+need them hold a ``LazyModule`` proxy and the real import happens on first
+attribute access instead of at worker boot.
+"""
+import importlib
+import importlib.util
+
+# Modules that must never be imported while the application is starting up
+HEAVY_MODULES = ('cv2', 'mediapipe', 'tensorflow', 'aiortc', 'av', 'numpy')
+
+
+class LazyModule:
+    """Proxy that imports the named module on first attribute access"""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    @property
+    def loaded(self):
+        """Whether the underlying module has been imported yet"""
+        return self._module is not None
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = 'loaded' if self.loaded else 'not loaded'
+        return f'<LazyModule {self._name} ({state})>'
+
+
+def lazy_module(name):
+    """
+    Return a proxy for a module that is imported when first used.
+
+    Args:
+        name (str): The fully qualified module name.
+
+    Returns:
+        LazyModule: The proxy.
+    """
+    return LazyModule(name)
+
+
+def is_available(name):
+    """
+    Check whether a module can be imported without importing it.
+
+    Args:
+        name (str): The fully qualified module name.
+
+    Returns:
+        bool: True if the module is installed.
+    """
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
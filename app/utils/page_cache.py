@@ -0,0 +1,146 @@
+"""
+Rendered-page cache for anonymous traffic.
+
+Views decorated with ``@cacheable`` are rendered once per endpoint, view
+arguments, auth state and deploy version. The body is stored together with
+precompressed gzip (and brotli, when installed) variants and a strong
+content-hash ETag, so repeat anonymous hits skip Jinja entirely and
+revalidations are answered with 304 Not Modified.
+
+Only anonymous requests without pending flash messages are cached, since
+the navigation bar and flash area are the only per-visitor parts of these
+pages.
+"""
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, request, session, make_response
+from flask_login import current_user
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+
+def compress_variants(body):
+    """
+    Precompress a response body.
+
+    Returns:
+        dict: Encoded bodies keyed by content coding ('gzip' and, if
+        available, 'br').
+    """
+    variants = {'gzip': gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['br'] = brotli.compress(body, quality=11)
+    return variants
+
+
+class PageCache:
+    """Flask extension holding pre-rendered, precompressed pages"""
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.max_entries = 0
+        self.version = 'dev'
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Configure the cache from the app config"""
+        self.enabled = app.config.get('PAGE_CACHE_ENABLED', True)
+        self.max_entries = app.config.get('PAGE_CACHE_MAX_ENTRIES', 256)
+        self.version = str(app.config.get('DEPLOY_VERSION', 'dev'))
+        self.clear()
+        app.extensions['page_cache'] = self
+
+    def clear(self):
+        """Drop every cached page"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, response):
+        body = response.get_data()
+        entry = {
+            'body': body,
+            'variants': compress_variants(body),
+            'etag': hashlib.sha256(body).hexdigest()[:32],
+            'mimetype': response.mimetype,
+        }
+        with self._lock:
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+
+def _cache_key(cache):
+    auth_state = 'authenticated' if current_user.is_authenticated else 'anonymous'
+    view_args = tuple(sorted((request.view_args or {}).items()))
+    return (request.endpoint, view_args, auth_state, cache.version)
+
+
+def _serve(entry):
+    # Offered in order of preference; best_match breaks quality ties by this order
+    offered = [coding for coding in ('br', 'gzip') if coding in entry['variants']] + ['identity']
+    encoding = request.accept_encodings.best_match(offered, default='identity')
+    etag = entry['etag'] if encoding == 'identity' else f"{entry['etag']}-{encoding}"
+
+    # Any representation of the same content counts as a match
+    client_tags = request.if_none_match.as_set(include_weak=True)
+    if any(tag.split('-')[0] == entry['etag'] for tag in client_tags):
+        response = make_response('', 304)
+    else:
+        body = entry['body'] if encoding == 'identity' else entry['variants'][encoding]
+        response = make_response(body)
+        response.mimetype = entry['mimetype']
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.vary.update(('Accept-Encoding', 'Cookie'))
+    return response
+
+
+def cacheable(view):
+    """Serve a view from the page cache for anonymous GET requests"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        cache = current_app.extensions.get('page_cache')
+        if (cache is None or not cache.enabled or request.method != 'GET'
+                or current_user.is_authenticated or session.get('_flashes')):
+            return view(*args, **kwargs)
+
+        key = _cache_key(cache)
+        entry = cache.get(key)
+        if entry is None:
+            cache.misses += 1
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200 or session.modified:
+                return response
+            entry = cache.put(key, response)
+        else:
+            cache.hits += 1
+        return _serve(entry)
+
+    return wrapper
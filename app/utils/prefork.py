@@ -0,0 +1,223 @@
+"""
+Preload-and-fork worker supervisor.
+
+The supervisor builds the application once, warms its caches, freezes the
+garbage collector's view of the heap and then forks worker processes, so
+the app, SQLAlchemy metadata and compiled Jinja templates are shared
+copy-on-write between workers instead of being rebuilt by each one.
+"""
+import gc
+import os
+import signal
+import time
+
+
+def warm_app(app):
+    """
+    Populate the caches that every worker would otherwise build on its own.
+
+    Compiles every template into the Jinja cache and runs the hot queries
+    once so SQLAlchemy's statement compilation cache is filled. Database
+    connections are disposed afterwards because they must never be shared
+    across a fork.
+
+    Returns:
+        dict: The number of templates and queries warmed.
+    """
+    from app import db
+    from app.models.avatar import Avatar
+    from app.models.user import User
+    from app.models.game_session import GameSession
+
+    templates = app.jinja_env.list_templates(extensions=['html'])
+    for name in templates:
+        app.jinja_env.get_template(name)
+
+    queries = [
+        db.select(Avatar).order_by(Avatar.id),
+        db.select(User).where(User.id == 0),
+        db.select(User).where(User.username == ''),
+        db.select(GameSession).where(GameSession.id == 0),
+    ]
+    with app.app_context():
+        for query in queries:
+            db.session.execute(query).all()
+        db.session.remove()
+        db.engine.dispose()
+
+    return {'templates': len(templates), 'queries': len(queries)}
+
+
+def freeze_heap():
+    """
+    Move every object allocated so far into the GC's permanent generation.
+
+    Frozen objects are never traversed by collections in the workers, so the
+    collector does not write to (and un-share) the preloaded pages.
+    """
+    gc.collect()
+    gc.freeze()
+    return gc.get_freeze_count()
+
+
+def memory_usage(pid):
+    """
+    Read the memory footprint of a process from /proc.
+
+    Returns:
+        dict: 'rss', 'pss' and 'uss' (unique set size) in kilobytes, or None
+        when /proc/<pid>/smaps_rollup is unavailable.
+    """
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return None
+
+    values = {}
+    for line in lines:
+        parts = line.split()
+        if len(parts) >= 2 and parts[0].endswith(':') and parts[1].isdigit():
+            values[parts[0][:-1]] = int(parts[1])
+
+    return {
+        'rss': values.get('Rss', 0),
+        'pss': values.get('Pss', 0),
+        'uss': values.get('Private_Clean', 0) + values.get('Private_Dirty', 0),
+    }
+
+
+class Supervisor:
+    """Fork and babysit a fixed number of worker processes"""
+
+    def __init__(self, target, workers, logger=None, report_interval=60.0,
+                 max_restarts=5, restart_backoff=1.0, max_backoff=60.0, healthy_after=60.0):
+        """
+        A crashed worker is restarted after a delay that doubles with each
+        crash in a row, from ``restart_backoff`` up to ``max_backoff``. A
+        worker that crashes more than ``max_restarts`` times in a row is
+        given up on; one that ran for ``healthy_after`` seconds before
+        crashing starts counting again.
+
+        Args:
+            target (callable): Called with the worker index in each child.
+            workers (int): Number of worker processes.
+            logger (logging.Logger): Where to send status and memory reports.
+            report_interval (float): Seconds between memory reports.
+            max_restarts (int): Crashes in a row before a worker is given up on.
+            restart_backoff (float): Seconds before the first restart.
+            max_backoff (float): Longest delay between restarts.
+            healthy_after (float): Seconds of uptime that reset a worker's
+                crash count.
+        """
+        self.target = target
+        self.workers = workers
+        self.logger = logger
+        self.report_interval = report_interval
+        self.max_restarts = max_restarts
+        self.restart_backoff = restart_backoff
+        self.max_backoff = max_backoff
+        self.healthy_after = healthy_after
+        self.children = {}
+        # Worker index to consecutive crashes, and to the time a pending restart is due
+        self.crashes = {}
+        self._restarts = {}
+        self._started = {}
+        self._stopping = False
+
+    def _log(self, message, error=False):
+        if self.logger:
+            (self.logger.error if error else self.logger.info)(message)
+        else:
+            print(message)
+
+    def _spawn(self, index):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            code = 0
+            try:
+                self.target(index)
+            except BaseException:
+                import traceback
+                traceback.print_exc()
+                code = 1
+            finally:
+                os._exit(code)
+        self.children[pid] = index
+        self._started[pid] = time.monotonic()
+        self._log(f"Started worker {index} (pid {pid})")
+
+    def _stop(self, signum, frame):
+        self._stopping = True
+        self._restarts.clear()
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def report(self):
+        """
+        Log and return the memory usage of every worker.
+
+        Returns:
+            dict: Memory usage keyed by worker index.
+        """
+        usage = {}
+        for pid, index in sorted(self.children.items(), key=lambda item: item[1]):
+            stats = memory_usage(pid)
+            if stats is None:
+                continue
+            usage[index] = stats
+            self._log(f"Worker {index} (pid {pid}): rss={stats['rss']} kB "
+                      f"pss={stats['pss']} kB unique={stats['uss']} kB")
+        return usage
+
+    def _crashed(self, index, pid, code, uptime):
+        if uptime >= self.healthy_after:
+            self.crashes[index] = 0
+        self.crashes[index] = self.crashes.get(index, 0) + 1
+        if self.crashes[index] > self.max_restarts:
+            self._log(f"Worker {index} (pid {pid}) exited with {code} after {self.crashes[index]} crashes "
+                      f"in a row, giving up on it", error=True)
+            return
+        delay = min(self.restart_backoff * 2 ** (self.crashes[index] - 1), self.max_backoff)
+        self._log(f"Worker {index} (pid {pid}) exited with {code}, restarting in {delay:g}s")
+        self._restarts[index] = time.monotonic() + delay
+
+    def run(self):
+        """
+        Fork the workers and wait for them, restarting any that crash.
+
+        Returns when every worker has exited cleanly or been given up on, or
+        after SIGTERM/SIGINT.
+        """
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        for index in range(self.workers):
+            self._spawn(index)
+
+        next_report = time.monotonic() + self.report_interval
+        while self.children or self._restarts:
+            pid, status = os.waitpid(-1, os.WNOHANG) if self.children else (0, 0)
+            if pid == 0:
+                now = time.monotonic()
+                for index, due in list(self._restarts.items()):
+                    if now >= due:
+                        del self._restarts[index]
+                        self._spawn(index)
+                if now >= next_report:
+                    self.report()
+                    next_report = time.monotonic() + self.report_interval
+                time.sleep(0.1)
+                continue
+
+            index = self.children.pop(pid, None)
+            uptime = time.monotonic() - self._started.pop(pid, time.monotonic())
+            if index is None:
+                continue
+            code = os.waitstatus_to_exitcode(status)
+            if code != 0 and not self._stopping:
+                self._crashed(index, pid, code, uptime)
@@ -0,0 +1,197 @@
+"""
+Token-bucket rate limiting for login attempts.
+
+Buckets are keyed by client IP and by username. Every attempt takes a token
+from both; once either is empty the attempt is rejected before the user is
+loaded or a bcrypt hash is checked, which caps the CPU an attacker can burn.
+
+Two stores are available: ``MemoryBucketStore`` keeps per-process state in
+flat arrays, and ``SharedBucketStore`` keeps a fixed-size table in an
+anonymous shared mapping that forked workers inherit, so the preforked
+workers from run.py enforce one budget between them.
+"""
+import hashlib
+import mmap
+import multiprocessing
+import struct
+import threading
+import time
+from array import array
+
+STORAGE_MEMORY = 'memory'
+STORAGE_SHARED = 'shared'
+
+
+def _refill(tokens, last, now, capacity, rate):
+    return min(capacity, tokens + (now - last) * rate)
+
+
+class MemoryBucketStore:
+    """Per-process buckets held in two flat arrays indexed through a dict"""
+
+    def __init__(self, max_keys=100_000):
+        self.max_keys = max_keys
+        self._slots = {}
+        self._free = []
+        self._tokens = array('d')
+        self._last = array('d')
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._slots)
+
+    def _slot(self, key, capacity, now):
+        slot = self._slots.pop(key, None)
+        if slot is None:
+            if len(self._slots) >= self.max_keys:
+                # Evict the least recently used key; its bucket is treated as full again
+                self._free.append(self._slots.pop(next(iter(self._slots))))
+            if self._free:
+                slot = self._free.pop()
+            else:
+                slot = len(self._tokens)
+                self._tokens.append(0.0)
+                self._last.append(0.0)
+            self._tokens[slot] = capacity
+            self._last[slot] = now
+        # Re-inserting keeps the dict ordered from least to most recently used
+        self._slots[key] = slot
+        return slot
+
+    def take(self, key, capacity, rate, cost, now):
+        """
+        Refill a bucket and try to take `cost` tokens from it.
+
+        Returns:
+            tuple: (allowed, tokens remaining).
+        """
+        with self._lock:
+            slot = self._slot(key, capacity, now)
+            tokens = _refill(self._tokens[slot], self._last[slot], now, capacity, rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._tokens[slot] = tokens
+            self._last[slot] = now
+            return allowed, tokens
+
+
+class SharedBucketStore:
+    """
+    Fixed-size, direct-mapped bucket table in memory shared with forked workers.
+
+    Keys are reduced to a 64-bit digest; a slot whose stored digest does not
+    match is taken over with a full bucket, so collisions can only make the
+    limiter more lenient, never lock out an innocent key.
+    """
+
+    _ENTRY = struct.Struct('=Qdd')
+
+    def __init__(self, slots=65_536):
+        self.slots = slots
+        self._map = mmap.mmap(-1, self._ENTRY.size * slots)
+        self._lock = multiprocessing.Lock()
+
+    @staticmethod
+    def _digest(key):
+        value = int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little')
+        return value or 1
+
+    def take(self, key, capacity, rate, cost, now):
+        """
+        Refill a bucket and try to take `cost` tokens from it.
+
+        Returns:
+            tuple: (allowed, tokens remaining).
+        """
+        digest = self._digest(key)
+        offset = (digest % self.slots) * self._ENTRY.size
+        with self._lock:
+            stored, tokens, last = self._ENTRY.unpack_from(self._map, offset)
+            if stored != digest:
+                tokens, last = capacity, now
+            tokens = _refill(tokens, last, now, capacity, rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._ENTRY.pack_into(self._map, offset, digest, tokens, now)
+            return allowed, tokens
+
+
+class LoginLimiter:
+    """Flask extension limiting login attempts per IP address and per username"""
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.store = None
+        self.ip_capacity = self.ip_rate = 0.0
+        self.user_capacity = self.user_rate = 0.0
+        self.reset_metrics()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Configure bucket sizes and storage from the app config"""
+        self.enabled = app.config.get('LOGIN_RATE_LIMIT_ENABLED', True)
+        self.ip_capacity = float(app.config.get('LOGIN_LIMIT_IP_CAPACITY', 20))
+        self.ip_rate = app.config.get('LOGIN_LIMIT_IP_PER_MINUTE', 10) / 60.0
+        self.user_capacity = float(app.config.get('LOGIN_LIMIT_USER_CAPACITY', 5))
+        self.user_rate = app.config.get('LOGIN_LIMIT_USER_PER_MINUTE', 2) / 60.0
+
+        storage = app.config.get('LOGIN_LIMIT_STORAGE', STORAGE_MEMORY)
+        if storage == STORAGE_SHARED:
+            self.store = SharedBucketStore(app.config.get('LOGIN_LIMIT_SHARED_SLOTS', 65_536))
+        elif storage == STORAGE_MEMORY:
+            self.store = MemoryBucketStore(app.config.get('LOGIN_LIMIT_MAX_KEYS', 100_000))
+        else:
+            raise ValueError(f"Unknown LOGIN_LIMIT_STORAGE: {storage}")
+        self.reset_metrics()
+        app.extensions['login_limiter'] = self
+
+    def reset_metrics(self):
+        """Zero the attempt counters"""
+        self.allowed = 0
+        self.rejected_ip = 0
+        self.rejected_user = 0
+
+    def metrics(self):
+        """Get the attempt counters for this process; the login route logs them with every rejection"""
+        return {
+            'allowed': self.allowed,
+            'rejected_ip': self.rejected_ip,
+            'rejected_user': self.rejected_user,
+            'tracked_keys': len(self.store) if isinstance(self.store, MemoryBucketStore) else None,
+        }
+
+    def _retry_after(self, tokens, rate):
+        return max(1, int((1.0 - tokens) / rate + 0.999)) if rate > 0 else 60
+
+    def hit(self, ip, username, now=None):
+        """
+        Record a login attempt.
+
+        Args:
+            ip (str): The client's address.
+            username (str): The submitted username.
+
+        Returns:
+            int: Seconds to wait before retrying if the attempt is rejected,
+            otherwise None.
+        """
+        if not self.enabled:
+            return None
+        now = time.monotonic() if now is None else now
+
+        allowed, tokens = self.store.take(f'ip:{ip}', self.ip_capacity, self.ip_rate, 1.0, now)
+        if not allowed:
+            self.rejected_ip += 1
+            return self._retry_after(tokens, self.ip_rate)
+
+        username = (username or '').strip().lower()
+        allowed, tokens = self.store.take(f'user:{username}', self.user_capacity, self.user_rate, 1.0, now)
+        if not allowed:
+            self.rejected_user += 1
+            return self._retry_after(tokens, self.user_rate)
+
+        self.allowed += 1
+        return None
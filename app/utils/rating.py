@@ -0,0 +1,275 @@
+"""
+Skill rating engine (Elo and Glicko-2).
+
+All update functions operate on NumPy arrays so the same code path serves a
+single completed match and a full chronological replay of match history.
+"""
+from app.utils.lazy_import import lazy_module
+
+np = lazy_module('numpy')
+
+DEFAULT_RATING = 1500.0
+DEFAULT_DEVIATION = 350.0
+DEFAULT_VOLATILITY = 0.06
+
+# Conversion factor between the Glicko and Glicko-2 scales
+GLICKO2_SCALE = 173.7178
+
+SYSTEM_ELO = 'elo'
+SYSTEM_GLICKO2 = 'glicko2'
+
+
+class RatingParams:
+    """Tunable parameters of the rating system"""
+
+    def __init__(self, system=SYSTEM_GLICKO2, k_factor=32.0, tau=0.5,
+                 epsilon=1e-6, max_deviation=DEFAULT_DEVIATION, min_deviation=30.0):
+        if system not in (SYSTEM_ELO, SYSTEM_GLICKO2):
+            raise ValueError(f"Unknown rating system: {system}")
+        self.system = system
+        self.k_factor = k_factor
+        self.tau = tau
+        self.epsilon = epsilon
+        self.max_deviation = max_deviation
+        self.min_deviation = min_deviation
+
+    @classmethod
+    def from_config(cls, config):
+        """Build parameters from a Flask config mapping"""
+        return cls(
+            system=config.get('RATING_SYSTEM', SYSTEM_GLICKO2),
+            k_factor=config.get('RATING_ELO_K_FACTOR', 32.0),
+            tau=config.get('RATING_GLICKO2_TAU', 0.5),
+        )
+
+
+def elo_update(r1, r2, score, k_factor=32.0):
+    """
+    Apply Elo updates for a batch of independent matches.
+
+    Args:
+        r1, r2 (array-like): Ratings of player 1 and player 2 before the match.
+        score (array-like): Result from player 1's perspective (1, 0.5 or 0).
+        k_factor (float): Maximum rating change per match.
+
+    Returns:
+        tuple: New ratings for player 1 and player 2.
+    """
+    r1 = np.asarray(r1, dtype=np.float64)
+    r2 = np.asarray(r2, dtype=np.float64)
+    score = np.asarray(score, dtype=np.float64)
+    expected = 1.0 / (1.0 + np.power(10.0, (r2 - r1) / 400.0))
+    change = k_factor * (score - expected)
+    return r1 + change, r2 - change
+
+
+def _g(phi):
+    return 1.0 / np.sqrt(1.0 + 3.0 * phi * phi / np.pi ** 2)
+
+
+def _new_volatility(delta, phi, v, sigma, tau, epsilon):
+    """Vectorized Illinois iteration from step 5 of the Glicko-2 paper"""
+    a = np.log(sigma * sigma)
+    delta2 = delta * delta
+    phi2 = phi * phi
+    tau2 = tau * tau
+
+    def f(x):
+        ex = np.exp(x)
+        return (ex * (delta2 - phi2 - v - ex)) / (2.0 * (phi2 + v + ex) ** 2) - (x - a) / tau2
+
+    big = delta2 > phi2 + v
+    lower = np.where(big, np.log(np.where(big, delta2 - phi2 - v, 1.0)), a - tau)
+    pending = ~big
+    k = 1
+    while pending.any():
+        still_negative = f(a - k * tau) < 0
+        pending &= still_negative
+        k += 1
+        lower = np.where(pending, a - k * tau, lower)
+
+    A, B = a, lower
+    fA, fB = f(A), f(B)
+    active = np.abs(B - A) > epsilon
+    for _ in range(100):
+        if not active.any():
+            break
+        C = A + (A - B) * fA / (fB - fA)
+        fC = f(C)
+        flip = fC * fB <= 0
+        A = np.where(active & flip, B, A)
+        fA = np.where(active & flip, fB, np.where(active, fA / 2.0, fA))
+        B = np.where(active, C, B)
+        fB = np.where(active, fC, fB)
+        active &= np.abs(B - A) > epsilon
+
+    return np.exp(A / 2.0)
+
+
+def _glicko2_side(mu, phi, sigma, mu_opp, phi_opp, score, params):
+    g = _g(phi_opp)
+    expected = 1.0 / (1.0 + np.exp(-g * (mu - mu_opp)))
+    v = 1.0 / (g * g * expected * (1.0 - expected))
+    delta = v * g * (score - expected)
+
+    new_sigma = _new_volatility(delta, phi, v, sigma, params.tau, params.epsilon)
+    phi_star = np.sqrt(phi * phi + new_sigma * new_sigma)
+    new_phi = 1.0 / np.sqrt(1.0 / (phi_star * phi_star) + 1.0 / v)
+    new_mu = mu + new_phi * new_phi * g * (score - expected)
+    return new_mu, new_phi, new_sigma
+
+
+def glicko2_update(r1, rd1, vol1, r2, rd2, vol2, score, params=None):
+    """
+    Apply Glicko-2 updates for a batch of independent matches.
+
+    Each match is treated as its own rating period, so both players are
+    updated from each other's pre-match state.
+
+    Returns:
+        tuple: (r1, rd1, vol1, r2, rd2, vol2) after the matches.
+    """
+    params = params or RatingParams()
+    r1, rd1, vol1, r2, rd2, vol2, score = (
+        np.asarray(x, dtype=np.float64) for x in (r1, rd1, vol1, r2, rd2, vol2, score)
+    )
+    mu1, phi1 = (r1 - DEFAULT_RATING) / GLICKO2_SCALE, rd1 / GLICKO2_SCALE
+    mu2, phi2 = (r2 - DEFAULT_RATING) / GLICKO2_SCALE, rd2 / GLICKO2_SCALE
+
+    new1 = _glicko2_side(mu1, phi1, vol1, mu2, phi2, score, params)
+    new2 = _glicko2_side(mu2, phi2, vol2, mu1, phi1, 1.0 - score, params)
+
+    result = []
+    for mu, phi, sigma in (new1, new2):
+        rd = np.clip(phi * GLICKO2_SCALE, params.min_deviation, params.max_deviation)
+        result.extend((mu * GLICKO2_SCALE + DEFAULT_RATING, rd, sigma))
+    return tuple(result)
+
+
+def schedule_waves(player1, player2, n_players):
+    """
+    Assign every match to a wave so that no player appears twice in a wave.
+
+    A match is placed one wave after the latest wave either of its players
+    was last seen in, which preserves each player's chronological order while
+    letting unrelated matches be updated together.
+
+    Returns:
+        numpy.ndarray: Wave index for each match.
+    """
+    last = [-1] * n_players
+    waves = [0] * len(player1)
+    for i, (a, b) in enumerate(zip(player1.tolist(), player2.tolist())):
+        la, lb = last[a], last[b]
+        w = (la if la > lb else lb) + 1
+        waves[i] = w
+        last[a] = last[b] = w
+    return np.asarray(waves, dtype=np.int64)
+
+
+def replay(player1, player2, scores, n_players, params=None, initial=None):
+    """
+    Recompute ratings from a chronological match history.
+
+    Args:
+        player1, player2 (array-like): Player indices in ``[0, n_players)``.
+        scores (array-like): Result from player 1's perspective.
+        n_players (int): Number of distinct players.
+        params (RatingParams): Rating parameters to replay with.
+        initial (tuple): Optional starting (rating, deviation, volatility) arrays.
+
+    Returns:
+        tuple: Final (rating, deviation, volatility) arrays indexed by player.
+    """
+    params = params or RatingParams()
+    player1 = np.asarray(player1, dtype=np.int64)
+    player2 = np.asarray(player2, dtype=np.int64)
+    scores = np.asarray(scores, dtype=np.float64)
+
+    if initial is None:
+        rating = np.full(n_players, DEFAULT_RATING)
+        deviation = np.full(n_players, DEFAULT_DEVIATION)
+        volatility = np.full(n_players, DEFAULT_VOLATILITY)
+    else:
+        rating, deviation, volatility = (np.array(x, dtype=np.float64) for x in initial)
+
+    if len(scores) == 0:
+        return rating, deviation, volatility
+
+    waves = schedule_waves(player1, player2, n_players)
+    order = np.argsort(waves, kind='stable')
+    bounds = np.flatnonzero(np.diff(waves[order])) + 1
+
+    for idx in np.split(order, bounds):
+        a, b, s = player1[idx], player2[idx], scores[idx]
+        if params.system == SYSTEM_ELO:
+            rating[a], rating[b] = elo_update(rating[a], rating[b], s, params.k_factor)
+        else:
+            (rating[a], deviation[a], volatility[a],
+             rating[b], deviation[b], volatility[b]) = glicko2_update(
+                rating[a], deviation[a], volatility[a],
+                rating[b], deviation[b], volatility[b], s, params)
+
+    return rating, deviation, volatility
+
+
+def rate_match(player1, player2, score, params=None):
+    """
+    Update two User objects in place from a single match result.
+
+    Args:
+        player1, player2 (User): The players of the match.
+        score (float): Result from player 1's perspective (1, 0.5 or 0).
+        params (RatingParams): Rating parameters to use.
+    """
+    params = params or RatingParams()
+    if params.system == SYSTEM_ELO:
+        r1, r2 = elo_update(player1.rating, player2.rating, score, params.k_factor)
+        player1.rating, player2.rating = float(r1), float(r2)
+        return
+
+    r1, rd1, vol1, r2, rd2, vol2 = glicko2_update(
+        player1.rating, player1.rating_deviation, player1.rating_volatility,
+        player2.rating, player2.rating_deviation, player2.rating_volatility,
+        score, params)
+    player1.rating, player1.rating_deviation, player1.rating_volatility = float(r1), float(rd1), float(vol1)
+    player2.rating, player2.rating_deviation, player2.rating_volatility = float(r2), float(rd2), float(vol2)
+
+
+def recompute_ratings(params=None):
+    """
+    Replay every completed game session and store the resulting ratings.
+
+    Returns:
+        int: The number of sessions replayed.
+    """
+    from app import db
+    from app.models.user import User
+    from app.models.game_session import GameSession
+
+    params = params or RatingParams()
+    rows = db.session.execute(
+        db.select(GameSession.player1_id, GameSession.player2_id, GameSession.winner_id)
+        .where(GameSession.status == GameSession.STATUS_COMPLETED,
+               GameSession.player2_id.isnot(None),
+               GameSession.player1_id != GameSession.player2_id)
+        .order_by(GameSession.ended_at, GameSession.id)
+    ).all()
+    user_ids = db.session.execute(db.select(User.id).order_by(User.id)).scalars().all()
+    index = {user_id: i for i, user_id in enumerate(user_ids)}
+
+    player1 = np.fromiter((index[r.player1_id] for r in rows), dtype=np.int64, count=len(rows))
+    player2 = np.fromiter((index[r.player2_id] for r in rows), dtype=np.int64, count=len(rows))
+    scores = np.fromiter(
+        (1.0 if r.winner_id == r.player1_id else 0.0 if r.winner_id == r.player2_id else 0.5
+         for r in rows), dtype=np.float64, count=len(rows))
+
+    rating, deviation, volatility = replay(player1, player2, scores, len(user_ids), params)
+
+    db.session.execute(db.update(User), [
+        {'id': user_id, 'rating': float(rating[i]),
+         'rating_deviation': float(deviation[i]), 'rating_volatility': float(volatility[i])}
+        for user_id, i in index.items()
+    ])
+    db.session.commit()
+    return len(rows)
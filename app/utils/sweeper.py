@@ -0,0 +1,51 @@
+"""
+Background maintenance tasks.
+"""
+
+
+def sweep_reset_tokens(app):
+    """
+    Purge expired password reset tokens once.
+
+    Returns:
+        int: The number of tokens deleted.
+    """
+    from app import db
+    from app.models.reset_token import PasswordResetToken
+
+    batch_size = app.config.get('RESET_TOKEN_SWEEP_BATCH_SIZE', 1000)
+    with app.app_context():
+        try:
+            return PasswordResetToken.purge_expired(batch_size)
+        except Exception:
+            db.session.rollback()
+            app.logger.exception("Reset token sweep failed")
+            return 0
+        finally:
+            db.session.remove()
+
+
+def start_reset_token_sweeper(app):
+    """
+    Start a background task that purges expired reset tokens periodically.
+
+    Runs every RESET_TOKEN_SWEEP_INTERVAL seconds; an interval of 0 disables
+    the sweeper (use the purge-reset-tokens command from cron instead).
+
+    Returns:
+        The background task, or None if the sweeper is disabled.
+    """
+    from app import socketio
+
+    interval = app.config.get('RESET_TOKEN_SWEEP_INTERVAL', 0)
+    if interval <= 0:
+        return None
+
+    def sweep():
+        while True:
+            count = sweep_reset_tokens(app)
+            if count:
+                app.logger.info(f"Purged {count} expired reset tokens")
+            socketio.sleep(interval)
+
+    return socketio.start_background_task(sweep)
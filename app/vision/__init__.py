@@ -0,0 +1 @@
+# This file makes the vision directory a Python package
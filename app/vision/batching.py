@@ -0,0 +1,94 @@
+"""
+Micro-batching of work items from many callers.
+
+Models run more efficiently on a batch of inputs than on the same inputs
+one at a time, and every dispatch to a worker process has a fixed cost.
+``MicroBatcher`` collects items added from any thread and hands them to
+a handler in batches of up to ``batch_size``: a batch is sent as soon as
+it is full, or once its oldest item has waited ``max_wait_ms``, so light
+load costs at most that much extra latency.
+"""
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """Group items into batches for a handler, bounded in size and wait"""
+
+    def __init__(self, handler, batch_size=8, max_wait_ms=5.0):
+        """
+        Args:
+            handler (callable): Called with each list of items, from the
+                batcher's thread.
+            batch_size (int): Most items in one batch.
+            max_wait_ms (float): Longest an item waits for a batch to fill.
+        """
+        self.handler = handler
+        self.batch_size = batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.batches = 0
+        self.items = 0
+        self._pending = []
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._thread.start()
+
+    def add(self, item):
+        """
+        Queue an item for the next batch.
+
+        Raises:
+            RuntimeError: If the batcher is closed.
+        """
+        with self._condition:
+            if self._closed:
+                raise RuntimeError('The batcher is closed')
+            self._pending.append((time.monotonic() + self.max_wait, item))
+            self._condition.notify()
+
+    def _next_batch(self):
+        with self._condition:
+            while not self._pending and not self._closed:
+                self._condition.wait()
+            # Wait for the batch to fill until its oldest item is due
+            while self._pending and len(self._pending) < self.batch_size and not self._closed:
+                remaining = self._pending[0][0] - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            batch = [item for _, item in self._pending[:self.batch_size]]
+            del self._pending[:self.batch_size]
+            if batch:
+                self.batches += 1
+                self.items += len(batch)
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return
+            try:
+                self.handler(batch)
+            except Exception:
+                logger.exception('Batch handler failed for %d items', len(batch))
+
+    def stats(self):
+        """Get the number of batches and items handled and the mean batch size"""
+        with self._condition:
+            return {
+                'batches': self.batches,
+                'items': self.items,
+                'mean_batch_size': self.items / self.batches if self.batches else 0.0,
+            }
+
+    def close(self, timeout=None):
+        """Hand over the items still queued and stop the thread"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join(timeout)
@@ -0,0 +1,309 @@
+"""
+Landmark extractors for server-side video tracking.
+
+An extractor turns one RGB video frame into the landmarks the browser
+would have streamed: hands keyed by name as (21, 3) arrays and the body as
+a (33, 3) array, in pixels, with NaN for missing points. Extractors are
+built once per pool worker from a spec string, so they never cross a
+process boundary.
+
+A frame may be processed with only some of the models ('hands',
+'body'); the others' landmarks come back empty. When a frame was scaled
+down before extraction, ``scale_landmarks`` maps the result back to the
+full frame's pixels.
+
+``MediaPipeExtractor`` runs the MediaPipe hand and pose models.
+``PoseModelExtractor`` runs MediaPipe's pose landmark model directly with
+TensorFlow Lite, so frames from many sessions can go through it as one
+batch. ``MarkerExtractor`` finds solid coloured wrist markers and needs
+only NumPy; it is what synthetic test videos are drawn for.
+"""
+import importlib
+import importlib.util
+import os
+import time
+from app.motion.landmarks import HAND_LANDMARKS, BODY_LANDMARKS, WRIST
+from app.utils.lazy_import import lazy_module
+
+np = lazy_module('numpy')
+cv2 = lazy_module('cv2')
+
+# RGB colours of the wrist markers in synthetic videos
+MARKER_COLORS = {'left': (0, 0, 255), 'right': (255, 0, 0)}
+
+
+def empty_hand():
+    """Get hand landmarks with every point missing"""
+    return np.full((HAND_LANDMARKS, 3), np.nan, dtype=np.float32)
+
+
+def padded_batch_size(count):
+    """Get the batch size a batch of ``count`` frames runs at: the next power of two"""
+    return 1 << max(count - 1, 0).bit_length()
+
+
+def warmup_batch_sizes(batch_size):
+    """Get every padded batch size up to that of a full batch of ``batch_size`` frames"""
+    sizes = [1]
+    while sizes[-1] < batch_size:
+        sizes.append(sizes[-1] * 2)
+    return tuple(sizes)
+
+
+def scale_landmarks(landmarks, scale_x, scale_y):
+    """Scale extracted landmarks' pixel coordinates in place; z follows x"""
+    factor = np.array([scale_x, scale_y, scale_x], dtype=np.float32)
+    for hand in landmarks['hands'].values():
+        hand *= factor
+    if landmarks['body'] is not None:
+        landmarks['body'] *= factor
+    return landmarks
+
+
+class LandmarkExtractor:
+    """Base class of landmark extractors"""
+
+    def process(self, image, detectors=None):
+        """
+        Extract landmarks from one frame.
+
+        Args:
+            image (ndarray): RGB frame of shape (height, width, 3), uint8.
+            detectors (tuple): Models to run, 'hands' and/or 'body'; all of
+                them when None.
+
+        Returns:
+            dict: 'hands' maps hand names to (21, 3) landmarks, 'body' is
+            (33, 3) landmarks or None.
+        """
+        raise NotImplementedError
+
+    def process_batch(self, images, detectors):
+        """
+        Extract landmarks from several frames, possibly of different sessions.
+
+        Args:
+            images (list): RGB frames, which may differ in size.
+            detectors (list): Models to run for each frame (see ``process``).
+
+        Returns:
+            list: Landmarks of each frame, as from ``process``.
+        """
+        return [self.process(image, frame_detectors) for image, frame_detectors in zip(images, detectors)]
+
+    def warm_up(self, frames=3, height=480, width=640, batch_sizes=(1,)):
+        """
+        Run blank frames through the models so their first real frame is fast.
+
+        The first inference pays for graph initialisation and allocations;
+        each batch size is run as well since it may need its own buffers.
+        Batching extractors pad batches to the sizes of
+        ``warmup_batch_sizes``, so those are the ones to pass.
+
+        Returns:
+            list: Milliseconds taken by each warm-up run, first to last.
+        """
+        image = np.zeros((height, width, 3), dtype=np.uint8)
+        timings = []
+        for size in batch_sizes:
+            for _ in range(frames):
+                start = time.perf_counter()
+                if size == 1:
+                    self.process(image)
+                else:
+                    self.process_batch([image] * size, [None] * size)
+                timings.append((time.perf_counter() - start) * 1000)
+        return timings
+
+    def close(self):
+        """Release the extractor's models"""
+
+
+class MarkerExtractor(LandmarkExtractor):
+    """Locate coloured wrist markers, one colour per hand"""
+
+    def __init__(self, colors=None, tolerance=60, min_pixels=20):
+        """
+        Args:
+            colors (dict): Hand name to RGB marker colour.
+            tolerance (int): Largest per-channel difference from the colour.
+            min_pixels (int): Smallest blob counted as a marker.
+        """
+        self.colors = colors or MARKER_COLORS
+        self.tolerance = tolerance
+        self.min_pixels = min_pixels
+
+    def process(self, image, detectors=None):
+        hands = {}
+        if detectors is not None and 'hands' not in detectors:
+            return {'hands': hands, 'body': None}
+        pixels = image.astype(np.int16)
+        for name, color in self.colors.items():
+            mask = (np.abs(pixels - np.asarray(color, dtype=np.int16)) <= self.tolerance).all(axis=-1)
+            ys, xs = np.nonzero(mask)
+            if len(xs) < self.min_pixels:
+                continue
+            hand = empty_hand()
+            hand[WRIST] = [xs.mean(), ys.mean(), 0.0]
+            hands[name] = hand
+        return {'hands': hands, 'body': None}
+
+
+class MediaPipeExtractor(LandmarkExtractor):
+    """Run the MediaPipe hand and pose models on each frame"""
+
+    def __init__(self, model_complexity=0, min_detection_confidence=0.5):
+        mp = importlib.import_module('mediapipe')
+        # A stream's frames may land on any worker, so every frame is detected on its own
+        self._hands = mp.solutions.hands.Hands(
+            static_image_mode=True, max_num_hands=2, model_complexity=model_complexity,
+            min_detection_confidence=min_detection_confidence)
+        self._pose = mp.solutions.pose.Pose(
+            static_image_mode=True, model_complexity=model_complexity,
+            min_detection_confidence=min_detection_confidence)
+
+    @staticmethod
+    def _to_pixels(landmarks, count, width, height):
+        points = np.array([(p.x, p.y, p.z) for p in landmarks.landmark], dtype=np.float32).reshape(count, 3)
+        # MediaPipe's z has roughly the scale of x
+        points *= np.array([width, height, width], dtype=np.float32)
+        return points
+
+    def process(self, image, detectors=None):
+        height, width = image.shape[:2]
+        hands = {}
+        if detectors is None or 'hands' in detectors:
+            found = self._hands.process(image)
+            for landmarks, handedness in zip(found.multi_hand_landmarks or (), found.multi_handedness or ()):
+                name = handedness.classification[0].label.lower()
+                hands[name] = self._to_pixels(landmarks, HAND_LANDMARKS, width, height)
+
+        body = None
+        pose = self._pose.process(image) if detectors is None or 'body' in detectors else None
+        if pose is not None and pose.pose_landmarks is not None:
+            body = self._to_pixels(pose.pose_landmarks, BODY_LANDMARKS, width, height)
+        return {'hands': hands, 'body': body}
+
+    def close(self):
+        self._hands.close()
+        self._pose.close()
+
+
+class PoseModelExtractor(LandmarkExtractor):
+    """Run MediaPipe's pose landmark model with TensorFlow Lite on batches of whole frames"""
+
+    INPUT_SIZE = 256
+
+    def __init__(self, model_path=None, num_threads=1, min_presence=0.5, min_visibility=0.5):
+        """
+        The model is meant for a crop around one person. Players stand
+        centred in front of their camera, so the whole frame is used,
+        letterboxed to the model's square input; no hands are extracted.
+
+        Args:
+            model_path (str): The .tflite model; the one bundled with
+                mediapipe when None.
+            num_threads (int): Threads TensorFlow Lite may use.
+            min_presence (float): Smallest pose score for a body to be found.
+            min_visibility (float): Smallest landmark visibility kept; less
+                visible points are NaN.
+        """
+        tf = importlib.import_module('tensorflow')
+        if model_path is None:
+            package = importlib.util.find_spec('mediapipe').submodule_search_locations[0]
+            model_path = os.path.join(package, 'modules', 'pose_landmark', 'pose_landmark_full.tflite')
+        self.min_presence = min_presence
+        self.min_visibility = min_visibility
+        self._model_path = model_path
+        self._num_threads = num_threads
+        self._tf = tf
+        # Padded batch size to its interpreter and input buffer
+        self._interpreters = {}
+        interpreter = tf.lite.Interpreter(model_path=model_path, num_threads=num_threads)
+        self._input = interpreter.get_input_details()[0]['index']
+        outputs = {output['name']: output['index'] for output in interpreter.get_output_details()}
+        self._landmarks = outputs['Identity']
+        self._presence = outputs['Identity_1']
+        # The model's own input is a batch of one
+        interpreter.allocate_tensors()
+        self._interpreters[1] = interpreter, np.zeros((1, self.INPUT_SIZE, self.INPUT_SIZE, 3), dtype=np.float32)
+
+    def _interpreter(self, size):
+        # Each padded batch size keeps its own allocated interpreter, so batches of
+        # changing size never resize and reallocate tensors
+        if size not in self._interpreters:
+            interpreter = self._tf.lite.Interpreter(model_path=self._model_path, num_threads=self._num_threads)
+            interpreter.resize_tensor_input(self._input, [size, self.INPUT_SIZE, self.INPUT_SIZE, 3])
+            interpreter.allocate_tensors()
+            batch = np.zeros((size, self.INPUT_SIZE, self.INPUT_SIZE, 3), dtype=np.float32)
+            self._interpreters[size] = interpreter, batch
+        return self._interpreters[size]
+
+    def _letterbox(self, image, out):
+        height, width = image.shape[:2]
+        scale = self.INPUT_SIZE / max(height, width)
+        scaled_width, scaled_height = round(width * scale), round(height * scale)
+        x = (self.INPUT_SIZE - scaled_width) // 2
+        y = (self.INPUT_SIZE - scaled_height) // 2
+        out[:] = 0
+        resized = cv2.resize(image, (scaled_width, scaled_height), interpolation=cv2.INTER_AREA)
+        np.multiply(resized, 1 / 255, out=out[y:y + scaled_height, x:x + scaled_width], casting='unsafe')
+        return scale, x, y
+
+    def process(self, image, detectors=None):
+        return self.process_batch([image], [detectors])[0]
+
+    def process_batch(self, images, detectors):
+        results = [{'hands': {}, 'body': None} for _ in images]
+        wanted = [i for i, frame_detectors in enumerate(detectors)
+                  if frame_detectors is None or 'body' in frame_detectors]
+        if not wanted:
+            return results
+
+        # Partial batches are padded with blank frames up to a power of two
+        interpreter, batch = self._interpreter(padded_batch_size(len(wanted)))
+        boxes = [self._letterbox(images[i], frame) for i, frame in zip(wanted, batch)]
+        batch[len(wanted):] = 0
+        interpreter.set_tensor(self._input, batch)
+        interpreter.invoke()
+
+        # 39 points of x, y, z, visibility and presence logits; the first 33 are the body
+        points = interpreter.get_tensor(self._landmarks).reshape(len(batch), -1, 5)[:len(wanted), :BODY_LANDMARKS]
+        presence = interpreter.get_tensor(self._presence).reshape(-1)[:len(wanted)]
+        for i, (scale, x, y), frame_points, score in zip(wanted, boxes, points, presence):
+            if score < self.min_presence:
+                continue
+            body = (frame_points[:, :3] - np.array([x, y, 0], dtype=np.float32)) / scale
+            visibility = 1 / (1 + np.exp(-frame_points[:, 3]))
+            body[visibility < self.min_visibility] = np.nan
+            results[i]['body'] = body.astype(np.float32)
+        return results
+
+
+EXTRACTORS = {
+    'mediapipe': MediaPipeExtractor,
+    'pose-model': PoseModelExtractor,
+    'marker': MarkerExtractor,
+}
+
+
+def load_extractor(spec):
+    """
+    Build an extractor from a spec string.
+
+    Args:
+        spec (str): A name from EXTRACTORS or a 'module:Class' path.
+
+    Returns:
+        LandmarkExtractor: The extractor.
+
+    Raises:
+        ValueError: If the spec names no extractor.
+    """
+    if spec in EXTRACTORS:
+        return EXTRACTORS[spec]()
+    module, _, name = spec.partition(':')
+    try:
+        return getattr(importlib.import_module(module), name)()
+    except (ImportError, AttributeError, ValueError):
+        raise ValueError(f'Unknown landmark extractor: {spec}')
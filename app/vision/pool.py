@@ -0,0 +1,447 @@
+"""
+Process pool of landmark extractors with per-session CPU budgets.
+
+Every worker process builds one extractor at start-up and keeps it for its
+lifetime, so model loading is paid once per worker rather than per frame.
+It then runs blank frames through the extractor, so graph initialisation
+and buffer allocation are not paid by the first frame of a match, and
+reports back with its timings. ``ready`` tells whether every worker has
+done so; ``start`` returns at once and the workers warm up in the
+background.
+Frames from all sessions share the workers; each session has a token
+bucket of CPU seconds that refills at its budget (in cores) and is charged
+with the CPU time its frames actually took. A session that is over budget
+or already has ``max_inflight`` frames in the pool has new frames dropped,
+so one heavy stream cannot starve the others and latency never builds up
+in a queue.
+
+With ``shared_memory`` on, each session's frames are written into its own
+``FrameRing`` and workers get only the slot to read, instead of a pickled
+copy of the pixels. A frame overwritten before a worker reached it is
+skipped and counted as stale.
+
+With ``batch_size`` above one, frames from all sessions are collected by
+a ``MicroBatcher`` and each batch goes to one worker as a single task,
+which runs the whole batch through the extractor's ``process_batch`` and
+charges every frame an equal share of the batch's CPU time.
+"""
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import resource_tracker
+from app.vision.batching import MicroBatcher
+from app.vision.extractors import load_extractor, warmup_batch_sizes
+from app.vision.ring import FrameRing
+
+# Rings a worker keeps attached
+MAX_ATTACHED_RINGS = 32
+
+# Extractor and attached rings of the current worker process
+_extractor = None
+_rings = OrderedDict()
+
+
+def _init_worker(spec, warmup_frames=0, batch_sizes=(1,), ready=None):
+    global _extractor
+    report = {'pid': os.getpid()}
+    try:
+        start = time.perf_counter()
+        _extractor = load_extractor(spec)
+        report['load_ms'] = (time.perf_counter() - start) * 1000
+        timings = _extractor.warm_up(warmup_frames, batch_sizes=batch_sizes) if warmup_frames else []
+    except Exception as e:
+        if ready is not None:
+            ready.put(dict(report, error=f'{type(e).__name__}: {e}'))
+        raise
+    report['warmup_ms'] = sum(timings)
+    # The first run is the cold one; the rest show what a warm model takes
+    report['first_ms'] = timings[0] if timings else None
+    report['warm_ms'] = max(timings[1:]) if len(timings) > 1 else None
+    if ready is not None:
+        ready.put(report)
+
+
+def _extract(image, detectors):
+    start = time.process_time()
+    landmarks = _extractor.process(image, detectors)
+    return landmarks, time.process_time() - start
+
+
+def _attach(spec):
+    ring = _rings.get(spec)
+    if ring is None:
+        ring = _rings[spec] = FrameRing.attach(*spec)
+        while len(_rings) > MAX_ATTACHED_RINGS:
+            _rings.popitem(last=False)[1].close()
+    else:
+        _rings.move_to_end(spec)
+    return ring
+
+
+def _read(spec, slot, sequence):
+    try:
+        ring = _attach(spec)
+    except FileNotFoundError:
+        # The session was closed or its ring replaced
+        return None
+    frame = ring.read(slot, sequence)
+    return None if frame is None else (ring, frame[0])
+
+
+def _extract_shared(spec, slot, sequence, detectors):
+    start = time.process_time()
+    frame = _read(spec, slot, sequence)
+    if frame is None:
+        return None, 0.0
+    landmarks = _extractor.process(frame[1], detectors)
+    ring = frame[0]
+    del frame
+    # The slot was rewritten while it was being read
+    if ring.sequence(slot) != sequence:
+        landmarks = None
+    return landmarks, time.process_time() - start
+
+
+def _extract_batch(frames, detectors):
+    start = time.process_time()
+    # Each frame is an image or the (ring spec, slot, sequence) it was written to
+    images = [_read(*frame) if isinstance(frame, tuple) else (None, frame) for frame in frames]
+    found = [i for i, image in enumerate(images) if image is not None]
+    results = [None] * len(frames)
+    if found:
+        batch = _extractor.process_batch([images[i][1] for i in found], [detectors[i] for i in found])
+        for i, landmarks in zip(found, batch):
+            ring = images[i][0]
+            if ring is None or ring.sequence(frames[i][1]) == frames[i][2]:
+                results[i] = landmarks
+    del images
+    return results, time.process_time() - start
+
+
+class SessionBudget:
+    """CPU accounting for one session"""
+
+    def __init__(self, capacity, now):
+        self.tokens = capacity
+        self.last = now
+        self.ring = None
+        self.inflight = 0
+        self.submitted = 0
+        self.completed = 0
+        self.stale = 0
+        self.dropped_budget = 0
+        self.dropped_busy = 0
+        self.cpu_seconds = 0.0
+
+    def stats(self):
+        return {
+            'submitted': self.submitted,
+            'completed': self.completed,
+            'stale': self.stale,
+            'dropped_budget': self.dropped_budget,
+            'dropped_busy': self.dropped_busy,
+            'cpu_seconds': self.cpu_seconds,
+            'inflight': self.inflight,
+        }
+
+
+class ExtractorPool:
+    """Run landmark extraction for many video sessions on a process pool"""
+
+    def __init__(self, extractor='mediapipe', workers=2, session_budget=0.5, burst=1.0, max_inflight=2,
+                 shared_memory=True, ring_slots=4, batch_size=1, max_wait_ms=5.0, warmup_frames=3):
+        """
+        Args:
+            extractor (str): Spec passed to load_extractor in each worker.
+            workers (int): Number of worker processes.
+            session_budget (float): CPU cores each session may use on average.
+            burst (float): CPU seconds a session may use ahead of its budget.
+            max_inflight (int): Frames a session may have in the pool at once.
+            shared_memory (bool): Pass frames through per-session FrameRings
+                rather than pickling them.
+            ring_slots (int): Frame slots per ring; more than max_inflight
+                so queued frames are not overwritten.
+            batch_size (int): Most frames per batch; 1 sends every frame
+                to a worker on its own.
+            max_wait_ms (float): Longest a frame waits for its batch to fill.
+            warmup_frames (int): Blank frames each worker runs, per batch
+                size, before reporting ready; 0 skips warming up.
+        """
+        self.extractor = extractor
+        self.workers = workers
+        self.session_budget = session_budget
+        self.burst = burst
+        self.max_inflight = max_inflight
+        self.shared_memory = shared_memory
+        self.ring_slots = max(ring_slots, max_inflight + 1)
+        self.batch_size = batch_size
+        self.max_wait_ms = max_wait_ms
+        self.warmup_frames = warmup_frames
+        self._executor = None
+        self._batcher = None
+        self._ready = None
+        self._reports = {}
+        self._ready_lock = threading.Lock()
+        self._sessions = {}
+        self._cpu_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start the worker processes, each building and warming up its extractor"""
+        if self._executor is None:
+            # Workers must share this process's resource tracker; one of their own would remove
+            # the rings they attached to when they exit
+            resource_tracker.ensure_running()
+            self._ready = multiprocessing.Queue()
+            self._reports = {}
+            batch_sizes = warmup_batch_sizes(self.batch_size)
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, initializer=_init_worker,
+                initargs=(self.extractor, self.warmup_frames, batch_sizes, self._ready))
+            # Start the workers from this thread: forked from the batcher's thread they could inherit
+            # a pipe another thread holds open for a subprocess. With 'fork' the first task starts
+            # them all, with 'spawn' and 'forkserver' each task queued before a worker is idle starts one.
+            for _ in range(self.workers):
+                self._executor.submit(int)
+            if self.batch_size > 1 and self._batcher is None:
+                self._batcher = MicroBatcher(self._dispatch, self.batch_size, self.max_wait_ms)
+        return self
+
+    def _collect(self, timeout):
+        # Read one worker's report; returns False once the timeout has passed
+        try:
+            report = self._ready.get(timeout=timeout) if timeout else self._ready.get_nowait()
+        except queue.Empty:
+            return False
+        self._reports[report['pid']] = report
+        return True
+
+    def ready(self):
+        """Whether the pool is started and every worker has loaded and warmed up its extractor"""
+        if self._executor is None:
+            return False
+        with self._ready_lock:
+            while self._collect(None):
+                pass
+            return sum('error' not in report for report in self._reports.values()) >= self.workers
+
+    def wait_ready(self, timeout=None):
+        """
+        Start the pool if needed and wait for every worker to be warm.
+
+        Returns:
+            bool: Whether the pool is ready; False on timeout or if a worker
+            failed to build its extractor.
+        """
+        self.start()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._ready_lock:
+            while sum('error' not in report for report in self._reports.values()) < self.workers:
+                if any('error' in report for report in self._reports.values()):
+                    return False
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._collect(remaining if remaining is not None else 1.0)
+            return True
+
+    def warmup_reports(self):
+        """
+        Get what each worker reported once warm.
+
+        Returns:
+            list: Per worker, its 'pid' and the milliseconds it took to load
+            ('load_ms') and warm up ('warmup_ms') its extractor, its first,
+            cold run ('first_ms') and slowest warm run ('warm_ms'); or an
+            'error' if the extractor could not be built.
+        """
+        self.ready()
+        with self._ready_lock:
+            return list(self._reports.values())
+
+    def _session(self, session_id, now):
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = SessionBudget(self.burst, now)
+        session.tokens = min(self.burst, session.tokens + (now - session.last) * self.session_budget)
+        session.last = now
+        return session
+
+    def _admit(self, session):
+        if session.tokens <= 0:
+            session.dropped_budget += 1
+            return False
+        if session.inflight >= self.max_inflight:
+            session.dropped_busy += 1
+            return False
+        return True
+
+    def admit(self, session_id, now=None):
+        """
+        Check whether a frame from the session would be accepted now.
+
+        Lets callers skip preparing a frame the pool would drop; a refused
+        frame is counted as dropped.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            return self._admit(self._session(session_id, now))
+
+    def submit(self, session_id, image, now=None, detectors=None):
+        """
+        Queue a frame for landmark extraction.
+
+        Args:
+            session_id: Key the frame's CPU time is charged to.
+            image (ndarray): RGB frame of shape (height, width, 3).
+            detectors (tuple): Models to run; all of them when None.
+
+        Returns:
+            Future: Resolves to the extractor's landmarks (None if the frame
+            went stale), or None if the frame was dropped. If a worker died,
+            the frame fails with BrokenProcessPool and the next submit starts
+            a fresh pool.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            session = self._session(session_id, now)
+            if not self._admit(session):
+                return None
+            session.inflight += 1
+            session.submitted += 1
+
+        executor = self.start()._executor
+        result = Future()
+        if self.shared_memory:
+            ring = self._ring(session, image)
+            slot, sequence = ring.write(image)
+            frame = (ring.spec(), slot, sequence)
+        else:
+            frame = image
+        if self._batcher is not None:
+            self._batcher.add((session, frame, detectors, result))
+            return result
+
+        try:
+            if self.shared_memory:
+                future = executor.submit(_extract_shared, *frame, detectors)
+            else:
+                future = executor.submit(_extract, frame, detectors)
+        except Exception as e:
+            self._discard(executor, e)
+            self._fail(session, result, e)
+            return result
+        future.add_done_callback(lambda done: self._finish(session, done, result, executor))
+        return result
+
+    def _discard(self, executor, error):
+        # A worker that died breaks its whole executor; the next submit starts a fresh pool
+        if not isinstance(error, BrokenProcessPool):
+            return
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _ring(self, session, image):
+        # A session's frames are submitted from one thread, so only that thread writes its ring
+        ring = session.ring
+        if ring is None or not ring.fits(image):
+            if ring is not None:
+                ring.close()
+            ring = session.ring = FrameRing(self.ring_slots, image.shape[0], image.shape[1], image.shape[2])
+        return ring
+
+    def _dispatch(self, items):
+        # Runs on the batcher's thread, which must not start workers; a discarded pool is
+        # replaced by the next submit
+        executor = self._executor
+        try:
+            if executor is None:
+                raise BrokenProcessPool('The worker pool is being restarted')
+            future = executor.submit(_extract_batch, [item[1] for item in items], [item[2] for item in items])
+        except Exception as e:
+            self._discard(executor, e)
+            for session, _, _, result in items:
+                self._fail(session, result, e)
+            return
+        future.add_done_callback(lambda done: self._finish_batch(items, done, executor))
+
+    def _finish_batch(self, items, done, executor):
+        try:
+            batch, cpu = done.result()
+        except Exception as e:
+            self._discard(executor, e)
+            for session, _, _, result in items:
+                self._fail(session, result, e)
+            return
+        for (session, _, _, result), landmarks in zip(items, batch):
+            self._complete(session, result, landmarks, cpu / len(items))
+
+    def _fail(self, session, result, error):
+        with self._lock:
+            session.inflight -= 1
+        result.set_exception(error)
+
+    def _finish(self, session, done, result, executor):
+        try:
+            landmarks, cpu = done.result()
+        except Exception as e:
+            self._discard(executor, e)
+            self._fail(session, result, e)
+            return
+        self._complete(session, result, landmarks, cpu)
+
+    def _complete(self, session, result, landmarks, cpu):
+        with self._lock:
+            session.inflight -= 1
+            if landmarks is None:
+                session.stale += 1
+            else:
+                session.completed += 1
+            session.cpu_seconds += cpu
+            session.tokens -= cpu
+            self._cpu_seconds += cpu
+        result.set_result(landmarks)
+
+    def cpu_time(self):
+        """Get the CPU seconds the workers have spent on all sessions"""
+        with self._lock:
+            return self._cpu_seconds
+
+    def batch_stats(self):
+        """Get the number of batches and frames batched and the mean batch size"""
+        if self._batcher is None:
+            return {'batches': 0, 'items': 0, 'mean_batch_size': 0.0}
+        return self._batcher.stats()
+
+    def stats(self, session_id):
+        """Get a session's frame and CPU counters, or None if it is unknown"""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            return session.stats() if session is not None else None
+
+    def close_session(self, session_id):
+        """Forget a session's budget and counters and remove its ring"""
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is not None and session.ring is not None:
+            session.ring.close()
+
+    def shutdown(self, wait=False):
+        """Stop the worker processes and remove every ring"""
+        if self._batcher is not None:
+            # Queued frames are dispatched, then cancelled with the executor's queue unless waited for
+            self._batcher.close()
+            self._batcher = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+        for session_id in list(self._sessions):
+            self.close_session(session_id)
@@ -0,0 +1,132 @@
+"""
+Shared-memory ring of video frame slots.
+
+Sending a decoded 640x480 frame to a worker process through a pipe
+pickles and copies about a megabyte twice. ``FrameRing`` instead keeps a
+fixed number of frame-sized slots in one ``multiprocessing.shared_memory``
+block: the receiver copies each frame into the next slot and workers are
+only told the slot and its sequence number, then read the pixels as a
+NumPy view of the shared block without copying.
+
+Each slot starts with a sequence counter used as a seqlock. The writer
+makes it odd while the slot is being filled and even once the frame is
+complete, so a reader can tell from the counter alone whether the slot
+still holds the frame it was told about. Nothing waits on a lock: a slow
+reader finds its frame overwritten by a newer one and skips it, so stale
+frames are replaced rather than queued.
+"""
+import struct
+import uuid
+from multiprocessing import shared_memory
+from app.utils.lazy_import import lazy_module
+
+np = lazy_module('numpy')
+
+# Slot header: sequence, height, width, channels, timestamp (ms); padded to 64 bytes
+HEADER = struct.Struct('=QIIId')
+HEADER_SIZE = 64
+
+
+class FrameRing:
+    """Fixed-size frame slots in shared memory with per-slot sequence counters"""
+
+    def __init__(self, slots, height, width, channels=3, name=None, create=True):
+        """
+        Args:
+            slots (int): Number of frame slots.
+            height (int): Largest frame height the ring holds.
+            width (int): Largest frame width the ring holds.
+            channels (int): Bytes per pixel.
+            name (str): Name of an existing ring to attach to.
+            create (bool): Create the shared block rather than attach to it.
+        """
+        self.slots = slots
+        self.height = height
+        self.width = width
+        self.channels = channels
+        self.frame_size = height * width * channels
+        self.slot_size = HEADER_SIZE + -(-self.frame_size // HEADER_SIZE) * HEADER_SIZE
+        if create:
+            self._shm = shared_memory.SharedMemory(
+                name=name or f'mpg-frames-{uuid.uuid4().hex[:12]}', create=True, size=self.slot_size * slots)
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+        self.owner = create
+        self._next = 0
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    def spec(self):
+        """Get the arguments that attach another process to this ring"""
+        return (self.slots, self.height, self.width, self.channels, self.name)
+
+    @classmethod
+    def attach(cls, slots, height, width, channels, name):
+        """Attach to a ring created by another process"""
+        return cls(slots, height, width, channels, name=name, create=False)
+
+    def fits(self, image):
+        """Whether a frame fits in a slot"""
+        return image.shape[0] <= self.height and image.shape[1] <= self.width and image.shape[2] == self.channels
+
+    def _view(self, slot, height, width):
+        return np.ndarray((height, width, self.channels), dtype=np.uint8, buffer=self._shm.buf,
+                          offset=slot * self.slot_size + HEADER_SIZE)
+
+    def write(self, image, timestamp=0.0):
+        """
+        Copy a frame into the next slot, overwriting whatever it held.
+
+        Args:
+            image (ndarray): uint8 frame of shape (height, width, channels).
+            timestamp (float): Capture time in milliseconds.
+
+        Returns:
+            tuple: (slot, sequence) identifying the frame for readers.
+
+        Raises:
+            ValueError: If the frame does not fit in a slot.
+        """
+        if not self.fits(image):
+            raise ValueError(f'Frame of shape {image.shape} does not fit the ring')
+        self._next += 1
+        sequence = self._next * 2
+        slot = self._next % self.slots
+        offset = slot * self.slot_size
+        height, width = image.shape[:2]
+
+        HEADER.pack_into(self._shm.buf, offset, sequence - 1, height, width, self.channels, timestamp)
+        np.copyto(self._view(slot, height, width), image, casting='no')
+        HEADER.pack_into(self._shm.buf, offset, sequence, height, width, self.channels, timestamp)
+        return slot, sequence
+
+    def sequence(self, slot):
+        """Get a slot's current sequence counter"""
+        return HEADER.unpack_from(self._shm.buf, slot * self.slot_size)[0]
+
+    def read(self, slot, sequence):
+        """
+        Get a zero-copy view of a frame.
+
+        The view stays valid only while the slot is not rewritten; check
+        ``sequence(slot)`` again after using it.
+
+        Returns:
+            tuple: (frame view, timestamp), or None if the slot no longer
+            holds that frame.
+        """
+        current, height, width, channels, timestamp = HEADER.unpack_from(self._shm.buf, slot * self.slot_size)
+        if current != sequence:
+            return None
+        return self._view(slot, height, width), timestamp
+
+    def close(self):
+        """Detach from the ring, removing it if this process created it"""
+        if self._shm is None:
+            return
+        self._shm.close()
+        if self.owner:
+            self._shm.unlink()
+        self._shm = None
@@ -0,0 +1,209 @@
+"""
+Adaptive quality for server-side tracking under load.
+
+Every tracked session sits at a quality level. A level sets how many
+incoming frames are skipped, the resolution frames are scaled to before
+extraction, and which landmark models run. Each game mode has its own
+ladder of levels: Boxing turns punches into damage from wrist speeds, so
+it gives up resolution before frame rate, while Shadow Dance compares
+poses and drops frames first. Detectors a mode's rules need always run;
+its optional ones only run at full quality.
+
+``QualityScheduler`` measures each session's lag from a frame reaching
+the server to its landmarks being delivered, smoothed over recent frames,
+and the share of the worker pool's CPU in use. At most once per interval
+a session moves one level down when its lag is over the target or the
+pool is short of headroom, and one level back up once its lag is well
+under the target and the pool has spare capacity. The gap between the two
+thresholds keeps sessions from flapping between levels.
+"""
+import threading
+import time
+
+# Landmark models an extractor can be asked to run
+DETECTORS = ('hands', 'body')
+
+# Per game mode: detectors its rules need, detectors that only run at full
+# quality, and its levels as (frame skip, input scale) from best to worst
+GAME_MODES = {
+    # Punch damage comes from wrist speeds, so resolution goes before frames
+    'boxing': {
+        'detectors': ('hands', 'body'), 'optional': (),
+        'levels': ((1, 1.0), (1, 0.75), (1, 0.5), (2, 0.5), (3, 0.5)),
+    },
+    'ninja_reflex': {
+        'detectors': ('hands', 'body'), 'optional': (),
+        'levels': ((1, 1.0), (1, 0.75), (1, 0.5), (2, 0.5), (3, 0.5)),
+    },
+    'rhythm_conductor': {
+        'detectors': ('hands',), 'optional': ('body',),
+        'levels': ((1, 1.0), (1, 0.75), (1, 0.5), (2, 0.5), (3, 0.5)),
+    },
+    # Finger positions need resolution, so frames go first
+    'spell_casting': {
+        'detectors': ('hands',), 'optional': ('body',),
+        'levels': ((1, 1.0), (2, 1.0), (2, 0.75), (3, 0.75), (4, 0.5)),
+    },
+    # Poses are compared rather than differentiated, so frames go first
+    'shadow_dance': {
+        'detectors': ('body',), 'optional': ('hands',),
+        'levels': ((1, 1.0), (2, 1.0), (2, 0.75), (3, 0.75), (4, 0.5)),
+    },
+}
+
+# Sessions that did not name a known game mode
+DEFAULT_MODE = {
+    'detectors': ('hands', 'body'), 'optional': (),
+    'levels': ((1, 1.0), (1, 0.75), (2, 0.75), (2, 0.5), (3, 0.5)),
+}
+
+# Weight of the newest frame in a session's smoothed lag
+LAG_SMOOTHING = 0.2
+# A session recovers a level once its lag is below this share of the target
+RECOVER_SHARE = 0.5
+
+
+class QualitySession:
+    """Quality level and lag of one session"""
+
+    def __init__(self, game_mode, now):
+        self.game_mode = game_mode if game_mode in GAME_MODES else None
+        self.mode = GAME_MODES.get(game_mode, DEFAULT_MODE)
+        self.level = 0
+        self.lag = None
+        self.frames = 0
+        self.skipped = 0
+        self.changes = 0
+        self.changed = now
+
+    def detectors(self):
+        if self.level == 0:
+            return self.mode['detectors'] + self.mode['optional']
+        return self.mode['detectors']
+
+
+class QualityScheduler:
+    """Choose frame skip, resolution and detectors for each session"""
+
+    def __init__(self, target_lag_ms=150.0, workers=2, headroom=0.2, interval=1.0, cpu_clock=None,
+                 enabled=True):
+        """
+        Args:
+            target_lag_ms (float): End-to-end lag sessions are kept under.
+            workers (int): Worker processes sharing the CPU load.
+            headroom (float): Share of the workers' CPU kept free.
+            interval (float): Shortest time in seconds between two level
+                changes of a session, and the CPU measurement window.
+            cpu_clock (callable): Returns the CPU seconds the workers have
+                used so far; without it only lag is considered.
+            enabled (bool): Adapt levels; when off every session stays at
+                full quality.
+        """
+        self.target_lag_ms = target_lag_ms
+        self.workers = workers
+        self.headroom = headroom
+        self.interval = interval
+        self.cpu_clock = cpu_clock
+        self.enabled = enabled
+        self.utilization = 0.0
+        self._cpu = None
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def _session(self, session_id, now):
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = QualitySession(None, now)
+        return session
+
+    def open(self, session_id, game_mode=None, now=None):
+        """Start a session at full quality with its game mode's ladder"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._sessions[session_id] = QualitySession(game_mode, now)
+
+    def plan(self, session_id, now=None):
+        """
+        Decide how to process a session's next frame.
+
+        Returns:
+            tuple: (input scale, detectors to run), or None if the frame
+            is skipped.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            session = self._session(session_id, now)
+            skip, scale = session.mode['levels'][session.level]
+            session.frames += 1
+            if session.frames % skip:
+                session.skipped += 1
+                return None
+            return scale, session.detectors()
+
+    def _measure(self, now):
+        if self.cpu_clock is None:
+            return
+        if self._cpu is None:
+            self._cpu = (now, self.cpu_clock())
+            return
+        since, used = self._cpu
+        if now - since >= self.interval:
+            cpu = self.cpu_clock()
+            self.utilization = (cpu - used) / ((now - since) * self.workers)
+            self._cpu = (now, cpu)
+
+    def record(self, session_id, lag_ms, now=None):
+        """
+        Record the lag of a processed frame and adjust the session's level.
+
+        Returns:
+            int: The session's level.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return 0
+            session.lag = lag_ms if session.lag is None else session.lag + LAG_SMOOTHING * (lag_ms - session.lag)
+            self._measure(now)
+            if not self.enabled or now - session.changed < self.interval:
+                return session.level
+
+            level = session.level
+            if session.lag > self.target_lag_ms or self.utilization > 1 - self.headroom:
+                level = min(level + 1, len(session.mode['levels']) - 1)
+            elif session.lag < self.target_lag_ms * RECOVER_SHARE and self.utilization < 1 - 2 * self.headroom:
+                level = max(level - 1, 0)
+            if level != session.level:
+                session.level = level
+                session.changes += 1
+                session.changed = now
+                # Lag measured at the old level says little about the new one
+                session.lag = None
+            return session.level
+
+    def state(self, session_id):
+        """Get a session's level and what it runs, or None if it is unknown"""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            skip, scale = session.mode['levels'][session.level]
+            return {
+                'game_mode': session.game_mode,
+                'level': session.level,
+                'levels': len(session.mode['levels']),
+                'frame_skip': skip,
+                'scale': scale,
+                'detectors': list(session.detectors()),
+                'lag_ms': session.lag,
+                'target_lag_ms': self.target_lag_ms,
+                'cpu_utilization': self.utilization,
+                'skipped': session.skipped,
+                'changes': session.changes,
+            }
+
+    def close(self, session_id):
+        """Forget a session"""
+        with self._lock:
+            self._sessions.pop(session_id, None)
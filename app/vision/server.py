@@ -0,0 +1,275 @@
+"""
+Server-side tracking of WebRTC video.
+
+Clients that are too slow to run the tracking models themselves can send
+their camera to the server instead. ``VisionServer`` answers their WebRTC
+offer with aiortc, decodes the incoming video with PyAV and hands frames
+to an ``ExtractorPool``. Extracted landmarks go to a callback that feeds
+them into the same gesture pipeline as client-submitted ones.
+
+aiortc needs an asyncio loop, which runs in a background thread next to
+the Socket.IO server. Frames are only converted to arrays when the
+session's CPU budget admits them. The loop and the worker processes are
+never started at app start-up, so preforked workers each get their own:
+``preload`` starts the workers loading and warming up their models once
+a server process is running, or else the first stream does. Offers are
+only answered once every worker is warm.
+
+A ``QualityScheduler`` decides per stream, from its game mode and
+measured lag, which frames are skipped, how far frames are scaled down
+before extraction and which models run, so that under load sessions
+degrade gradually instead of falling behind. Landmarks of scaled frames
+are mapped back to full-frame pixels before delivery.
+
+``feed`` runs frames from any iterable, such as ``read_video``, through
+the same path, which is how recorded and synthetic videos are tested.
+"""
+import asyncio
+import logging
+import threading
+import time
+from app.vision.extractors import scale_landmarks
+from app.vision.pool import ExtractorPool
+from app.vision.scheduler import QualityScheduler
+from app.vision.video import resize, scaled_size
+
+logger = logging.getLogger(__name__)
+
+
+class VisionServer:
+    """Flask extension receiving WebRTC video and extracting landmarks on a worker pool"""
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.pool = None
+        self.scheduler = None
+        self.offer_timeout = 10.0
+        self._loop = None
+        self._thread = None
+        self._peers = {}
+        self._last = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Configure the pool from the app config"""
+        self.shutdown()
+        self.enabled = app.config.get('VISION_SERVER_ENABLED', False)
+        self.offer_timeout = app.config.get('VISION_OFFER_TIMEOUT', 10.0)
+        self.pool = ExtractorPool(
+            extractor=app.config.get('VISION_EXTRACTOR', 'mediapipe'),
+            workers=app.config.get('VISION_WORKERS', 2),
+            session_budget=app.config.get('VISION_SESSION_CPU_BUDGET', 0.5),
+            burst=app.config.get('VISION_SESSION_CPU_BURST', 1.0),
+            max_inflight=app.config.get('VISION_MAX_INFLIGHT', 2),
+            shared_memory=app.config.get('VISION_SHARED_MEMORY', True),
+            ring_slots=app.config.get('VISION_RING_SLOTS', 4),
+            batch_size=app.config.get('VISION_BATCH_SIZE', 1),
+            max_wait_ms=app.config.get('VISION_BATCH_WAIT_MS', 5.0),
+            warmup_frames=app.config.get('VISION_WARMUP_FRAMES', 3),
+        )
+        self.scheduler = QualityScheduler(
+            target_lag_ms=app.config.get('VISION_TARGET_LAG_MS', 150.0),
+            workers=self.pool.workers,
+            headroom=app.config.get('VISION_CPU_HEADROOM', 0.2),
+            interval=app.config.get('VISION_QUALITY_INTERVAL', 1.0),
+            cpu_clock=self.pool.cpu_time,
+            enabled=app.config.get('VISION_ADAPTIVE_QUALITY', True),
+        )
+        app.extensions['vision'] = self
+
+    def preload(self):
+        """Start the worker processes loading and warming up their models in the background"""
+        if self.enabled:
+            self.pool.start()
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name='vision-loop', daemon=True)
+                self._thread.start()
+        return self._loop
+
+    def _run(self, coroutine, timeout=None):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._ensure_loop()).result(timeout)
+
+    def submit(self, stream_id, image, timestamp, on_landmarks):
+        """
+        Queue one frame and deliver its landmarks to ``on_landmarks``.
+
+        Args:
+            stream_id: The stream (and budget) the frame belongs to.
+            image (ndarray): RGB frame of shape (height, width, 3).
+            timestamp (float): Capture time in milliseconds.
+            on_landmarks (callable): Called as ``on_landmarks(stream_id,
+                landmarks, timestamp)`` from a pool thread.
+
+        Returns:
+            Future: The extraction, or None if the frame was skipped or
+            dropped.
+        """
+        plan = self.scheduler.plan(stream_id)
+        if plan is None:
+            return None
+        scale, detectors = plan
+        height, width = image.shape[:2]
+        image = resize(image, *scaled_size(width, height, scale))
+        return self._submit(stream_id, image, (width, height), detectors, timestamp, on_landmarks)
+
+    def _submit(self, stream_id, image, size, detectors, timestamp, on_landmarks):
+        arrived = time.monotonic()
+        future = self.pool.submit(stream_id, image, detectors=detectors)
+        if future is not None:
+            scale = (size[0] / image.shape[1], size[1] / image.shape[0])
+            future.add_done_callback(
+                lambda done: self._deliver(stream_id, timestamp, arrived, scale, done, on_landmarks))
+        return future
+
+    def _deliver(self, stream_id, timestamp, arrived, scale, done, on_landmarks):
+        try:
+            landmarks = done.result()
+        except Exception:
+            logger.exception('Landmark extraction failed for stream %s', stream_id)
+            return
+        self.scheduler.record(stream_id, (time.monotonic() - arrived) * 1000)
+        if landmarks is None:
+            return
+        if scale != (1, 1):
+            scale_landmarks(landmarks, *scale)
+
+        # Frames can finish out of order; a late one would corrupt velocities
+        with self._lock:
+            last = self._last.get(stream_id)
+            if last is not None and timestamp is not None and timestamp <= last:
+                return
+            self._last[stream_id] = timestamp
+        on_landmarks(stream_id, landmarks, timestamp)
+
+    def feed(self, stream_id, frames, on_landmarks, wait=True):
+        """
+        Run (image, timestamp) frames from an iterable through the pool.
+
+        Returns:
+            int: The number of frames the pool accepted.
+        """
+        futures = [self.submit(stream_id, image, timestamp, on_landmarks) for image, timestamp in frames]
+        futures = [future for future in futures if future is not None]
+        if wait:
+            for future in futures:
+                try:
+                    future.result()
+                except Exception:
+                    pass
+        return len(futures)
+
+    def offer(self, stream_id, sdp, type, on_landmarks, game_mode=None):
+        """
+        Answer a client's WebRTC offer and start tracking its video.
+
+        ``game_mode`` picks the quality ladder the stream degrades along.
+        Waits up to the offer timeout for the workers to be warm.
+
+        Returns:
+            dict: The answer's 'sdp' and 'type'.
+
+        Raises:
+            ValueError: If the offer is invalid or the workers are not
+                ready in time.
+        """
+        if not sdp or type != 'offer':
+            raise ValueError('A WebRTC offer is required')
+        if not self.pool.wait_ready(self.offer_timeout):
+            raise ValueError('Server-side tracking is not ready yet')
+        self.scheduler.open(stream_id, game_mode)
+        try:
+            return self._run(self._answer(stream_id, sdp, type, on_landmarks), self.offer_timeout)
+        except (ValueError, TypeError) as e:
+            raise ValueError(f'Invalid offer: {e}')
+
+    async def _answer(self, stream_id, sdp, type, on_landmarks):
+        from aiortc import RTCPeerConnection, RTCSessionDescription
+
+        await self._close(stream_id)
+        peer = RTCPeerConnection()
+        self._peers[stream_id] = peer
+
+        @peer.on('track')
+        def on_track(track):
+            if track.kind == 'video':
+                asyncio.ensure_future(self._consume(stream_id, track, on_landmarks))
+
+        @peer.on('connectionstatechange')
+        async def on_state():
+            if peer.connectionState in ('failed', 'closed') and self._peers.get(stream_id) is peer:
+                await self._close(stream_id)
+
+        await peer.setRemoteDescription(RTCSessionDescription(sdp=sdp, type=type))
+        await peer.setLocalDescription(await peer.createAnswer())
+        return {'sdp': peer.localDescription.sdp, 'type': peer.localDescription.type}
+
+    async def _consume(self, stream_id, track, on_landmarks):
+        from aiortc.mediastreams import MediaStreamError
+
+        while True:
+            try:
+                frame = await track.recv()
+            except MediaStreamError:
+                break
+            # Skip the RGB conversion for frames that would not be processed anyway
+            plan = self.scheduler.plan(stream_id)
+            if plan is None or not self.pool.admit(stream_id):
+                continue
+            scale, detectors = plan
+            # Scale while converting; swscale does both in one pass
+            width, height = scaled_size(frame.width, frame.height, scale)
+            image = frame.to_ndarray(format='rgb24', width=width, height=height)
+            timestamp = float(frame.time) * 1000 if frame.time is not None else None
+            self._submit(stream_id, image, (frame.width, frame.height), detectors, timestamp, on_landmarks)
+
+    async def _close(self, stream_id):
+        peer = self._peers.pop(stream_id, None)
+        if peer is not None:
+            await peer.close()
+
+    def stop(self, stream_id):
+        """Stop tracking a stream and forget its budget"""
+        if self._loop is not None and stream_id in self._peers:
+            self._run(self._close(stream_id), self.offer_timeout)
+        with self._lock:
+            self._last.pop(stream_id, None)
+        if self.pool is not None:
+            self.pool.close_session(stream_id)
+            self.scheduler.close(stream_id)
+
+    def status(self, stream_id):
+        """
+        Get a stream's quality level and frame counters.
+
+        Returns:
+            dict: 'ready' whether the workers are warm, 'quality' from the
+            scheduler and 'frames' from the pool, each None if the stream
+            is unknown.
+        """
+        if self.pool is None:
+            return {'ready': False, 'quality': None, 'frames': None}
+        return {'ready': self.pool.ready(), 'quality': self.scheduler.state(stream_id),
+                'frames': self.pool.stats(stream_id)}
+
+    def load(self):
+        """Get the share of the workers' CPU in use, or None if server-side tracking is not running"""
+        if not self.enabled or self.pool is None or not self.pool.ready():
+            return None
+        return self.scheduler.utilization
+
+    def shutdown(self):
+        """Close every stream and stop the loop and worker processes"""
+        if self._loop is not None:
+            for stream_id in list(self._peers):
+                self._run(self._close(stream_id), self.offer_timeout)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+            self._loop = self._thread = None
+        if self.pool is not None:
+            self.pool.shutdown()
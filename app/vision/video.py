@@ -0,0 +1,96 @@
+"""
+Video files for exercising the server-side tracking path.
+
+``read_video`` decodes any file PyAV can open into RGB frames with
+timestamps, so recorded sessions can be replayed through the extractor
+pool without a browser. ``write_marker_video`` draws wrist tracks as solid
+coloured discs for ``MarkerExtractor``, giving synthetic videos whose
+ground truth is known.
+"""
+from app.vision.extractors import MARKER_COLORS
+from app.utils.lazy_import import lazy_module
+
+np = lazy_module('numpy')
+av = lazy_module('av')
+
+
+def read_video(path, max_frames=None):
+    """
+    Decode a video file.
+
+    Args:
+        path (str): The file to read.
+        max_frames (int): Stop after this many frames.
+
+    Yields:
+        tuple: (RGB frame of shape (height, width, 3), timestamp in ms).
+    """
+    with av.open(str(path)) as container:
+        stream = container.streams.video[0]
+        for i, frame in enumerate(container.decode(stream)):
+            if max_frames is not None and i >= max_frames:
+                break
+            timestamp = float(frame.time) * 1000 if frame.time is not None else None
+            yield frame.to_ndarray(format='rgb24'), timestamp
+
+
+def scaled_size(width, height, scale):
+    """Get a frame size scaled down, rounded to even dimensions for YUV video"""
+    if scale == 1:
+        return width, height
+    return max(2, round(width * scale / 2) * 2), max(2, round(height * scale / 2) * 2)
+
+
+def resize(image, width, height):
+    """Resize an RGB frame by nearest-neighbour sampling"""
+    if image.shape[1] == width and image.shape[0] == height:
+        return image
+    rows = (np.arange(height) * image.shape[0] // height)[:, None]
+    cols = np.arange(width) * image.shape[1] // width
+    return image[rows, cols]
+
+
+def draw_markers(wrists, width=640, height=480, radius=12, colors=None):
+    """
+    Draw one frame of wrist markers on a grey background.
+
+    Args:
+        wrists (dict): Hand name to (x, y) pixel position; NaN hides a marker.
+
+    Returns:
+        ndarray: RGB frame of shape (height, width, 3).
+    """
+    colors = colors or MARKER_COLORS
+    image = np.full((height, width, 3), 128, dtype=np.uint8)
+    ys, xs = np.ogrid[:height, :width]
+    for name, (x, y) in wrists.items():
+        if np.isfinite(x) and np.isfinite(y):
+            image[(xs - x) ** 2 + (ys - y) ** 2 <= radius ** 2] = colors[name]
+    return image
+
+
+def write_marker_video(path, tracks, fps=30, width=640, height=480, radius=12):
+    """
+    Write wrist tracks as a video of coloured markers.
+
+    Args:
+        path (str): The file to write; the container follows the extension.
+        tracks (dict): Hand name to (frames, 2) pixel positions.
+
+    Returns:
+        int: The number of frames written.
+    """
+    frames = min(len(track) for track in tracks.values())
+    with av.open(str(path), mode='w') as container:
+        stream = container.add_stream('mpeg4', rate=fps)
+        stream.width, stream.height = width, height
+        stream.pix_fmt = 'yuv420p'
+        # High quality keeps marker colours close to the drawn ones
+        stream.options = {'qscale': '2'}
+        for i in range(frames):
+            image = draw_markers({name: track[i] for name, track in tracks.items()}, width, height, radius)
+            for packet in stream.encode(av.VideoFrame.from_ndarray(image, format='rgb24')):
+                container.mux(packet)
+        for packet in stream.encode():
+            container.mux(packet)
+    return frames
@@ -0,0 +1,2 @@
+# This file makes the benchmarks directory a Python package
+# Run a benchmark from the project root, e.g. `python -m benchmarks.bench_rating`
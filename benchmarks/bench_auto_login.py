@@ -0,0 +1,85 @@
+"""
+Benchmark the cost of the auto-login hook on cookieless requests.
+
+Kiosk and API clients arrive without a session, so the auto-login hook runs
+on every request. This measures the hook's time and the SQL statements it
+issues per request with the admin identity cached, and with the cache
+invalidated before each request (the behaviour of an uncached hook).
+
+Usage:
+    python -m benchmarks.bench_auto_login [--requests 2000]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+
+def measure(requests, cached):
+    from flask import g
+    from app import create_app, db
+    from config import TestingConfig
+
+    db_fd, db_path = tempfile.mkstemp()
+
+    class BenchConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{db_path}'
+        AUTO_LOGIN_ENABLED = True
+        BCRYPT_LOG_ROUNDS = 4
+
+    app = create_app(BenchConfig)
+    cache = app.extensions['auto_login']
+
+    @app.route('/ping')
+    def ping():
+        return 'ok'
+
+    # Time only the auto-login hook by wrapping it
+    hook = app.before_request_funcs[None][0]
+    timings = []
+
+    def timed_hook():
+        start = time.perf_counter()
+        hook()
+        timings.append(time.perf_counter() - start)
+
+    app.before_request_funcs[None][0] = timed_hook
+
+    statements = [0]
+    with app.app_context():
+        db.event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.__setitem__(0, statements[0] + 1))
+
+    client = app.test_client(use_cookies=False)
+    client.get('/ping')
+    timings.clear()
+    statements[0] = 0
+
+    for _ in range(requests):
+        if not cached:
+            cache.invalidate()
+        client.get('/ping')
+
+    os.close(db_fd)
+    os.unlink(db_path)
+    timings.sort()
+    return {
+        'hook_mean_us': sum(timings) / len(timings) * 1e6,
+        'hook_p99_us': timings[int(len(timings) * 0.99)] * 1e6,
+        'queries_per_request': statements[0] / requests,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'mode':<10} {'hook mean':>10} {'hook p99':>10} {'queries/req':>12}")
+    for cached in (False, True):
+        r = measure(args.requests, cached)
+        print(f"{'cached' if cached else 'uncached':<10} {r['hook_mean_us']:>8.1f}us "
+              f"{r['hook_p99_us']:>8.1f}us {r['queries_per_request']:>12.2f}")
+
+
+if __name__ == '__main__':
+    main()
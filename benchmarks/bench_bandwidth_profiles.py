@@ -0,0 +1,89 @@
+"""
+Benchmark server-driven bandwidth profiles on a simulated bad network.
+
+Replays a trace of link capacity through a simple bottleneck model: a
+sender at its profile's bitrate fills a queue whenever it sends faster
+than the link drains, the queue adds delay, and what overflows the
+buffer is lost. Every report interval the simulated client sends the
+BandwidthController the round-trip time, loss and available bitrate it
+would read from getStats(), and applies the profile changes it gets
+back. Each fixed profile is compared against the adaptive one by
+one-way delay percentiles, loss and the mean bitrate sent.
+
+The default trace holds 3 Mbps, drops to 400 kbps for a minute, holds
+900 kbps for another minute and then recovers.
+
+Usage:
+    python -m benchmarks.bench_bandwidth_profiles [--trace 3000:60,400:60,900:60,3000:60] [--report 2]
+"""
+import argparse
+
+import numpy as np
+
+from app.rtc.bandwidth import PROFILE_KBPS, PROFILES, BandwidthController
+
+
+def capacities(trace, step):
+    """Expand 'kbps:seconds' segments into the capacity at every step"""
+    segments = [tuple(float(part) for part in segment.split(':')) for segment in trace.split(',')]
+    return np.concatenate([np.full(int(seconds / step), kbps) for kbps, seconds in segments])
+
+
+def simulate(args, capacity, profile=None):
+    controller = BandwidthController()
+    controller.interval = args.interval
+    adaptive = profile is None
+    profile = profile or 'medium'
+    buffer_kbit = args.buffer_ms / 1000 * capacity.max()
+    queue = 0.0
+    delays, dropped, offered = [], 0.0, 0.0
+    lost_since = offered_since = 0.0
+    rng = np.random.default_rng(0)
+    report_steps = max(int(round(args.report / args.step)), 1)
+
+    for i, link in enumerate(capacity):
+        now = i * args.step
+        rate = PROFILE_KBPS[profile]
+        queue += (rate - link) * args.step
+        overflow = max(queue - buffer_kbit, 0.0)
+        queue = min(max(queue, 0.0), buffer_kbit)
+        delay = args.base_rtt / 2 + queue / link * 1000
+        delays.append(delay)
+        offered += rate * args.step
+        dropped += overflow
+        offered_since += rate * args.step
+        lost_since += overflow
+
+        if adaptive and i and i % report_steps == 0:
+            stats = {
+                'rtt_ms': 2 * delay,
+                'loss': lost_since / offered_since,
+                # Browsers' estimates are noisy
+                'available_kbps': link * rng.uniform(0.8, 1.1),
+            }
+            lost_since = offered_since = 0.0
+            profile = controller.report('match', 'client', {'peer': stats}, now=now).get('peer', profile)
+
+    return np.percentile(delays, [50, 95]), dropped / offered, offered / (len(capacity) * args.step)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--trace', default='3000:60,400:60,900:60,3000:60', help="Segments of 'kbps:seconds'")
+    parser.add_argument('--base-rtt', type=float, default=60, help='Round trip without queueing, in ms')
+    parser.add_argument('--buffer-ms', type=float, default=500, help='Bottleneck buffer at full capacity')
+    parser.add_argument('--report', type=float, default=2.0, help='Seconds between client stats reports')
+    parser.add_argument('--interval', type=float, default=2.0, help='Shortest time between profile changes')
+    parser.add_argument('--step', type=float, default=0.1)
+    args = parser.parse_args()
+
+    capacity = capacities(args.trace, args.step)
+    print(f"Trace {args.trace} (kbps:seconds), base RTT {args.base_rtt:g} ms, reports every {args.report:g} s")
+    print(f"{'profile':>8} {'p50 delay ms':>12} {'p95 delay ms':>12} {'loss':>6} {'mean kbps':>9}")
+    for profile in (*PROFILES, None):
+        (p50, p95), loss, kbps = simulate(args, capacity, profile)
+        print(f"{profile or 'adaptive':>8} {p50:>12.0f} {p95:>12.0f} {loss:>6.1%} {kbps:>9.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark latency against throughput of batched landmark extraction.
+
+Drives N sessions at a fixed frame rate through an ExtractorPool for
+every combination of batch size and session count, and reports the
+frames extracted per second, the median and 95th percentile latency from
+submission to landmarks, the mean batch size and the frames dropped. Each
+batch size gives one latency/throughput curve over the offered loads.
+With batch size 1 every frame is its own task, as without batching.
+
+The default 'pose-model' extractor runs MediaPipe's pose landmark model
+through TensorFlow Lite; '--threads' lets each worker's interpreter use
+several cores on a batch.
+
+Usage:
+    python -m benchmarks.bench_batch_inference [--batch-sizes 1,4,8] [--sessions 1,4,8] [--wait 5]
+    python -m benchmarks.bench_batch_inference --extractor marker --fps 60
+"""
+import argparse
+import functools
+import time
+
+import numpy as np
+
+from app.vision import extractors
+from app.vision.pool import ExtractorPool
+from app.vision.video import draw_markers
+
+
+def run(args, batch_size, sessions, image):
+    pool = ExtractorPool(args.extractor, workers=args.workers, session_budget=float(args.workers), burst=30.0,
+                         max_inflight=args.max_inflight, batch_size=batch_size, max_wait_ms=args.wait).start()
+    # Warm up: every worker builds its extractor and sizes its model for a batch
+    for future in [pool.submit(f'warm-{i}', image) for i in range(max(args.workers, batch_size))]:
+        future.result()
+
+    names = [f'session-{i}' for i in range(sessions)]
+    latencies = []
+
+    def done(submitted, future):
+        latencies.append(time.perf_counter() - submitted)
+
+    futures = []
+    start = time.perf_counter()
+    for i in range(args.frames):
+        delay = start + i / args.fps - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        for name in names:
+            future = pool.submit(name, image)
+            if future is not None:
+                future.add_done_callback(functools.partial(done, time.perf_counter()))
+                futures.append(future)
+    for future in futures:
+        future.result()
+    elapsed = time.perf_counter() - start
+
+    dropped = sum(pool.stats(name)['dropped_busy'] + pool.stats(name)['dropped_budget'] for name in names)
+    mean_batch = pool.batch_stats()['mean_batch_size'] or 1.0
+    pool.shutdown(wait=True)
+    return len(futures) / elapsed, np.percentile(latencies, [50, 95]) * 1000, mean_batch, dropped
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--extractor', default='pose-model', help="'pose-model', 'marker' or 'module:Class'")
+    parser.add_argument('--batch-sizes', default='1,4,8')
+    parser.add_argument('--sessions', default='1,4,8', help='Offered loads, in concurrent sessions')
+    parser.add_argument('--wait', type=float, default=5.0, help='Longest wait for a batch to fill, in ms')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--threads', type=int, default=1, help='TensorFlow Lite threads per worker')
+    parser.add_argument('--frames', type=int, default=90)
+    parser.add_argument('--fps', type=float, default=30)
+    parser.add_argument('--max-inflight', type=int, default=4)
+    args = parser.parse_args()
+
+    if args.extractor == 'pose-model' and args.threads != 1:
+        extractors.EXTRACTORS['pose-model'] = functools.partial(extractors.PoseModelExtractor,
+                                                                num_threads=args.threads)
+    image = draw_markers({'left': (220, 260), 'right': (420, 260)})
+
+    print(f"{args.extractor}: {args.frames} frames per session at {args.fps:g} fps, {args.workers} workers, "
+          f"wait {args.wait:g} ms")
+    print(f"{'batch':>5} {'sessions':>8} {'frames/s':>9} {'p50 ms':>7} {'p95 ms':>7} {'mean batch':>10} {'dropped':>8}")
+    for batch_size in (int(size) for size in args.batch_sizes.split(',')):
+        for sessions in (int(count) for count in args.sessions.split(',')):
+            throughput, (p50, p95), mean_batch, dropped = run(args, batch_size, sessions, image)
+            print(f"{batch_size:>5} {sessions:>8} {throughput:>9,.1f} {p50:>7.1f} {p95:>7.1f} {mean_batch:>10.1f} "
+                  f"{dropped:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Benchmark boxing damage scoring for many matches on one core.
+
+Scores one tick of every active match from a sliding window of wrist
+history, in one vectorized pass over (matches, 2 players, 2 hands,
+frames, 3) arrays. The per-match path makes one call per match, as a
+handler scoring each room on its own would.
+
+Usage:
+    python -m benchmarks.bench_boxing [--matches 2000] [--history 12]
+"""
+import argparse
+import os
+import time
+
+# One core: keep any BLAS-backed NumPy paths single-threaded
+os.environ.setdefault('OPENBLAS_NUM_THREADS', '1')
+os.environ.setdefault('OMP_NUM_THREADS', '1')
+
+import numpy as np
+
+from app.gameplay.boxing import PUNCH_TYPES, score_tick
+
+
+def best_of(repeats, func):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--matches', type=int, default=2000)
+    parser.add_argument('--history', type=int, default=12, help='Frames of wrist history per tick')
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    shape = (args.matches, 2, 2, args.history, 3)
+    wrists = (rng.uniform(200, 440, shape[:3] + (1, 3))
+              + np.cumsum(rng.normal(0, 25, shape), axis=3)).astype(np.float32)
+    timestamps = np.cumsum(rng.normal(1000 / 30, 2, (args.matches, 2, args.history)), axis=-1)
+    stats = rng.integers(5, 16, (args.matches, 2, 3)).astype(np.float32)
+    blocking = rng.random((args.matches, 2)) < 0.2
+
+    tick = best_of(args.repeats, lambda: score_tick(wrists, timestamps, stats, blocking))
+
+    sample = min(args.matches, 200)
+
+    def per_match():
+        for m in range(sample):
+            score_tick(wrists[m:m + 1], timestamps[m:m + 1], stats[m:m + 1], blocking[m:m + 1])
+
+    loop = best_of(1, per_match) * args.matches / sample
+
+    result = score_tick(wrists, timestamps, stats, blocking)
+    counts = np.bincount(result['punches'].ravel(), minlength=len(PUNCH_TYPES))
+    print(f"tick:             {args.matches} matches x {args.history} frames of history")
+    print(f"vectorized:       {tick * 1000:.2f} ms per tick ({args.matches / tick:,.0f} matches/s per core)")
+    print(f"per-match calls:  {loop * 1000:.2f} ms per tick ({args.matches / loop:,.0f} matches/s per core)")
+    print(f"30 Hz budget:     {args.matches / 30 / tick:,.0f} matches per core")
+    print(f"punches landed:   {dict(zip(PUNCH_TYPES[1:], counts[1:].tolist()))}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+Benchmark moving decoded frames to a worker process: pickling through a
+multiprocessing queue against a shared-memory FrameRing.
+
+The consumer only touches a sparse grid of pixels, so the numbers are the
+cost of the transfer itself. With the queue every frame is pickled,
+written through a pipe and unpickled; with the ring it is copied once into
+a slot and the queue carries just (slot, sequence). The producer does not
+wait for the consumer, so frames the consumer falls behind on are
+overwritten in the ring (counted as stale) rather than queued.
+
+Usage:
+    python -m benchmarks.bench_frame_ring [--frames 600] [--width 640] [--height 480] [--slots 8]
+"""
+import argparse
+import multiprocessing
+import os
+import time
+
+# One core per side: keep NumPy single-threaded
+os.environ.setdefault('OPENBLAS_NUM_THREADS', '1')
+os.environ.setdefault('OMP_NUM_THREADS', '1')
+
+import numpy as np
+
+from app.vision.ring import FrameRing
+
+
+def consume_queue(queue, results):
+    count = checksum = 0
+    while True:
+        frame = queue.get()
+        if frame is None:
+            break
+        checksum += int(frame[::64, ::64, 0].sum())
+        count += 1
+    results.put((count, 0, checksum, time.perf_counter()))
+
+
+def consume_ring(spec, queue, results):
+    ring = FrameRing.attach(*spec)
+    count = stale = checksum = 0
+    while True:
+        message = queue.get()
+        if message is None:
+            break
+        slot, sequence = message
+        frame = ring.read(slot, sequence)
+        if frame is None:
+            stale += 1
+            continue
+        value = int(frame[0][::64, ::64, 0].sum())
+        del frame
+        if ring.sequence(slot) != sequence:
+            stale += 1
+            continue
+        checksum += value
+        count += 1
+    ring.close()
+    results.put((count, stale, checksum, time.perf_counter()))
+
+
+def run(mode, frames, args):
+    queue = multiprocessing.Queue(maxsize=0)
+    results = multiprocessing.Queue()
+    ring = None
+    if mode == 'queue':
+        worker = multiprocessing.Process(target=consume_queue, args=(queue, results))
+    else:
+        ring = FrameRing(args.slots, args.height, args.width)
+        worker = multiprocessing.Process(target=consume_ring, args=(ring.spec(), queue, results))
+    worker.start()
+
+    start = time.perf_counter()
+    for i in range(args.frames):
+        frame = frames[i % len(frames)]
+        if ring is None:
+            queue.put(frame)
+        else:
+            queue.put(ring.write(frame))
+    queue.put(None)
+    produced = time.perf_counter() - start
+    count, stale, _, finished = results.get()
+    worker.join()
+    if ring is not None:
+        ring.close()
+    return count, stale, produced, finished - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--frames', type=int, default=600)
+    parser.add_argument('--width', type=int, default=640)
+    parser.add_argument('--height', type=int, default=480)
+    parser.add_argument('--slots', type=int, default=8)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 256, (args.height, args.width, 3), dtype=np.uint8) for _ in range(8)]
+    megabytes = frames[0].nbytes / 1e6
+
+    print(f"frames:   {args.frames} x {args.width}x{args.height} RGB ({megabytes:.2f} MB each)")
+    print(f"{'transfer':<8} {'delivered':>10} {'stale':>6} {'producer fps':>13} {'end-to-end fps':>15} {'MB/s':>8}")
+    for mode in ('queue', 'ring'):
+        count, stale, produced, total = run(mode, frames, args)
+        print(f"{mode:<8} {count:>10} {stale:>6} {args.frames / produced:>13,.0f} {count / total:>15,.0f} "
+              f"{count * megabytes / total:>8,.0f}")
+
+
+if __name__ == '__main__':
+    main()
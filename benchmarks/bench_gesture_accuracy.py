@@ -0,0 +1,82 @@
+"""
+Measure gesture recognition quality and cost on a labeled corpus.
+
+Reports per-gesture precision and recall over events, detection latency
+in frames (median and 95th percentile) and classifier throughput. Runs on
+a recorded corpus directory (see app.motion.corpus) or on a synthetic one
+generated with the given noise. Threshold flags override the defaults, so
+a proposed change can be compared against the current values on the same
+data.
+
+Usage:
+    python -m benchmarks.bench_gesture_accuracy [--corpus DIR] [--per-gesture 50] [--noise 1.5]
+    python -m benchmarks.bench_gesture_accuracy --save corpus/ --per-gesture 100
+    python -m benchmarks.bench_gesture_accuracy --corpus corpus/ --block-velocity 14
+"""
+import argparse
+
+from app.motion.corpus import load_corpus, save_corpus
+from app.motion.evaluation import evaluate_sequences
+from app.motion.gestures import GestureThresholds
+from app.motion.synthetic import synthetic_corpus
+
+
+def fmt(value, spec='.2f'):
+    return '-' if value is None else format(value, spec)
+
+
+def print_scores(title, scores):
+    print(f"{title:<12} {'events':>7} {'detected':>9} {'false pos':>10} {'precision':>10} {'recall':>7} "
+          f"{'lat p50':>8} {'lat p95':>8}")
+    for label, score in scores.items():
+        print(f"{label:<12} {score.events:>7} {score.detected:>9} {score.false_positives:>10} "
+              f"{fmt(score.precision):>10} {fmt(score.recall):>7} "
+              f"{fmt(score.latency(50), '.1f'):>8} {fmt(score.latency(95), '.1f'):>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--corpus', help='Corpus directory or sequence file; synthetic when omitted')
+    parser.add_argument('--save', help='Write the synthetic corpus to this directory')
+    parser.add_argument('--per-gesture', type=int, default=50, help='Synthetic sequences per gesture')
+    parser.add_argument('--noise', type=float, default=1.5, help='Synthetic landmark jitter in pixels')
+    parser.add_argument('--dropout', type=float, default=0.02, help='Synthetic chance of losing a hand per frame')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--tolerance', type=int, default=2, help='Frames after an event a detection may land')
+    defaults = GestureThresholds()
+    for name in ('pinch_distance', 'punch_velocity', 'block_velocity', 'swipe_velocity',
+                 'min_finger_length', 'crouch_offset', 'lean_offset'):
+        parser.add_argument('--' + name.replace('_', '-'), type=float, default=getattr(defaults, name))
+    args = parser.parse_args()
+
+    if args.corpus:
+        sequences = load_corpus(args.corpus)
+        source = args.corpus
+    else:
+        sequences = synthetic_corpus(args.per_gesture, args.seed, args.noise, args.dropout)
+        source = f'synthetic, noise {args.noise} px, dropout {args.dropout}'
+        if args.save:
+            save_corpus(sequences, args.save)
+
+    thresholds = GestureThresholds(
+        pinch_distance=args.pinch_distance, punch_velocity=args.punch_velocity,
+        block_velocity=args.block_velocity, swipe_velocity=args.swipe_velocity,
+        min_finger_length=args.min_finger_length, crouch_offset=args.crouch_offset,
+        lean_offset=args.lean_offset,
+    )
+    report = evaluate_sequences(sequences, thresholds, args.tolerance)
+
+    print(f"corpus:      {len(sequences)} sequences, {report['frames']} frames ({source})")
+    print()
+    print_scores('hand', report['hands'])
+    if report['body']:
+        print()
+        print_scores('body', report['body'])
+    print()
+    seconds = report['seconds'] or float('nan')
+    # A player frame is two hands and, when recorded, a body; one call per sequence
+    print(f"throughput:  {report['frames'] / seconds:,.0f} player frames/s per core")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark server-side gesture classification throughput on one core.
+
+Classifies synthetic landmark batches of shape (frames, players, hands, 21, 3)
+plus one body per player, and reports frames per second per core. A player
+frame is two hands and a body. The per-frame path classifies one player
+frame per call, as a handler without batching would.
+
+Usage:
+    python -m benchmarks.bench_gestures [--frames 120] [--players 256]
+"""
+import argparse
+import os
+import time
+
+# One core: keep any BLAS-backed NumPy paths single-threaded
+os.environ.setdefault('OPENBLAS_NUM_THREADS', '1')
+os.environ.setdefault('OMP_NUM_THREADS', '1')
+
+import numpy as np
+
+from app.motion.gestures import classify_body, classify_hand_sequence, classify_hands
+from app.motion.landmarks import BODY_LANDMARKS, HAND_LANDMARKS
+
+
+def synthetic_batch(frames, players, seed=0):
+    """Random-walk landmarks in pixel space for every player"""
+    rng = np.random.default_rng(seed)
+    hands = rng.uniform(0, 640, (1, players, 2, HAND_LANDMARKS, 3))
+    hands = hands + np.cumsum(rng.normal(0, 15, (frames, players, 2, 1, 3)), axis=0)
+    bodies = rng.uniform(0, 640, (frames, players, BODY_LANDMARKS, 3))
+    return hands.astype(np.float32), bodies.astype(np.float32)
+
+
+def best_of(repeats, func):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--frames', type=int, default=120)
+    parser.add_argument('--players', type=int, default=256)
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    hands, bodies = synthetic_batch(args.frames, args.players)
+    player_frames = args.frames * args.players
+
+    hand_time = best_of(args.repeats, lambda: classify_hand_sequence(hands))
+    body_time = best_of(args.repeats, lambda: classify_body(bodies))
+
+    # Per-frame calls over a slice of the batch
+    sample = min(player_frames, 2000)
+    velocity = np.zeros(3, dtype=np.float32)
+    flat_hands = hands.reshape(-1, 2, HAND_LANDMARKS, 3)[:sample]
+    flat_bodies = bodies.reshape(-1, BODY_LANDMARKS, 3)[:sample]
+
+    def per_frame():
+        for player_hands, body in zip(flat_hands, flat_bodies):
+            classify_hands(player_hands[0], velocity)
+            classify_hands(player_hands[1], velocity)
+            classify_body(body)
+
+    loop_time = best_of(1, per_frame) * player_frames / sample
+
+    counts = np.bincount(classify_hand_sequence(hands).ravel(), minlength=10)
+    print(f"batch:            {args.frames} frames x {args.players} players")
+    print(f"hands:            {hand_time * 1000:.1f} ms ({2 * player_frames / hand_time:,.0f} hand frames/s)")
+    print(f"bodies:           {body_time * 1000:.1f} ms ({player_frames / body_time:,.0f} body frames/s)")
+    print(f"vectorized:       {player_frames / (hand_time + body_time):,.0f} player frames/s per core")
+    print(f"per-frame calls:  {player_frames / loop_time:,.0f} player frames/s per core")
+    print(f"gesture mix:      {counts.tolist()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Compare the binary landmark frame format with JSON payloads.
+
+For hands (two sets of 21 points), body (33) and face mesh (468) this
+reports bytes per frame and the server-side cost per frame of turning a
+message into a float32 array: json.loads plus conversion for JSON, a
+zero-copy numpy.frombuffer view, and the view plus dequantization.
+
+Usage:
+    python -m benchmarks.bench_landmark_codec [--frames 30] [--repeats 200]
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from app.motion.codec import (
+    ENCODING_FLOAT16, ENCODING_INT16, KIND_BODY, KIND_FACE, KIND_HAND, KIND_POINTS,
+    decode_frames, dequantize, encode_frames
+)
+
+CASES = [('hands', KIND_HAND, 2), ('body', KIND_BODY, 1), ('face', KIND_FACE, 1)]
+
+
+def json_message(landmarks):
+    """Encode frames as motion-tracking.js does: arrays of {x, y, z} objects"""
+    return json.dumps([
+        [[{'x': x, 'y': y, 'z': z} for x, y, z in points] for points in frame]
+        for frame in landmarks.tolist()
+    ]).encode('utf-8')
+
+
+def json_decode(message):
+    """Parse a JSON message into a float32 array, as the motion_frames handler does"""
+    frames = json.loads(message)
+    return np.array([[[(kp['x'], kp['y'], kp['z']) for kp in points] for points in frame] for frame in frames],
+                    dtype=np.float32)
+
+
+def per_frame_us(repeats, frames, func):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        func()
+    return (time.perf_counter() - start) / (repeats * frames) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--frames', type=int, default=30, help='Frames per message')
+    parser.add_argument('--repeats', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'payload':<8} {'format':<8} {'bytes/frame':>12} {'decode us/frame':>16} {'max error':>10}")
+    for name, kind, sets in CASES:
+        landmarks = rng.uniform(0, 640, (args.frames, sets, KIND_POINTS[kind], 3)).astype(np.float32)
+        landmarks[..., 2] -= 320
+
+        message = json_message(landmarks)
+        repeats = max(1, args.repeats // 20) if kind == KIND_FACE else args.repeats
+        cost = per_frame_us(repeats, args.frames, lambda: json_decode(message))
+        print(f"{name:<8} {'json':<8} {len(message) / args.frames:>12,.0f} {cost:>16.2f} {0:>10.3f}")
+
+        for label, encoding in (('float16', ENCODING_FLOAT16), ('int16', ENCODING_INT16)):
+            message = encode_frames(landmarks, kind, encoding=encoding)
+            view_cost = per_frame_us(args.repeats, args.frames, lambda: decode_frames(message, kind))
+            out = np.empty(landmarks.shape, dtype=np.float32)
+            cost = per_frame_us(args.repeats, args.frames, lambda: dequantize(decode_frames(message, kind), out))
+            error = np.abs(dequantize(decode_frames(message)) - landmarks).max()
+            print(f"{name:<8} {label:<8} {len(message) / args.frames:>12,.0f} {cost:>16.2f} {error:>10.3f}"
+                  f"   (view only {view_cost:.2f} us)")
+
+
+if __name__ == '__main__':
+    main()
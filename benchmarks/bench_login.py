@@ -0,0 +1,114 @@
+"""
+Benchmark login throughput and event loop latency during a login storm.
+
+Concurrent clients hammer /auth/login while a heartbeat task sleeps in a
+tight loop and records how late it wakes up, which is the delay every other
+socket on the worker would see. Compare pool modes to see the effect of
+moving bcrypt off the request path.
+
+Usage:
+    python -m benchmarks.bench_login [--pool inline,thread,process] [--clients 16]
+                                     [--logins 20] [--rounds 12] [--eventlet]
+
+With --eventlet the standard library is monkey patched first, reproducing
+the green-thread worker the app runs under in production.
+"""
+import argparse
+import sys
+
+if __name__ == '__main__' and '--eventlet' in sys.argv:
+    import eventlet
+    eventlet.monkey_patch()
+
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+
+def heartbeat(stop, lags, interval=0.005):
+    """Record how late a periodic sleep wakes up"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        time.sleep(interval)
+        lags.append((time.perf_counter() - start - interval) * 1000)
+
+
+def storm(pool, clients, logins, rounds, workers):
+    from app import create_app, db, bcrypt
+    from app.models.user import User
+    from config import TestingConfig
+
+    db_fd, db_path = tempfile.mkstemp()
+
+    class BenchConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{db_path}'
+        BCRYPT_LOG_ROUNDS = rounds
+        PASSWORD_HASH_POOL = pool
+        PASSWORD_HASH_WORKERS = workers
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        pw_hash = bcrypt.generate_password_hash('password', rounds).decode('utf-8')
+        db.session.add_all(User(username=f'user{i}', email=f'user{i}@example.com', password_hash=pw_hash)
+                           for i in range(clients))
+        db.session.commit()
+
+    statuses = []
+    lags = []
+    stop = threading.Event()
+
+    def client(i):
+        test_client = app.test_client()
+        for _ in range(logins):
+            response = test_client.post('/auth/login', data={'username': f'user{i}', 'password': 'password'})
+            statuses.append(response.status_code)
+            test_client.get('/auth/logout')
+
+    ticker = threading.Thread(target=heartbeat, args=(stop, lags))
+    ticker.start()
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    ticker.join()
+
+    os.close(db_fd)
+    os.unlink(db_path)
+
+    ok = statuses.count(302)
+    lags.sort()
+    return {
+        'pool': pool,
+        'logins_per_s': ok / elapsed,
+        'rejected': statuses.count(503),
+        'lag_p50': statistics.median(lags) if lags else 0.0,
+        'lag_p99': lags[int(len(lags) * 0.99)] if lags else 0.0,
+        'lag_max': lags[-1] if lags else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--pool', default='inline,thread,process')
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--logins', type=int, default=20)
+    parser.add_argument('--rounds', type=int, default=12)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+    parser.add_argument('--eventlet', action='store_true')
+    args = parser.parse_args()
+
+    print(f"{'pool':<8} {'logins/s':>9} {'503s':>6} {'lag p50':>9} {'lag p99':>9} {'lag max':>9}")
+    for pool in args.pool.split(','):
+        r = storm(pool, args.clients, args.logins, args.rounds, args.workers)
+        print(f"{r['pool']:<8} {r['logins_per_s']:>9.1f} {r['rejected']:>6} "
+              f"{r['lag_p50']:>7.2f}ms {r['lag_p99']:>7.2f}ms {r['lag_max']:>7.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark CPU spent serving a simulated credential-stuffing attack.
+
+A handful of attacker addresses replay leaked username/password pairs
+against /auth/login. The run is repeated with the login limiter disabled
+and enabled, reporting process CPU time, bcrypt checks performed and the
+limiter's metrics.
+
+Usage:
+    python -m benchmarks.bench_login_stuffing [--attempts 300] [--ips 5] [--users 20] [--rounds 12]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+
+def attack(enabled, attempts, ips, users, rounds):
+    from app import create_app, db, bcrypt, hasher, login_limiter
+    from app.models.user import User
+    from config import TestingConfig
+
+    db_fd, db_path = tempfile.mkstemp()
+
+    class BenchConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{db_path}'
+        BCRYPT_LOG_ROUNDS = rounds
+        PASSWORD_HASH_POOL = 'inline'
+        LOGIN_RATE_LIMIT_ENABLED = enabled
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        pw_hash = bcrypt.generate_password_hash('correct-horse', rounds).decode('utf-8')
+        db.session.add_all(User(username=f'user{i}', email=f'user{i}@example.com', password_hash=pw_hash)
+                           for i in range(users))
+        db.session.commit()
+
+    checks = [0]
+    original = hasher.check_password
+
+    def counting_check(*args):
+        checks[0] += 1
+        return original(*args)
+
+    hasher.check_password = counting_check
+    rng = random.Random(0)
+    client = app.test_client()
+    statuses = []
+
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    for _ in range(attempts):
+        response = client.post(
+            '/auth/login',
+            data={'username': f'user{rng.randrange(users)}', 'password': f'leaked-{rng.randrange(10**6)}'},
+            environ_base={'REMOTE_ADDR': f'203.0.113.{rng.randrange(ips)}'}
+        )
+        statuses.append(response.status_code)
+    cpu, wall = time.process_time() - cpu_start, time.perf_counter() - wall_start
+
+    hasher.check_password = original
+    os.close(db_fd)
+    os.unlink(db_path)
+    return {
+        'cpu': cpu,
+        'wall': wall,
+        'rejected': statuses.count(429),
+        'checks': checks[0],
+        'metrics': login_limiter.metrics(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--attempts', type=int, default=300)
+    parser.add_argument('--ips', type=int, default=5)
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--rounds', type=int, default=12)
+    args = parser.parse_args()
+
+    print(f"{'limiter':<8} {'cpu s':>7} {'cpu/attempt':>12} {'429s':>6} {'bcrypt checks':>14}")
+    for enabled in (False, True):
+        r = attack(enabled, args.attempts, args.ips, args.users, args.rounds)
+        print(f"{'on' if enabled else 'off':<8} {r['cpu']:>7.2f} {r['cpu'] / args.attempts * 1000:>10.2f}ms "
+              f"{r['rejected']:>6} {r['checks']:>14}")
+        if enabled:
+            print(f"metrics: {r['metrics']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+Benchmark a full rating replay over a synthetic match history.
+
+Usage:
+    python -m benchmarks.bench_rating [--matches 10000000] [--players 100000]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.utils.rating import RatingParams, replay, schedule_waves
+
+
+def synthetic_history(n_matches, n_players, seed=0):
+    """Generate a random chronological match history with hidden skill"""
+    rng = np.random.default_rng(seed)
+    skill = rng.normal(0.0, 1.0, n_players)
+    player1 = rng.integers(0, n_players, n_matches)
+    player2 = (player1 + rng.integers(1, n_players, n_matches)) % n_players
+    p_win = 1.0 / (1.0 + np.exp(-(skill[player1] - skill[player2])))
+    draw = rng.random(n_matches) < 0.05
+    scores = np.where(draw, 0.5, (rng.random(n_matches) < p_win).astype(np.float64))
+    return player1, player2, scores, skill
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--matches', type=int, default=10_000_000)
+    parser.add_argument('--players', type=int, default=100_000)
+    parser.add_argument('--system', choices=['glicko2', 'elo'], default='glicko2')
+    args = parser.parse_args()
+
+    player1, player2, scores, skill = synthetic_history(args.matches, args.players)
+    params = RatingParams(system=args.system)
+
+    start = time.perf_counter()
+    waves = schedule_waves(player1, player2, args.players)
+    schedule_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    rating, _, _ = replay(player1, player2, scores, args.players, params)
+    total_time = time.perf_counter() - start
+
+    correlation = np.corrcoef(rating, skill)[0, 1]
+    print(f"system:        {args.system}")
+    print(f"matches:       {args.matches:,}")
+    print(f"players:       {args.players:,}")
+    print(f"waves:         {int(waves.max()) + 1:,}")
+    print(f"scheduling:    {schedule_time:.2f}s")
+    print(f"replay total:  {total_time:.2f}s")
+    print(f"throughput:    {args.matches / total_time:,.0f} matches/s")
+    print(f"skill corr:    {correlation:.3f}")
+
+
+if __name__ == '__main__':
+    main()
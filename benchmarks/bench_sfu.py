@@ -0,0 +1,194 @@
+"""
+Load test forwarding match video through the SFU against a full mesh.
+
+Starts N local aiortc clients that each send a synthetic moving video and
+connects them once as a full mesh, where every pair has its own
+connection, and once through a SelectiveForwarder, where every client
+publishes once and receives the others on server subscriptions. After a
+warm-up, reports per client the mean uplink and downlink bitrate, the
+frames per second received from each other client and the process CPU
+time. In the mesh, uplink grows with every peer; through the SFU it stays
+one stream, and the server carries the fan-out.
+
+Everything runs in one process, so the CPU time covers the clients and
+the server together.
+
+Usage:
+    python -m benchmarks.bench_sfu [--clients 4] [--seconds 10] [--layer medium]
+    python -m benchmarks.bench_sfu --clients 6 --modes sfu --layer low
+"""
+import argparse
+import asyncio
+import itertools
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.rtc.sfu import SelectiveForwarder, parse_peer
+from app.vision.video import draw_markers
+
+
+def moving_frames(count, width, height):
+    """
+    Frames of a marker circling over a gradient, so the encoder has motion to code.
+
+    Frames are yuv420p, as from a camera; the mesh clients share each frame
+    between their encoders, which cannot convert one frame concurrently.
+    """
+    from av import VideoFrame
+
+    gradient = np.linspace(0, 255, width, dtype=np.uint8)[None, :, None].repeat(height, 0).repeat(3, 2)
+    frames = []
+    for i in range(count):
+        angle = 2 * np.pi * i / count
+        image = draw_markers({'right': (width / 2 + width / 4 * np.cos(angle),
+                                        height / 2 + height / 4 * np.sin(angle))}, width=width, height=height)
+        frame = VideoFrame.from_ndarray(np.maximum(image, gradient // 2), format='rgb24')
+        frames.append(frame.reformat(format='yuv420p').to_ndarray())
+    return frames
+
+
+def source_track(frames):
+    from aiortc import VideoStreamTrack
+    from av import VideoFrame
+
+    class Source(VideoStreamTrack):
+        async def recv(self):
+            pts, time_base = await self.next_timestamp()
+            frame = VideoFrame.from_ndarray(frames[pts // 3000 % len(frames)], format='yuv420p')
+            frame.pts, frame.time_base = pts, time_base
+            return frame
+
+    return Source()
+
+
+class Client:
+    def __init__(self, name, frames):
+        from aiortc.contrib.media import MediaRelay
+
+        self.name = name
+        self.source = source_track(frames)
+        self.relay = MediaRelay()
+        self.peers = {}
+        self.received = {}
+
+    def peer(self, remote, send=True):
+        from aiortc import RTCPeerConnection
+
+        peer = self.peers[remote] = RTCPeerConnection()
+        if send:
+            peer.addTrack(self.relay.subscribe(self.source, buffered=False))
+
+        @peer.on('track')
+        def on_track(track):
+            asyncio.ensure_future(self._count(remote, track))
+
+        return peer
+
+    async def _count(self, remote, track):
+        from aiortc.mediastreams import MediaStreamError
+
+        while True:
+            try:
+                await track.recv()
+            except MediaStreamError:
+                return
+            self.received[remote] = self.received.get(remote, 0) + 1
+
+    async def traffic(self):
+        sent = received = 0
+        for peer in self.peers.values():
+            for stat in (await peer.getStats()).values():
+                if stat.type == 'transport':
+                    sent += stat.bytesSent
+                    received += stat.bytesReceived
+        return sent, received
+
+    async def close(self):
+        for peer in self.peers.values():
+            await peer.close()
+
+
+async def connect_mesh(clients, sfu):
+    from aiortc import RTCSessionDescription
+
+    for caller, callee in itertools.combinations(clients, 2):
+        offerer, answerer = caller.peer(callee.name), callee.peer(caller.name)
+        await offerer.setLocalDescription(await offerer.createOffer())
+        await answerer.setRemoteDescription(offerer.localDescription)
+        await answerer.setLocalDescription(await answerer.createAnswer())
+        await offerer.setRemoteDescription(RTCSessionDescription(sdp=answerer.localDescription.sdp, type='answer'))
+
+
+async def connect_sfu(clients, sfu):
+    from aiortc import RTCSessionDescription
+
+    loop = asyncio.get_running_loop()
+    by_name = {client.name: client for client in clients}
+    for client in clients:
+        peer = client.peer('sfu')
+        await peer.setLocalDescription(await peer.createOffer())
+        answer, offers = await loop.run_in_executor(None, sfu.publish, 'bench', client.name,
+                                                    peer.localDescription.sdp, 'offer')
+        await peer.setRemoteDescription(RTCSessionDescription(**answer))
+        for offer in offers:
+            subscriber, publisher = by_name[offer['to']], parse_peer(offer['socket'])[1]
+            subscription = subscriber.peer(publisher, send=False)
+            await subscription.setRemoteDescription(RTCSessionDescription(**offer['offer']))
+            await subscription.setLocalDescription(await subscription.createAnswer())
+            await loop.run_in_executor(None, sfu.answer, subscriber.name, publisher,
+                                       subscription.localDescription.sdp, 'answer')
+
+
+async def measure(args, mode, frames):
+    sfu = SelectiveForwarder()
+    sfu.init_app(SimpleNamespace(extensions={}, config={
+        'SFU_ENABLED': True, 'SFU_DEFAULT_LAYER': args.layer, 'SFU_MAX_PARTICIPANTS': args.clients}))
+    clients = [Client(f'client-{i}', frames) for i in range(args.clients)]
+    await (connect_mesh if mode == 'mesh' else connect_sfu)(clients, sfu)
+    await asyncio.sleep(args.warmup)
+
+    before = [await client.traffic() for client in clients]
+    counts = [dict(client.received) for client in clients]
+    cpu, start = time.process_time(), time.perf_counter()
+    await asyncio.sleep(args.seconds)
+    elapsed, cpu = time.perf_counter() - start, time.process_time() - cpu
+    after = [await client.traffic() for client in clients]
+
+    rows = []
+    for client, (sent0, received0), (sent1, received1), count in zip(clients, before, after, counts):
+        fps = [(client.received.get(other.name, 0) - count.get(other.name, 0)) / elapsed
+               for other in clients if other is not client]
+        rows.append(((sent1 - sent0) * 8 / elapsed / 1000, (received1 - received0) * 8 / elapsed / 1000,
+                     min(fps), np.mean(fps)))
+    for client in clients:
+        await client.close()
+    await asyncio.get_running_loop().run_in_executor(None, sfu.shutdown)
+    return rows, cpu / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=4)
+    parser.add_argument('--modes', default='mesh,sfu')
+    parser.add_argument('--layer', default='medium', help="Layer the SFU forwards at: 'low', 'medium' or 'high'")
+    parser.add_argument('--width', type=int, default=640)
+    parser.add_argument('--height', type=int, default=480)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--warmup', type=float, default=3, help='Seconds to let encoders ramp up before measuring')
+    args = parser.parse_args()
+
+    frames = moving_frames(30, args.width, args.height)
+    print(f"{args.clients} clients sending {args.width}x{args.height} video for {args.seconds:g} s, "
+          f"SFU layer {args.layer}")
+    print(f"{'mode':>4} {'uplink kbps':>11} {'downlink kbps':>13} {'min fps':>8} {'mean fps':>9} {'CPU cores':>9}")
+    for mode in args.modes.split(','):
+        rows, cores = asyncio.run(measure(args, mode, frames))
+        uplink, downlink, _, mean_fps = np.mean(rows, axis=0)
+        print(f"{mode:>4} {uplink:>11,.0f} {downlink:>13,.0f} {min(row[2] for row in rows):>8.1f} "
+              f"{mean_fps:>9.1f} {cores:>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Benchmark application startup in fresh interpreters.
+
+Each run imports the app package and calls create_app in a new process, so
+module import costs are measured cold. Exits non-zero if the median startup
+time exceeds the budget or a heavy CV/ML module is imported during startup.
+
+Usage:
+    python -m benchmarks.bench_startup [--runs 7] [--budget-ms 1500] [--config testing]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+from app import create_app
+from app.utils.lazy_import import HEAVY_MODULES
+imported = time.perf_counter()
+create_app({config!r})
+created = time.perf_counter()
+print(json.dumps({{
+    'import_ms': (imported - start) * 1000,
+    'create_ms': (created - imported) * 1000,
+    'heavy': [name for name in HEAVY_MODULES if name in sys.modules],
+}}))
+"""
+
+
+def run_once(config_name):
+    output = subprocess.run(
+        [sys.executable, '-c', CHILD.format(config=config_name)],
+        cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=7)
+    parser.add_argument('--budget-ms', type=float, default=1500.0)
+    parser.add_argument('--config', default='testing')
+    args = parser.parse_args()
+
+    results = [run_once(args.config) for _ in range(args.runs)]
+    import_ms = statistics.median(r['import_ms'] for r in results)
+    create_ms = statistics.median(r['create_ms'] for r in results)
+    total_ms = statistics.median(r['import_ms'] + r['create_ms'] for r in results)
+    heavy = sorted({name for r in results for name in r['heavy']})
+
+    print(f"runs:            {args.runs}")
+    print(f"import (median): {import_ms:.1f} ms")
+    print(f"create (median): {create_ms:.1f} ms")
+    print(f"total (median):  {total_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    print(f"heavy modules:   {', '.join(heavy) or 'none'}")
+
+    failures = []
+    if total_ms > args.budget_ms:
+        failures.append(f"startup took {total_ms:.1f} ms, over the {args.budget_ms:.0f} ms budget")
+    if heavy:
+        failures.append(f"heavy modules imported at startup: {', '.join(heavy)}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark server-side landmark extraction for several video sessions.
+
+Replays a video file (or a synthetic marker video) as N concurrent
+sessions at the source frame rate through an ExtractorPool, and reports
+throughput and, per session, the frames extracted and dropped and the
+CPU used. With a per-session budget below what a session needs, its
+frames are dropped while the other sessions keep their frame rate.
+
+Usage:
+    python -m benchmarks.bench_vision_pool [--sessions 4] [--workers 2] [--budget 0.5]
+    python -m benchmarks.bench_vision_pool --video match.mp4 --extractor mediapipe
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from app.vision.pool import ExtractorPool
+from app.vision.video import read_video, write_marker_video
+
+
+def synthetic_video(path, frames):
+    t = np.linspace(0, 2 * np.pi, frames)
+    tracks = {
+        'left': np.stack([200 + 80 * np.cos(t), 240 + 60 * np.sin(t)], axis=1),
+        'right': np.stack([440 + 80 * np.sin(t), 240 + 60 * np.cos(t)], axis=1),
+    }
+    write_marker_video(path, tracks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--video', help='Video file to replay; synthetic markers when omitted')
+    parser.add_argument('--extractor', default='marker', help="'marker', 'mediapipe' or 'module:Class'")
+    parser.add_argument('--frames', type=int, default=150)
+    parser.add_argument('--sessions', type=int, default=4)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--budget', type=float, default=0.5, help='CPU cores per session')
+    parser.add_argument('--burst', type=float, default=1.0, help='CPU seconds per session')
+    parser.add_argument('--max-inflight', type=int, default=2)
+    parser.add_argument('--fps', type=float, default=30)
+    parser.add_argument('--pickle', action='store_true', help='Pickle frames instead of using shared memory')
+    args = parser.parse_args()
+
+    path = args.video
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(), 'markers.mp4')
+        synthetic_video(path, args.frames)
+    frames = [image for image, _ in read_video(path, args.frames)]
+
+    pool = ExtractorPool(args.extractor, workers=args.workers, session_budget=args.budget,
+                         burst=args.burst, max_inflight=args.max_inflight,
+                         shared_memory=not args.pickle).start()
+    # Warm up: every worker builds its extractor
+    for future in [pool.submit(f'warm-{i}', frames[0]) for i in range(args.workers)]:
+        future.result()
+
+    sessions = [f'session-{i}' for i in range(args.sessions)]
+    futures = []
+    start = time.perf_counter()
+    for i, image in enumerate(frames):
+        due = start + i / args.fps
+        delay = due - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        futures.extend(pool.submit(session, image) for session in sessions)
+    for future in futures:
+        if future is not None:
+            future.result()
+    elapsed = time.perf_counter() - start
+    stats = {session: pool.stats(session) for session in sessions}
+    pool.shutdown(wait=True)
+
+    offered = len(frames) * len(sessions)
+    completed = sum(session['completed'] for session in stats.values())
+    print(f"sessions:       {args.sessions} x {len(frames)} frames at {args.fps:g} fps, {args.workers} workers")
+    print(f"extracted:      {completed}/{offered} frames in {elapsed:.2f} s ({completed / elapsed:,.0f} frames/s)")
+    print(f"{'session':<12} {'done':>6} {'budget':>7} {'busy':>6} {'cpu s':>7} {'fps':>6}")
+    for session, counts in stats.items():
+        print(f"{session:<12} {counts['completed']:>6} {counts['dropped_budget']:>7} {counts['dropped_busy']:>6} "
+              f"{counts['cpu_seconds']:>7.2f} {counts['completed'] / elapsed:>6.1f}")
+
+
+if __name__ == '__main__':
+    main()
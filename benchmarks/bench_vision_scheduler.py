@@ -0,0 +1,94 @@
+"""
+Benchmark adaptive quality of server-side tracking under overload.
+
+Replays a synthetic marker video as N concurrent sessions at the source
+frame rate through a VisionServer, once at fixed full quality and once
+with the QualityScheduler adapting levels, and reports per session the
+frames delivered, the median and 95th percentile lag from a frame
+reaching the server to its landmarks, and the level it ended at. With
+more sessions than the workers can track at full quality, fixed quality
+lets lag build up to the in-flight limit while the scheduler trades
+resolution and frames for staying near the target.
+
+Usage:
+    python -m benchmarks.bench_vision_scheduler [--sessions 6] [--workers 2] [--target 150]
+"""
+import argparse
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.vision.server import VisionServer
+from app.vision.video import draw_markers
+
+
+def run(args, adaptive, frames):
+    app = SimpleNamespace(extensions={}, config={
+        'VISION_EXTRACTOR': 'marker', 'VISION_WORKERS': args.workers, 'VISION_MAX_INFLIGHT': args.max_inflight,
+        'VISION_SESSION_CPU_BUDGET': float(args.workers), 'VISION_SESSION_CPU_BURST': 30.0,
+        'VISION_ADAPTIVE_QUALITY': adaptive, 'VISION_TARGET_LAG_MS': args.target,
+        'VISION_QUALITY_INTERVAL': args.interval,
+    })
+    server = VisionServer(app)
+    server.pool.start()
+    for future in [server.pool.submit(f'warm-{i}', frames[0]) for i in range(args.workers)]:
+        future.result()
+
+    sessions = [f'session-{i}' for i in range(args.sessions)]
+    lags = {session: [] for session in sessions}
+    lock = threading.Lock()
+
+    def on_landmarks(stream_id, landmarks, timestamp):
+        with lock:
+            lags[stream_id].append(time.monotonic() * 1000 - timestamp)
+
+    for i, session in enumerate(sessions):
+        server.scheduler.open(session, args.game_mode)
+    futures = []
+    start = time.monotonic()
+    for i in range(args.frames):
+        delay = start + i / args.fps - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        for session in sessions:
+            futures.append(server.submit(session, frames[i % len(frames)], time.monotonic() * 1000, on_landmarks))
+    for future in futures:
+        if future is not None:
+            future.result()
+    elapsed = time.monotonic() - start
+    states = {session: server.status(session)['quality'] for session in sessions}
+    server.shutdown()
+    return lags, states, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--frames', type=int, default=240)
+    parser.add_argument('--sessions', type=int, default=6)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--max-inflight', type=int, default=8)
+    parser.add_argument('--fps', type=float, default=30)
+    parser.add_argument('--target', type=float, default=150, help='Target lag in ms')
+    parser.add_argument('--interval', type=float, default=0.5, help='Seconds between level changes')
+    parser.add_argument('--game-mode', default='boxing')
+    args = parser.parse_args()
+
+    t = np.linspace(0, 2 * np.pi, 60)
+    frames = [draw_markers({'left': (200 + 80 * np.cos(a), 240), 'right': (440, 240 + 60 * np.sin(a))}) for a in t]
+
+    print(f"sessions: {args.sessions} x {args.frames} frames at {args.fps:g} fps, {args.workers} workers, "
+          f"{args.game_mode}, target {args.target:g} ms")
+    print(f"{'quality':<9} {'session':<10} {'done':>5} {'fps':>6} {'p50 ms':>7} {'p95 ms':>7} {'level':>6} {'scale':>6}")
+    for adaptive in (False, True):
+        lags, states, elapsed = run(args, adaptive, frames)
+        for session, values in lags.items():
+            state = states[session]
+            p50, p95 = np.percentile(values, [50, 95]) if values else (float('nan'),) * 2
+            print(f"{'adaptive' if adaptive else 'fixed':<9} {session:<10} {len(values):>5} "
+                  f"{len(values) / elapsed:>6.1f} {p50:>7.0f} {p95:>7.0f} {state['level']:>6} {state['scale']:>6g}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Benchmark the cold start of landmark extraction workers with and without warm-up.
+
+For each warm-up setting, starts a fresh ExtractorPool, waits until its
+workers report ready and then streams one session at the source frame
+rate. Reports the time to ready, what each worker spent loading and
+warming up its extractor, and the latency of the first frame, the 99th
+percentile latency of the first frames of the match (cold) and of the
+frames after them (warm).
+
+Usage:
+    python -m benchmarks.bench_vision_warmup [--extractor pose-model] [--warmup 0,3] [--workers 1]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.vision.pool import ExtractorPool
+from app.vision.video import draw_markers
+
+
+def run(args, warmup_frames, image):
+    pool = ExtractorPool(args.extractor, workers=args.workers, session_budget=float(args.workers), burst=30.0,
+                         max_inflight=args.frames, batch_size=args.batch_size, warmup_frames=warmup_frames)
+    start = time.perf_counter()
+    if not pool.wait_ready(timeout=300):
+        raise SystemExit(f"Workers did not become ready: {pool.warmup_reports()}")
+    ready = time.perf_counter() - start
+    reports = pool.warmup_reports()
+
+    latencies = []
+    for i in range(args.frames):
+        submitted = time.perf_counter()
+        pool.submit('session', image).result()
+        latencies.append((time.perf_counter() - submitted) * 1000)
+        delay = submitted + 1 / args.fps - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+    pool.shutdown(wait=True)
+    return ready, reports, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--extractor', default='pose-model', help='Extractor spec, as for VISION_EXTRACTOR')
+    parser.add_argument('--warmup', default='0,3', help='Warm-up frames per worker to compare')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--batch-size', type=int, default=1)
+    parser.add_argument('--frames', type=int, default=150)
+    parser.add_argument('--cold-frames', type=int, default=5, help='Frames at the start of a match counted as cold')
+    parser.add_argument('--fps', type=float, default=30)
+    args = parser.parse_args()
+
+    image = draw_markers({'left': (220, 260), 'right': (420, 260)})
+    print(f"{args.extractor}: {args.workers} workers, {args.frames} frames at {args.fps:g} fps, "
+          f"first {args.cold_frames} counted as cold")
+    print(f"{'warm-up':>7} {'ready s':>8} {'load ms':>8} {'warm-up ms':>10} {'first ms':>9} "
+          f"{'cold p99':>9} {'warm p99':>9}")
+    for warmup_frames in (int(count) for count in args.warmup.split(',')):
+        ready, reports, latencies = run(args, warmup_frames, image)
+        load = max(report['load_ms'] for report in reports)
+        warmup = max(report['warmup_ms'] for report in reports)
+        cold = np.percentile(latencies[:args.cold_frames], 99)
+        warm = np.percentile(latencies[args.cold_frames:], 99)
+        print(f"{warmup_frames:>7} {ready:>8.2f} {load:>8.0f} {warmup:>10.0f} {latencies[0]:>9.1f} "
+              f"{cold:>9.1f} {warm:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -15,11 +15,109 @@ class Config:
     # Maximum allowed file size (16MB)
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024
 
+    # Schema bootstrap at startup: 'create', 'check' (create only missing tables and columns) or 'skip'
+    SCHEMA_MODE = os.environ.get('SCHEMA_MODE', 'check')
+
     # Auto-login configuration
     AUTO_LOGIN_ENABLED = os.environ.get('AUTO_LOGIN_ENABLED', 'True').lower() in ('true', '1', 't')
     AUTO_LOGIN_USERNAME = os.environ.get('AUTO_LOGIN_USERNAME', 'admin')
     AUTO_LOGIN_PASSWORD = os.environ.get('AUTO_LOGIN_PASSWORD', 'admin')
     AUTO_LOGIN_EMAIL = os.environ.get('AUTO_LOGIN_EMAIL', 'admin@example.com')
+    AUTO_LOGIN_CACHE_TTL = int(os.environ.get('AUTO_LOGIN_CACHE_TTL', 0))  # 0 caches until invalidated
+
+    # Password hashing: bcrypt work factor and worker pool ('auto', 'thread', 'process' or 'inline')
+    BCRYPT_LOG_ROUNDS = int(os.environ.get('BCRYPT_LOG_ROUNDS', 12))
+    PASSWORD_HASH_POOL = os.environ.get('PASSWORD_HASH_POOL', 'auto')
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 32))
+    PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 30))
+
+    # Deploy identifier; part of every page cache key
+    DEPLOY_VERSION = os.environ.get('DEPLOY_VERSION', 'dev')
+
+    # Rendered-page cache for anonymous traffic on @cacheable views
+    PAGE_CACHE_ENABLED = os.environ.get('PAGE_CACHE_ENABLED', 'True').lower() in ('true', '1', 't')
+    PAGE_CACHE_MAX_ENTRIES = int(os.environ.get('PAGE_CACHE_MAX_ENTRIES', 256))
+
+    # Server-side gesture classification (defaults match gesture-recognition.js)
+    GESTURE_PINCH_DISTANCE = float(os.environ.get('GESTURE_PINCH_DISTANCE', 0.05))
+    GESTURE_PUNCH_VELOCITY = float(os.environ.get('GESTURE_PUNCH_VELOCITY', 25))
+    GESTURE_BLOCK_VELOCITY = float(os.environ.get('GESTURE_BLOCK_VELOCITY', 10))
+    GESTURE_SWIPE_VELOCITY = float(os.environ.get('GESTURE_SWIPE_VELOCITY', 15))
+    GESTURE_MAX_BATCH_FRAMES = int(os.environ.get('GESTURE_MAX_BATCH_FRAMES', 120))
+
+    # Normalize streamed landmarks with each user's saved calibration profile
+    CALIBRATION_NORMALIZE = os.environ.get('CALIBRATION_NORMALIZE', 'True').lower() in ('true', '1', 't')
+    CALIBRATION_CACHE_MAX_ENTRIES = int(os.environ.get('CALIBRATION_CACHE_MAX_ENTRIES', 1024))
+
+    # Server-side tracking of WebRTC video on a pool of landmark extractor processes
+    VISION_SERVER_ENABLED = os.environ.get('VISION_SERVER_ENABLED', 'False').lower() in ('true', '1', 't')
+    # 'mediapipe', 'pose-model', 'marker' or 'module:Class'
+    VISION_EXTRACTOR = os.environ.get('VISION_EXTRACTOR', 'mediapipe')
+    VISION_WORKERS = int(os.environ.get('VISION_WORKERS', 2))
+    VISION_SESSION_CPU_BUDGET = float(os.environ.get('VISION_SESSION_CPU_BUDGET', 0.5))  # cores per session
+    VISION_SESSION_CPU_BURST = float(os.environ.get('VISION_SESSION_CPU_BURST', 1.0))  # CPU seconds
+    VISION_MAX_INFLIGHT = int(os.environ.get('VISION_MAX_INFLIGHT', 2))
+    VISION_SHARED_MEMORY = os.environ.get('VISION_SHARED_MEMORY', 'True').lower() in ('true', '1', 't')
+    VISION_RING_SLOTS = int(os.environ.get('VISION_RING_SLOTS', 4))  # frame slots per session
+    VISION_BATCH_SIZE = int(os.environ.get('VISION_BATCH_SIZE', 1))  # frames per batch across sessions; 1 disables
+    VISION_BATCH_WAIT_MS = float(os.environ.get('VISION_BATCH_WAIT_MS', 5.0))
+    VISION_WARMUP_FRAMES = int(os.environ.get('VISION_WARMUP_FRAMES', 3))  # blank frames per worker before ready
+    VISION_ADAPTIVE_QUALITY = os.environ.get('VISION_ADAPTIVE_QUALITY', 'True').lower() in ('true', '1', 't')
+    VISION_TARGET_LAG_MS = float(os.environ.get('VISION_TARGET_LAG_MS', 150))
+    VISION_CPU_HEADROOM = float(os.environ.get('VISION_CPU_HEADROOM', 0.2))  # share of worker CPU kept free
+    VISION_QUALITY_INTERVAL = float(os.environ.get('VISION_QUALITY_INTERVAL', 1.0))  # seconds between level changes
+
+    # Forwarding match video through the server instead of a full mesh
+    SFU_ENABLED = os.environ.get('SFU_ENABLED', 'False').lower() in ('true', '1', 't')
+    SFU_MESH_MAX_PARTICIPANTS = int(os.environ.get('SFU_MESH_MAX_PARTICIPANTS', 2))  # larger rooms use the SFU
+    SFU_MAX_PARTICIPANTS = int(os.environ.get('SFU_MAX_PARTICIPANTS', 16))
+    SFU_DEFAULT_LAYER = os.environ.get('SFU_DEFAULT_LAYER', 'medium')  # 'low', 'medium' or 'high'
+    SFU_SIGNALING_TIMEOUT = float(os.environ.get('SFU_SIGNALING_TIMEOUT', 10))
+
+    # Bandwidth profiles chosen by the server from clients' WebRTC stats
+    BANDWIDTH_ADAPTIVE = os.environ.get('BANDWIDTH_ADAPTIVE', 'True').lower() in ('true', '1', 't')
+    BANDWIDTH_TARGET_RTT_MS = float(os.environ.get('BANDWIDTH_TARGET_RTT_MS', 250))
+    BANDWIDTH_MAX_LOSS = float(os.environ.get('BANDWIDTH_MAX_LOSS', 0.05))  # share of packets lost
+    BANDWIDTH_INTERVAL = float(os.environ.get('BANDWIDTH_INTERVAL', 2.0))  # seconds between profile changes
+    BANDWIDTH_REPORT_INTERVAL_MS = int(os.environ.get('BANDWIDTH_REPORT_INTERVAL_MS', 2000))  # client stats reports
+
+    # Maximum number of operations accepted by /game/api/batch
+    API_BATCH_MAX_OPERATIONS = int(os.environ.get('API_BATCH_MAX_OPERATIONS', 20))
+
+    # Browser cache lifetime for results pages of completed sessions
+    RESULTS_CACHE_MAX_AGE = int(os.environ.get('RESULTS_CACHE_MAX_AGE', 86400))
+
+    # On-disk Jinja bytecode cache, filled by `flask precompile-templates` (defaults to instance/jinja_cache)
+    JINJA_BYTECODE_CACHE = os.environ.get('JINJA_BYTECODE_CACHE', 'True').lower() in ('true', '1', 't')
+    JINJA_BYTECODE_CACHE_DIR = os.environ.get('JINJA_BYTECODE_CACHE_DIR')
+
+    # Fingerprinted static assets built by `flask build-assets` (defaults to app/static/dist)
+    ASSETS_FINGERPRINTING = os.environ.get('ASSETS_FINGERPRINTING', 'True').lower() in ('true', '1', 't')
+    ASSETS_DIST_FOLDER = os.environ.get('ASSETS_DIST_FOLDER')
+    # Builds whose hashed files a rebuild keeps, so clients with older pages still load them
+    ASSETS_KEEP_BUILDS = int(os.environ.get('ASSETS_KEEP_BUILDS', 3))
+
+    # Login rate limiting (token buckets per IP and per username; storage 'memory' or 'shared')
+    LOGIN_RATE_LIMIT_ENABLED = os.environ.get('LOGIN_RATE_LIMIT_ENABLED', 'True').lower() in ('true', '1', 't')
+    LOGIN_LIMIT_IP_CAPACITY = int(os.environ.get('LOGIN_LIMIT_IP_CAPACITY', 20))
+    LOGIN_LIMIT_IP_PER_MINUTE = float(os.environ.get('LOGIN_LIMIT_IP_PER_MINUTE', 10))
+    LOGIN_LIMIT_USER_CAPACITY = int(os.environ.get('LOGIN_LIMIT_USER_CAPACITY', 5))
+    LOGIN_LIMIT_USER_PER_MINUTE = float(os.environ.get('LOGIN_LIMIT_USER_PER_MINUTE', 2))
+    LOGIN_LIMIT_STORAGE = os.environ.get('LOGIN_LIMIT_STORAGE', 'memory')
+
+    # Reverse proxies in front of the app (such as the load balancer run.py's prefork mode needs);
+    # their X-Forwarded-* headers are trusted to give the client address, 0 trusts none
+    PROXY_FIX_HOPS = int(os.environ.get('PROXY_FIX_HOPS', 0))
+
+    # Expired password reset token sweeper (seconds between sweeps, 0 disables)
+    RESET_TOKEN_SWEEP_INTERVAL = int(os.environ.get('RESET_TOKEN_SWEEP_INTERVAL', 900))
+    RESET_TOKEN_SWEEP_BATCH_SIZE = int(os.environ.get('RESET_TOKEN_SWEEP_BATCH_SIZE', 1000))
+
+    # Skill rating configuration ('glicko2' or 'elo')
+    RATING_SYSTEM = os.environ.get('RATING_SYSTEM', 'glicko2')
+    RATING_ELO_K_FACTOR = float(os.environ.get('RATING_ELO_K_FACTOR', 32))
+    RATING_GLICKO2_TAU = float(os.environ.get('RATING_GLICKO2_TAU', 0.5))
 
     @staticmethod
     def init_app(app):
@@ -39,6 +137,8 @@ class TestingConfig(Config):
     WTF_CSRF_ENABLED = False  # Disable CSRF protection in tests
     SERVER_NAME = 'localhost.localdomain'  # Set server name for URL generation in tests
     AUTO_LOGIN_ENABLED = False  # Disable auto-login for tests
+    LOGIN_RATE_LIMIT_ENABLED = False  # Tests log in repeatedly from one address
+    JINJA_BYTECODE_CACHE = False  # Keep test runs from writing to the instance folder
 
 class ProductionConfig(Config):
     """Production configuration"""
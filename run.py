@@ -1,5 +1,6 @@
 import os
-from app import create_app, socketio
+from app import create_app, socketio, vision
+from app.utils.sweeper import start_reset_token_sweeper
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -8,12 +9,66 @@ load_dotenv()
 # Create Flask application with specified configuration
 app = create_app(os.getenv('FLASK_ENV', 'development'))
 
+
+def serve(host, port, sweep=True):
+    """Run the application with Socket.IO"""
+    if sweep:
+        start_reset_token_sweeper(app)
+    # Warm up the tracking models now rather than during the first match
+    vision.preload()
+    socketio.run(app, host=host, port=port, debug=app.config['DEBUG'],
+                 use_reloader=False, allow_unsafe_werkzeug=True)
+
+
+def serve_preforked(host, port, workers):
+    """
+    Warm the app once, then fork one worker per port starting at `port`.
+
+    Socket.IO needs sticky sessions, so each worker listens on its own port
+    behind a load balancer that pins clients to a worker. Set PROXY_FIX_HOPS
+    so client addresses are taken from the balancer's X-Forwarded-For.
+
+    Each worker runs Werkzeug's threaded server, which Flask-SocketIO only
+    allows with allow_unsafe_werkzeug. It is fine behind a balancer for small
+    deployments, but it is not a hardened production server; see the README's
+    Deployment section for running each port under gunicorn instead.
+    Crashed workers restart with exponential backoff and are given up on
+    after WORKER_MAX_RESTARTS crashes in a row.
+    """
+    from app.utils.prefork import Supervisor, warm_app, freeze_heap
+
+    warmed = warm_app(app)
+    frozen = freeze_heap()
+    app.logger.info(f"Preloaded {warmed['templates']} templates and {warmed['queries']} queries, "
+                    f"froze {frozen} objects")
+    app.logger.warning("Preforked workers run the Werkzeug development server; use gunicorn in production")
+
+    supervisor = Supervisor(
+        lambda index: serve(host, port + index, sweep=index == 0),
+        workers,
+        report_interval=float(os.getenv('WORKER_REPORT_INTERVAL', 60)),
+        max_restarts=int(os.getenv('WORKER_MAX_RESTARTS', 5)),
+        restart_backoff=float(os.getenv('WORKER_RESTART_BACKOFF', 1)),
+        max_backoff=float(os.getenv('WORKER_MAX_BACKOFF', 60))
+    )
+    supervisor.run()
+
+
 if __name__ == '__main__':
     # Get port from environment variable or use default
     port = int(os.getenv('PORT', 5000))
-    
+
     # Get host from environment variable or use default
     host = os.getenv('HOST', '127.0.0.1')
-    
-    # Run the application with Socket.IO
-    socketio.run(app, host=host, port=port, debug=app.config['DEBUG'])
+
+    # Number of preforked workers; 1 runs a single in-process server
+    workers = int(os.getenv('WORKERS', 1))
+
+    if workers > 1:
+        serve_preforked(host, port, workers)
+    else:
+        start_reset_token_sweeper(app)
+        vision.preload()
+
+        # Run the application with Socket.IO
+        socketio.run(app, host=host, port=port, debug=app.config['DEBUG'])
@@ -0,0 +1,94 @@
+"""
+Tests for the batched game API endpoint.
+"""
+from app.models.avatar import Avatar
+from app.models.game_session import GameSession
+from app.models.user import User
+
+
+def test_batch_runs_operations_in_order(client, auth, app):
+    """Test that a batch applies its operations in order and returns each result."""
+    auth.login()
+    with app.app_context():
+        avatar_id = Avatar.query.first().id
+
+    response = client.post('/game/api/batch', json={'operations': [
+        {'op': 'update_avatar', 'data': {'avatar_id': avatar_id}},
+        {'op': 'save_avatar_customization', 'data': {'avatarId': avatar_id, 'color': '#ff0000'}},
+        {'op': 'get_avatar_customization'},
+        {'op': 'create_session'},
+    ]})
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['success'] is True
+    assert [r['status'] for r in data['results']] == [200, 200, 200, 200]
+
+    # Later operations see the changes staged by earlier ones
+    avatar_data = data['results'][2]['body']['avatarData']
+    assert avatar_data == {'avatarId': avatar_id, 'color': '#ff0000', 'accessories': [], 'animation': None}
+
+    session_id = data['results'][3]['body']['session_id']
+    with app.app_context():
+        assert User.query.filter_by(username='testuser').first().avatar_id == avatar_id
+        assert GameSession.query.get(session_id) is not None
+
+
+def test_batch_failure_rolls_back(client, auth, app):
+    """Test that a failing operation stops the batch and discards its changes."""
+    auth.login()
+    with app.app_context():
+        avatar_id = Avatar.query.first().id
+
+    response = client.post('/game/api/batch', json={'operations': [
+        {'op': 'update_avatar', 'data': {'avatar_id': avatar_id}},
+        {'op': 'create_session'},
+        {'op': 'join_session', 'data': {'session_id': 9999}},
+        {'op': 'get_avatar_customization'},
+    ]})
+    assert response.status_code == 404
+    data = response.get_json()
+    assert data['success'] is False
+    assert data['failed'] == 2
+    assert len(data['results']) == 3
+    assert data['results'][2]['body']['error'] == 'Session not found'
+
+    with app.app_context():
+        assert User.query.filter_by(username='testuser').first().avatar_id is None
+        assert GameSession.query.count() == 0
+
+
+def test_batch_validation(client, auth, app):
+    """Test that malformed batches are rejected before anything runs."""
+    auth.login()
+
+    response = client.post('/game/api/batch', json={})
+    assert response.status_code == 400
+
+    response = client.post('/game/api/batch', json={'operations': [
+        {'op': 'create_session'},
+        {'op': 'drop_tables'},
+    ]})
+    assert response.status_code == 400
+    assert 'drop_tables' in response.get_json()['error']
+
+    # Bodies and data that are not objects are client errors
+    response = client.post('/game/api/batch', json=['create_session'])
+    assert response.status_code == 400
+    response = client.post('/game/api/batch', json={'operations': [{'op': 'create_session', 'data': [1]}]})
+    assert response.status_code == 400
+    assert 'create_session' in response.get_json()['error']
+    response = client.post('/game/api/create_session', json='medium')
+    assert response.status_code == 400
+
+    app.config['API_BATCH_MAX_OPERATIONS'] = 2
+    response = client.post('/game/api/batch', json={'operations': [{'op': 'create_session'}] * 3})
+    assert response.status_code == 400
+
+    with app.app_context():
+        assert GameSession.query.count() == 0
+
+
+def test_batch_requires_login(client):
+    """Test that the batch endpoint is login protected."""
+    response = client.post('/game/api/batch', json={'operations': [{'op': 'create_session'}]})
+    assert response.status_code == 302
@@ -0,0 +1,111 @@
+"""
+Tests for the static asset pipeline.
+"""
+import gzip
+import pytest
+from flask import url_for
+from app import create_app
+from app.utils.assets import build_assets, load_manifest, fingerprint
+from config import TestingConfig
+
+
+@pytest.fixture
+def built_app(app, tmp_path):
+    """An app serving assets built into a temporary dist folder."""
+    dist = tmp_path / 'dist'
+    build_assets(app.static_folder, str(dist))
+
+    class AssetsConfig(TestingConfig):
+        ASSETS_DIST_FOLDER = str(dist)
+
+    return create_app(AssetsConfig)
+
+
+def test_build_assets(app, tmp_path):
+    """Test that assets are fingerprinted and text assets precompressed."""
+    dist = tmp_path / 'dist'
+    manifest = build_assets(app.static_folder, str(dist))
+
+    entry = manifest['js/main.js']
+    source = open(f'{app.static_folder}/js/main.js', 'rb').read()
+    assert entry['path'] == f'js/main.{fingerprint(source)}.js'
+    assert (dist / entry['path']).read_bytes() == source
+    assert 'gzip' in entry['encodings']
+    assert gzip.decompress((dist / (entry['path'] + '.gz')).read_bytes()) == source
+
+    # Images are copied but not compressed
+    assert manifest['images/hero-image.jpg']['encodings'] == []
+    assert load_manifest(str(dist)) == manifest
+
+    # Rebuilding into the static folder never picks up the previous build
+    assert not any(rel.startswith('dist/') for rel in build_assets(app.static_folder, str(dist)))
+
+
+def test_rebuilds_keep_recent_builds(tmp_path):
+    """Test that a rebuild keeps the last builds' hashed files, prunes older ones and skips uploads."""
+    static = tmp_path / 'static'
+    (static / 'js').mkdir(parents=True)
+    (static / 'uploads').mkdir()
+    (static / 'uploads' / 'avatar.png').write_bytes(b'user content')
+    dist = static / 'dist'
+
+    paths = []
+    for version in range(3):
+        (static / 'js' / 'app.js').write_text(f'console.log({version});' * 20)
+        manifest = build_assets(str(static), str(dist), exclude=[str(static / 'uploads')], keep_builds=2)
+        assert set(manifest) == {'js/app.js'}
+        paths.append(manifest['js/app.js']['path'])
+
+    assert not (dist / paths[0]).exists() and not (dist / (paths[0] + '.gz')).exists()
+    for path in paths[1:]:
+        assert (dist / path).exists() and (dist / (path + '.gz')).exists()
+    assert load_manifest(str(dist))['js/app.js']['path'] == paths[2]
+
+
+def test_url_for_uses_hashed_names(built_app):
+    """Test that url_for('static') points at the fingerprinted file."""
+    manifest = built_app.extensions['assets']
+    with built_app.test_request_context():
+        url = url_for('static', filename='css/style.css')
+        assert url == f"/static/dist/{manifest['css/style.css']['path']}"
+        assert url_for('static', filename='js/not-built.js') == '/static/js/not-built.js'
+
+
+def test_serve_hashed_assets(built_app):
+    """Test that hashed assets are served precompressed and immutable."""
+    client = built_app.test_client()
+    with built_app.test_request_context():
+        url = url_for('static', filename='js/main.js')
+
+    plain = client.get(url)
+    assert plain.status_code == 200
+    assert 'Content-Encoding' not in plain.headers
+    assert 'immutable' in plain.headers['Cache-Control']
+    assert 'max-age=31536000' in plain.headers['Cache-Control']
+    assert plain.mimetype in ('application/javascript', 'text/javascript')
+
+    compressed = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert compressed.mimetype == plain.mimetype
+    assert gzip.decompress(compressed.data) == plain.data
+    assert 'Accept-Encoding' in compressed.headers['Vary']
+
+    # Unhashed paths still work for hard-coded references
+    response = client.get('/static/js/main.js')
+    assert response.status_code == 200
+    assert 'immutable' not in response.headers.get('Cache-Control', '')
+
+
+def test_pages_reference_hashed_assets(built_app):
+    """Test that rendered templates link to the fingerprinted files."""
+    response = built_app.test_client().get('/')
+    assert b'/static/dist/css/style.' in response.data
+    assert b'/static/dist/js/main.' in response.data
+
+
+def test_build_assets_command(app, tmp_path):
+    """Test the build-assets CLI command."""
+    app.config['ASSETS_DIST_FOLDER'] = str(tmp_path / 'dist')
+    result = app.test_cli_runner().invoke(args=['build-assets'])
+    assert 'Built' in result.output
+    assert (tmp_path / 'dist' / 'manifest.json').exists()
@@ -166,8 +166,8 @@ def test_reset_password_request(client, app):
     # Check that a token was generated
     with app.app_context():
         user = User.query.filter_by(email='test@example.com').first()
-        assert user.reset_token is not None
-        assert user.reset_token_expiration is not None
+        assert len(user.reset_tokens) == 1
+        assert user.reset_tokens[0].expires_at is not None
 
     # Submit a reset request for a non-existent email
     response = client.post(
@@ -207,8 +207,8 @@ def test_reset_password_token(client, app):
     # Check that the token was cleared
     with app.app_context():
         user = User.query.filter_by(email='test@example.com').first()
-        assert user.reset_token is None
-        assert user.reset_token_expiration is None
+        assert user.reset_tokens == []
+        assert User.get_user_by_reset_token(token) is None
 
     # Login with the new password
     response = client.post(
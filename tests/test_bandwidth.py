@@ -0,0 +1,132 @@
+"""
+Tests for server-driven bandwidth profiles.
+"""
+import pytest
+from app import bandwidth, db, socketio, vision
+from app.models.game_session import GameSession
+from app.models.user import User
+from app.rtc.bandwidth import BandwidthController
+
+
+def controller(**settings):
+    controller = BandwidthController()
+    for name, value in settings.items():
+        setattr(controller, name, value)
+    return controller
+
+
+GOOD = {'rtt_ms': 40, 'loss': 0.0, 'available_kbps': 3000}
+LOSSY = {'rtt_ms': 40, 'loss': 0.2, 'available_kbps': 3000}
+
+
+def test_links_step_down_fast_and_up_slowly():
+    """Test degrading on loss and recovering only after a few clean intervals."""
+    links = controller(interval=2.0)
+    assert links.profile('match', 'a', 'b') == 'medium'
+
+    # Clean links move up only once several intervals have passed
+    assert links.report('match', 'a', {'b': GOOD}, now=1) == {}
+    assert links.report('match', 'a', {'b': GOOD}, now=2) == {}
+    assert links.report('match', 'a', {'b': GOOD}, now=7) == {'b': 'high'}
+
+    # Loss is smoothed, so one lossy report is not enough
+    assert links.report('match', 'a', {'b': {'loss': 0.1}}, now=9) == {}
+    assert links.report('match', 'a', {'b': LOSSY}, now=10) == {'b': 'medium'}
+    # At most one step per interval
+    assert links.report('match', 'a', {'b': LOSSY}, now=11) == {}
+    assert links.report('match', 'a', {'b': LOSSY}, now=12) == {'b': 'low'}
+    # The worst profile is the floor
+    assert links.report('match', 'a', {'b': LOSSY}, now=14) == {}
+
+    # Between the recover and degrade thresholds the profile holds
+    for t in range(15, 31, 2):
+        assert links.report('match', 'a', {'b': {'loss': 0.03}}, now=t) == {}
+    assert links.profile('match', 'a', 'b') == 'low'
+    state = links.state('match')['a -> b']
+    assert (state['profile'], state['changes'], state['reports']) == ('low', 3, 16)
+
+
+def test_round_trip_and_available_bitrate():
+    """Test that slow links and links without room for a profile step down, and the other link is untouched."""
+    links = controller(interval=1.0, target_rtt_ms=200)
+    assert links.report('match', 'a', {'b': {'rtt_ms': 400}, 'c': GOOD}, now=1) == {'b': 'low'}
+    assert links.profile('match', 'a', 'c') == 'medium'
+
+    # 400 kbps cannot carry the medium profile
+    assert links.report('match', 'x', {'y': {'available_kbps': 400}}, now=1) == {'y': 'low'}
+    # 800 kbps carries medium but not with the margin to move up to high
+    for t in range(2, 12):
+        links.report('match', 'x', {'y': {'available_kbps': 800}}, now=t)
+    assert links.profile('match', 'x', 'y') == 'medium'
+
+
+def test_cpu_limits():
+    """Test that a CPU-limited encoder, or a busy server for forwarded links, steps down."""
+    links = controller(interval=1.0, headroom=0.2)
+    assert links.report('match', 'a', {'b': dict(GOOD, cpu_limited=True)}, now=1) == {'b': 'low'}
+
+    # Server load only counts for links the SFU forwards
+    assert links.report('match', 'c', {'d': GOOD, 'sfu': GOOD, 'sfu:d': GOOD}, server_load=0.9, now=1) == {
+        'sfu': 'low', 'sfu:d': 'low'}
+    # Recovery waits for real headroom
+    for t in range(2, 10):
+        links.report('match', 'c', {'sfu': GOOD}, server_load=0.7, now=t)
+    assert links.profile('match', 'c', 'sfu') == 'low'
+    assert links.report('match', 'c', {'sfu': GOOD}, server_load=0.3, now=10) == {'sfu': 'medium'}
+
+    links.enabled = False
+    assert links.report('match', 'e', {'f': LOSSY}, now=100) == {}
+
+
+def test_invalid_reports_and_forget():
+    """Test rejecting malformed summaries and forgetting a client's links."""
+    links = controller()
+    with pytest.raises(ValueError):
+        links.report('match', 'a', ['b'])
+    with pytest.raises(ValueError):
+        links.report('match', 'a', {'b': {'rtt_ms': 'slow'}})
+
+    links.report('match', 'a', {'b': GOOD, 'sfu:c': GOOD}, now=1)
+    links.report('match', 'b', {'a': GOOD}, now=1)
+    links.report('other', 'c', {'sfu': GOOD}, now=1)
+    links.forget('c')
+    assert set(links.state('match')) == {'a -> b', 'b -> a'}
+    assert links.state('other') == {}
+    links.forget('a')
+    assert links.state('match') == {}
+
+
+def test_network_stats_push_profiles(app, client, auth, monkeypatch):
+    """Test that reported stats come back as profile changes over the socket."""
+    app.config['BANDWIDTH_INTERVAL'] = 0.0
+    bandwidth.init_app(app)
+    with app.app_context():
+        session = GameSession(player1_id=User.query.filter_by(username='testuser').first().id)
+        db.session.add(session)
+        db.session.commit()
+        session_id = str(session.id)
+    auth.login()
+    socket = socketio.test_client(app, flask_test_client=client)
+    socket.get_received()
+
+    # Only players who joined the session's room may report
+    socket.emit('network_stats', {'session_id': session_id, 'peers': {'peer': LOSSY}})
+    assert socket.get_received()[0]['name'] == 'bandwidth_error'
+    socket.emit('join_game', {'session_id': session_id})
+    socket.get_received()
+
+    socket.emit('network_stats', {'session_id': session_id, 'peers': {'peer': LOSSY, 'sfu:pub': GOOD}})
+    assert [e['args'][0] for e in socket.get_received()] == [{'peer': 'peer', 'profile': 'low'},
+                                                             {'peer': 'sfu:pub', 'profile': 'high'}]
+
+    # Forwarded links step down while the tracking workers are busy; direct ones ignore them
+    monkeypatch.setattr(vision, 'load', lambda: 0.95)
+    socket.emit('network_stats', {'session_id': session_id, 'peers': {'other': GOOD, 'sfu:pub': GOOD}})
+    assert [e['args'][0] for e in socket.get_received()] == [{'peer': 'other', 'profile': 'high'},
+                                                             {'peer': 'sfu:pub', 'profile': 'medium'}]
+
+    socket.emit('network_stats', {'session_id': session_id, 'peers': 'bad'})
+    assert socket.get_received()[0]['name'] == 'bandwidth_error'
+
+    socket.disconnect()
+    assert bandwidth.state(session_id) == {}
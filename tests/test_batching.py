@@ -0,0 +1,125 @@
+"""
+Tests for batched landmark extraction across sessions.
+"""
+import threading
+import time
+import numpy as np
+import pytest
+from app.motion.landmarks import BODY_LANDMARKS, WRIST
+from app.vision.batching import MicroBatcher
+from app.vision.extractors import padded_batch_size, warmup_batch_sizes
+from app.vision.pool import ExtractorPool
+from app.vision.video import draw_markers
+
+
+def test_batches_fill_or_time_out():
+    """Test that a batch goes out when full or when its oldest item is due."""
+    batches = []
+    handled = threading.Event()
+
+    def handler(batch):
+        batches.append(batch)
+        handled.set()
+
+    batcher = MicroBatcher(handler, batch_size=3, max_wait_ms=10_000)
+    for i in range(3):
+        batcher.add(i)
+    assert handled.wait(5)
+    assert batches == [[0, 1, 2]]
+
+    # A partial batch waits for the deadline
+    batcher.max_wait = 0.05
+    handled.clear()
+    start = time.monotonic()
+    batcher.add(3)
+    assert handled.wait(5)
+    assert time.monotonic() - start >= 0.04
+    assert batches[-1] == [3]
+
+    # Closing hands over whatever is queued
+    batcher.max_wait = 10
+    batcher.add(4)
+    batcher.add(5)
+    batcher.close(timeout=5)
+    assert batches[-1] == [4, 5]
+    assert batcher.stats() == {'batches': 3, 'items': 6, 'mean_batch_size': 2.0}
+    with pytest.raises(RuntimeError):
+        batcher.add(6)
+
+
+def test_handler_errors_do_not_stop_the_batcher():
+    """Test that a failing batch is logged and later batches still run."""
+    batches = []
+
+    def handler(batch):
+        batches.append(batch)
+        if len(batches) == 1:
+            raise RuntimeError('boom')
+
+    batcher = MicroBatcher(handler, batch_size=1)
+    batcher.add('a')
+    batcher.add('b')
+    batcher.close(timeout=5)
+    assert batches == [['a'], ['b']]
+
+
+@pytest.mark.parametrize('shared', [True, False])
+def test_pool_batches_frames_across_sessions(shared):
+    """Test that frames of several sessions are extracted as one batch and scattered back."""
+    pool = ExtractorPool('marker', workers=1, max_inflight=4, shared_memory=shared, batch_size=4,
+                         max_wait_ms=10_000).start()
+    try:
+        positions = {'a': (100, 120), 'b': (300, 200)}
+        futures = {(session, i): pool.submit(session, draw_markers({'right': position}))
+                   for i in range(2) for session, position in positions.items()}
+        for (session, _), future in futures.items():
+            np.testing.assert_allclose(future.result(timeout=30)['hands']['right'][WRIST, :2],
+                                       positions[session], atol=1)
+
+        assert pool.batch_stats() == {'batches': 1, 'items': 4, 'mean_batch_size': 4.0}
+        for session in positions:
+            stats = pool.stats(session)
+            assert (stats['completed'], stats['inflight']) == (2, 0)
+            assert stats['cpu_seconds'] > 0
+    finally:
+        pool.shutdown(wait=True)
+
+
+def test_partial_batches_pad_to_warmed_up_sizes():
+    """Test that every batch up to a full one pads to a size the workers warm up."""
+    assert [padded_batch_size(n) for n in range(1, 10)] == [1, 2, 4, 4, 8, 8, 8, 8, 16]
+    assert warmup_batch_sizes(1) == (1,)
+    assert warmup_batch_sizes(6) == (1, 2, 4, 8)
+    for batch_size in range(1, 17):
+        assert {padded_batch_size(n) for n in range(1, batch_size + 1)} <= set(warmup_batch_sizes(batch_size))
+
+
+def test_pose_model_batches_match_single_frames():
+    """Test that a batch through the pose model gives the same landmarks as single frames."""
+    pytest.importorskip('tensorflow')
+    pytest.importorskip('mediapipe')
+    from app.vision.extractors import PoseModelExtractor
+
+    extractor = PoseModelExtractor(min_presence=0, min_visibility=0)
+    rng = np.random.default_rng(0)
+    images = [rng.integers(0, 256, (480, 640, 3), dtype=np.uint8),
+              rng.integers(0, 256, (240, 320, 3), dtype=np.uint8),
+              rng.integers(0, 256, (360, 360, 3), dtype=np.uint8)]
+    single = [extractor.process(image) for image in images]
+    batch = extractor.process_batch(images, [None, ('hands',), ('body',)])
+
+    assert batch[1] == {'hands': {}, 'body': None}
+    for i in (0, 2):
+        assert batch[i]['body'].shape == (BODY_LANDMARKS, 3)
+        np.testing.assert_allclose(batch[i]['body'], single[i]['body'], rtol=1e-3, atol=1e-2)
+
+    # Batches of changing size reuse the interpreter allocated for their padded size
+    interpreter = extractor._interpreters[2][0]
+    extractor.process_batch(images, [None] * 3)
+    extractor.process_batch(images + images[:1], [None] * 4)
+    assert set(extractor._interpreters) == {1, 2, 4}
+    assert extractor.process_batch(images[:2], [None, None])[1]['body'] is not None
+    assert extractor._interpreters[2][0] is interpreter
+
+    # Nobody in a blank frame
+    assert PoseModelExtractor().process(np.zeros((480, 640, 3), dtype=np.uint8))['body'] is None
@@ -0,0 +1,151 @@
+"""
+Tests for the boxing damage engine.
+"""
+import numpy as np
+import pytest
+from app import db
+from app.gameplay.boxing import (
+    CROSS, JAB, PUNCH_TYPES, UPPERCUT, BoxingRules, avatar_stats, score_tick, wrist_kinematics
+)
+from app.models.avatar import Avatar
+from app.models.game_session import GameRound, GameSession
+from app.models.user import User
+
+HISTORY = 12
+FRAME_MS = 1000 / 30
+
+
+def stroke_match(direction=None, frames=40, start=10, peak=40.0):
+    """Wrist tracks (2 players, 2 hands, frames, 3) with player 1's left hand punching."""
+    wrists = np.zeros((2, 2, frames, 3), dtype=np.float32)
+    wrists[:, 0] = [400, 400, 0]
+    wrists[:, 1] = [250, 400, 0]
+    if direction is not None:
+        direction = np.asarray(direction, dtype=np.float32) / np.linalg.norm(direction)
+        speeds = peak * np.sin(np.pi * (np.arange(6) + 0.5) / 6)
+        path = np.cumsum(speeds)[:, None] * direction
+        wrists[0, 0, start:start + 6] += path
+        wrists[0, 0, start + 6:] += path[-1]
+    return wrists
+
+
+def play(matches, **kwargs):
+    """Slide a history window over whole tracks of shape (matches, 2, 2, frames, 3), one frame per tick."""
+    frames = matches.shape[3]
+    timestamps = np.arange(frames) * FRAME_MS
+    damage = np.zeros(matches.shape[:2], dtype=np.float32)
+    punches = []
+    for end in range(HISTORY, frames + 1):
+        window = np.broadcast_to(timestamps[end - HISTORY:end], matches.shape[:2] + (HISTORY,))
+        result = score_tick(matches[:, :, :, end - HISTORY:end], window, **kwargs)
+        damage += result['damage']
+        punches.extend(PUNCH_TYPES[code] for code in result['punches'][:, 0, 0] if code)
+    return damage, punches
+
+
+@pytest.mark.parametrize('direction, expected', [
+    ((0, 0, -1), 'jab'),
+    ((-0.8, 0, -0.6), 'cross'),
+    ((0, -0.9, -0.3), 'uppercut'),
+])
+def test_punch_types(direction, expected):
+    """Test that each punch is classified by direction and scored once."""
+    damage, punches = play(stroke_match(direction)[None])
+    assert punches == [expected]
+    assert damage[0, 0] == 0
+    base = BoxingRules().base_damage[PUNCH_TYPES.index(expected)]
+    assert base * 0.9 < damage[0, 1] < base * 1.3
+
+
+def test_retraction_and_slow_moves_do_no_damage():
+    """Test that pulling back or moving slowly is not a punch."""
+    assert play(stroke_match((0, 0, 1))[None])[1] == []
+    assert play(stroke_match((0, 0, -1), peak=15)[None])[1] == []
+
+
+def test_modifiers_and_blocks():
+    """Test avatar stats, speed scaling and blocking."""
+    match = stroke_match((0, 0, -1))[None]
+    base = play(match)[0][0, 1]
+
+    strong = np.array([[[20, 10, 10], [10, 10, 10]]], dtype=np.float32)
+    assert play(match, stats=strong)[0][0, 1] == pytest.approx(2 * base, rel=1e-5)
+    tough = np.array([[[10, 10, 10], [10, 10, 20]]], dtype=np.float32)
+    assert play(match, stats=tough)[0][0, 1] == pytest.approx(base / 2, rel=1e-5)
+    fast = np.array([[[10, 15, 10], [10, 10, 10]]], dtype=np.float32)
+    assert play(match, stats=fast)[0][0, 1] > base
+
+    blocked = play(match, blocking=np.array([[False, True]]))[0][0, 1]
+    assert blocked == pytest.approx(base * BoxingRules().block_factor, rel=1e-5)
+    assert play(stroke_match((0, 0, -1), peak=60)[None])[0][0, 1] > base
+
+
+def test_matches_are_independent():
+    """Test that one vectorized pass equals scoring each match alone."""
+    matches = np.stack([
+        stroke_match((0, 0, -1)), stroke_match(), stroke_match((0, -0.9, -0.3)), stroke_match((-0.8, 0, -0.6))
+    ])
+    damage, punches = play(matches)
+    assert sorted(punches) == ['cross', 'jab', 'uppercut']
+    for i, match in enumerate(matches):
+        np.testing.assert_allclose(damage[i], play(match[None])[0][0], rtol=1e-6)
+
+
+def test_full_landmarks_and_missing_data():
+    """Test (..., 21, 3) input and NaN wrists."""
+    wrists = stroke_match((0, 0, -1))[None, :, :, :HISTORY]
+    hands = np.repeat(wrists[..., None, :], 21, axis=-2)
+    timestamps = np.broadcast_to(np.arange(HISTORY) * FRAME_MS, (1, 2, HISTORY))
+    np.testing.assert_array_equal(score_tick(hands, timestamps)['damage'], score_tick(wrists, timestamps)['damage'])
+
+    hands[:] = np.nan
+    result = score_tick(hands, timestamps)
+    assert not result['damage'].any() and not result['punches'].any()
+
+    with pytest.raises(ValueError):
+        score_tick(wrists[..., :5, :], timestamps[..., :5])
+
+
+def test_kinematics_use_timestamps():
+    """Test finite differences over uneven frame times."""
+    wrists = np.array([[0, 0, 0], [10, 0, 0], [40, 0, 0]], dtype=np.float32)
+    velocity, acceleration = wrist_kinematics(wrists, np.array([0.0, 10.0, 30.0]))
+    np.testing.assert_allclose(velocity[:, 0], [1000, 1500])
+    np.testing.assert_allclose(acceleration[:, 0], [500 / 0.015])
+
+
+def test_avatar_stats_and_round_damage(app):
+    """Test avatar modifiers from the database and applying damage to a round."""
+    with app.app_context():
+        boxer = Avatar.query.filter_by(name='Boxer').first()
+        boxer.strength, boxer.speed, boxer.defense = 15, 12, 8
+        stats = avatar_stats([(boxer, None)])
+        np.testing.assert_array_equal(stats, [[[15, 12, 8], [10, 10, 10]]])
+
+        user = User.query.filter_by(username='testuser').first()
+        session = GameSession(player1_id=user.id, player2_id=user.id)
+        db.session.add(session)
+        db.session.flush()
+        game_round = GameRound(session_id=session.id, round_number=1, status=GameRound.STATUS_ACTIVE)
+        db.session.add(game_round)
+        db.session.flush()
+
+        assert game_round.apply_damage(np.float32(3.6), 0) is False
+        assert game_round.player1_health == pytest.approx(96.4)
+        assert game_round.shown_health == (97, 100)
+
+        # Glancing hits below half a point per tick still add up
+        for _ in range(30):
+            game_round.apply_damage(0.2, 0)
+        assert game_round.player1_health == pytest.approx(90.4)
+        db.session.flush()
+        db.session.refresh(game_round)
+        assert game_round.player1_health == pytest.approx(90.4)
+
+        assert game_round.apply_damage(0, 250) is True
+        assert game_round.player2_health == 0
+        assert game_round.shown_health == (91, 0)
+
+        game_round.status = GameRound.STATUS_COMPLETED
+        assert game_round.apply_damage(10, 10) is False
+        assert game_round.player1_health == pytest.approx(90.4)
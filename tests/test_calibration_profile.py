@@ -0,0 +1,179 @@
+"""
+Tests for calibration profiles and landmark normalization.
+"""
+import numpy as np
+import pytest
+from app import calibrations, socketio
+from app.models.calibration_profile import CalibrationProfile
+from app.models.user import User
+from app.motion import landmarks as lm
+from app.motion.gestures import GestureClassifier
+from app.motion.normalization import (
+    REFERENCE_CENTER, REFERENCE_SHOULDER_WIDTH, LandmarkTransform, measure_body
+)
+from tests.test_gestures import make_body, make_hand
+
+
+def make_arms(body, reach=160.0):
+    """Add straight arms hanging from the shoulders."""
+    body = body.copy()
+    for shoulder, elbow, wrist in ((lm.LEFT_SHOULDER, lm.LEFT_ELBOW, lm.LEFT_WRIST),
+                                   (lm.RIGHT_SHOULDER, lm.RIGHT_ELBOW, lm.RIGHT_WRIST)):
+        body[elbow] = body[shoulder] + [0, reach / 2, 0]
+        body[wrist] = body[shoulder] + [0, reach, 0]
+    return body
+
+
+def test_measure_body():
+    """Test measurements from neutral pose frames, ignoring missing ones."""
+    poses = np.stack([make_arms(make_body())] * 3)
+    poses[0, lm.LEFT_SHOULDER] = np.nan
+    measured = measure_body(poses)
+    assert measured == pytest.approx({'shoulder_width': 100, 'arm_span': 420, 'center_x': 320, 'center_y': 180})
+
+    assert measure_body(make_body()[None])['arm_span'] is None
+    poses[:, lm.LEFT_SHOULDER] = np.nan
+    with pytest.raises(ValueError):
+        measure_body(poses)
+
+
+def test_transform_maps_to_reference_frame():
+    """Test scaling about the shoulder midpoint, reach correction and mirroring."""
+    transform = LandmarkTransform.from_measurements(shoulder_width=80, center_x=100, center_y=50)
+    points = np.array([[100, 50, 0], [140, 50, 0.1], [np.nan, 0, 0]], dtype=np.float32)
+    out = transform.apply(points)
+    assert out.dtype == np.float32
+    np.testing.assert_allclose(out[0], [*REFERENCE_CENTER, 0])
+    np.testing.assert_allclose(out[1], [REFERENCE_CENTER[0] + REFERENCE_SHOULDER_WIDTH / 2, REFERENCE_CENTER[1], 0.2])
+    assert np.isnan(out[2, 0])
+
+    long_arms = LandmarkTransform.from_measurements(shoulder_width=80, arm_span=80 * 8)
+    assert long_arms.scale[1] == pytest.approx(2 / 1.25)
+
+    mirrored = LandmarkTransform.from_measurements(shoulder_width=80, center_x=100, center_y=50, handedness='left')
+    np.testing.assert_allclose(mirrored.apply(points[1]), [REFERENCE_CENTER[0] - REFERENCE_SHOULDER_WIDTH / 2, 240, 0.2])
+
+
+def test_classifier_with_transform():
+    """Test classifying in the reference frame and reporting the player's own sides."""
+    classifier = GestureClassifier()
+    transform = LandmarkTransform.from_measurements(shoulder_width=50, handedness='left')
+
+    # A 10 px swipe is too slow at the player's distance but not in the reference frame
+    hand = make_hand()
+    frames = [hand.tolist(), (hand + [10, 0, 0]).tolist()]
+    assert classifier.classify('a', hands={'left': frames})['hands'] == {'left': ['open_hand', 'open_hand']}
+    result = classifier.classify('b', hands={'left': frames}, transform=transform)
+    assert result == {'hands': {'left': ['open_hand', 'swipe_right']}, 'body': None}
+    assert classifier.recent('b') == {'open_hand', 'swipe_right'}
+
+    # Poses are classified mirrored and reported as the player leaned
+    transform = LandmarkTransform.from_measurements(shoulder_width=REFERENCE_SHOULDER_WIDTH, handedness='left')
+    assert transform.apply(make_body(lean=40))[lm.NOSE, 0] < REFERENCE_CENTER[0]
+    assert classifier.classify('c', body=[make_body(lean=40).tolist()], transform=transform)['body'] == ['lean_right']
+
+
+def test_save_and_get_calibration(client, auth, app):
+    """Test the calibration API."""
+    auth.login()
+    assert client.get('/game/api/get_calibration').status_code == 404
+
+    response = client.post('/game/api/save_calibration', json={
+        'handedness': 'left',
+        'body': [make_arms(make_body()).tolist()] * 2,
+        'motion_range': {'hands': {'left': {'min': {'x': 10, 'y': 20}, 'max': {'x': 300, 'y': 400}}}},
+        'ignored': True,
+    })
+    assert response.status_code == 200
+    calibration = client.get('/game/api/get_calibration').get_json()['calibration']
+    assert calibration['handedness'] == 'left'
+    assert calibration['shoulder_width'] == pytest.approx(100)
+    assert calibration['center'] == pytest.approx({'x': 320, 'y': 180})
+    assert set(calibration['data']) == {'motion_range'}
+
+    # Changing only the handedness keeps the measurements
+    response = client.post('/game/api/save_calibration', json={'handedness': 'right'})
+    assert response.get_json()['calibration']['shoulder_width'] == pytest.approx(100)
+
+    for payload in ({'handedness': 'both'}, {'shoulder_width': -5}, {'shoulder_width': 'wide'},
+                    {'body': [[[0, 0, 0]]]}, {'shoulder_width': 100, 'center': 5}):
+        assert client.post('/game/api/save_calibration', json=payload).status_code == 400
+
+    with app.app_context():
+        assert CalibrationProfile.query.count() == 1
+        assert CalibrationProfile.query.first().handedness == 'right'
+
+
+def test_transforms_are_cached_until_the_profile_changes(app):
+    """Test that a profile is loaded once and reloaded after it is saved."""
+    with app.app_context():
+        from app import db
+        user = User.query.filter_by(username='testuser').first()
+        assert calibrations.get(user.id) is None
+
+        profile = CalibrationProfile.for_user(user)
+        profile.update(measurements={'shoulder_width': 80})
+        db.session.commit()
+        transform = calibrations.get(user.id)
+        assert transform.scale[0] == pytest.approx(2)
+        assert calibrations.get(user.id) is transform
+        assert calibrations.hits == 1
+
+        profile.update(handedness='left')
+        db.session.commit()
+        assert calibrations.get(user.id).mirror
+
+        app.config['CALIBRATION_NORMALIZE'] = False
+        calibrations.init_app(app)
+        assert calibrations.get(user.id) is None
+
+
+def test_motion_frames_use_saved_calibration(client, auth):
+    """Test that streamed landmarks are normalized with the user's profile."""
+    auth.login()
+    socket = socketio.test_client(client.application, flask_test_client=client)
+    hand = make_hand()
+    frames = {'right': [hand.tolist(), (hand + [10, 0, 0]).tolist()]}
+
+    def gestures():
+        received = {event['name']: event['args'][0] for event in socket.get_received()}
+        return received['motion_gestures']['hands']
+
+    socket.emit('motion_frames', {'hands': frames})
+    assert gestures() == {'right': ['open_hand', 'open_hand']}
+
+    client.post('/game/api/save_calibration', json={'shoulder_width': 50})
+    socket.emit('motion_frames', {'hands': frames})
+    assert gestures() == {'right': ['open_hand', 'swipe_right']}
+    socket.disconnect()
+
+
+def test_server_tracked_pose_measures_the_profile(app, client, auth):
+    """Test that body landmarks sent back while calibrating are enough to measure the player."""
+    from app.routes.game import _server_landmarks_handler
+
+    auth.login()
+    socket = socketio.test_client(app, flask_test_client=client)
+    socket.get_received()
+    sid = socketio.server.manager.sid_from_eio_sid(socket.eio_sid, '/')
+
+    body = make_arms(make_body())
+    body[lm.NOSE] = np.nan
+    handler = _server_landmarks_handler(app, 1, None, send_body=True)
+    handler(sid, {'hands': {}, 'body': body}, 0.5)
+    sent = [e['args'][0] for e in socket.get_received() if e['name'] == 'vision_body']
+    assert sent[0]['timestamp'] == 0.5 and sent[0]['body'][lm.NOSE] == [None, None, None]
+
+    response = client.post('/game/api/save_calibration', json={
+        'body': [event['body'] for event in sent],
+        'motion_range': {'hands': {'min': {'x': 10, 'y': 20}, 'max': {'x': 300, 'y': 400}}, 'body': None},
+        'thresholds': {'pixelDifference': 30, 'motionPercentage': 0.5},
+    })
+    calibration = response.get_json()['calibration']
+    assert calibration['shoulder_width'] == pytest.approx(100)
+    assert set(calibration['data']) == {'motion_range', 'thresholds'}
+
+    # Without the calibrate flag nothing is sent back
+    _server_landmarks_handler(app, 1, None)(sid, {'hands': {}, 'body': body}, 1.0)
+    assert all(e['name'] != 'vision_body' for e in socket.get_received())
+    socket.disconnect()
@@ -197,3 +197,172 @@ def test_error_handlers_500():
     # because Flask's test client catches the exception
     # Just check that the app has a 500 error handler
     assert app.error_handler_spec[None][500] is not None
+
+
+def test_schema_mode_skip():
+    """Test that SCHEMA_MODE 'skip' leaves the schema to migrations."""
+    class SkipSchemaConfig(TestingConfig):
+        SCHEMA_MODE = 'skip'
+
+    app = create_app(SkipSchemaConfig)
+    with app.app_context():
+        assert db.inspect(db.engine).get_table_names() == []
+
+
+def test_schema_mode_check_creates_missing_tables():
+    """Test that SCHEMA_MODE 'check' only creates tables when some are missing."""
+    from app import init_schema
+
+    app = create_app(TestingConfig)
+    with app.app_context():
+        assert 'users' in db.inspect(db.engine).get_table_names()
+
+        # A second check finds everything in place and is a no-op
+        init_schema(app)
+        assert 'users' in db.inspect(db.engine).get_table_names()
+
+
+def test_schema_mode_check_adds_missing_columns(tmp_path):
+    """Test that SCHEMA_MODE 'check' adds columns a database from before a model change lacks."""
+    import sqlite3
+    from app.models.user import User
+
+    path = tmp_path / 'old.db'
+    with sqlite3.connect(path) as connection:
+        connection.execute('CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR(64) NOT NULL, '
+                           'email VARCHAR(120) NOT NULL, password_hash VARCHAR(128) NOT NULL, created_at DATETIME, '
+                           'last_seen DATETIME, avatar_id INTEGER, wins INTEGER, losses INTEGER, draws INTEGER)')
+        connection.execute("INSERT INTO users (username, email, password_hash, wins, losses, draws) "
+                           "VALUES ('old', 'old@example.com', 'x', 0, 0, 0)")
+
+    class OldDatabaseConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+
+    app = create_app(OldDatabaseConfig)
+    with app.app_context():
+        user = User.query.filter_by(username='old').one()
+        assert (user.rating, user.rating_deviation, user.rating_volatility) == (1500.0, 350.0, 0.06)
+        assert 'ix_users_rating' in {index['name'] for index in db.inspect(db.engine).get_indexes('users')}
+
+    # Running the check again finds nothing to add
+    create_app(OldDatabaseConfig)
+
+
+def test_schema_mode_invalid():
+    """Test that an unknown SCHEMA_MODE is rejected."""
+    class BadSchemaConfig(TestingConfig):
+        SCHEMA_MODE = 'bogus'
+
+    import pytest
+    with pytest.raises(ValueError):
+        create_app(BadSchemaConfig)
+
+
+def test_auto_login_admin_created_on_first_request(tmp_path):
+    """Test that the auto-login admin is created lazily by the first request."""
+    class AutoLoginConfig(TestingConfig):
+        AUTO_LOGIN_ENABLED = True
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{tmp_path / "auto.db"}'
+
+    from app.models.user import User
+
+    app = create_app(AutoLoginConfig)
+    with app.app_context():
+        assert User.query.filter_by(username='admin').first() is None
+
+    with app.test_client() as client:
+        response = client.get('/')
+        assert response.status_code == 200
+        with client.session_transaction() as sess:
+            assert '_user_id' in sess
+
+    with app.app_context():
+        assert User.query.filter_by(username='admin').first() is not None
+
+
+def test_startup_does_not_import_heavy_modules():
+    """Test that creating the app never imports the CV/ML stacks."""
+    import subprocess
+    import sys
+
+    code = (
+        "import sys\n"
+        "from app import create_app\n"
+        "from app.utils.lazy_import import HEAVY_MODULES\n"
+        "from config import TestingConfig\n"
+        "create_app(TestingConfig)\n"
+        "print(','.join(m for m in HEAVY_MODULES if m in sys.modules))\n"
+    )
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == ''
+
+
+def test_lazy_module():
+    """Test that lazy modules import on first attribute access."""
+    from app.utils.lazy_import import lazy_module, is_available
+
+    module = lazy_module('json')
+    assert not module.loaded
+    assert module.dumps([1]) == '[1]'
+    assert module.loaded
+
+    assert is_available('json')
+    assert not is_available('module_that_does_not_exist')
+
+
+def test_auto_login_admin_identity_is_cached(tmp_path):
+    """Test that cookieless requests reuse the cached admin without querying."""
+    class AutoLoginConfig(TestingConfig):
+        AUTO_LOGIN_ENABLED = True
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{tmp_path / "cached.db"}'
+
+    from app.models.user import User
+
+    app = create_app(AutoLoginConfig)
+    cache = app.extensions['auto_login']
+
+    statements = []
+    with app.app_context():
+        db.event.listen(db.engine, 'before_cursor_execute',
+                        lambda conn, cursor, statement, *args: statements.append(statement))
+
+    client = app.test_client(use_cookies=False)
+    client.get('/about')
+    assert cache.resolves == 1
+
+    statements.clear()
+    for _ in range(3):
+        assert client.get('/about').status_code == 200
+    assert cache.resolves == 1
+    assert cache.hits == 3
+    assert not [s for s in statements if 'FROM users' in s]
+
+    # Changing the admin row invalidates the cached identity
+    with app.app_context():
+        admin = User.query.filter_by(username='admin').first()
+        admin.wins = 1
+        db.session.commit()
+    client.get('/about')
+    assert cache.resolves == 2
+
+    # Explicit invalidation works too
+    cache.invalidate()
+    client.get('/about')
+    assert cache.resolves == 3
+
+
+def test_auto_login_skipped_with_session(tmp_path):
+    """Test that requests carrying a login session never touch the cache."""
+    class AutoLoginConfig(TestingConfig):
+        AUTO_LOGIN_ENABLED = True
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{tmp_path / "session.db"}'
+
+    app = create_app(AutoLoginConfig)
+    cache = app.extensions['auto_login']
+
+    with app.test_client() as client:
+        client.get('/about')
+        client.get('/about')
+        client.get('/about')
+    assert cache.resolves == 1
+    assert cache.hits == 0
@@ -0,0 +1,71 @@
+"""
+Tests for the shared-memory frame ring.
+"""
+import multiprocessing
+import numpy as np
+import pytest
+from app.vision.ring import FrameRing
+
+
+def frame(value, height=4, width=6):
+    return np.full((height, width, 3), value, dtype=np.uint8)
+
+
+@pytest.fixture
+def ring():
+    ring = FrameRing(3, 4, 6)
+    yield ring
+    ring.close()
+
+
+def test_write_and_read(ring):
+    """Test that a written frame reads back as a view of the slot."""
+    slot, sequence = ring.write(frame(7), timestamp=12.5)
+    view, timestamp = ring.read(slot, sequence)
+    np.testing.assert_array_equal(view, frame(7))
+    assert timestamp == 12.5
+    assert ring.sequence(slot) == sequence
+    assert sequence % 2 == 0
+
+    # Smaller frames keep their own shape
+    slot, sequence = ring.write(frame(9, 2, 3))
+    assert ring.read(slot, sequence)[0].shape == (2, 3, 3)
+
+
+def test_overwritten_frames_are_stale(ring):
+    """Test that a slot reused by a newer frame no longer returns the old one."""
+    written = [ring.write(frame(i)) for i in range(4)]
+    assert written[0][0] == written[3][0]
+    assert ring.read(*written[0]) is None
+    np.testing.assert_array_equal(ring.read(*written[3])[0], frame(3))
+    np.testing.assert_array_equal(ring.read(*written[1])[0], frame(1))
+
+
+def test_fits(ring):
+    """Test rejecting frames larger than a slot."""
+    assert ring.fits(frame(0, 4, 6))
+    assert not ring.fits(frame(0, 5, 6))
+    assert not ring.fits(np.zeros((4, 6, 4), dtype=np.uint8))
+    with pytest.raises(ValueError):
+        ring.write(frame(0, 4, 7))
+
+
+def _read_in_child(spec, slot, sequence, results):
+    ring = FrameRing.attach(*spec)
+    found = ring.read(slot, sequence)
+    results.put(None if found is None else int(found[0].sum()))
+    del found
+    ring.close()
+
+
+def test_attach_from_another_process(ring):
+    """Test that another process reads the frame without it being sent."""
+    slot, sequence = ring.write(frame(2))
+    results = multiprocessing.Queue()
+    child = multiprocessing.Process(target=_read_in_child, args=(ring.spec(), slot, sequence, results))
+    child.start()
+    assert results.get(timeout=30) == 2 * 4 * 6 * 3
+    child.join()
+
+    # Closing an attached ring leaves the owner's block in place
+    assert ring.read(slot, sequence) is not None
@@ -0,0 +1,99 @@
+"""
+Tests for pre-rendered results pages of completed sessions.
+"""
+from app import db
+from app.models.user import User
+from app.models.game_session import GameSession
+from app.models.game_result import GameResult
+
+
+def _session(app, complete=True):
+    with app.app_context():
+        player1 = User.query.filter_by(username='testuser').first()
+        player2 = User.query.filter_by(username='admin').first()
+        session = GameSession(player1_id=player1.id, player2_id=player2.id,
+                              player1_score=3, player2_score=1)
+        db.session.add(session)
+        db.session.commit()
+        session.start_session()
+        if complete:
+            session.end_session(player1.id)
+        return session.id
+
+
+def test_end_session_publishes_result(app):
+    """Test that completing a session stores its rendered summary."""
+    session_id = _session(app)
+    with app.app_context():
+        result = GameResult.query.get(session_id)
+        assert result is not None
+        assert result.is_current
+        assert f'Session #{session_id}'.encode() in result.body.encode()
+        assert 'Player 1 wins!' in result.body
+
+
+def test_completed_results_are_served_from_store(client, auth, app):
+    """Test that completed sessions are served with an ETag and revalidated."""
+    session_id = _session(app)
+    auth.login()
+
+    response = client.get(f'/game/results/{session_id}')
+    assert response.status_code == 200
+    assert b'Game Results' in response.data
+    assert b'Player 1 wins!' in response.data
+    assert b'Welcome, testuser' in response.data
+    assert response.headers['ETag']
+    assert response.cache_control.private
+    assert response.cache_control.max_age == app.config['RESULTS_CACHE_MAX_AGE']
+
+    etag = response.headers['ETag']
+    response = client.get(f'/game/results/{session_id}', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+
+    # The stored summary is served even if the row changes underneath it
+    with app.app_context():
+        GameSession.query.get(session_id).player1_score = 99
+        db.session.commit()
+    response = client.get(f'/game/results/{session_id}')
+    assert response.headers['ETag'] == etag
+    assert b'>99<' not in response.data
+
+
+def test_etag_is_per_user(client, auth, app):
+    """Test that each user gets their own ETag for the same results."""
+    session_id = _session(app)
+    auth.login()
+    first = client.get(f'/game/results/{session_id}').headers['ETag']
+    auth.logout()
+    auth.login('admin', 'password')
+    second = client.get(f'/game/results/{session_id}').headers['ETag']
+    assert first != second
+
+
+def test_active_sessions_render_live(client, auth, app):
+    """Test that non-completed sessions are rendered live without caching."""
+    session_id = _session(app, complete=False)
+    auth.login()
+
+    response = client.get(f'/game/results/{session_id}')
+    assert response.status_code == 200
+    assert 'ETag' not in response.headers
+    with app.app_context():
+        assert GameResult.query.get(session_id) is None
+
+
+def test_stale_results_are_republished(client, auth, app):
+    """Test that results from another deploy are rendered again on view."""
+    session_id = _session(app)
+    with app.app_context():
+        result = GameResult.query.get(session_id)
+        result.version = 'old-release'
+        result.body = 'stale'
+        db.session.commit()
+
+    auth.login()
+    response = client.get(f'/game/results/{session_id}')
+    assert b'stale' not in response.data
+    with app.app_context():
+        assert GameResult.query.get(session_id).is_current
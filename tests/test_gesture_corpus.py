@@ -0,0 +1,95 @@
+"""
+Tests for the gesture corpus, synthetic generators and scoring.
+"""
+import numpy as np
+import pytest
+from app.motion.corpus import GestureSequence, load_corpus, save_corpus
+from app.motion.evaluation import GestureScore, evaluate_sequences, gesture_events, score_track
+from app.motion.gestures import HAND_GESTURES, GestureThresholds
+from app.motion.synthetic import SYNTHETIC_GESTURES, synthetic_corpus, synthetic_sequence
+
+PUNCH = HAND_GESTURES.index('punch')
+FIST = HAND_GESTURES.index('fist')
+
+
+def test_sequence_round_trip(tmp_path):
+    """Test saving and loading a corpus directory."""
+    sequences = synthetic_corpus(per_gesture=1, seed=3, dropout=0.1)
+    paths = save_corpus(sequences, tmp_path / 'corpus')
+    assert len(paths) == len(SYNTHETIC_GESTURES)
+
+    loaded = load_corpus(tmp_path / 'corpus')
+    assert [s.name for s in loaded] == list(SYNTHETIC_GESTURES)
+    for original, copy in zip(sequences, loaded):
+        np.testing.assert_array_equal(copy.hands, original.hands)
+        np.testing.assert_array_equal(copy.hand_labels, original.hand_labels)
+        np.testing.assert_array_equal(copy.body, original.body)
+        np.testing.assert_array_equal(copy.timestamps, original.timestamps)
+    assert len(load_corpus(paths[0])) == 1
+
+
+def test_labels_survive_vocabulary_changes(tmp_path, monkeypatch):
+    """Test that stored label names, not codes, decide the loaded labels."""
+    sequence = synthetic_sequence('punch', np.random.default_rng(0))
+    sequence.save(tmp_path / 'punch.npz')
+
+    reordered = tuple(reversed(HAND_GESTURES[1:])) + (None,)
+    monkeypatch.setattr('app.motion.corpus.HAND_GESTURES', reordered)
+    loaded = GestureSequence.load(tmp_path / 'punch.npz')
+    assert {reordered[c] for c in np.unique(loaded.hand_labels)} == \
+        {HAND_GESTURES[c] for c in np.unique(sequence.hand_labels)}
+
+
+def test_invalid_sequences(tmp_path):
+    """Test that misshapen sequences and foreign files are rejected."""
+    with pytest.raises(ValueError):
+        GestureSequence(np.zeros((3, 1, 21, 3)), np.zeros((3, 1)))
+    with pytest.raises(ValueError):
+        GestureSequence(np.zeros((3, 2, 21, 3)), np.zeros((3, 2)), body=np.zeros((2, 33, 3)))
+
+    np.savez(tmp_path / 'other.npz', values=np.zeros(3))
+    with pytest.raises(ValueError):
+        GestureSequence.load(tmp_path / 'other.npz')
+
+
+@pytest.mark.parametrize('gesture', SYNTHETIC_GESTURES)
+def test_clean_synthetic_gestures_are_detected(gesture):
+    """Test that noiseless synthetic gestures score perfectly."""
+    sequences = [synthetic_sequence(gesture, np.random.default_rng(seed), noise=0) for seed in range(5)]
+    report = evaluate_sequences(sequences)
+    score = report['hands'][gesture]
+    assert score.events == 5
+    assert score.recall == 1.0 and score.precision == 1.0
+    assert report['body']['stand'].recall == 1.0
+    assert report['frames'] == sum(len(s) for s in sequences)
+
+
+def test_thresholds_change_the_score():
+    """Test that the harness reflects threshold changes."""
+    sequences = [synthetic_sequence('punch', np.random.default_rng(seed), noise=0) for seed in range(5)]
+    strict = evaluate_sequences(sequences, GestureThresholds(punch_velocity=100))
+    assert strict['hands']['punch'].recall == 0.0
+
+
+def test_gesture_events():
+    """Test splitting codes into labeled runs."""
+    assert gesture_events([0, 8, 8, 1, 1, 8, 0, 0]) == [(8, 1, 3), (1, 3, 5), (8, 5, 6)]
+    assert gesture_events([]) == []
+
+
+def test_score_track():
+    """Test event matching, latency, false positives and unlabeled frames."""
+    truth = [FIST] * 4 + [PUNCH] * 4 + [FIST] * 4 + [0] * 4
+    predicted = [FIST] * 6 + [PUNCH] * 2 + [FIST] * 3 + [PUNCH, FIST] + [PUNCH] * 3
+    scores = {}
+    score_track(truth, predicted, scores)
+
+    punch = scores[PUNCH]
+    assert (punch.events, punch.detected, punch.latencies) == (1, 1, [2])
+    # The run at 11 is past the tolerance; the run in unlabeled frames is ignored
+    assert (punch.predicted, punch.false_positives) == (2, 1)
+    assert punch.precision == 0.5 and punch.recall == 1.0
+    assert scores[FIST].recall == 1.0
+
+    empty = GestureScore()
+    assert empty.precision is None and empty.recall is None and empty.latency() is None
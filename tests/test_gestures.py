@@ -0,0 +1,176 @@
+"""
+Tests for the server-side gesture classifier.
+"""
+import numpy as np
+import pytest
+from app import socketio, gestures
+from app.motion import landmarks as lm
+from app.motion.gestures import (
+    BODY_POSES, GestureClassifier, classify_body, classify_hand_sequence,
+    classify_hands, finger_masks, gesture_names
+)
+
+
+def make_hand(extended=(True,) * 5, wrist=(320.0, 400.0, 0.0)):
+    """Build hand landmarks pointing up, with the given fingers extended."""
+    hand = np.full((lm.HAND_LANDMARKS, 3), np.nan, dtype=np.float32)
+    hand[lm.WRIST] = wrist
+    for i, (base, tip) in enumerate(zip(lm.FINGER_BASES, lm.FINGER_TIPS)):
+        hand[base] = hand[lm.WRIST] + [(i - 2) * 20, -60, 0]
+        # Curled fingers end just past their base, short of the length threshold
+        hand[tip] = hand[base] + ([0, -70, 0] if extended[i] else [0, 10, 0])
+    return hand
+
+
+def make_body(lean=0.0, crouch=False):
+    """Build body landmarks for a standing, leaning or crouching player."""
+    body = np.full((lm.BODY_LANDMARKS, 3), np.nan, dtype=np.float32)
+    body[lm.NOSE] = [320 + lean, 100, 0]
+    body[lm.LEFT_SHOULDER] = [370 + lean, 180, 0]
+    body[lm.RIGHT_SHOULDER] = [270 + lean, 180, 0]
+    body[lm.LEFT_HIP] = [350, 380, 0]
+    body[lm.RIGHT_HIP] = [290, 380, 0]
+    knee_y = 460 if crouch else 420
+    body[lm.LEFT_KNEE] = [350, knee_y, 0]
+    body[lm.RIGHT_KNEE] = [290, knee_y, 0]
+    return body
+
+
+STATIC_CASES = [
+    ((True, True, True, True, True), 'open_hand'),
+    ((False, False, False, False, False), 'fist'),
+    ((False, True, False, False, False), 'point'),
+    ((False, True, True, False, False), 'peace'),
+    ((True, False, True, False, True), None),
+]
+
+
+@pytest.mark.parametrize('extended, expected', STATIC_CASES)
+def test_static_hand_gestures(extended, expected):
+    """Test finger-based gestures with a still hand."""
+    hand = make_hand(extended)
+    assert finger_masks(hand) == sum(1 << i for i, e in enumerate(extended) if e)
+    assert gesture_names(classify_hands(hand, np.zeros(3))) == expected
+
+
+def test_pinch_uses_js_threshold():
+    """Test that pinch fires below the 0.05 thumb-to-index distance."""
+    hand = make_hand()
+    hand[lm.THUMB_TIP] = hand[lm.INDEX_TIP] + [0.01, 0, 0]
+    assert gesture_names(classify_hands(hand, np.zeros(3))) == 'pinch'
+    hand[lm.THUMB_TIP] = hand[lm.INDEX_TIP] + [0.06, 0, 0]
+    assert gesture_names(classify_hands(hand, np.zeros(3))) != 'pinch'
+
+
+def test_motion_gestures():
+    """Test punch, block and swipe from wrist velocity across frames."""
+    fist = make_hand((False,) * 5)
+    open_hand = make_hand()
+    frames = np.stack([
+        fist,
+        fist - [0, 0, 30],        # forward, faster than 25
+        fist - [0, 0, 50],        # forward, only 20
+        open_hand,
+        open_hand - [0, 12, 0],   # upward, faster than 10
+        open_hand + [20, -12, 0],  # mostly right, faster than 15
+        open_hand,                 # mostly left
+    ]).astype(np.float32)
+
+    assert gesture_names(classify_hand_sequence(frames)) == [
+        'fist', 'punch', 'fist', 'open_hand', 'block', 'swipe_right', 'swipe_left'
+    ]
+
+
+def test_velocity_carries_across_batches():
+    """Test that the previous frame gives the first frame of a batch its velocity."""
+    fist = make_hand((False,) * 5)
+    batch = np.stack([fist - [0, 0, 30]])
+    assert gesture_names(classify_hand_sequence(batch)) == ['fist']
+    assert gesture_names(classify_hand_sequence(batch, previous=fist)) == ['punch']
+
+
+def test_batched_matches_per_player():
+    """Test that frames x players batches classify like each stream alone."""
+    rng = np.random.default_rng(0)
+    players = [make_hand(tuple(rng.random(5) > 0.5)) for _ in range(6)]
+    frames = np.stack([np.stack(players) + rng.normal(0, 20, (6, 1, 3)) for _ in range(10)]).astype(np.float32)
+
+    batched = classify_hand_sequence(frames)
+    assert batched.shape == (10, 6)
+    for p in range(6):
+        np.testing.assert_array_equal(batched[:, p], classify_hand_sequence(frames[:, p]))
+
+
+def test_missing_wrist_detects_nothing():
+    """Test that a hand without a wrist is not classified."""
+    hand = make_hand()
+    hand[lm.WRIST] = np.nan
+    assert gesture_names(classify_hands(hand, np.zeros(3))) is None
+
+
+def test_body_poses():
+    """Test stand, lean and crouch detection."""
+    poses = np.stack([make_body(), make_body(lean=-40), make_body(lean=40), make_body(crouch=True)])
+    assert gesture_names(classify_body(poses), BODY_POSES) == ['stand', 'lean_left', 'lean_right', 'crouch']
+
+    missing = make_body()
+    missing[lm.LEFT_HIP] = np.nan
+    assert gesture_names(classify_body(missing), BODY_POSES) is None
+
+
+def test_classifier_streams():
+    """Test per-stream state and payload validation."""
+    classifier = GestureClassifier()
+    fist = make_hand((False,) * 5)
+    classifier.classify('a', hands={'right': [fist.tolist()]})
+    result = classifier.classify('a', hands={'right': [(fist - [0, 0, 30]).tolist()]}, body=[make_body().tolist()])
+    assert result == {'hands': {'right': ['punch']}, 'body': ['stand']}
+    assert classifier.recent('a') == {'punch', 'stand'}
+
+    # Streams do not share state
+    result = classifier.classify('b', hands={'right': [(fist - [0, 0, 30]).tolist()]})
+    assert result['hands']['right'] == ['fist']
+
+    classifier.forget('a')
+    assert classifier.recent('a') == set()
+
+    with pytest.raises(ValueError):
+        classifier.classify('a', hands={'right': [[[0, 0, 0]] * 5]})
+    with pytest.raises(ValueError):
+        classifier.classify('a', hands=[fist.tolist()])
+    # Arbitrary hand names would each keep their own state
+    with pytest.raises(ValueError):
+        classifier.classify('a', hands={'third': [fist.tolist()]})
+    classifier.max_frames = 1
+    with pytest.raises(ValueError):
+        classifier.classify('a', hands={'right': [fist.tolist()] * 2})
+
+
+def test_motion_frames_socket_event(client, auth):
+    """Test classifying streamed landmarks over the socket."""
+    auth.login()
+    socket = socketio.test_client(client.application, flask_test_client=client)
+
+    fist = make_hand((False,) * 5)
+    hand = [fist.tolist(), (fist - [0, 0, 30]).tolist()]
+    hand[0][lm.PINKY_TIP] = [None, None, None]
+    socket.emit('motion_frames', {'hands': {'right': hand}, 'body': [make_body().tolist()] * 2})
+
+    received = {event['name']: event['args'][0] for event in socket.get_received()}
+    assert received['motion_gestures']['hands'] == {'right': ['fist', 'punch']}
+    assert received['motion_gestures']['body'] == ['stand', 'stand']
+
+    # Game actions are flagged when they match what the server saw
+    socket.emit('join_game', {'session_id': 'room-1'})
+    socket.emit('game_action', {'session_id': 'room-1', 'action_type': 'punch'})
+    socket.emit('game_action', {'session_id': 'room-1', 'action_type': 'block'})
+    actions = [e['args'][0] for e in socket.get_received() if e['name'] == 'game_action']
+    assert [a['verified'] for a in actions] == [True, False]
+
+    socket.emit('motion_frames', {'hands': {'right': [[1, 2, 3]]}})
+    assert socket.get_received()[0]['name'] == 'motion_error'
+
+    sid = socketio.server.manager.sid_from_eio_sid(socket.eio_sid, '/')
+    assert gestures.recent(sid) == {'fist', 'punch', 'stand'}
+    socket.disconnect()
+    assert gestures.recent(sid) == set()
@@ -0,0 +1,116 @@
+"""
+Tests for the bounded password hashing pool.
+"""
+import threading
+import pytest
+from app import create_app, db, hasher, bcrypt
+from app.models.user import User
+from app.utils.hashing import HashingPoolSaturated, bcrypt_cost
+from config import TestingConfig
+
+
+def test_bcrypt_cost():
+    """Test extracting the work factor from a bcrypt hash."""
+    pw_hash = bcrypt.generate_password_hash('password', 5)
+    assert bcrypt_cost(pw_hash) == 5
+    assert bcrypt_cost(pw_hash.decode('utf-8')) == 5
+    assert bcrypt_cost('not-a-hash') is None
+    assert bcrypt_cost(None) is None
+
+
+@pytest.mark.parametrize('mode', ['inline', 'thread'])
+def test_hash_and_check(mode):
+    """Test hashing and checking passwords in each pool mode."""
+    class PoolConfig(TestingConfig):
+        PASSWORD_HASH_POOL = mode
+        BCRYPT_LOG_ROUNDS = 4
+
+    create_app(PoolConfig)
+    assert hasher.mode == mode
+
+    pw_hash = hasher.hash_password('password')
+    assert bcrypt_cost(pw_hash) == 4
+    assert hasher.check_password(pw_hash, 'password')
+    assert not hasher.check_password(pw_hash, 'wrong')
+    assert not hasher.needs_rehash(pw_hash)
+
+
+def test_invalid_pool_mode():
+    """Test that an unknown pool mode is rejected."""
+    class BadPoolConfig(TestingConfig):
+        PASSWORD_HASH_POOL = 'gpu'
+
+    with pytest.raises(ValueError):
+        create_app(BadPoolConfig)
+
+
+def test_saturated_pool_rejects_with_503(app, client):
+    """Test that a full pool fails fast and login answers 503."""
+    release = threading.Event()
+    started = threading.Event()
+    hasher.max_pending = 0
+    hasher._slots = threading.BoundedSemaphore(hasher.workers)
+
+    def occupy():
+        started.set()
+        release.wait(5)
+
+    blockers = [threading.Thread(target=hasher._run, args=(occupy,)) for _ in range(hasher.workers)]
+    for blocker in blockers:
+        blocker.start()
+    started.wait(5)
+    try:
+        rejected = hasher.rejected
+        with pytest.raises(HashingPoolSaturated):
+            hasher.hash_password('password')
+        assert hasher.rejected == rejected + 1
+
+        response = client.post('/auth/login', data={'username': 'testuser', 'password': 'password'})
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '1'
+    finally:
+        release.set()
+        for blocker in blockers:
+            blocker.join()
+
+
+def test_slow_jobs_time_out_with_503_and_keep_their_slots(app, client):
+    """Test that a timed-out job answers 503 and holds its slot until it really finishes."""
+    release = threading.Event()
+    hasher.max_pending = 0
+    hasher.timeout = 0.05
+    hasher._slots = threading.BoundedSemaphore(1)
+
+    try:
+        timed_out = hasher.timed_out
+        with pytest.raises(HashingPoolSaturated):
+            hasher._run(release.wait, 5)
+        assert hasher.timed_out == timed_out + 1
+
+        # The abandoned job still runs, so there is no room for another one
+        response = client.post('/auth/login', data={'username': 'testuser', 'password': 'password'})
+        assert response.status_code == 503
+    finally:
+        release.set()
+
+    # Finishing frees the slot
+    assert hasher._slots.acquire(timeout=5)
+    hasher._slots.release()
+    hasher.timeout = 5
+    assert hasher.check_password(bcrypt.generate_password_hash('password', 4), 'password')
+
+
+def test_login_rehashes_old_work_factor(app, auth):
+    """Test that logging in upgrades a hash created with a different work factor."""
+    with app.app_context():
+        user = User.query.filter_by(username='testuser').first()
+        user.password_hash = bcrypt.generate_password_hash('password', 4).decode('utf-8')
+        db.session.commit()
+
+    response = auth.login()
+    assert response.status_code == 302
+
+    with app.app_context():
+        user = User.query.filter_by(username='testuser').first()
+        assert bcrypt_cost(user.password_hash) == hasher.log_rounds
+        assert bcrypt.check_password_hash(user.password_hash, 'password')
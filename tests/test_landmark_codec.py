@@ -0,0 +1,100 @@
+"""
+Tests for the binary landmark frame codec.
+"""
+import numpy as np
+import pytest
+from app import socketio
+from app.motion import codec
+from app.motion.codec import FrameFormatError, decode_frames, dequantize, encode_frames
+from tests.test_gestures import make_body, make_hand
+
+
+@pytest.mark.parametrize('encoding, tolerance', [(codec.ENCODING_FLOAT16, 0.25), (codec.ENCODING_INT16, 0.02)])
+def test_round_trip(encoding, tolerance):
+    """Test that frames survive encoding within the format's precision."""
+    rng = np.random.default_rng(0)
+    landmarks = rng.uniform(-320, 640, (5, 2, 21, 3)).astype(np.float32)
+    landmarks[1, 0] = np.nan
+
+    message = encode_frames(landmarks, codec.KIND_HAND, seq=7, timestamps=np.arange(5) * 33.0, encoding=encoding)
+    assert len(message) == 5 * (codec.HEADER_SIZE + 2 * 21 * 3 * 2)
+
+    records = decode_frames(message, kind=codec.KIND_HAND)
+    assert records['seq'].tolist() == [7, 8, 9, 10, 11]
+    assert records['timestamp'].tolist() == [0, 33, 66, 99, 132]
+
+    decoded = dequantize(records)
+    assert decoded.dtype == np.float32
+    np.testing.assert_array_equal(np.isnan(decoded), np.isnan(landmarks))
+    assert np.nanmax(np.abs(decoded - landmarks)) <= tolerance
+
+
+def test_single_set_and_output_buffer():
+    """Test encoding (frames, points, 3) and dequantizing into a given array."""
+    body = np.stack([make_body()] * 3)
+    records = decode_frames(encode_frames(body, codec.KIND_BODY, encoding=codec.ENCODING_INT16))
+    out = np.empty((3, 1, 33, 3), dtype=np.float32)
+    assert dequantize(records, out) is out
+    np.testing.assert_allclose(out[:, 0], body, atol=0.01)
+
+
+def test_decode_is_zero_copy():
+    """Test that decoded landmarks view the received buffer."""
+    buffer = bytearray(encode_frames(np.zeros((2, 21, 3)), codec.KIND_HAND))
+    records = decode_frames(buffer)
+    assert np.shares_memory(records, np.frombuffer(buffer, dtype=np.uint8))
+
+
+def test_malformed_messages():
+    """Test that invalid headers and sizes are rejected."""
+    message = encode_frames(np.zeros((2, 21, 3)), codec.KIND_HAND)
+    body = encode_frames(np.zeros((1, 33, 3)), codec.KIND_BODY)
+
+    with pytest.raises(FrameFormatError):
+        decode_frames(message[:10])
+    with pytest.raises(FrameFormatError):
+        decode_frames(message[:-1])
+    with pytest.raises(FrameFormatError):
+        decode_frames(b'\x02' + message[1:])
+    with pytest.raises(FrameFormatError):
+        decode_frames(message, kind=codec.KIND_BODY)
+    with pytest.raises(FrameFormatError):
+        decode_frames(b'\x01\x01\x09\x01' + message[4:])
+    # Frames of one message share a layout
+    half = len(message) // 2
+    with pytest.raises(FrameFormatError):
+        decode_frames(message[:half] + b'\x01\x01\x02' + message[half + 3:])
+    with pytest.raises(FrameFormatError):
+        encode_frames(np.zeros((1, 21, 3)), codec.KIND_BODY)
+    # Text and other objects are not messages
+    for payload in ('frames', None, [1, 2, 3], np.zeros(64)[::2]):
+        with pytest.raises(FrameFormatError):
+            decode_frames(payload)
+    assert len(decode_frames(body)) == 1
+    assert len(decode_frames(np.frombuffer(body, dtype=np.uint16))) == 1
+
+
+def test_motion_frames_binary_socket_event(client, auth):
+    """Test classifying binary landmark frames over the socket."""
+    auth.login()
+    socket = socketio.test_client(client.application, flask_test_client=client)
+
+    fist = make_hand((False,) * 5)
+    hands = np.full((2, 2, 21, 3), np.nan, dtype=np.float32)
+    hands[:, 1] = [fist, fist - [0, 0, 30]]
+    socket.emit('motion_frames_binary', {
+        'hands': encode_frames(hands, codec.KIND_HAND, seq=41),
+        'body': encode_frames(np.stack([make_body()] * 2), codec.KIND_BODY, encoding=codec.ENCODING_INT16),
+    })
+
+    received = {event['name']: event['args'][0] for event in socket.get_received()}
+    result = received['motion_gestures']
+    assert result['hands'] == {'left': [None, None], 'right': ['fist', 'punch']}
+    assert result['body'] == ['stand', 'stand']
+    assert result['seq'] == [41, 42]
+
+    three_hands = encode_frames(np.zeros((1, 3, 21, 3)), codec.KIND_HAND)
+    for bad in (b'\x01\x01', three_hands, encode_frames(np.zeros((1, 33, 3)), codec.KIND_BODY)):
+        socket.emit('motion_frames_binary', {'hands': bad})
+        assert socket.get_received()[0]['name'] == 'motion_error'
+    socket.disconnect()
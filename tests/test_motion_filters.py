@@ -0,0 +1,104 @@
+"""
+Tests for the vectorized One-Euro filter.
+"""
+import math
+import numpy as np
+import pytest
+from app.motion.filters import OneEuroFilter
+
+
+def reference_one_euro(points, timestamps, min_cutoff=1.0, beta=0.007, d_cutoff=1.0):
+    """Scalar One-Euro filter for a single 3D point, as in the paper."""
+    def alpha(cutoff, dt):
+        return 1 / (1 + 1 / (2 * math.pi * cutoff * dt))
+
+    x_prev, dx_prev, t_prev = points[0], np.zeros(3), timestamps[0]
+    result = [points[0]]
+    for x, t in zip(points[1:], timestamps[1:]):
+        dt = t - t_prev
+        dx = dx_prev + alpha(d_cutoff, dt) * ((x - x_prev) / dt - dx_prev)
+        cutoff = min_cutoff + beta * np.linalg.norm(dx)
+        x_prev = x_prev + alpha(cutoff, dt) * (x - x_prev)
+        dx_prev, t_prev = dx, t
+        result.append(x_prev)
+    return np.array(result)
+
+
+def random_walk(frames, players, landmarks, seed=0):
+    rng = np.random.default_rng(seed)
+    steps = rng.normal(0, 8, (frames, players, landmarks, 3))
+    return (rng.uniform(0, 640, (players, landmarks, 3)) + np.cumsum(steps, axis=0)).astype(np.float32)
+
+
+def test_matches_scalar_reference():
+    """Test every slot against the scalar filter with uneven frame times."""
+    frames = random_walk(40, 3, 2)
+    timestamps = np.cumsum(np.random.default_rng(1).uniform(0.02, 0.05, 40))
+    bank = OneEuroFilter(3, 2, beta=0.05)
+
+    smoothed = np.stack([bank.filter(frame, t) for frame, t in zip(frames, timestamps)])
+    for p in range(3):
+        for j in range(2):
+            expected = reference_one_euro(frames[:, p, j].astype(np.float64), timestamps, beta=0.05)
+            np.testing.assert_allclose(smoothed[:, p, j], expected, atol=1e-3)
+
+
+def test_filters_in_place_and_per_stream():
+    """Test that in-place, per-stream and whole-bank filtering agree."""
+    frames = random_walk(20, 2, 21)
+    timestamps = np.arange(20) / 30
+    bank, streams = OneEuroFilter(2, 21), OneEuroFilter(2, 21)
+
+    in_place = frames.copy()
+    for frame, t in zip(in_place, timestamps):
+        assert bank.filter(frame, t, out=frame) is frame
+
+    for p, key in enumerate(('left', 'right')):
+        np.testing.assert_allclose(streams.filter_stream(key, frames[:, p], timestamps), in_place[:, p], atol=1e-4)
+
+
+def test_smoothing_adapts_to_speed():
+    """Test that jitter is damped while fast movement keeps little lag."""
+    rng = np.random.default_rng(2)
+    timestamps = np.arange(60) / 30
+    still = 320 + rng.normal(0, 2, (60, 1, 1, 3)).astype(np.float32)
+    moving = still + (timestamps * 600)[:, None, None, None].astype(np.float32)
+
+    bank = OneEuroFilter(1, 1, beta=0.01)
+    smoothed_still = np.stack([bank.filter(frame, t) for frame, t in zip(still, timestamps)])
+    bank.reset()
+    smoothed_moving = np.stack([bank.filter(frame, t) for frame, t in zip(moving, timestamps)])
+
+    assert smoothed_still[30:].std() < still[30:].std() / 3
+    lag = np.abs(smoothed_moving - moving)[30:].mean()
+    assert lag < 20  # 20 px per frame of movement
+
+
+def test_missing_landmarks_hold_state():
+    """Test that NaN landmarks and absent slots leave their state untouched."""
+    bank = OneEuroFilter(2, 1)
+    frame = np.array([[[100, 100, 0]], [[200, 200, 0]]], dtype=np.float32)
+    bank.filter(frame, 0.0)
+
+    gap = frame.copy()
+    gap[1] = np.nan
+    result = bank.filter(gap + 10, 1 / 30)
+    assert np.isnan(result[1]).all()
+    assert (result[0, 0, :2] > 100).all()
+
+    # The absent slot resumes from where it was, not from scratch
+    result = bank.filter(frame + 30, 2 / 30)
+    assert 200 < result[1, 0, 0] < 230
+
+
+def test_slots():
+    """Test acquiring, reusing and releasing stream slots."""
+    bank = OneEuroFilter(2, 1)
+    assert bank.acquire('a') == bank.acquire('a')
+    bank.filter_stream('b', np.ones((1, 1, 3)), [0.0])
+    with pytest.raises(RuntimeError):
+        bank.acquire('c')
+
+    bank.release('b')
+    slot = bank.acquire('c')
+    assert np.isnan(bank._x[slot]).all()
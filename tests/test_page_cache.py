@@ -0,0 +1,102 @@
+"""
+Tests for the rendered-page cache.
+"""
+import gzip
+import pytest
+from app import page_cache
+from app.utils import page_cache as page_cache_module
+
+
+def test_anonymous_pages_are_cached(client):
+    """Test that repeat anonymous hits are served from the cache."""
+    first = client.get('/')
+    assert first.status_code == 200
+    assert first.headers['ETag']
+    assert first.headers['Cache-Control'] == 'no-cache'
+    assert page_cache.misses == 1
+
+    second = client.get('/')
+    assert second.data == first.data
+    assert second.headers['ETag'] == first.headers['ETag']
+    assert page_cache.hits == 1
+
+    client.get('/about')
+    assert len(page_cache) == 2
+
+
+def test_conditional_request_returns_304(client):
+    """Test that a matching If-None-Match is answered with 304."""
+    etag = client.get('/about').headers['ETag']
+
+    response = client.get('/about', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+    assert response.headers['ETag'] == etag
+
+    response = client.get('/about', headers={'If-None-Match': '"stale"'})
+    assert response.status_code == 200
+
+
+def test_precompressed_variants(client):
+    """Test that compressed variants decode to the same page."""
+    plain = client.get('/')
+
+    response = client.get('/', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.data) == plain.data
+    assert response.headers['ETag'] != plain.headers['ETag']
+    assert 'Accept-Encoding' in response.headers['Vary']
+
+    # A gzip ETag still revalidates an identity request
+    response = client.get('/', headers={'If-None-Match': response.headers['ETag']})
+    assert response.status_code == 304
+
+
+@pytest.mark.skipif(page_cache_module.brotli is None, reason='brotli is not installed')
+def test_brotli_variant(client):
+    """Test that brotli is preferred when the client accepts it."""
+    plain = client.get('/')
+    response = client.get('/', headers={'Accept-Encoding': 'br, gzip'})
+    assert response.headers['Content-Encoding'] == 'br'
+    assert page_cache_module.brotli.decompress(response.data) == plain.data
+
+
+def test_authenticated_requests_bypass_cache(client, auth):
+    """Test that logged-in users always get a live render."""
+    auth.login()
+    response = client.get('/')
+    assert b'Welcome, testuser' in response.data
+    assert 'ETag' not in response.headers
+    assert len(page_cache) == 0
+
+
+def test_flash_messages_bypass_cache(client):
+    """Test that pages showing flash messages are never cached."""
+    with client.session_transaction() as sess:
+        sess['_flashes'] = [('info', 'Hello there')]
+
+    response = client.get('/')
+    assert b'Hello there' in response.data
+    assert len(page_cache) == 0
+
+    # The flash was consumed, so the next hit is cacheable
+    client.get('/')
+    assert len(page_cache) == 1
+
+
+def test_deploy_version_is_part_of_key(client):
+    """Test that a new deploy version misses the old entries."""
+    client.get('/')
+    page_cache.version = 'next-release'
+    client.get('/')
+    assert page_cache.misses == 2
+    assert len(page_cache) == 2
+
+
+def test_cache_can_be_disabled(client):
+    """Test that a disabled cache renders live."""
+    page_cache.enabled = False
+    response = client.get('/')
+    assert response.status_code == 200
+    assert 'ETag' not in response.headers
+    assert len(page_cache) == 0
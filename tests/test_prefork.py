@@ -0,0 +1,85 @@
+"""
+Tests for the preload-and-fork worker supervisor.
+"""
+import gc
+import os
+import sys
+import time
+import pytest
+from app.utils.prefork import Supervisor, warm_app, freeze_heap, memory_usage
+
+linux_only = pytest.mark.skipif(not sys.platform.startswith('linux'), reason='requires /proc and fork')
+
+
+def test_warm_app(app):
+    """Test that warming compiles every template into the Jinja cache."""
+    stats = warm_app(app)
+    assert stats['templates'] > 0
+    assert stats['queries'] > 0
+    assert app.jinja_env.cache is not None
+    assert len(app.jinja_env.cache) >= stats['templates']
+
+
+def test_freeze_heap():
+    """Test that freezing moves objects to the permanent generation."""
+    try:
+        assert freeze_heap() > 0
+    finally:
+        gc.unfreeze()
+
+
+@linux_only
+def test_memory_usage():
+    """Test reading the memory footprint of the current process."""
+    stats = memory_usage(os.getpid())
+    assert stats['rss'] > 0
+    assert 0 < stats['uss'] <= stats['rss']
+    assert memory_usage(-1) is None
+
+
+@linux_only
+def test_supervisor_runs_workers(tmp_path):
+    """Test that each worker runs the target with its own index."""
+    def target(index):
+        (tmp_path / f'worker-{index}').write_text(str(os.getpid()))
+
+    Supervisor(target, 3, report_interval=0).run()
+
+    pids = {(tmp_path / f'worker-{i}').read_text() for i in range(3)}
+    assert len(pids) == 3
+    assert str(os.getpid()) not in pids
+
+
+@linux_only
+def test_supervisor_restarts_crashed_worker(tmp_path):
+    """Test that a worker exiting with an error is restarted."""
+    marker = tmp_path / 'crashed'
+
+    def target(index):
+        if not marker.exists():
+            marker.write_text('1')
+            raise RuntimeError('first start fails')
+        (tmp_path / 'restarted').write_text('1')
+
+    Supervisor(target, 1, report_interval=60, restart_backoff=0.01).run()
+    assert (tmp_path / 'restarted').exists()
+
+
+@linux_only
+def test_supervisor_backs_off_and_gives_up(tmp_path):
+    """Test that a worker crashing in a row is restarted ever more slowly, then given up on."""
+    starts = tmp_path / 'starts'
+
+    def target(index):
+        with open(starts, 'a') as f:
+            f.write(f'{time.monotonic()}\n')
+        raise RuntimeError('always fails')
+
+    supervisor = Supervisor(target, 1, report_interval=60, max_restarts=3, restart_backoff=0.2)
+    supervisor.run()
+
+    times = [float(line) for line in starts.read_text().split()]
+    assert len(times) == 4
+    gaps = [later - earlier for earlier, later in zip(times, times[1:])]
+    assert gaps[0] >= 0.2 and gaps[1] >= 0.4 and gaps[2] >= 0.8
+    assert supervisor.crashes == {0: 4}
@@ -0,0 +1,90 @@
+"""
+Tests for the adaptive quality scheduler of server-side tracking.
+"""
+from app.vision.scheduler import GAME_MODES, QualityScheduler
+
+
+def plans(scheduler, session_id, frames, now=0):
+    return [scheduler.plan(session_id, now=now) for _ in range(frames)]
+
+
+def test_levels_follow_game_mode():
+    """Test each mode's ladder of frame skip, scale and detectors."""
+    scheduler = QualityScheduler()
+    scheduler.open('boxer', 'boxing', now=0)
+    scheduler.open('dancer', 'shadow_dance', now=0)
+    scheduler.open('other', 'unknown', now=0)
+
+    assert plans(scheduler, 'boxer', 2) == [(1.0, ('hands', 'body'))] * 2
+    assert plans(scheduler, 'dancer', 1) == [(1.0, ('body', 'hands'))]
+    assert scheduler.state('other')['game_mode'] is None
+
+    scheduler._sessions['boxer'].level = 3
+    scheduler._sessions['dancer'].level = 1
+    assert plans(scheduler, 'boxer', 4) == [None, (0.5, ('hands', 'body')), None, (0.5, ('hands', 'body'))]
+    # Boxing keeps every frame longer than Shadow Dance, which also stops running hands
+    assert [skip for skip, _ in GAME_MODES['boxing']['levels'][:3]] == [1, 1, 1]
+    assert plans(scheduler, 'dancer', 2) == [(1.0, ('body',)), None]
+
+    state = scheduler.state('boxer')
+    assert (state['level'], state['frame_skip'], state['scale'], state['skipped']) == (3, 2, 0.5, 2)
+
+    # Frames of sessions that were never opened get the default ladder
+    assert scheduler.plan('fed', now=0) == (1.0, ('hands', 'body'))
+    scheduler.close('boxer')
+    assert scheduler.state('boxer') is None
+
+
+def test_lag_moves_levels_with_hysteresis():
+    """Test degrading over the target lag and recovering well under it."""
+    scheduler = QualityScheduler(target_lag_ms=100, interval=1.0)
+    scheduler.open('a', 'boxing', now=0)
+
+    # No change within the interval
+    assert scheduler.record('a', 500, now=0.5) == 0
+    assert scheduler.record('a', 500, now=1.0) == 1
+    assert scheduler.record('a', 500, now=1.5) == 1
+    assert scheduler.record('a', 500, now=2.0) == 2
+
+    # Between half the target and the target the level holds
+    for t in range(3, 6):
+        assert scheduler.record('a', 70, now=t) == 2
+    # Lag is smoothed, so it takes a few fast frames to recover
+    assert [scheduler.record('a', 20, now=t) for t in (6, 6.2, 6.4)] == [2, 2, 1]
+    assert scheduler.record('a', 20, now=7.4) == 0
+    assert scheduler.record('a', 20, now=8.4) == 0
+    assert scheduler.state('a')['changes'] == 4
+
+    # The worst level is the floor
+    for t in range(10, 20):
+        scheduler.record('a', 1000, now=t)
+    assert scheduler.state('a')['level'] == len(GAME_MODES['boxing']['levels']) - 1
+
+
+def test_cpu_headroom():
+    """Test degrading while the workers are short of headroom despite low lag."""
+    cpu = [0.0]
+    scheduler = QualityScheduler(target_lag_ms=100, workers=2, headroom=0.2, interval=1.0,
+                                 cpu_clock=lambda: cpu[0])
+    scheduler.open('a', now=0)
+    scheduler.record('a', 10, now=0)
+
+    cpu[0] = 1.9
+    assert scheduler.record('a', 10, now=1) == 1
+    assert scheduler.state('a')['cpu_utilization'] == 0.95
+
+    # 70% busy: inside the hysteresis band, so no recovery
+    cpu[0] += 1.4
+    assert scheduler.record('a', 10, now=2) == 1
+    cpu[0] += 0.4
+    assert scheduler.record('a', 10, now=3) == 0
+
+
+def test_disabled_scheduler_keeps_full_quality():
+    """Test that with adaptation off no frames are skipped whatever the lag."""
+    scheduler = QualityScheduler(target_lag_ms=100, enabled=False)
+    scheduler.open('a', 'shadow_dance', now=0)
+    for t in range(5):
+        assert scheduler.record('a', 1000, now=t) == 0
+    assert None not in plans(scheduler, 'a', 5)
+    assert scheduler.state('a')['lag_ms'] > 100
@@ -0,0 +1,133 @@
+"""
+Tests for the login rate limiter.
+"""
+import os
+import sys
+import pytest
+from app import create_app, login_limiter
+from app.utils.rate_limit import MemoryBucketStore, SharedBucketStore, LoginLimiter
+from config import TestingConfig
+
+
+@pytest.mark.parametrize('store_class', [MemoryBucketStore, SharedBucketStore])
+def test_token_bucket(store_class):
+    """Test that buckets drain and refill at the configured rate."""
+    store = store_class()
+    for _ in range(3):
+        assert store.take('key', 3, 1.0, 1, now=100.0)[0]
+    allowed, tokens = store.take('key', 3, 1.0, 1, now=100.0)
+    assert not allowed
+    assert tokens == pytest.approx(0)
+
+    # Half a second refills half a token, one and a half seconds is enough
+    assert not store.take('key', 3, 1.0, 1, now=100.5)[0]
+    assert store.take('key', 3, 1.0, 1, now=101.5)[0]
+
+    # Other keys have their own bucket
+    assert store.take('other', 3, 1.0, 1, now=101.5)[0]
+
+
+def test_memory_store_evicts_least_recently_used():
+    """Test that the memory store stays bounded."""
+    store = MemoryBucketStore(max_keys=2)
+    store.take('a', 1, 0.0, 1, now=0.0)
+    store.take('b', 1, 0.0, 1, now=0.0)
+    store.take('a', 1, 0.0, 1, now=0.0)
+    store.take('c', 1, 0.0, 1, now=0.0)
+    assert len(store) == 2
+
+    # 'b' was evicted and starts again with a full bucket, 'a' is still empty
+    assert store.take('b', 1, 0.0, 1, now=0.0)[0]
+    assert not store.take('c', 1, 0.0, 1, now=0.0)[0]
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason='requires fork')
+def test_shared_store_is_shared_with_forked_workers():
+    """Test that tokens taken in a forked worker are gone in the parent."""
+    store = SharedBucketStore(slots=64)
+    pid = os.fork()
+    if pid == 0:
+        for _ in range(2):
+            store.take('ip:10.0.0.1', 2, 0.0, 1, now=0.0)
+        os._exit(0)
+    os.waitpid(pid, 0)
+    assert not store.take('ip:10.0.0.1', 2, 0.0, 1, now=0.0)[0]
+
+
+def test_login_limiter_keys():
+    """Test limiting by IP address and by username."""
+    class LimitedConfig(TestingConfig):
+        LOGIN_RATE_LIMIT_ENABLED = True
+        LOGIN_LIMIT_IP_CAPACITY = 3
+        LOGIN_LIMIT_USER_CAPACITY = 2
+
+    limiter = LoginLimiter(create_app(LimitedConfig))
+
+    # The username bucket is shared regardless of case
+    assert limiter.hit('1.1.1.1', 'Victim', now=0.0) is None
+    assert limiter.hit('2.2.2.2', 'victim ', now=0.0) is None
+    assert limiter.hit('3.3.3.3', 'victim', now=0.0) > 0
+
+    # The IP bucket stops one address trying many usernames
+    assert limiter.hit('4.4.4.4', 'a', now=0.0) is None
+    assert limiter.hit('4.4.4.4', 'b', now=0.0) is None
+    assert limiter.hit('4.4.4.4', 'c', now=0.0) is None
+    assert limiter.hit('4.4.4.4', 'd', now=0.0) > 0
+
+    assert limiter.metrics() == {'allowed': 5, 'rejected_ip': 1, 'rejected_user': 1, 'tracked_keys': 8}
+
+
+def test_invalid_limiter_storage():
+    """Test that an unknown storage backend is rejected."""
+    class BadStorageConfig(TestingConfig):
+        LOGIN_LIMIT_STORAGE = 'redis'
+
+    with pytest.raises(ValueError):
+        create_app(BadStorageConfig)
+
+
+def test_login_rejected_when_over_budget(app, client, monkeypatch):
+    """Test that over-budget attempts get a 429 without checking the password."""
+    login_limiter.enabled = True
+    login_limiter.user_capacity = 2
+    login_limiter.user_rate = 0.0
+
+    checks = []
+    from app import hasher
+    original = hasher.check_password
+    monkeypatch.setattr(hasher, 'check_password', lambda *args: checks.append(args) or original(*args))
+
+    for _ in range(2):
+        response = client.post('/auth/login', data={'username': 'testuser', 'password': 'wrong'})
+        assert response.status_code == 200
+
+    response = client.post('/auth/login', data={'username': 'testuser', 'password': 'password'})
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) > 0
+    assert b'Too many login attempts' in response.data
+    assert len(checks) == 2
+
+
+def test_login_limit_per_forwarded_client(tmp_path, caplog):
+    """Test that behind a trusted proxy each forwarded client gets its own IP bucket."""
+    class ProxiedConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{tmp_path / "proxied.db"}'
+        PROXY_FIX_HOPS = 1
+        LOGIN_RATE_LIMIT_ENABLED = True
+        LOGIN_LIMIT_IP_CAPACITY = 1
+        LOGIN_LIMIT_IP_PER_MINUTE = 0
+
+    app = create_app(ProxiedConfig)
+    client = app.test_client()
+
+    def attempt(forwarded_for, username):
+        return client.post('/auth/login', data={'username': username, 'password': 'wrong'},
+                           headers={'X-Forwarded-For': forwarded_for}, environ_base={'REMOTE_ADDR': '10.0.0.1'})
+
+    assert attempt('203.0.113.5', 'a').status_code == 200
+    assert attempt('203.0.113.5', 'b').status_code == 429
+    # Another client behind the same proxy is not locked out
+    assert attempt('198.51.100.7', 'c').status_code == 200
+
+    # Rejections are logged with the limiter's counters
+    assert "from 203.0.113.5; limiter counters: {'allowed': 1, 'rejected_ip': 1" in caplog.text
@@ -0,0 +1,114 @@
+"""
+Tests for the skill rating engine.
+"""
+import numpy as np
+import pytest
+from app import db
+from app.models.user import User
+from app.models.game_session import GameSession
+from app.utils.rating import (
+    DEFAULT_RATING, DEFAULT_DEVIATION, RatingParams,
+    elo_update, glicko2_update, replay, schedule_waves
+)
+
+
+def test_elo_update():
+    """Test that Elo moves ratings towards the result."""
+    r1, r2 = elo_update(1500, 1500, 1.0, k_factor=32)
+    assert r1 == pytest.approx(1516)
+    assert r2 == pytest.approx(1484)
+
+    # A draw between equals changes nothing
+    r1, r2 = elo_update(1500, 1500, 0.5)
+    assert r1 == pytest.approx(1500)
+    assert r2 == pytest.approx(1500)
+
+
+def test_glicko2_update():
+    """Test Glicko-2 updates for wins and draws."""
+    r1, rd1, vol1, r2, rd2, vol2 = glicko2_update(
+        DEFAULT_RATING, DEFAULT_DEVIATION, 0.06,
+        DEFAULT_RATING, DEFAULT_DEVIATION, 0.06, 1.0)
+    assert r1 > DEFAULT_RATING > r2
+    assert r1 - DEFAULT_RATING == pytest.approx(DEFAULT_RATING - r2)
+    assert rd1 < DEFAULT_DEVIATION and rd2 < DEFAULT_DEVIATION
+    assert vol1 == pytest.approx(0.06, abs=1e-3)
+
+    # Beating a much stronger, well-established opponent is worth more
+    upset = glicko2_update(1500, 200, 0.06, 1900, 50, 0.06, 1.0)[0]
+    expected = glicko2_update(1500, 200, 0.06, 1100, 50, 0.06, 1.0)[0]
+    assert upset - 1500 > expected - 1500
+
+
+def test_invalid_rating_system():
+    """Test that unknown rating systems are rejected."""
+    with pytest.raises(ValueError):
+        RatingParams(system='trueskill')
+
+
+def test_schedule_waves():
+    """Test that waves never contain the same player twice."""
+    player1 = np.array([0, 2, 0, 1, 3])
+    player2 = np.array([1, 3, 2, 3, 0])
+    waves = schedule_waves(player1, player2, 4)
+    assert waves.tolist() == [0, 0, 1, 1, 2]
+
+
+@pytest.mark.parametrize('system', ['glicko2', 'elo'])
+def test_replay_matches_sequential_updates(system):
+    """Test that the batched replay equals updating one match at a time."""
+    rng = np.random.default_rng(1)
+    n_players, n_matches = 12, 300
+    player1 = rng.integers(0, n_players, n_matches)
+    player2 = (player1 + rng.integers(1, n_players, n_matches)) % n_players
+    scores = rng.choice([0.0, 0.5, 1.0], n_matches)
+    params = RatingParams(system=system)
+
+    rating, deviation, volatility = replay(player1, player2, scores, n_players, params)
+
+    expected = replay([], [], [], n_players, params)
+    for a, b, s in zip(player1, player2, scores):
+        expected = replay([a], [b], [s], n_players, params, initial=expected)
+
+    np.testing.assert_allclose(rating, expected[0])
+    np.testing.assert_allclose(deviation, expected[1])
+    np.testing.assert_allclose(volatility, expected[2])
+
+
+def _completed_session(winner_name):
+    player1 = User.query.filter_by(username='testuser').first()
+    player2 = User.query.filter_by(username='admin').first()
+    session = GameSession(player1_id=player1.id, player2_id=player2.id)
+    db.session.add(session)
+    db.session.commit()
+    session.start_session()
+    winner = User.query.filter_by(username=winner_name).first()
+    session.end_session(winner.id)
+    return player1, player2
+
+
+def test_end_session_updates_ratings(app):
+    """Test that completing a session updates both players' ratings."""
+    with app.app_context():
+        player1, player2 = _completed_session('testuser')
+        assert player1.rating > DEFAULT_RATING
+        assert player2.rating < DEFAULT_RATING
+        assert player1.rating_deviation < DEFAULT_DEVIATION
+
+
+def test_recompute_ratings_command(app, runner):
+    """Test that the recompute command replays the stored history."""
+    with app.app_context():
+        player1, _ = _completed_session('testuser')
+        _completed_session('admin')
+        live_rating = player1.rating
+
+        player1.rating = DEFAULT_RATING
+        db.session.commit()
+
+    result = runner.invoke(args=['recompute-ratings'])
+    assert 'Replayed 2 completed sessions' in result.output
+
+    with app.app_context():
+        player1 = User.query.filter_by(username='testuser').first()
+        assert player1.rating == pytest.approx(live_rating)
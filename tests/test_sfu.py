@@ -0,0 +1,356 @@
+"""
+Tests for forwarding match video through the server.
+"""
+import asyncio
+from fractions import Fraction
+import numpy as np
+import pytest
+from app import db, socketio, sfu
+from app.models.game_session import GameSession
+from app.models.user import User
+from app.rtc.sfu import Publication, _create_layer_track, layer_size, parse_peer, subscription_peer
+from app.vision.video import draw_markers
+
+
+def test_peer_ids():
+    """Test telling the server's peer ids from other clients."""
+    assert parse_peer('sfu') == (True, None)
+    assert parse_peer(subscription_peer('abc')) == (True, 'abc')
+    assert parse_peer('abc') == (False, None)
+    assert parse_peer(None) == (False, None)
+
+
+def test_layer_size():
+    """Test that layers cap the height, keep the aspect and never scale up."""
+    assert layer_size(640, 480, 'low') == (240, 180)
+    assert layer_size(640, 480, 'medium') == (480, 360)
+    assert layer_size(640, 480, 'high') == (640, 480)
+    assert layer_size(320, 240, 'medium') == (320, 240)
+
+
+def frame_source(count, fps=30, size=(640, 480)):
+    """A track of numbered frames at a fixed rate"""
+    from aiortc import MediaStreamTrack
+    from aiortc.mediastreams import MediaStreamError
+    from av import VideoFrame
+
+    class Source(MediaStreamTrack):
+        kind = 'video'
+
+        def __init__(self):
+            super().__init__()
+            self.sent = 0
+
+        async def recv(self):
+            if self.sent == count:
+                raise MediaStreamError
+            frame = VideoFrame.from_ndarray(np.zeros((size[1], size[0], 3), dtype=np.uint8), format='rgb24')
+            frame.pts, frame.time_base = self.sent * 3000, Fraction(1, 90000 * 30 // fps)
+            self.sent += 1
+            return frame
+
+    return Source()
+
+
+def test_layer_track_thins_and_scales():
+    """Test that a subscriber gets frames at its layer's rate and size, and layers switch live."""
+    from aiortc.mediastreams import MediaStreamError
+
+    async def forward(layer, switch_to=None):
+        track = _create_layer_track(Publication('a', 'room', None, None), frame_source(60), layer)
+        frames = []
+        while True:
+            try:
+                frames.append(await track.recv())
+            except MediaStreamError:
+                return track, frames
+            if switch_to and len(frames) == 10:
+                track.layer = switch_to
+
+    track, frames = asyncio.run(forward('low'))
+    assert {(frame.width, frame.height) for frame in frames} == {(240, 180)}
+    # Two seconds of 30 fps video at the low layer's 15 fps
+    assert len(frames) == 30 and (track.forwarded, track.dropped) == (30, 30)
+
+    track, frames = asyncio.run(forward('medium'))
+    assert 45 <= len(frames) <= 52
+
+    track, frames = asyncio.run(forward('high'))
+    assert len(frames) == 60 and frames[0].width == 640
+
+    _, frames = asyncio.run(forward('low', switch_to='high'))
+    assert (frames[9].width, frames[10].width) == (240, 640)
+
+
+def test_publication_scales_once_per_size():
+    """Test that subscribers at the same layer share one scaled frame."""
+    from av import VideoFrame
+
+    publication = Publication('a', 'room', None, None)
+    frame = VideoFrame.from_ndarray(np.zeros((480, 640, 3), dtype=np.uint8), format='rgb24')
+    scaled = publication.scaled(frame, (240, 180))
+    assert (scaled.width, scaled.height) == (240, 180)
+    assert publication.scaled(frame, (240, 180)) is scaled
+    assert scaled.format.name == 'yuv420p'
+
+    # Full-size frames only need converting for the encoders
+    assert publication.scaled(frame, (640, 480)).format.name == 'yuv420p'
+    frame = frame.reformat(format='yuv420p')
+    assert publication.scaled(frame, (640, 480)) is frame
+
+
+@pytest.fixture
+def sfu_app(app):
+    app.config.update({'SFU_ENABLED': True})
+    sfu.init_app(app)
+    yield app
+    sfu.shutdown()
+
+
+def marker_track(position):
+    from aiortc import VideoStreamTrack
+    from av import VideoFrame
+
+    class MarkerTrack(VideoStreamTrack):
+        async def recv(self):
+            pts, time_base = await self.next_timestamp()
+            frame = VideoFrame.from_ndarray(draw_markers({'right': position}), format='rgb24')
+            frame.pts, frame.time_base = pts, time_base
+            return frame
+
+    return MarkerTrack()
+
+
+class Client:
+    """An aiortc client publishing a marker video and answering subscription offers"""
+
+    def __init__(self, sid, position, layer):
+        from aiortc import RTCPeerConnection
+
+        self.sid = sid
+        self.layer = layer
+        self.peer = RTCPeerConnection()
+        self.peer.addTrack(marker_track(position))
+        self.subscriptions = {}
+        self.received = {}
+
+    async def publish(self, room):
+        from aiortc import RTCSessionDescription
+
+        loop = asyncio.get_running_loop()
+        await self.peer.setLocalDescription(await self.peer.createOffer())
+        answer, offers = await loop.run_in_executor(None, sfu.publish, room, self.sid, self.peer.localDescription.sdp,
+                                                    'offer', self.layer)
+        await self.peer.setRemoteDescription(RTCSessionDescription(**answer))
+        return offers
+
+    async def subscribe(self, publisher, offer):
+        from aiortc import RTCPeerConnection, RTCSessionDescription
+
+        peer = self.subscriptions[publisher] = RTCPeerConnection()
+
+        @peer.on('track')
+        def on_track(track):
+            if track.kind == 'video':
+                asyncio.ensure_future(self._receive(publisher, track))
+
+        await peer.setRemoteDescription(RTCSessionDescription(**offer))
+        await peer.setLocalDescription(await peer.createAnswer())
+        await asyncio.get_running_loop().run_in_executor(None, sfu.answer, self.sid, publisher,
+                                                         peer.localDescription.sdp, 'answer')
+
+    async def _receive(self, publisher, track):
+        from aiortc.mediastreams import MediaStreamError
+
+        while True:
+            try:
+                frame = await track.recv()
+            except MediaStreamError:
+                return
+            self.received.setdefault(publisher, []).append((frame.width, frame.height))
+
+    async def close(self):
+        for peer in [self.peer, *self.subscriptions.values()]:
+            await peer.close()
+
+
+def test_forwards_every_stream_to_the_rest_of_the_room(sfu_app):
+    """Test that three clients each publish once and receive the other two at their own layer."""
+    async def connect():
+        return {'a': Client('a', (100, 100), 'high'), 'b': Client('b', (300, 200), 'medium'),
+                'c': Client('c', (500, 300), 'low')}
+
+    async def call():
+        for client in clients.values():
+            for offer in await client.publish('room'):
+                await clients[offer['to']].subscribe(parse_peer(offer['socket'])[1], offer['offer'])
+        for _ in range(300):
+            if all(len(client.received.get(other, [])) >= 3
+                   for client in clients.values() for other in clients if other != client.sid):
+                break
+            await asyncio.sleep(0.1)
+
+    loop = asyncio.new_event_loop()
+    clients = loop.run_until_complete(connect())
+    try:
+        loop.run_until_complete(call())
+        assert sfu.participants('room') == ['a', 'b', 'c']
+        sizes = {name: {size for frames in client.received.values() for size in frames}
+                 for name, client in clients.items()}
+        assert sizes == {'a': {(640, 480)}, 'b': {(480, 360)}, 'c': {(240, 180)}}
+
+        stats = sfu.stats('c')
+        assert stats['room'] == 'room' and stats['layer'] == 'low'
+        assert set(stats['subscriptions']) == {'a', 'b'}
+        assert all(s['forwarded'] >= 3 and s['bytes_sent'] > 0 for s in stats['subscriptions'].values())
+
+        sfu.set_layer('c', 'high')
+        assert {s['layer'] for s in sfu.stats('c')['subscriptions'].values()} == {'high'}
+        with pytest.raises(ValueError):
+            sfu.set_layer('c', 'ultra')
+        # One publisher at a time, as the bandwidth controller picks per link
+        sfu.set_layer('c', 'low', 'a')
+        assert {p: s['layer'] for p, s in sfu.stats('c')['subscriptions'].items()} == {'a': 'low', 'b': 'high'}
+        assert sfu.stats('c')['layer'] == 'high'
+
+        assert sorted(sfu.leave('a')) == ['b', 'c']
+        assert sfu.participants('room') == ['b', 'c']
+        assert set(sfu.stats('b')['subscriptions']) == {'c'}
+    finally:
+        for client in clients.values():
+            loop.run_until_complete(client.close())
+        pending = asyncio.all_tasks(loop)
+        for task in pending:
+            task.cancel()
+        if pending:
+            loop.run_until_complete(asyncio.wait(pending))
+        loop.close()
+
+
+def make_offer():
+    from aiortc import RTCPeerConnection
+
+    async def offer():
+        peer = RTCPeerConnection()
+        peer.addTrack(marker_track((100, 100)))
+        await peer.setLocalDescription(await peer.createOffer())
+        description = {'sdp': peer.localDescription.sdp, 'type': 'offer'}
+        await peer.close()
+        return description
+
+    return asyncio.run(offer())
+
+
+def player_session(app):
+    """A session with the test user as its first player"""
+    with app.app_context():
+        session = GameSession(player1_id=User.query.filter_by(username='testuser').first().id)
+        db.session.add(session)
+        db.session.commit()
+        return str(session.id)
+
+
+def test_signaling_through_mesh_events(sfu_app, client, auth):
+    """Test publishing with 'call-user' and the room switching to the SFU past the mesh limit."""
+    session_id = player_session(sfu_app)
+    auth.login()
+    sockets = [socketio.test_client(sfu_app, flask_test_client=client) for _ in range(3)]
+    sids = [socketio.server.manager.sid_from_eio_sid(socket.eio_sid, '/') for socket in sockets]
+    for socket in sockets[:2]:
+        socket.emit('join_game', {'session_id': session_id})
+    assert all(e['name'] != 'video_mode' for socket in sockets for e in socket.get_received())
+
+    sockets[2].emit('join_game', {'session_id': session_id})
+    for socket in sockets:
+        assert {'name': 'video_mode', 'args': [{'mode': 'sfu', 'peer': 'sfu'}], 'namespace': '/'} \
+            in socket.get_received()
+
+    sockets[0].emit('call-user', {'to': 'sfu', 'offer': make_offer(), 'session_id': session_id, 'layer': 'low'})
+    answer = sockets[0].get_received()[0]
+    assert answer['name'] == 'answer-made' and answer['args'][0]['socket'] == 'sfu'
+    assert answer['args'][0]['answer']['type'] == 'answer'
+
+    # The second publisher gets an offer for the first one's stream and the other way round
+    sockets[1].emit('call-user', {'to': 'sfu', 'offer': make_offer(), 'session_id': session_id})
+    events = sockets[1].get_received()
+    assert [e['name'] for e in events] == ['answer-made', 'call-made']
+    assert events[1]['args'][0]['socket'] == f'sfu:{sids[0]}'
+    made = sockets[0].get_received()
+    assert [(e['name'], e['args'][0]['socket']) for e in made] == [('call-made', f'sfu:{sids[1]}')]
+
+    sockets[1].emit('make-answer', {'to': 'sfu:unknown', 'answer': {'sdp': 'v=0', 'type': 'answer'}})
+    assert sockets[1].get_received()[0]['args'][0] == {'error': 'No such subscription'}
+    sockets[1].emit('sfu_layer', {'layer': 'ultra'})
+    assert sockets[1].get_received()[0]['name'] == 'sfu_error'
+
+    # Leaving closes the forwarded stream on the other side
+    sockets[1].emit('leave_game', {'session_id': session_id})
+    assert {'name': 'user-disconnected', 'args': [f'sfu:{sids[1]}'], 'namespace': '/'} in sockets[0].get_received()
+    assert sfu.participants(session_id) == [sids[0]]
+    for socket in sockets:
+        socket.disconnect()
+    assert sfu.participants(session_id) == []
+
+
+def test_slow_forwarding_answers_with_an_error(sfu_app, client, auth, monkeypatch):
+    """Test that a negotiation outliving the signaling timeout reports sfu_error and leaves nothing behind."""
+    session_id = player_session(sfu_app)
+    auth.login()
+    socket = socketio.test_client(sfu_app, flask_test_client=client)
+    socket.emit('join_game', {'session_id': session_id})
+    socket.get_received()
+
+    async def stalled(*args):
+        await asyncio.sleep(5)
+
+    sfu.timeout = 0.1
+    monkeypatch.setattr(sfu, '_publish', stalled)
+    socket.emit('call-user', {'to': 'sfu', 'offer': make_offer(), 'session_id': session_id})
+    assert socket.get_received()[0]['args'][0] == {'error': 'The server timed out forwarding video'}
+    socket.disconnect()
+    assert sfu.participants(session_id) == []
+
+
+def test_spectators_do_not_switch_the_room_to_the_sfu(sfu_app, client, auth):
+    """Test that only players count towards the mesh limit."""
+    session_id = player_session(sfu_app)
+    auth.login()
+    players = [socketio.test_client(sfu_app, flask_test_client=client) for _ in range(2)]
+    for socket in players:
+        socket.emit('join_game', {'session_id': session_id})
+
+    # Sockets keep the user they connected as
+    auth.logout()
+    auth.login('admin')
+    spectator = socketio.test_client(sfu_app, flask_test_client=client)
+    spectator.emit('join_game', {'session_id': session_id})
+    assert all(e['name'] != 'video_mode' for socket in players + [spectator] for e in socket.get_received())
+    for socket in players + [spectator]:
+        socket.disconnect()
+
+
+def test_publishing_requires_playing_in_the_session(sfu_app, client, auth):
+    """Test that a client may only publish, and so receive streams, in a session it joined and plays in."""
+    session_id = player_session(sfu_app)
+    with sfu_app.app_context():
+        admin = User.query.filter_by(username='admin').first().id
+        other = GameSession(player1_id=admin)
+        db.session.add(other)
+        db.session.commit()
+        other_id = str(other.id)
+
+    auth.login()
+    socket = socketio.test_client(sfu_app, flask_test_client=client)
+    socket.get_received()
+
+    # Not in the session's room yet
+    socket.emit('call-user', {'to': 'sfu', 'offer': make_offer(), 'session_id': session_id})
+    assert socket.get_received()[0]['args'][0] == {'error': 'Not a player in this session'}
+
+    # In the room of a session someone else plays
+    socket.emit('join_game', {'session_id': other_id})
+    socket.get_received()
+    socket.emit('call-user', {'to': 'sfu', 'offer': make_offer(), 'session_id': other_id})
+    assert socket.get_received()[0]['args'][0] == {'error': 'Not a player in this session'}
+    assert sfu.participants(other_id) == []
+    socket.disconnect()
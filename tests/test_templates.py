@@ -0,0 +1,70 @@
+"""
+Tests for the Jinja bytecode cache and template precompilation.
+"""
+import pytest
+from app import create_app
+from app.utils.templates import precompile_templates
+from config import TestingConfig
+
+
+@pytest.fixture
+def cached_config(tmp_path):
+    class CachedConfig(TestingConfig):
+        JINJA_BYTECODE_CACHE = True
+        JINJA_BYTECODE_CACHE_DIR = str(tmp_path / 'jinja_cache')
+
+    return CachedConfig
+
+
+def _count_compiles(app):
+    env = app.jinja_env
+    calls = []
+    compile_source = env.compile
+
+    def counting_compile(*args, **kwargs):
+        calls.append(args[1] if len(args) > 1 else kwargs.get('name'))
+        return compile_source(*args, **kwargs)
+
+    env.compile = counting_compile
+    return calls
+
+
+def test_cache_disabled_for_tests(app):
+    """Test that the testing config does not use a bytecode cache."""
+    assert app.jinja_env.bytecode_cache is None
+
+
+def test_precompile_fills_cache(cached_config, tmp_path):
+    """Test that precompiled templates are loaded without compiling in a new process."""
+    report = precompile_templates(create_app(cached_config))
+    names = [row['name'] for row in report]
+    assert 'base.html' in names
+    assert 'game/match.html' in names
+    assert all(row['compile'] > 0 and row['load'] >= 0 for row in report)
+    assert any(row['render'] is not None for row in report)
+    assert len(list((tmp_path / 'jinja_cache').iterdir())) == len(report)
+
+    # A freshly started app finds every template in the bytecode cache
+    app = create_app(cached_config)
+    compiled = _count_compiles(app)
+    for name in names:
+        app.jinja_env.get_template(name)
+    assert compiled == []
+
+    assert b'Motion Powered Games' in app.test_client().get('/about').data
+
+
+def test_cold_start_without_cache_compiles(app):
+    """Test the baseline: without the cache every template is compiled."""
+    compiled = _count_compiles(app)
+    app.jinja_env.get_template('base.html')
+    assert compiled == ['base.html']
+
+
+def test_precompile_templates_command(cached_config, tmp_path):
+    """Test the precompile-templates CLI command."""
+    app = create_app(cached_config)
+    result = app.test_cli_runner().invoke(args=['precompile-templates', '--no-render'])
+    assert 'base.html' in result.output
+    assert 'Compiled' in result.output
+    assert str(tmp_path / 'jinja_cache') in result.output
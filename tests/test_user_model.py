@@ -2,8 +2,9 @@
 Tests for the User model.
 """
 import pytest
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from app.models.user import User
+from app.models.reset_token import PasswordResetToken
 from app import db, bcrypt
 
 
@@ -35,8 +36,7 @@ def test_new_user(app):
         assert user.wins == 0
         assert user.losses == 0
         assert user.draws == 0
-        assert user.reset_token is None
-        assert user.reset_token_expiration is None
+        assert user.reset_tokens == []
 
 
 def test_password_hashing():
@@ -65,32 +65,81 @@ def test_reset_token(app):
         # Generate a reset token
         token = user.generate_reset_token()
 
-        # Check that the token is set
-        assert user.reset_token is not None
-        assert user.reset_token_expiration is not None
-        assert user.reset_token == token
+        # Check that only the digest of the token is stored
+        record = PasswordResetToken.query.filter_by(user_id=user.id).one()
+        assert record.token_digest == PasswordResetToken.digest(token)
+        assert record.token_digest != token
+        assert record.expires_at is not None
 
         # Check that the token can be verified
         assert user.verify_reset_token(token)
+        assert User.get_user_by_reset_token(token) == user
 
         # Check that an invalid token is rejected
         assert not user.verify_reset_token('invalid-token')
+        assert User.get_user_by_reset_token('invalid-token') is None
+
+        # Check that issuing a new token revokes the old one
+        new_token = user.generate_reset_token()
+        assert not user.verify_reset_token(token)
+        assert user.verify_reset_token(new_token)
 
         # Check that an expired token is rejected
-        user.reset_token_expiration = datetime.now() - timedelta(hours=2)
+        record = PasswordResetToken.query.filter_by(user_id=user.id).one()
+        record.expires_at = datetime.now(timezone.utc) - timedelta(hours=2)
         db.session.commit()
-        assert not user.verify_reset_token(token)
+        assert not user.verify_reset_token(new_token)
 
         # Clear the token
         user.clear_reset_token()
-        assert user.reset_token is None
-        assert user.reset_token_expiration is None
+        assert PasswordResetToken.query.filter_by(user_id=user.id).count() == 0
 
         # Clean up
         db.session.delete(user)
         db.session.commit()
 
 
+def test_purge_expired_reset_tokens(app, runner):
+    """Test that expired reset tokens are purged in batches."""
+    with app.app_context():
+        users = User.query.all()
+        for user in users:
+            user.generate_reset_token()
+        now = datetime.now(timezone.utc)
+        PasswordResetToken.query.update({'expires_at': now - timedelta(minutes=1)})
+        db.session.commit()
+
+        live = User.query.filter_by(username='testuser').first()
+        live_token = live.generate_reset_token()
+
+        assert PasswordResetToken.purge_expired(batch_size=1) == len(users) - 1
+        assert PasswordResetToken.query.count() == 1
+        assert live.verify_reset_token(live_token)
+
+        record = PasswordResetToken.query.one()
+        record.expires_at = now - timedelta(minutes=1)
+        db.session.commit()
+
+    result = runner.invoke(args=['purge-reset-tokens'])
+    assert 'Purged 1 expired reset tokens' in result.output
+
+
+def test_reset_token_sweeper(app):
+    """Test the background sweeper's single pass and its disabled setting."""
+    from app.utils.sweeper import sweep_reset_tokens, start_reset_token_sweeper
+
+    with app.app_context():
+        user = User.query.filter_by(username='testuser').first()
+        user.generate_reset_token()
+        PasswordResetToken.query.update({'expires_at': datetime.now(timezone.utc) - timedelta(minutes=1)})
+        db.session.commit()
+
+    assert sweep_reset_tokens(app) == 1
+
+    app.config['RESET_TOKEN_SWEEP_INTERVAL'] = 0
+    assert start_reset_token_sweeper(app) is None
+
+
 def test_update_last_seen(app):
     """Test updating the last_seen timestamp."""
     with app.app_context():
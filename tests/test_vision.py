@@ -0,0 +1,358 @@
+"""
+Tests for server-side video tracking.
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+import pytest
+from app import socketio, vision
+from app.motion.landmarks import WRIST
+from app.routes.game import _server_landmarks_handler
+from app.vision.extractors import LandmarkExtractor, MarkerExtractor, load_extractor
+from app.vision.pool import ExtractorPool
+from app.vision.ring import FrameRing
+from app.vision.video import draw_markers, read_video, resize, scaled_size, write_marker_video
+
+
+class BusyExtractor(LandmarkExtractor):
+    """Burn about 30 ms of CPU per frame."""
+
+    def process(self, image, detectors=None):
+        end = time.process_time() + 0.03
+        while time.process_time() < end:
+            pass
+        return {'hands': {}, 'body': None}
+
+
+def marker_tracks(frames=30):
+    t = np.linspace(0, 1, frames)
+    return {
+        'left': np.stack([100 + 200 * t, np.full(frames, 200.0)], axis=1),
+        'right': np.stack([500 - 100 * t, 300 + 50 * t], axis=1),
+    }
+
+
+def test_marker_video_round_trip(tmp_path):
+    """Test that markers drawn into a video file are found again after decoding."""
+    tracks = marker_tracks()
+    path = tmp_path / 'markers.mp4'
+    assert write_marker_video(path, tracks) == 30
+
+    extractor = MarkerExtractor()
+    frames = list(read_video(path))
+    assert len(frames) == 30
+    assert frames[3][1] == pytest.approx(100)
+    for i, (image, timestamp) in enumerate(frames):
+        hands = extractor.process(image)['hands']
+        for name, track in tracks.items():
+            np.testing.assert_allclose(hands[name][WRIST, :2], track[i], atol=2)
+            assert np.isnan(hands[name][1:]).all()
+
+    hidden = draw_markers({'left': (np.nan, np.nan), 'right': (50, 60)})
+    assert set(extractor.process(hidden)['hands']) == {'right'}
+    assert extractor.process(hidden, ('body',)) == {'hands': {}, 'body': None}
+
+
+def test_resize():
+    """Test scaling frames down to even sizes."""
+    assert scaled_size(640, 480, 1) == (640, 480)
+    assert scaled_size(640, 480, 0.75) == (480, 360)
+    assert scaled_size(641, 481, 0.5) == (320, 240)
+
+    image = draw_markers({'right': (320, 240)})
+    small = resize(image, 320, 240)
+    assert small.shape == (240, 320, 3)
+    np.testing.assert_allclose(MarkerExtractor().process(small)['hands']['right'][WRIST, :2], (160, 120), atol=1)
+    assert resize(image, 640, 480) is image
+
+
+def test_load_extractor():
+    """Test extractor specs."""
+    assert isinstance(load_extractor('marker'), MarkerExtractor)
+    assert isinstance(load_extractor('tests.test_vision:BusyExtractor'), BusyExtractor)
+    with pytest.raises(ValueError):
+        load_extractor('tests.test_vision:Missing')
+
+
+def test_pool_extracts_in_workers():
+    """Test that frames are processed by the worker processes."""
+    pool = ExtractorPool('marker', workers=2, max_inflight=8).start()
+    try:
+        image = draw_markers({'right': (320, 240)})
+        futures = [pool.submit('a', image) for _ in range(4)]
+        for future in futures:
+            np.testing.assert_allclose(future.result(timeout=30)['hands']['right'][WRIST, :2], (320, 240), atol=1)
+        stats = pool.stats('a')
+        assert stats['submitted'] == stats['completed'] == 4
+        assert stats['inflight'] == 0
+    finally:
+        pool.shutdown(wait=True)
+
+
+def test_pool_warms_up_before_ready():
+    """Test that workers report ready once their extractor is built and warmed up."""
+    pool = ExtractorPool('tests.test_vision:BusyExtractor', workers=2, warmup_frames=2)
+    assert not pool.ready()
+    try:
+        assert pool.wait_ready(timeout=30)
+        assert pool.ready()
+        reports = pool.warmup_reports()
+        assert len({report['pid'] for report in reports}) == 2
+        for report in reports:
+            # Two blank frames of about 30 ms each
+            assert report['warmup_ms'] >= 50
+            assert report['first_ms'] >= 25 and report['warm_ms'] >= 25
+    finally:
+        pool.shutdown(wait=True)
+
+    broken = ExtractorPool('tests.test_vision:Missing', workers=1)
+    try:
+        assert not broken.wait_ready(timeout=30)
+        assert broken.warmup_reports()[0]['error'].startswith('ValueError')
+        assert not broken.ready()
+    finally:
+        broken.shutdown()
+
+
+@pytest.mark.parametrize('batch_size', [1, 2])
+def test_pool_recovers_from_a_dead_worker(batch_size):
+    """Test that frames fail instead of raising once a worker dies, and the pool is rebuilt."""
+    import os
+    import signal
+    from concurrent.futures.process import BrokenProcessPool
+
+    pool = ExtractorPool('marker', workers=1, warmup_frames=1, batch_size=batch_size, max_wait_ms=1)
+    image = draw_markers({'right': (320, 240)})
+    try:
+        assert pool.wait_ready(timeout=30)
+        os.kill(pool.warmup_reports()[0]['pid'], signal.SIGKILL)
+
+        failed = 0
+        for _ in range(50):
+            try:
+                landmarks = pool.submit('a', image).result(timeout=30)
+            except BrokenProcessPool:
+                failed += 1
+                continue
+            break
+        assert failed >= 1
+        np.testing.assert_allclose(landmarks['hands']['right'][WRIST, :2], (320, 240), atol=1)
+        assert pool.stats('a')['inflight'] == 0
+    finally:
+        pool.shutdown(wait=True)
+
+
+@pytest.mark.parametrize('method', ['spawn', 'forkserver'])
+def test_pool_starts_every_worker_without_fork(method):
+    """Test that every worker starts and warms up when processes are not forked."""
+    import multiprocessing
+
+    default = multiprocessing.get_start_method()
+    multiprocessing.set_start_method(method, force=True)
+    pool = ExtractorPool('marker', workers=3, warmup_frames=1)
+    try:
+        assert pool.wait_ready(timeout=60)
+        assert len(pool.warmup_reports()) == 3
+    finally:
+        pool.shutdown(wait=True)
+        multiprocessing.set_start_method(default, force=True)
+
+
+def test_pool_session_budgets():
+    """Test that each session is held to its own CPU budget and in-flight limit."""
+    pool = ExtractorPool('tests.test_vision:BusyExtractor', workers=1, session_budget=0.1, burst=0.05,
+                         max_inflight=1).start()
+    image = np.zeros((4, 4, 3), dtype=np.uint8)
+    try:
+        first = pool.submit('heavy', image, now=0)
+        assert pool.submit('heavy', image, now=0) is None
+        first.result(timeout=30)
+        pool.submit('heavy', image, now=0).result(timeout=30)
+
+        # Two 30 ms frames exceed the 50 ms burst until the bucket refills
+        assert not pool.admit('heavy', now=0)
+        assert pool.submit('heavy', image, now=0) is None
+        assert pool.submit('light', image, now=0).result(timeout=30) is not None
+        assert pool.submit('heavy', image, now=1).result(timeout=30) is not None
+
+        stats = pool.stats('heavy')
+        assert (stats['completed'], stats['dropped_busy'], stats['dropped_budget']) == (3, 1, 2)
+        assert stats['cpu_seconds'] >= 0.09
+        pool.close_session('heavy')
+        assert pool.stats('heavy') is None
+    finally:
+        pool.shutdown(wait=True)
+
+
+def test_pool_shared_memory():
+    """Test that frames reach the workers through the session's ring, pickled or not."""
+    image = draw_markers({'left': (120, 90)})
+    for shared in (True, False):
+        pool = ExtractorPool('marker', workers=1, max_inflight=2, shared_memory=shared).start()
+        try:
+            hands = pool.submit('a', image).result(timeout=30)['hands']
+            np.testing.assert_allclose(hands['left'][WRIST, :2], (120, 90), atol=1)
+            ring = pool._sessions['a'].ring
+            assert (ring is not None) == shared
+            if shared:
+                assert ring.slots == 4
+                # A larger frame replaces the ring
+                pool.submit('a', np.zeros((600, 800, 3), dtype=np.uint8)).result(timeout=30)
+                assert pool._sessions['a'].ring is not ring
+        finally:
+            pool.shutdown(wait=True)
+    assert pool._sessions == {}
+
+
+def test_extract_shared_skips_stale_frames(monkeypatch):
+    """Test that a frame overwritten before the worker reads it is skipped."""
+    from app.vision import pool as pool_module
+    monkeypatch.setattr(pool_module, '_rings', OrderedDict())
+    monkeypatch.setattr(pool_module, '_extractor', None)
+    pool_module._init_worker('marker')
+    ring = FrameRing(2, 480, 640)
+    try:
+        image = draw_markers({'right': (320, 240)})
+        slot, sequence = ring.write(image)
+        landmarks, cpu = pool_module._extract_shared(ring.spec(), slot, sequence, None)
+        assert 'right' in landmarks['hands'] and cpu > 0
+
+        ring.write(image)
+        ring.write(image)
+        assert pool_module._extract_shared(ring.spec(), slot, sequence, None) == (None, 0.0)
+        for attached in pool_module._rings.values():
+            attached.close()
+    finally:
+        ring.close()
+    # A removed ring is skipped as well
+    assert pool_module._extract_shared((2, 480, 640, 3, 'mpg-frames-missing'), 0, 2, None) == (None, 0.0)
+
+
+@pytest.fixture
+def vision_app(app):
+    app.config.update({'VISION_SERVER_ENABLED': True, 'VISION_EXTRACTOR': 'marker', 'VISION_WORKERS': 1,
+                       'VISION_MAX_INFLIGHT': 64, 'VISION_SESSION_CPU_BURST': 30.0})
+    vision.init_app(app)
+    yield app
+    vision.shutdown()
+
+
+def test_video_file_feeds_gesture_pipeline(vision_app, client, auth, tmp_path):
+    """Test that landmarks from a video file reach the socket as gestures."""
+    auth.login()
+    socket = socketio.test_client(vision_app, flask_test_client=client)
+    socket.get_received()
+    sid = socketio.server.manager.sid_from_eio_sid(socket.eio_sid, '/')
+
+    path = tmp_path / 'markers.mp4'
+    write_marker_video(path, marker_tracks(10))
+    handler = _server_landmarks_handler(vision_app, 1, None)
+    assert vision.feed(sid, read_video(path), handler) == 10
+
+    events = [e['args'][0] for e in socket.get_received() if e['name'] == 'motion_gestures']
+    assert events
+    assert [e['timestamp'] for e in events] == sorted(e['timestamp'] for e in events)
+    assert all(set(e['hands']) == {'left', 'right'} for e in events)
+
+    socket.disconnect()
+    assert vision.pool.stats(sid) is None
+
+
+def test_scaled_frames_keep_full_frame_pixels(vision_app):
+    """Test that landmarks of frames scaled down by the scheduler are mapped back."""
+    vision.scheduler.open('scaled', 'boxing')
+    vision.scheduler._sessions['scaled'].level = 2
+    received = []
+    frames = [(draw_markers({'left': (101, 211)}), float(i)) for i in range(3)]
+    assert vision.feed('scaled', frames, lambda stream_id, landmarks, timestamp: received.append(landmarks)) == 3
+
+    np.testing.assert_allclose(received[-1]['hands']['left'][WRIST, :2], (101, 211), atol=2)
+    status = vision.status('scaled')
+    assert status['quality']['scale'] == 0.5
+    assert status['quality']['detectors'] == ['hands', 'body']
+    assert status['frames']['completed'] == 3
+    vision.stop('scaled')
+    assert vision.status('scaled') == {'ready': True, 'quality': None, 'frames': None}
+
+
+def test_vision_offer_validation(vision_app, client, auth):
+    """Test the offer handler's error paths."""
+    auth.login()
+    socket = socketio.test_client(vision_app, flask_test_client=client)
+    socket.get_received()
+
+    socket.emit('vision_offer', {'type': 'offer'})
+    assert socket.get_received()[0]['name'] == 'vision_error'
+
+    # Workers that cannot build their extractor never become ready
+    vision.pool.extractor = 'tests.test_vision:Missing'
+    socket.emit('vision_offer', {'sdp': 'v=0', 'type': 'offer'})
+    assert socket.get_received()[0]['args'][0] == {'error': 'Server-side tracking is not ready yet'}
+
+    vision.enabled = False
+    socket.emit('vision_offer', {'sdp': 'v=0', 'type': 'offer'})
+    assert socket.get_received()[0]['args'][0] == {'error': 'Server-side tracking is disabled'}
+
+    socket.emit('vision_status')
+    assert socket.get_received()[0]['args'][0] == {'ready': False, 'quality': None, 'frames': None}
+    socket.disconnect()
+
+
+def test_vision_offer_uses_the_session_game_mode(vision_app, client, auth, monkeypatch):
+    """Test that sessions are created with a game mode and tracking follows it."""
+    auth.login()
+    assert client.post('/game/api/create_session', json={'game_mode': 'chess'}).status_code == 400
+    session_id = client.post('/game/api/create_session', json={'game_mode': 'boxing'}).get_json()['session_id']
+    assert b'gameMode: "boxing"' in client.get(f'/game/play/{session_id}').data
+
+    modes = []
+    monkeypatch.setattr(vision, 'offer', lambda *args, game_mode=None: modes.append(game_mode) or {})
+    socket = socketio.test_client(vision_app, flask_test_client=client)
+    socket.emit('vision_offer', {'sdp': 'v=0', 'type': 'offer', 'session_id': session_id})
+    socket.emit('vision_offer', {'sdp': 'v=0', 'type': 'offer', 'session_id': session_id,
+                                 'game_mode': 'shadow_dance'})
+    socket.emit('vision_offer', {'sdp': 'v=0', 'type': 'offer'})
+    assert modes == ['boxing', 'shadow_dance', None]
+    socket.disconnect()
+
+
+def test_webrtc_loopback(vision_app):
+    """Test tracking a video track received over a real WebRTC connection."""
+    from aiortc import RTCPeerConnection, RTCSessionDescription, VideoStreamTrack
+    from av import VideoFrame
+
+    class MarkerTrack(VideoStreamTrack):
+        async def recv(self):
+            pts, time_base = await self.next_timestamp()
+            frame = VideoFrame.from_ndarray(draw_markers({'right': (200, 150)}), format='rgb24')
+            frame.pts, frame.time_base = pts, time_base
+            return frame
+
+    received = []
+    done = threading.Event()
+
+    def on_landmarks(stream_id, landmarks, timestamp):
+        received.append(landmarks['hands'])
+        if len(received) >= 3:
+            done.set()
+
+    async def call():
+        peer = RTCPeerConnection()
+        peer.addTrack(MarkerTrack())
+        await peer.setLocalDescription(await peer.createOffer())
+        answer = await asyncio.get_running_loop().run_in_executor(
+            None, vision.offer, 'loopback', peer.localDescription.sdp, peer.localDescription.type, on_landmarks,
+            'shadow_dance')
+        await peer.setRemoteDescription(RTCSessionDescription(**answer))
+        await asyncio.get_running_loop().run_in_executor(None, done.wait, 30)
+        await peer.close()
+
+    asyncio.run(call())
+    assert vision.status('loopback')['quality']['game_mode'] == 'shadow_dance'
+    vision.stop('loopback')
+
+    assert done.is_set()
+    # Video compression shifts marker colours and edges slightly
+    np.testing.assert_allclose(received[-1]['right'][WRIST, :2], (200, 150), atol=3)